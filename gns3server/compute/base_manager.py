@@ -38,13 +38,15 @@ from gns3server.utils.interfaces import is_interface_up
 from ..config import Config
 from ..utils.asyncio import wait_run_in_executor
 from ..utils import force_unix_path
+from ..ubridge.hypervisor_pool import UbridgeHypervisorPool
+from ..utils.asyncio.file_tail import FileTail, FileTailClosedError
 from .project_manager import ProjectManager
 from .port_manager import PortManager
 
 from .nios.nio_udp import NIOUDP
 from .nios.nio_tap import NIOTAP
 from .nios.nio_ethernet import NIOEthernet
-from ..utils.images import md5sum, remove_checksum, images_directories, default_images_directory, list_images
+from ..utils.images import md5sum, remove_checksum, images_directories, default_images_directory, list_images, directory_index
 from .error import NodeError, ImageMissingError
 
 CHUNK_SIZE = 1024 * 8  # 8KB
@@ -58,6 +60,9 @@ class BaseManager:
     """
 
     _convert_lock = None
+    _ubridge_pool = None
+    # capture file path => FileTail shared by the clients streaming the capture
+    _pcap_tails = {}
 
     def __init__(self):
 
@@ -132,6 +137,34 @@ class BaseManager:
 
         return self._config
 
+    @property
+    def ubridge_pool(self):
+        """
+        Returns the pool of uBridge hypervisors shared by the nodes of
+        all the modules, None if each node runs its own uBridge.
+
+        :returns: UbridgeHypervisorPool instance or None
+        """
+
+        server_config = self.config.get_section_config("Server")
+        size = int(server_config.get("ubridge_shared_hypervisors", 0))
+        if size <= 0:
+            return None
+        if BaseManager._ubridge_pool is None:
+            BaseManager._ubridge_pool = UbridgeHypervisorPool(size, server_config.get("host"))
+        return BaseManager._ubridge_pool
+
+    @staticmethod
+    async def close_ubridge_pool():
+        """
+        Stops the shared uBridge hypervisors when the server shuts down.
+        """
+
+        if BaseManager._ubridge_pool is not None:
+            pool = BaseManager._ubridge_pool
+            BaseManager._ubridge_pool = None
+            await pool.close()
+
     async def unload(self):
 
         tasks = []
@@ -180,6 +213,27 @@ class BaseManager:
 
         return node
 
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on a node, used when the same action
+        is sent for multiple nodes at once.
+
+        :param node: Node instance
+        :param action: start, stop, suspend or reload
+        :param data: Data sent with the action
+        """
+
+        if action == "start":
+            await node.start()
+        elif action == "stop":
+            await node.stop()
+        elif action == "suspend":
+            await node.suspend()
+        elif action == "reload":
+            await node.reload()
+        else:
+            raise aiohttp.web.HTTPBadRequest(text="Unknown node action '{}'".format(action))
+
     async def convert_old_project(self, project, legacy_id, name):
         """
         Convert projects made before version 1.3
@@ -455,19 +509,35 @@ class BaseManager:
         response.set_status(200)
         response.enable_chunked_encoding()
 
+        # the capture file is read once for all the clients
+        while True:
+            tail = BaseManager._pcap_tails.get(path)
+            if tail is None or tail.closed:
+                tail = FileTail(path, lambda: nio.capturing)
+                BaseManager._pcap_tails[path] = tail
+
+            try:
+                reader = await tail.open_reader()
+                break
+            except FileTailClosedError:
+                # the last client of the capture left while the file was opened
+                continue
+            except FileNotFoundError:
+                raise aiohttp.web.HTTPNotFound()
+            except PermissionError:
+                raise aiohttp.web.HTTPForbidden()
+
         try:
-            with open(path, "rb") as f:
-                await response.prepare(request)
-                while nio.capturing:
-                    data = f.read(CHUNK_SIZE)
-                    if not data:
-                        await asyncio.sleep(0.1)
-                        continue
-                    await response.write(data)
-        except FileNotFoundError:
-            raise aiohttp.web.HTTPNotFound()
-        except PermissionError:
-            raise aiohttp.web.HTTPForbidden()
+            await response.prepare(request)
+            while True:
+                data = await reader.read()
+                if not data:
+                    break
+                await response.write(data)
+        finally:
+            await reader.close()
+            if tail.closed and BaseManager._pcap_tails.get(path) is tail:
+                del BaseManager._pcap_tails[path]
 
     def get_abs_image_path(self, path, extra_dir=None):
         """
@@ -533,16 +603,8 @@ class BaseManager:
 
         :returns: Path or None if not found
         """
-        s = os.path.split(searched_file)
 
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                # If filename is the same
-                if s[1] == file and (s[0] == '' or s[0] == os.path.basename(root)):
-                    path = os.path.normpath(os.path.join(root, s[1]))
-                    if os.path.exists(path):
-                        return path
-        return None
+        return directory_index(directory).find(searched_file)
 
     def get_relative_image_path(self, path, extra_dir=None):
         """
@@ -582,7 +644,7 @@ class BaseManager:
         """
 
         try:
-            return list_images(self._NODE_TYPE)
+            return await wait_run_in_executor(list_images, self._NODE_TYPE)
         except OSError as e:
             raise aiohttp.web.HTTPConflict(text="Can not list images {}".format(e))
 
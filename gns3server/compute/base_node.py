@@ -32,6 +32,8 @@ from gns3server.utils.interfaces import interfaces
 from ..compute.port_manager import PortManager
 from ..utils.asyncio import wait_run_in_executor, locking
 from ..utils.asyncio.telnet_server import AsyncioTelnetServer
+from ..utils.asyncio.console_history import ConsoleHistory
+from ..config import Config
 from ..ubridge.hypervisor import Hypervisor
 from ..ubridge.ubridge_error import UbridgeError
 from .nios.nio_udp import NIOUDP
@@ -57,6 +59,10 @@ class BaseNode:
     :param wrap_console: The console is wrapped using AsyncioTelnetServer
     """
 
+    # The bridges of the node can run on a uBridge hypervisor shared with other nodes
+    # (their names must be unique on the compute)
+    _ubridge_shareable = False
+
     def __init__(self, name, node_id, project, manager, console=None, console_type="telnet", aux=None, allocate_aux=False, linked_clone=True, wrap_console=False):
 
         self._name = name
@@ -78,6 +84,7 @@ class BaseNode:
         self._wrap_console = wrap_console
         self._wrapper_telnet_server = None
         self._internal_console_port = None
+        self._console_history = None
         self._custom_adapters = []
         self._ubridge_require_privileged_access = False
 
@@ -94,18 +101,23 @@ class BaseNode:
         if self._aux is not None:
             self._aux = self._manager.port_manager.reserve_tcp_port(self._aux, self._project)
 
-        if self._console is None:
-            if console_type == "vnc":
-                # VNC is a special case and the range must be 5900-6000
-                self._console = self._manager.port_manager.get_free_tcp_port(self._project, port_range_start=5900, port_range_end=6000)
-            elif console_type != "none":
-                self._console = self._manager.port_manager.get_free_tcp_port(self._project)
-
-        if self._wrap_console:
-            self._internal_console_port = self._manager.port_manager.get_free_tcp_port(self._project)
-
-        if self._aux is None and allocate_aux:
-            self._aux = self._manager.port_manager.get_free_tcp_port(self._project)
+        if self._console is None and console_type == "vnc":
+            # VNC is a special case and the range must be 5900-6000
+            self._console = self._manager.port_manager.get_free_tcp_port(self._project, port_range_start=5900, port_range_end=6000)
+
+        # the other ports of the node are taken from the console range at once,
+        # none of them is kept if the range is exhausted
+        allocate_console = self._console is None and console_type != "none"
+        allocate_aux = self._aux is None and allocate_aux
+        count = sum(1 for allocate in (allocate_console, self._wrap_console, allocate_aux) if allocate)
+        if count:
+            ports = self._manager.port_manager.get_free_tcp_ports(self._project, count)
+            if allocate_console:
+                self._console = ports.pop(0)
+            if self._wrap_console:
+                self._internal_console_port = ports.pop(0)
+            if allocate_aux:
+                self._aux = ports.pop(0)
 
         log.debug("{module}: {name} [{id}] initialized. Console port {console}".format(module=self.manager.module_name,
                                                                                        name=self.name,
@@ -357,7 +369,7 @@ class BaseNode:
             await asyncio.sleep(0.1)
             remaining_trial -= 1
         await AsyncioTelnetServer.write_client_intro(writer, echo=True)
-        server = AsyncioTelnetServer(reader=reader, writer=writer, binary=True, echo=True)
+        server = AsyncioTelnetServer(reader=reader, writer=writer, binary=True, echo=True, history=self._get_console_history())
         # warning: this will raise OSError exception if there is a problem...
         self._wrapper_telnet_server = await asyncio.start_server(server.run, self._manager.port_manager.console_host, self.console)
 
@@ -511,6 +523,28 @@ class BaseNode:
                                                                                     id=self.id,
                                                                                     port=console))
 
+    @property
+    def console_history(self):
+        """
+        Returns the output recorded from the console.
+
+        :returns: ConsoleHistory instance, None when the console is not served by GNS3
+        """
+
+        return self._console_history
+
+    def _get_console_history(self):
+        """
+        Returns the history recording the output of the console,
+        the history is kept when the node is restarted.
+        """
+
+        if self._console_history is None:
+            size = int(Config.instance().get_section_config("Server").get("console_history_size", 256))
+            if size > 0:
+                self._console_history = ConsoleHistory(max_size=size * 1024)
+        return self._console_history
+
     @property
     def console_type(self):
         """
@@ -599,6 +633,29 @@ class BaseNode:
         except UbridgeError as e:
             raise UbridgeError("Error while sending command '{}': {}: {}".format(command, e, self._ubridge_hypervisor.read_stdout()))
 
+    async def _ubridge_send_batch(self, commands, ignore_errors=False):
+        """
+        Sends multiple commands to uBridge hypervisor in one round trip.
+
+        :param commands: list of commands to send
+        :param ignore_errors: return the errors instead of raising the first one
+
+        :returns: list with the results of each command or an UbridgeError
+        instance if the command failed and errors are ignored
+        """
+
+        if not self._ubridge_hypervisor or not self._ubridge_hypervisor.is_running():
+            await self._start_ubridge(self._ubridge_require_privileged_access)
+        if not self._ubridge_hypervisor or not self._ubridge_hypervisor.is_running():
+            raise NodeError("Cannot send commands '{}': uBridge is not running".format("', '".join(commands)))
+        results = await self._ubridge_hypervisor.send_batch(commands, ignore_errors=True)
+        for index, result in enumerate(results):
+            if isinstance(result, UbridgeError):
+                results[index] = UbridgeError("Error while sending command '{}': {}: {}".format(commands[index], result, self._ubridge_hypervisor.read_stdout()))
+                if not ignore_errors:
+                    raise results[index]
+        return results
+
     @locking
     async def _start_ubridge(self, require_privileged_access=False):
         """
@@ -615,6 +672,14 @@ class BaseNode:
         if require_privileged_access and not self._manager.has_privileged_access(self.ubridge_path):
             raise NodeError("uBridge requires root access or the capability to interact with network adapters")
 
+        # save if privileged are required in case uBridge needs to be restarted in self._ubridge_send()
+        self._ubridge_require_privileged_access = require_privileged_access
+        if self._ubridge_shareable and not require_privileged_access:
+            pool = self._manager.ubridge_pool
+            if pool:
+                self._ubridge_hypervisor = await pool.acquire(self.ubridge_path, self._name)
+                return
+
         server_config = self._manager.config.get_section_config("Server")
         server_host = server_config.get("host")
         if not self.ubridge:
@@ -624,8 +689,6 @@ class BaseNode:
         if self._ubridge_hypervisor:
             log.info("Hypervisor {}:{} has successfully started".format(self._ubridge_hypervisor.host, self._ubridge_hypervisor.port))
             await self._ubridge_hypervisor.connect()
-        # save if privileged are required in case uBridge needs to be restarted in self._ubridge_send()
-        self._ubridge_require_privileged_access = require_privileged_access
 
     async def _stop_ubridge(self):
         """
@@ -646,27 +709,41 @@ class BaseNode:
         :param destination_nio: destination NIO instance
         """
 
-        await self._ubridge_send("bridge create {name}".format(name=bridge_name))
-
         if not isinstance(destination_nio, NIOUDP):
             raise NodeError("Destination NIO is not UDP")
 
-        await self._ubridge_send('bridge add_nio_udp {name} {lport} {rhost} {rport}'.format(name=bridge_name,
-                                                                                                 lport=source_nio.lport,
-                                                                                                 rhost=source_nio.rhost,
-                                                                                                 rport=source_nio.rport))
+        # the bridge is created alone, the next commands must not configure
+        # another bridge with the same name if it already exists
+        await self._ubridge_send("bridge create {name}".format(name=bridge_name))
 
-        await self._ubridge_send('bridge add_nio_udp {name} {lport} {rhost} {rport}'.format(name=bridge_name,
-                                                                                                 lport=destination_nio.lport,
-                                                                                                 rhost=destination_nio.rhost,
-                                                                                                 rport=destination_nio.rport))
+        commands = ['bridge add_nio_udp {name} {lport} {rhost} {rport}'.format(name=bridge_name,
+                                                                              lport=source_nio.lport,
+                                                                              rhost=source_nio.rhost,
+                                                                              rport=source_nio.rport)]
 
-        if destination_nio.capturing:
-            await self._ubridge_send('bridge start_capture {name} "{pcap_file}"'.format(name=bridge_name,
-                                                                                             pcap_file=destination_nio.pcap_output_file))
+        commands.append('bridge add_nio_udp {name} {lport} {rhost} {rport}'.format(name=bridge_name,
+                                                                                   lport=destination_nio.lport,
+                                                                                   rhost=destination_nio.rhost,
+                                                                                   rport=destination_nio.rport))
 
-        await self._ubridge_send('bridge start {name}'.format(name=bridge_name))
-        await self._ubridge_apply_filters(bridge_name, destination_nio.filters)
+        if destination_nio.capturing:
+            commands.append('bridge start_capture {name} "{pcap_file}"'.format(name=bridge_name,
+                                                                               pcap_file=destination_nio.pcap_output_file))
+
+        commands.append('bridge start {name}'.format(name=bridge_name))
+
+        # the connection and its filters are configured in one round trip
+        filter_commands = self._ubridge_filter_commands(bridge_name, destination_nio.filters)
+        results = await self._ubridge_send_batch(commands + filter_commands, ignore_errors=True)
+        for result in results[:len(commands)]:
+            if isinstance(result, UbridgeError):
+                # the commands following the failed one have been run on a half-configured bridge
+                try:
+                    await self._ubridge_send("bridge delete {name}".format(name=bridge_name))
+                except UbridgeError as e:
+                    log.warning("Could not delete bridge {}: {}".format(bridge_name, e))
+                raise result
+        self._check_ubridge_filter_results(results[len(commands):])
 
     async def update_ubridge_udp_connection(self, bridge_name, source_nio, destination_nio):
         if destination_nio:
@@ -688,19 +765,35 @@ class BaseNode:
         :param filters: Array of filter dictionary
         """
 
-        await self._ubridge_send('bridge reset_packet_filters ' + bridge_name)
+        results = await self._ubridge_send_batch(self._ubridge_filter_commands(bridge_name, filters), ignore_errors=True)
+        self._check_ubridge_filter_results(results)
+
+    def _ubridge_filter_commands(self, bridge_name, filters):
+        """
+        :returns: uBridge commands to replace the packet filters of a bridge
+        """
+
+        commands = ['bridge reset_packet_filters ' + bridge_name]
         for packet_filter in self._build_filter_list(filters):
-            cmd = 'bridge add_packet_filter {} {}'.format(bridge_name, packet_filter)
-            try:
-                await self._ubridge_send(cmd)
-            except UbridgeError as e:
-                match = re.search(r"Cannot compile filter '(.*)': syntax error", str(e))
+            commands.append('bridge add_packet_filter {} {}'.format(bridge_name, packet_filter))
+        return commands
+
+    def _check_ubridge_filter_results(self, results):
+        """
+        Raises the errors of the packet filter commands, BPF syntax errors are only reported.
+
+        :param results: results of the commands returned by _ubridge_filter_commands()
+        """
+
+        for result in results:
+            if isinstance(result, UbridgeError):
+                match = re.search(r"Cannot compile filter '(.*)': syntax error", str(result))
                 if match:
                     message = "Warning: ignoring BPF packet filter '{}' due to syntax error".format(self.name, match.group(1))
                     log.warning(message)
                     self.project.emit("log.warning", {"message": message})
                 else:
-                    raise
+                    raise result
 
     def _build_filter_list(self, filters):
         """
@@ -780,8 +873,7 @@ class BaseNode:
         """
 
         m = PortManager.instance()
-        lport = m.get_free_udp_port(self.project)
-        rport = m.get_free_udp_port(self.project)
+        lport, rport = m.get_free_udp_ports(self.project, 2)
         source_nio_settings = {'lport': lport, 'rhost': '127.0.0.1', 'rport': rport, 'type': 'nio_udp'}
         destination_nio_settings = {'lport': rport, 'rhost': '127.0.0.1', 'rport': lport, 'type': 'nio_udp'}
         source_nio = self.manager.create_nio(source_nio_settings)
@@ -22,6 +22,8 @@ Builtin nodes server module.
 
 from ..base_manager import BaseManager
 from .builtin_node_factory import BuiltinNodeFactory, BUILTIN_NODES
+from .nodes.cloud import Cloud
+from .nodes.nat import Nat
 
 import logging
 log = logging.getLogger(__name__)
@@ -44,3 +46,12 @@ class Builtin(BaseManager):
         if BUILTIN_NODES['nat'].is_supported():
             types.append('nat')
         return types
+
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on a builtin node, only the cloud
+        needs to be started.
+        """
+
+        if action == "start" and isinstance(node, Cloud) and not isinstance(node, Nat):
+            await node.start()
@@ -97,6 +97,19 @@ class Docker(BaseManager):
         if self._session and not self._session.closed:
             await self._session.close()
 
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on a Docker container, a suspended
+        container is paused and a reloaded one restarted.
+        """
+
+        if action == "suspend":
+            await node.pause()
+        elif action == "reload":
+            await node.restart()
+        else:
+            await super().node_action(node, action, data)
+
     async def query(self, method, path, data={}, params={}):
         """
         Makes a query to the Docker daemon and decode the request
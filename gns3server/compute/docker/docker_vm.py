@@ -683,7 +683,7 @@ class DockerVM(BaseNode):
 
         output_stream = asyncio.StreamReader()
         input_stream = InputStream()
-        telnet = AsyncioTelnetServer(reader=output_stream, writer=input_stream, echo=True, naws=True, window_size_changed_callback=self._window_size_changed_callback)
+        telnet = AsyncioTelnetServer(reader=output_stream, writer=input_stream, echo=True, naws=True, window_size_changed_callback=self._window_size_changed_callback, history=self._get_console_history())
         try:
             self._telnet_servers.append((await asyncio.start_server(telnet.run, self._manager.port_manager.console_host, self.console)))
         except OSError as e:
@@ -880,8 +880,9 @@ class DockerVM(BaseNode):
             raise DockerError("Adapter {adapter_number} doesn't exist on Docker container '{name}'".format(name=self.name,
                                                                                                            adapter_number=adapter_number))
 
+        host_interfaces = psutil.net_if_addrs()
         for index in range(4096):
-            if "tap-gns3-e{}".format(index) not in psutil.net_if_addrs():
+            if "tap-gns3-e{}".format(index) not in host_interfaces:
                 adapter.host_ifc = "tap-gns3-e{}".format(str(index))
                 break
         if adapter.host_ifc is None:
@@ -319,6 +319,21 @@ class Dynamips(BaseManager):
                 except GeneratorExit:
                     log.warning("Could not create ghost IOS image {} (GeneratorExit)".format(vm.name))
 
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on a Dynamips node, the switches
+        and hubs don't need to be started.
+        """
+
+        if not isinstance(node, Router):
+            return
+        if action == "start":
+            try:
+                await self.ghost_ios_support(node)
+            except GeneratorExit:
+                pass
+        await super().node_action(node, action, data)
+
     async def create_nio(self, node, nio_settings):
         """
         Creates a new NIO.
@@ -20,12 +20,12 @@ Interface for Dynamips hypervisor management module ("hypervisor")
 http://github.com/GNS3/dynamips/blob/master/README.hypervisor#L46
 """
 
-import re
 import time
 import logging
 import asyncio
 
 from .dynamips_error import DynamipsError
+from ...utils.hypervisor_protocol import HypervisorResponseParser
 
 log = logging.getLogger(__name__)
 
@@ -42,10 +42,6 @@ class DynamipsHypervisor:
     hypervisor (defaults to 30 seconds)
     """
 
-    # Used to parse Dynamips response codes
-    error_re = re.compile(r"""^2[0-9]{2}-""")
-    success_re = re.compile(r"""^1[0-9]{2}\s{1}""")
-
     def __init__(self, working_dir, host, port=7200, timeout=30.0):
 
         self._host = host
@@ -225,38 +221,43 @@ class DynamipsHypervisor:
         :returns: results as a list
         """
 
-        # Dynamips responses are of the form:
-        #   1xx yyyyyy\r\n
-        #   1xx yyyyyy\r\n
-        #   ...
-        #   100-yyyy\r\n
-        # or
-        #   2xx-yyyy\r\n
-        #
-        # Where 1xx is a code from 100-199 for a success or 200-299 for an error
-        # The result might be multiple lines and might be less than the buffer size
-        # but still have more data. The only thing we know for sure is the last line
-        # will begin with '100-' or a '2xx-' and end with '\r\n'
+        results = await self.send_batch([command])
+        return results[0]
+
+    async def send_batch(self, commands, ignore_errors=False):
+        """
+        Sends multiple commands to this hypervisor without waiting
+        for the response of a command before sending the next one.
+
+        :param commands: list of Dynamips hypervisor commands
+        :param ignore_errors: return the errors instead of raising the first one
+
+        :returns: list with the results of each command (list of lines) or
+        a DynamipsError instance if the command failed and errors are ignored
+        """
 
         async with self._io_lock:
             if self._writer is None or self._reader is None:
                 raise DynamipsError("Not connected")
 
+            if not commands:
+                return []
+            commands = [command.strip() for command in commands]
             try:
-                command = command.strip() + '\n'
-                log.debug("sending {}".format(command))
-                self._writer.write(command.encode())
+                log.debug("sending {}".format(commands))
+                self._writer.write("".join(command + "\n" for command in commands).encode())
                 await self._writer.drain()
             except OSError as e:
                 raise DynamipsError("Could not send Dynamips command '{command}' to {host}:{port}: {error}, process running: {run}"
-                                    .format(command=command.strip(), host=self._host, port=self._port, error=e, run=self.is_running()))
+                                    .format(command=commands[0], host=self._host, port=self._port, error=e, run=self.is_running()))
 
-            # Now retrieve the result
-            data = []
-            buf = ''
+            # Now retrieve the results, the responses are in the same order than the commands
+            parser = HypervisorResponseParser()
+            results = []
             retries = 0
             max_retries = 10
-            while True:
+            while len(results) < len(commands):
+                command = commands[len(results)]
                 try:
                     try:
                         # line = await self._reader.readline()  # this can lead to ValueError: Line is too long
@@ -280,39 +281,19 @@ class DynamipsHypervisor:
                             await asyncio.sleep(0.1)
                             continue
                     retries = 0
-                    buf += chunk.decode("utf-8", errors="ignore")
+                    responses = parser.feed(chunk.decode("utf-8", errors="ignore"))
                 except OSError as e:
                     raise DynamipsError("Could not read response for '{command}' from {host}:{port}: {error}, process running: {run}"
-                                        .format(command=command.strip(), host=self._host, port=self._port, error=e, run=self.is_running()))
-
-                # If the buffer doesn't end in '\n' then we can't be done
-                try:
-                    if buf[-1] != '\n':
-                        continue
-                except IndexError:
-                    raise DynamipsError("Could not communicate with {host}:{port}, Dynamips process running: {run}"
-                                        .format(host=self._host, port=self._port, run=self.is_running()))
-
-                data += buf.split('\r\n')
-                if data[-1] == '':
-                    data.pop()
-                buf = ''
-
-                # Does it contain an error code?
-                if self.error_re.search(data[-1]):
-                    raise DynamipsError("Dynamips error when running command '{}': {}".format(command, data[-1][4:]))
-
-                # Or does the last line begin with '100-'? Then we are done!
-                if data[-1][:4] == '100-':
-                    data[-1] = data[-1][4:]
-                    if data[-1] == 'OK':
-                        data.pop()
-                    break
-
-            # Remove success responses codes
-            for index in range(len(data)):
-                if self.success_re.search(data[index]):
-                    data[index] = data[index][4:]
-
-            log.debug("returned result {}".format(data))
-            return data
+                                        .format(command=command, host=self._host, port=self._port, error=e, run=self.is_running()))
+
+                for error, result in responses:
+                    if error:
+                        result = DynamipsError("Dynamips error when running command '{}': {}".format(commands[len(results)], result))
+                    results.append(result)
+
+            log.debug("returned results {}".format(results))
+            if not ignore_errors:
+                for result in results:
+                    if isinstance(result, DynamipsError):
+                        raise result
+            return results
@@ -101,8 +101,21 @@ class NIO:
         :param pcap_data_link_type: PCAP data link type (DLT_*), default is DLT_EN10MB
         """
 
-        await self.bind_filter("both", "capture")
-        await self.setup_filter("both", '{} "{}"'.format(pcap_data_link_type, pcap_output_file))
+        # the filter is bound and set up in a single round trip
+        dynamips_direction = self._dynamips_direction["both"]
+        options = '{} "{}"'.format(pcap_data_link_type, pcap_output_file)
+        results = await self._hypervisor.send_batch(["nio bind_filter {name} {direction} capture".format(name=self._name,
+                                                                                                          direction=dynamips_direction),
+                                                     "nio setup_filter {name} {direction} {options}".format(name=self._name,
+                                                                                                            direction=dynamips_direction,
+                                                                                                            options=options)],
+                                                    ignore_errors=True)
+        if isinstance(results[0], DynamipsError):
+            raise results[0]
+        self._input_filter = self._output_filter = "capture"
+        if isinstance(results[1], DynamipsError):
+            raise results[1]
+        self._input_filter_options = self._output_filter_options = options
         self._capturing = True
         self._pcap_output_file = pcap_output_file
         self._pcap_data_link_type = pcap_data_link_type
@@ -62,6 +62,8 @@ class Router(BaseNode):
                2: "running",
                3: "suspended"}
 
+    _ubridge_shareable = True
+
     def __init__(self, name, node_id, project, manager, dynamips_id=None, console=None, console_type="telnet", aux=None, platform="c7200", hypervisor=None, ghost_flag=False):
 
         super().__init__(name, node_id, project, manager, console=console, console_type=console_type, aux=aux, allocate_aux=aux)
@@ -224,16 +226,17 @@ class Router(BaseNode):
                                                                                  platform=self._platform,
                                                                                  id=self._id))
 
+            commands = []
             if self._console:
-                await self._hypervisor.send('vm set_con_tcp_port "{name}" {console}'.format(name=self._name, console=self._console))
+                commands.append('vm set_con_tcp_port "{name}" {console}'.format(name=self._name, console=self._console))
 
             if self.aux is not None:
-                await self._hypervisor.send('vm set_aux_tcp_port "{name}" {aux}'.format(name=self._name, aux=self.aux))
+                commands.append('vm set_aux_tcp_port "{name}" {aux}'.format(name=self._name, aux=self.aux))
 
             # get the default base MAC address
-            mac_addr = await self._hypervisor.send('{platform} get_mac_addr "{name}"'.format(platform=self._platform,
-                                                                                                  name=self._name))
-            self._mac_addr = mac_addr[0]
+            commands.append('{platform} get_mac_addr "{name}"'.format(platform=self._platform, name=self._name))
+            results = await self._hypervisor.send_batch(commands)
+            self._mac_addr = results[-1][0]
 
         self._hypervisor.devices.append(self)
 
@@ -1266,28 +1269,37 @@ class Router(BaseNode):
             raise DynamipsError("Port {port_number} does not exist on adapter {adapter}".format(adapter=adapter,
                                                                                                 port_number=port_number))
 
-        try:
-            await self._hypervisor.send('vm slot_add_nio_binding "{name}" {slot_number} {port_number} {nio}'.format(name=self._name,
-                                                                                                                         slot_number=slot_number,
-                                                                                                                         port_number=port_number,
-                                                                                                                         nio=nio))
-        except DynamipsError:
+        # the NIO is bound and enabled on a running router in a single round trip
+        add_command = 'vm slot_add_nio_binding "{name}" {slot_number} {port_number} {nio}'.format(name=self._name,
+                                                                                                 slot_number=slot_number,
+                                                                                                 port_number=port_number,
+                                                                                                 nio=nio)
+        commands = [add_command]
+        is_running = await self.is_running()
+        if is_running:
+            commands.append('vm slot_enable_nio "{name}" {slot_number} {port_number}'.format(name=self._name,
+                                                                                             slot_number=slot_number,
+                                                                                             port_number=port_number))
+        results = await self._hypervisor.send_batch(commands, ignore_errors=True)
+        if isinstance(results[0], DynamipsError):
             # in case of error try to remove and add the nio binding
-            await self._hypervisor.send('vm slot_remove_nio_binding "{name}" {slot_number} {port_number}'.format(name=self._name,
-                                                                                                                      slot_number=slot_number,
-                                                                                                                      port_number=port_number))
-            await self._hypervisor.send('vm slot_add_nio_binding "{name}" {slot_number} {port_number} {nio}'.format(name=self._name,
-                                                                                                                         slot_number=slot_number,
-                                                                                                                         port_number=port_number,
-                                                                                                                         nio=nio))
+            remove_command = 'vm slot_remove_nio_binding "{name}" {slot_number} {port_number}'.format(name=self._name,
+                                                                                                     slot_number=slot_number,
+                                                                                                     port_number=port_number)
+            await self._hypervisor.send_batch([remove_command] + commands)
+        elif is_running and isinstance(results[1], DynamipsError):
+            raise results[1]
 
         log.info('Router "{name}" [{id}]: NIO {nio_name} bound to port {slot_number}/{port_number}'.format(name=self._name,
                                                                                                            id=self._id,
                                                                                                            nio_name=nio.name,
                                                                                                            slot_number=slot_number,
                                                                                                            port_number=port_number))
-
-        await self.slot_enable_nio(slot_number, port_number)
+        if is_running:
+            log.info('Router "{name}" [{id}]: NIO enabled on port {slot_number}/{port_number}'.format(name=self._name,
+                                                                                                      id=self._id,
+                                                                                                      slot_number=slot_number,
+                                                                                                      port_number=port_number))
         adapter.add_nio(port_number, nio)
 
     async def slot_update_nio_binding(self, slot_number, port_number, nio):
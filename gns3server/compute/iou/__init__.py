@@ -23,6 +23,7 @@ import os
 import asyncio
 
 from ..base_manager import BaseManager
+from ...schemas.iou import IOU_START_SCHEMA
 from .iou_error import IOUError
 from .iou_vm import IOUVM
 
@@ -50,6 +51,20 @@ class IOU(BaseManager):
         node = await super().create_node(*args, **kwargs)
         return node
 
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on an IOU VM, the license settings are
+        sent with the start action. IOU cannot be suspended.
+        """
+
+        if action == "suspend":
+            return
+        if action == "start" and data:
+            for name, value in data.items():
+                if name in IOU_START_SCHEMA["properties"] and getattr(node, name) != value:
+                    setattr(node, name, value)
+        await super().node_action(node, action, data)
+
     @staticmethod
     def get_legacy_vm_workdir(legacy_vm_id, name):
         """
@@ -54,6 +54,7 @@ log = logging.getLogger(__name__)
 
 class IOUVM(BaseNode):
     module_name = 'iou'
+    _ubridge_shareable = True
 
     """
     IOU VM implementation.
@@ -570,7 +571,7 @@ class IOUVM(BaseNode):
                 raise IOUError("Could not start IOU {}: {}\n{}".format(self._path, e, iou_stdout))
 
             if self.console and self.console_type == "telnet":
-                server = AsyncioTelnetServer(reader=self._iou_process.stdout, writer=self._iou_process.stdin, binary=True, echo=True)
+                server = AsyncioTelnetServer(reader=self._iou_process.stdout, writer=self._iou_process.stdin, binary=True, echo=True, history=self._get_console_history())
                 try:
                     self._telnet_server = await asyncio.start_server(server.run, self._manager.port_manager.console_host, self.console)
                 except OSError as e:
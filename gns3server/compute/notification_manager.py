@@ -17,7 +17,7 @@
 
 
 from contextlib import contextmanager
-from ..notification_queue import NotificationQueue
+from ..notification_queue import NotificationQueue, NotificationMessage
 
 
 class NotificationManager:
@@ -49,8 +49,9 @@ class NotificationManager:
         :param event: Event to send
         :param kwargs: Add this meta to the notification (project_id for example)
         """
+        message = NotificationMessage(action, event, kwargs)
         for listener in self._listeners:
-            listener.put_nowait((action, event, kwargs))
+            listener.put_nowait(message)
 
     @staticmethod
     def reset():
@@ -30,6 +30,71 @@ BANNED_PORTS = set((1, 7, 9, 11, 13, 15, 17, 19, 20, 21, 22, 23, 25, 37, 42, 43,
                     6668, 6669))
 
 
+class PortSet:
+    """
+    Set of reserved port numbers backed by a bitmap (one byte per port),
+    the free ports of a range are found without testing each reserved port.
+
+    :param ports: Initial port numbers
+    """
+
+    def __init__(self, ports=()):
+
+        self._bitmap = bytearray(65536)
+        self._ports = set()
+        for port in ports:
+            self.add(port)
+
+    def add(self, port):
+
+        self._bitmap[port] = 1
+        self._ports.add(port)
+
+    def remove(self, port):
+
+        self._ports.remove(port)
+        self._bitmap[port] = 0
+
+    def discard(self, port):
+
+        if port in self:
+            self.remove(port)
+
+    def free_ports(self, start_port, end_port, cursor=None):
+        """
+        Yields the ports not in the set between start_port and end_port (included),
+        starting from the cursor and wrapping around the range.
+
+        :param start_port: first port in the range
+        :param end_port: last port in the range
+        :param cursor: port where to start the search
+        """
+
+        if cursor is None or cursor < start_port or cursor > end_port:
+            cursor = start_port
+        for begin, end in ((cursor, end_port + 1), (start_port, cursor)):
+            port = self._bitmap.find(0, begin, end)
+            while port != -1:
+                yield port
+                port = self._bitmap.find(0, port + 1, end)
+
+    def __contains__(self, port):
+
+        return port in self._ports
+
+    def __iter__(self):
+
+        return iter(self._ports)
+
+    def __len__(self):
+
+        return len(self._ports)
+
+    def __repr__(self):
+
+        return repr(self._ports)
+
+
 class PortManager:
 
     """
@@ -40,8 +105,12 @@ class PortManager:
         self._console_host = None
         # UDP host must be 0.0.0.0, reason: https://github.com/GNS3/gns3-server/issues/265
         self._udp_host = "0.0.0.0"
-        self._used_tcp_ports = set()
-        self._used_udp_ports = set()
+        self._used_tcp_ports = PortSet()
+        self._used_udp_ports = PortSet()
+        # next port to try for each range, the ports are handed out in turn
+        # so a port just released is not immediately reused
+        self._tcp_cursors = {}
+        self._udp_cursor = None
 
         server_config = Config.instance().get_section_config("Server")
 
@@ -137,7 +206,7 @@ class PortManager:
         return self._used_udp_ports
 
     @staticmethod
-    def find_unused_port(start_port, end_port, host="127.0.0.1", socket_type="TCP", ignore_ports=None):
+    def find_unused_port(start_port, end_port, host="127.0.0.1", socket_type="TCP", ignore_ports=None, cursor=None):
         """
         Finds an unused port in a range.
 
@@ -146,14 +215,20 @@ class PortManager:
         :param host: host/address for bind()
         :param socket_type: TCP (default) or UDP
         :param ignore_ports: list of port to ignore within the range
+        :param cursor: port where to start the search, the search continues
+        at the beginning of the range
         """
 
         if end_port < start_port:
             raise HTTPConflict(text="Invalid port range {}-{}".format(start_port, end_port))
 
+        if not isinstance(ignore_ports, PortSet):
+            ignore_ports = PortSet(ignore_ports or ())
+
         last_exception = None
-        for port in range(start_port, end_port + 1):
-            if ignore_ports and (port in ignore_ports or port in BANNED_PORTS):
+        # only the ports not reserved by the server are probed with bind()
+        for port in ignore_ports.free_ports(start_port, end_port, cursor):
+            if port in BANNED_PORTS:
                 continue
 
             try:
@@ -163,10 +238,7 @@ class PortManager:
                 return port
             except OSError as e:
                 last_exception = e
-                if port + 1 == end_port:
-                    break
-                else:
-                    continue
+                continue
 
         raise HTTPConflict(text="Could not find a free port between {} and {} on host {}, last exception: {}".format(start_port,
                                                                                                                      end_port,
@@ -208,13 +280,36 @@ class PortManager:
                                      port_range_end,
                                      host=self._console_host,
                                      socket_type="TCP",
-                                     ignore_ports=self._used_tcp_ports)
+                                     ignore_ports=self._used_tcp_ports,
+                                     cursor=self._tcp_cursors.get((port_range_start, port_range_end)))
 
+        self._tcp_cursors[(port_range_start, port_range_end)] = port + 1
         self._used_tcp_ports.add(port)
         project.record_tcp_port(port)
         log.debug("TCP port {} has been allocated".format(port))
         return port
 
+    def get_free_tcp_ports(self, project, count, port_range_start=None, port_range_end=None):
+        """
+        Get several available TCP ports and reserve them, no port
+        is reserved if there are not enough ports available.
+
+        :param project: Project instance
+        :param count: number of ports
+
+        :returns: list of TCP ports
+        """
+
+        ports = []
+        try:
+            for _ in range(count):
+                ports.append(self.get_free_tcp_port(project, port_range_start=port_range_start, port_range_end=port_range_end))
+        except HTTPConflict:
+            for port in ports:
+                self.release_tcp_port(port, project)
+            raise
+        return ports
+
     def reserve_tcp_port(self, port, project, port_range_start=None, port_range_end=None):
         """
         Reserve a specific TCP port number. If not available replace it
@@ -281,13 +376,36 @@ class PortManager:
                                      self._udp_port_range[1],
                                      host=self._udp_host,
                                      socket_type="UDP",
-                                     ignore_ports=self._used_udp_ports)
+                                     ignore_ports=self._used_udp_ports,
+                                     cursor=self._udp_cursor)
 
+        self._udp_cursor = port + 1
         self._used_udp_ports.add(port)
         project.record_udp_port(port)
         log.debug("UDP port {} has been allocated".format(port))
         return port
 
+    def get_free_udp_ports(self, project, count):
+        """
+        Get several available UDP ports and reserve them, no port
+        is reserved if there are not enough ports available.
+
+        :param project: Project instance
+        :param count: number of ports
+
+        :returns: list of UDP ports
+        """
+
+        ports = []
+        try:
+            for _ in range(count):
+                ports.append(self.get_free_udp_port(project))
+        except HTTPConflict:
+            for port in ports:
+                self.release_udp_port(port, project)
+            raise
+        return ports
+
     def reserve_udp_port(self, port, project):
         """
         Reserve a specific UDP port number
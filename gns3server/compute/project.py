@@ -19,7 +19,6 @@ import os
 import aiohttp
 import shutil
 import asyncio
-import hashlib
 
 from uuid import UUID, uuid4
 
@@ -28,6 +27,7 @@ from .notification_manager import NotificationManager
 from ..config import Config
 from ..utils.asyncio import wait_run_in_executor
 from ..utils.path import check_path_allowed, get_default_project_directory
+from ..utils.images import compute_md5sum
 
 import logging
 log = logging.getLogger(__name__)
@@ -430,11 +430,4 @@ class Project:
         :returns: hexadecimal md5
         """
 
-        m = hashlib.md5()
-        with open(path, "rb") as f:
-            while True:
-                buf = f.read(128)
-                if not buf:
-                    break
-                m.update(buf)
-        return m.hexdigest()
+        return compute_md5sum(path)
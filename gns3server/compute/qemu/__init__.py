@@ -25,9 +25,11 @@ import platform
 import sys
 import re
 import subprocess
+import aiohttp
 
 from ...utils.asyncio import subprocess_check_output
 from ..base_manager import BaseManager
+from ..project_manager import ProjectManager
 from .qemu_error import QemuError
 from .qemu_vm import QemuVM
 from .utils.guest_cid import get_next_guest_cid
@@ -68,6 +70,25 @@ class Qemu(BaseManager):
                 node.guest_cid = get_next_guest_cid(self.nodes)
         return node
 
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on a Qemu VM, hardware acceleration
+        is checked before starting the VM.
+        """
+
+        if action == "start":
+            hardware_accel = self.config.get_section_config("Qemu").getboolean("enable_hardware_acceleration", True)
+            if sys.platform.startswith("linux"):
+                # the enable_kvm option was used before version 2.0 and has priority
+                enable_kvm = self.config.get_section_config("Qemu").getboolean("enable_kvm")
+                if enable_kvm is not None:
+                    hardware_accel = enable_kvm
+            if hardware_accel and "-no-kvm" not in node.options and "-no-hax" not in node.options:
+                pm = ProjectManager.instance()
+                if pm.check_hardware_virtualization(node) is False:
+                    raise aiohttp.web.HTTPConflict(text="Cannot start VM with hardware acceleration (KVM/HAX) enabled because hardware virtualization (VT-x/AMD-V) is already used by another software like VMware or VirtualBox")
+        await super().node_action(node, action, data)
+
     @staticmethod
     async def get_kvm_archs():
         """
@@ -30,13 +30,13 @@ import asyncio
 import socket
 import gns3server
 import subprocess
-import time
 import json
 
 from gns3server.utils import parse_version, shlex_quote
 from gns3server.utils.asyncio import subprocess_check_output, cancellable_wait_run_in_executor
 from .qemu_error import QemuError
 from .utils.qcow2 import Qcow2, Qcow2Error
+from .utils.qmp import QMPClient
 from ..adapters.ethernet_adapter import EthernetAdapter
 from ..nios.nio_udp import NIOUDP
 from ..nios.nio_tap import NIOTAP
@@ -53,6 +53,7 @@ log = logging.getLogger(__name__)
 
 class QemuVM(BaseNode):
     module_name = 'qemu'
+    _ubridge_shareable = True
 
     """
     QEMU VM implementation.
@@ -76,6 +77,8 @@ class QemuVM(BaseNode):
         self._process = None
         self._cpulimit_process = None
         self._monitor = None
+        self._qmp = None
+        self._qmp_lock = asyncio.Lock()
         self._stdout_file = ""
         self._qemu_img_stdout_file = ""
         self._execute_lock = asyncio.Lock()
@@ -996,6 +999,7 @@ class QemuVM(BaseNode):
             if "-enable-kvm" in command_string or "-enable-hax" in command_string:
                 self._hw_virtualization = True
 
+            await self._open_qmp_session()
             await self._start_ubridge()
             set_link_commands = []
             for adapter_number, adapter in enumerate(self._ethernet_adapters):
@@ -1048,7 +1052,7 @@ class QemuVM(BaseNode):
 
                     if self.on_close == "save_vm_state":
                         await self._control_vm("stop")
-                        await self._control_vm("savevm GNS3_SAVED_STATE")
+                        await self._control_vm("savevm GNS3_SAVED_STATE", timeout=120)
                         wait_for_savevm = 120
                         while wait_for_savevm:
                             await asyncio.sleep(1)
@@ -1073,88 +1077,107 @@ class QemuVM(BaseNode):
                             pass
                         if self._process.returncode is None:
                             log.warning('QEMU VM "{}" PID={} is still running'.format(self._name, self._process.pid))
+            await self._close_qmp_session()
             self._process = None
             self._stop_cpulimit()
             if self.on_close != "save_vm_state":
                 await self._clear_save_vm_stated()
             await super().stop()
 
-    async def _open_qemu_monitor_connection_vm(self, timeout=10):
+    async def _open_qmp_session(self, timeout=10):
         """
-        Opens a connection to the QEMU monitor.
+        Opens the QMP session used to control this VM until it stops.
 
-        :param timeout: timeout to connect to the monitor TCP server
-        :returns: The reader returned is a StreamReader instance; the writer is a StreamWriter instance
+        :param timeout: timeout to connect to the QMP TCP server
         """
 
-        begin = time.time()
-        connection_success = False
-        last_exception = None
-        reader = writer = None
-        while time.time() - begin < timeout:
-            await asyncio.sleep(0.01)
-            try:
-                log.debug("Connecting to Qemu monitor on {}:{}".format(self._monitor_host, self._monitor))
-                reader, writer = await asyncio.open_connection(self._monitor_host, self._monitor)
-            except (asyncio.TimeoutError, OSError) as e:
-                last_exception = e
-                continue
-            connection_success = True
-            break
+        await self._close_qmp_session()
+        if not self._monitor:
+            return
+        qmp = QMPClient(self._monitor_host, self._monitor, event_callback=self._qmp_event)
+        try:
+            await qmp.connect(timeout=timeout)
+        except QemuError as e:
+            log.warning("Could not connect to QEMU monitor: {}".format(e))
+            return
+        self._qmp = qmp
+
+    async def _get_qmp_session(self):
+        """
+        Returns the QMP session, it's opened again if it has been closed
+        while this VM is running (e.g. QEMU has dropped the connection).
+
+        :returns: QMPClient instance or None if there is no session
+        """
+
+        async with self._qmp_lock:
+            if self.is_running() and (self._qmp is None or not self._qmp.connected):
+                log.info('Opening again the QMP session of QEMU VM "{}"'.format(self._name))
+                await self._open_qmp_session()
+            return self._qmp
 
-        if not connection_success:
-            log.warning("Could not connect to QEMU monitor on {}:{}: {}".format(self._monitor_host, self._monitor,
-                                                                                last_exception))
+    async def _close_qmp_session(self):
+        """
+        Closes the QMP session.
+        """
+
+        if self._qmp:
+            qmp = self._qmp
+            self._qmp = None
+            await qmp.close()
+
+    def _qmp_event(self, event, data):
+        """
+        Updates the VM status from the QEMU events.
+
+        :param event: QMP event name
+        :param data: event data
+        """
+
+        if not self.is_running():
+            return
+        if event == "STOP":
+            status = "suspended"
+        elif event == "RESUME":
+            status = "started"
+        elif event == "SHUTDOWN" and "-no-shutdown" in self._options:
+            # QEMU exits after a shutdown unless -no-shutdown is used,
+            # in that case the termination callback updates the status
+            status = "stopped"
         else:
-            log.info("Connected to QEMU monitor on {}:{} after {:.4f} seconds".format(self._monitor_host, self._monitor, time.time() - begin))
-        return reader, writer
+            return
+        if self.status != status:
+            log.info('QEMU VM "{}" status changed to {} ({} event)'.format(self._name, status, event))
+            self.status = status
 
-    async def _control_vm(self, command, expected=None):
+    async def _control_vm(self, command, expected=None, timeout=30):
         """
         Executes a command with QEMU monitor when this VM is running.
 
         :param command: QEMU monitor command (e.g. info status, stop etc.)
         :param expected: An array of expected strings
+        :param timeout: timeout to wait for the command to complete
 
-        :returns: result of the command (matched object or None)
+        :returns: result of the command (matched line or None)
         """
 
         result = None
-        if self.is_running() and self._monitor:
-            log.info("Execute QEMU monitor command: {}".format(command))
-            reader, writer = await self._open_qemu_monitor_connection_vm()
-            if reader is None and writer is None:
+        if self.is_running():
+            qmp = await self._get_qmp_session()
+            if qmp is None:
+                log.warning("Could not execute QEMU monitor command '{}': no QMP session".format(command))
                 return result
-
+            log.info("Execute QEMU monitor command: {}".format(command))
             try:
-                cmd_byte = command.encode('ascii')
-                writer.write(cmd_byte + b"\n")
-                if not expected:
-                    while True:
-                        line = await asyncio.wait_for(reader.readline(), timeout=3)  # echo of the command
-                        if not line or cmd_byte in line:
-                            break
-            except asyncio.TimeoutError:
-                log.warning("Missing echo of command '{}'".format(command))
-            except OSError as e:
-                log.warning("Could not write to QEMU monitor: {}".format(e))
-                writer.close()
+                output = await qmp.human_monitor_command(command, timeout=timeout)
+            except QemuError as e:
+                log.warning("Could not execute QEMU monitor command '{}': {}".format(command, e))
                 return result
-            if expected:
-                try:
-                    while result is None:
-                        line = await asyncio.wait_for(reader.readline(), timeout=3)
-                        if not line:
-                            break
-                        for expect in expected:
-                            if expect in line:
-                                result = line.decode("utf-8").strip()
-                                break
-                except asyncio.TimeoutError:
-                    log.warning("Timeout while waiting for result of command '{}'".format(command))
-                except (ConnectionError, EOFError) as e:
-                    log.warning("Could not read from QEMU monitor: {}".format(e))
-            writer.close()
+            if expected and output:
+                for line in output.splitlines():
+                    for expect in expected:
+                        if expect in line.encode("utf-8"):
+                            return line.strip()
         return result
 
     async def _control_vm_commands(self, commands):
@@ -1164,26 +1187,9 @@ class QemuVM(BaseNode):
         :param commands: a list of QEMU monitor commands (e.g. info status, stop etc.)
         """
 
-        if self.is_running() and self._monitor:
-
-            reader, writer = await self._open_qemu_monitor_connection_vm()
-            if reader is None and writer is None:
-                return
-
-            for command in commands:
-                log.info("Execute QEMU monitor command: {}".format(command))
-                try:
-                    cmd_byte = command.encode('ascii')
-                    writer.write(cmd_byte + b"\n")
-                    while True:
-                        line = await asyncio.wait_for(reader.readline(), timeout=3)  # echo of the command
-                        if not line or cmd_byte in line:
-                            break
-                except asyncio.TimeoutError:
-                    log.warning("Missing echo of command '{}'".format(command))
-                except OSError as e:
-                    log.warning("Could not write to QEMU monitor: {}".format(e))
-            writer.close()
+        if self.is_running() and await self._get_qmp_session():
+            # QEMU processes the commands in order, no need to wait for each response
+            await asyncio.gather(*[self._control_vm(command) for command in commands])
 
     async def close(self):
         """
@@ -1219,15 +1225,17 @@ class QemuVM(BaseNode):
         :returns: status (string)
         """
 
-        result = await self._control_vm("info status", [
-            b"debug", b"inmigrate", b"internal-error", b"io-error",
-            b"paused", b"postmigrate", b"prelaunch", b"finish-migrate",
-            b"restore-vm", b"running", b"save-vm", b"shutdown", b"suspended",
-            b"watchdog", b"guest-panicked"
-        ])
-        if result is None:
-            return result
-        status = result.rsplit(' ', 1)[1]
+        if not self.is_running():
+            return None
+        qmp = await self._get_qmp_session()
+        if qmp is None:
+            return None
+        try:
+            result = await qmp.execute("query-status")
+        except QemuError as e:
+            log.warning("Could not get the QEMU VM status: {}".format(e))
+            return None
+        status = result["status"]
         if status == "running" or status == "prelaunch":
             self.status = "started"
         elif status == "suspended":
@@ -1541,7 +1549,7 @@ class QemuVM(BaseNode):
     def _monitor_options(self):
 
         if self._monitor:
-            return ["-monitor", "tcp:{}:{},server,nowait".format(self._monitor_host, self._monitor)]
+            return ["-qmp", "tcp:{}:{},server,nowait".format(self._monitor_host, self._monitor)]
         else:
             return []
 
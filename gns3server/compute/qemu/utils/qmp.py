@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Client for the QEMU Machine Protocol (QMP).
+
+A single connection is kept open for the lifetime of the VM, commands
+are correlated with their response using the "id" member and the
+asynchronous events are forwarded to a callback.
+"""
+
+import json
+import time
+import asyncio
+
+from ..qemu_error import QemuError
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class QMPClient:
+    """
+    QMP session with a QEMU process.
+
+    :param host: Host of the QMP TCP server
+    :param port: Port of the QMP TCP server
+    :param event_callback: Function called with the event name and data for each QEMU event
+    """
+
+    def __init__(self, host, port, event_callback=None):
+
+        self._host = host
+        self._port = port
+        self._event_callback = event_callback
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._pending = {}
+        self._next_id = 0
+        self._greeting = None
+
+    @property
+    def connected(self):
+        """
+        :returns: True if the session is established
+        """
+
+        return self._writer is not None
+
+    @property
+    def greeting(self):
+        """
+        :returns: Greeting sent by QEMU (version and capabilities)
+        """
+
+        return self._greeting
+
+    async def connect(self, timeout=10):
+        """
+        Connects to QEMU and negotiates the capabilities.
+
+        QEMU may not be listening yet when this is called right after
+        the process has been started, the connection is retried until the timeout.
+
+        :param timeout: Timeout in seconds to establish the session
+        """
+
+        begin = time.time()
+        last_exception = None
+        while True:
+            try:
+                self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+                break
+            except OSError as e:
+                last_exception = e
+            if time.time() - begin >= timeout:
+                raise QemuError("Could not connect to QMP on {}:{}: {}".format(self._host, self._port, last_exception))
+            await asyncio.sleep(0.01)
+
+        try:
+            greeting = await asyncio.wait_for(self._read_message(), timeout=timeout)
+            if greeting is None or "QMP" not in greeting:
+                raise QemuError("Invalid QMP greeting from {}:{}: {}".format(self._host, self._port, greeting))
+            self._greeting = greeting["QMP"]
+            self._reader_task = asyncio.ensure_future(self._read_loop())
+            await self.execute("qmp_capabilities", timeout=timeout)
+        except (asyncio.TimeoutError, OSError, QemuError) as e:
+            await self.close()
+            raise QemuError("Could not establish QMP session on {}:{}: {}".format(self._host, self._port, e))
+        log.info("QMP session established on {}:{} after {:.4f} seconds".format(self._host, self._port, time.time() - begin))
+
+    async def _read_message(self):
+        """
+        Reads one JSON message.
+
+        :returns: Message or None on EOF
+        """
+
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                return json.loads(line.decode("utf-8", errors="replace"))
+            except ValueError:
+                log.warning("Invalid QMP message received: {}".format(line))
+
+    async def _read_loop(self):
+        """
+        Dispatches the responses and events until the connection is closed.
+        """
+
+        try:
+            while True:
+                message = await self._read_message()
+                if message is None:
+                    break
+                if "event" in message:
+                    self._dispatch_event(message)
+                    continue
+                future = self._pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    log.debug("Unexpected QMP message: {}".format(message))
+                elif "error" in message:
+                    future.set_exception(QemuError("QMP command error: {}".format(message["error"].get("desc", message["error"]))))
+                else:
+                    future.set_result(message.get("return"))
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            log.debug("QMP connection to {}:{} lost: {}".format(self._host, self._port, e))
+        finally:
+            self._writer = None
+            self._fail_pending(QemuError("QMP connection to {}:{} closed".format(self._host, self._port)))
+
+    def _dispatch_event(self, message):
+
+        log.debug("QMP event received: {}".format(message["event"]))
+        if self._event_callback:
+            try:
+                self._event_callback(message["event"], message.get("data", {}))
+            except Exception as e:
+                log.error("Error while handling QMP event {}: {}".format(message["event"], e), exc_info=1)
+
+    def _fail_pending(self, exception):
+
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exception)
+        self._pending = {}
+
+    async def execute(self, command, arguments=None, timeout=30):
+        """
+        Executes a QMP command, multiple commands can be in flight at the same time.
+
+        :param command: QMP command name
+        :param arguments: Dictionary with the command arguments
+        :param timeout: Timeout in seconds to wait for the response
+
+        :returns: Value returned by QEMU
+        """
+
+        if self._writer is None:
+            raise QemuError("No QMP session to execute '{}'".format(command))
+
+        self._next_id += 1
+        message_id = self._next_id
+        message = {"execute": command, "id": message_id}
+        if arguments:
+            message["arguments"] = arguments
+        future = asyncio.get_event_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            self._writer.write(json.dumps(message).encode("utf-8") + b"\n")
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise QemuError("Timeout while waiting for result of QMP command '{}'".format(command))
+        except OSError as e:
+            raise QemuError("Could not send QMP command '{}': {}".format(command, e))
+        finally:
+            self._pending.pop(message_id, None)
+
+    async def human_monitor_command(self, command, timeout=30):
+        """
+        Executes a human monitor (HMP) command through the QMP session.
+
+        :param command: Monitor command (e.g. set_link gns3-0 off)
+        :param timeout: Timeout in seconds to wait for the response
+
+        :returns: Output of the command
+        """
+
+        return await self.execute("human-monitor-command", {"command-line": command}, timeout=timeout)
+
+    async def close(self):
+        """
+        Closes the session.
+        """
+
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        self._fail_pending(QemuError("QMP connection to {}:{} closed".format(self._host, self._port)))
@@ -42,3 +42,14 @@ class TraceNG(BaseManager):
         """
 
         return (await super().create_node(*args, **kwargs))
+
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on a TraceNG VM, the destination can
+        be sent with the start action. TraceNG cannot be suspended.
+        """
+
+        if action == "start":
+            await node.start((data or {}).get("destination"))
+        elif action != "suspend":
+            await super().node_action(node, action, data)
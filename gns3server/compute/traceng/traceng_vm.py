@@ -42,6 +42,7 @@ log = logging.getLogger(__name__)
 
 class TraceNGVM(BaseNode):
     module_name = 'traceng'
+    _ubridge_shareable = True
 
     """
     TraceNG VM implementation.
@@ -25,11 +25,13 @@ import sys
 import shutil
 import asyncio
 import subprocess
+import aiohttp
 import logging
 
 log = logging.getLogger(__name__)
 
 from ..base_manager import BaseManager
+from ..project_manager import ProjectManager
 from .virtualbox_vm import VirtualBoxVM
 from .virtualbox_error import VirtualBoxError
 
@@ -168,6 +170,18 @@ class VirtualBox(BaseManager):
                 log.warning("Could not close VirtualBox VM disk file {}: {}".format(os.path.basename(hdd_file), e))
                 continue
 
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on a VirtualBox VM, hardware virtualization
+        is checked before starting the VM.
+        """
+
+        if action == "start" and (await node.check_hw_virtualization()):
+            pm = ProjectManager.instance()
+            if pm.check_hardware_virtualization(node) is False:
+                raise aiohttp.web.HTTPConflict(text="Cannot start VM because hardware virtualization (VT-x/AMD-V) is already used by another software like VMware or KVM (on Linux)")
+        await super().node_action(node, action, data)
+
     async def list_vms(self, allow_clone=False):
         """
         Gets VirtualBox VM list.
@@ -53,6 +53,8 @@ class VirtualBoxVM(BaseNode):
     VirtualBox VM implementation.
     """
 
+    _ubridge_shareable = True
+
     def __init__(self, name, node_id, project, manager, vmname, linked_clone=False, console=None, console_type="telnet", adapters=0):
 
         super().__init__(name, node_id, project, manager, console=console, linked_clone=linked_clone, console_type=console_type)
@@ -963,7 +965,8 @@ class VirtualBoxVM(BaseNode):
             server = AsyncioTelnetServer(reader=self._remote_pipe,
                                          writer=self._remote_pipe,
                                          binary=True,
-                                         echo=True)
+                                         echo=True,
+                                         history=self._get_console_history())
             try:
                 self._telnet_server = await asyncio.start_server(server.run, self._manager.port_manager.console_host, self.console)
             except OSError as e:
@@ -27,6 +27,7 @@ import asyncio
 import subprocess
 import logging
 import codecs
+import aiohttp
 
 from collections import OrderedDict
 from gns3server.utils.interfaces import interfaces
@@ -36,6 +37,7 @@ from gns3server.utils import parse_version, shlex_quote
 log = logging.getLogger(__name__)
 
 from gns3server.compute.base_manager import BaseManager
+from gns3server.compute.project_manager import ProjectManager
 from gns3server.compute.vmware.vmware_vm import VMwareVM
 from gns3server.compute.vmware.vmware_error import VMwareError
 
@@ -667,6 +669,18 @@ class VMware(BaseManager):
         else:
             return [os.path.expanduser("~/vmware")]
 
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on a VMware VM, hardware virtualization
+        is checked before starting the VM.
+        """
+
+        if action == "start" and node.check_hw_virtualization():
+            pm = ProjectManager.instance()
+            if pm.check_hardware_virtualization(node) is False:
+                raise aiohttp.web.HTTPConflict(text="Cannot start VM because hardware virtualization (VT-x/AMD-V) is already used by another software like VirtualBox or KVM (on Linux)")
+        await super().node_action(node, action, data)
+
     async def list_vms(self):
         """
         Gets VMware VM list.
@@ -859,7 +859,8 @@ class VMwareVM(BaseNode):
             server = AsyncioTelnetServer(reader=self._remote_pipe,
                                          writer=self._remote_pipe,
                                          binary=True,
-                                         echo=True)
+                                         echo=True,
+                                         history=self._get_console_history())
             try:
                 self._telnet_server = await asyncio.start_server(server.run, self._manager.port_manager.console_host, self.console)
             except OSError as e:
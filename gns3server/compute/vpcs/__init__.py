@@ -52,6 +52,14 @@ class VPCS(BaseManager):
             raise VPCSError("Cannot create a new VPCS VM (limit of 255 VMs reached on this host)")
         return node
 
+    async def node_action(self, node, action, data=None):
+        """
+        Runs an action on a VPCS VM, VPCS cannot be suspended.
+        """
+
+        if action != "suspend":
+            await super().node_action(node, action, data)
+
     async def close_node(self, node_id, *args, **kwargs):
         """
         Closes a VPCS VM.
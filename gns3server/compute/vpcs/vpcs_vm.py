@@ -46,6 +46,7 @@ log = logging.getLogger(__name__)
 
 class VPCSVM(BaseNode):
     module_name = 'vpcs'
+    _ubridge_shareable = True
 
     """
     VPCS VM implementation.
@@ -25,6 +25,7 @@ import aiohttp
 
 from ..config import Config
 from .project import Project
+from .project_catalog import ProjectCatalog
 from .template import Template
 from .appliance import Appliance
 from .appliance_manager import ApplianceManager
@@ -50,6 +51,7 @@ class Controller:
     def __init__(self):
         self._computes = {}
         self._projects = {}
+        self._project_catalog = None
         self._notification = Notification(self)
         self.gns3vm = GNS3VM(self)
         self.symbols = Symbols()
@@ -219,19 +221,36 @@ class Controller:
         server_config = Config.instance().get_section_config("Server")
         projects_path = os.path.expanduser(server_config.get("projects_path", "~/GNS3/projects"))
         os.makedirs(projects_path, exist_ok=True)
+        topology_files = []
         try:
             for project_path in os.listdir(projects_path):
                 project_dir = os.path.join(projects_path, project_path)
                 if os.path.isdir(project_dir):
                     for file in os.listdir(project_dir):
                         if file.endswith(".gns3"):
+                            topology_files.append(os.path.join(project_dir, file))
                             try:
-                                await self.load_project(os.path.join(project_dir, file), load=False)
+                                await self.load_project(topology_files[-1], load=False)
                             except (aiohttp.web.HTTPConflict, NotImplementedError):
                                 pass  # Skip not compatible projects
         except OSError as e:
             log.error(str(e))
 
+        # only the properties of the projects have been read, the topologies
+        # are loaded when the projects are opened
+        catalog = self._get_project_catalog()
+        catalog.prune(topology_files)
+        catalog.save()
+
+    def _get_project_catalog(self):
+        """
+        :returns: ProjectCatalog instance, the index is saved next to the controller settings
+        """
+
+        if self._project_catalog is None:
+            self._project_catalog = ProjectCatalog(os.path.join(os.path.dirname(self._config_file), "gns3_projects.json"))
+        return self._project_catalog
+
     def load_base_files(self):
         """
         At startup we copy base file to the user location to allow
@@ -431,11 +450,15 @@ class Controller:
         Load a project from a .gns3
 
         :param path: Path of the .gns3
-        :param load: Load the topology
+        :param load: Load the topology, otherwise only the properties of
+        the project are read
         """
 
-        topo_data = load_topology(path)
-        topo_data.pop("topology")
+        if load:
+            topo_data = load_topology(path)
+            topo_data.pop("topology")
+        else:
+            topo_data = self._get_project_catalog().header(path)
         topo_data.pop("version")
         topo_data.pop("revision")
         topo_data.pop("type")
@@ -24,8 +24,10 @@ import json
 import uuid
 import sys
 import io
+import time
 from operator import itemgetter
 
+from ..config import Config
 from ..utils import parse_version
 from ..utils.asyncio import locking
 from ..controller.controller_error import ControllerError
@@ -59,6 +61,7 @@ class Compute:
 
     def __init__(self, compute_id, controller=None, protocol="http", host="localhost", port=3080, user=None, password=None, name=None, console_host=None):
         self._http_session = None
+        self._capture_session = None
         assert controller is not None
         log.info("Create compute %s", compute_id)
 
@@ -88,13 +91,77 @@ class Compute:
         self.name = name
         # Cache of interfaces on remote host
         self._interfaces_cache = None
+        self._interfaces_request = None
+        # Cache of the IP addresses used to reach the other computes
+        self._subnet_cache = {}
         self._connection_failure = 0
+        self._http_stats = {
+            "requests": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "errors": 0,
+            "retries": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0
+        }
 
     def _session(self):
         if self._http_session is None or self._http_session.closed is True:
-            self._http_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=None, force_close=True))
+            server_config = Config.instance().get_section_config("Server")
+            # keep the connections to the compute open, the idle connections are closed
+            # before the compute (aiohttp closes them after 75s) to avoid using stale connections
+            connector = aiohttp.TCPConnector(limit=int(server_config.get("compute_connection_limit", 100)),
+                                             keepalive_timeout=float(server_config.get("compute_keepalive_timeout", 15)),
+                                             enable_cleanup_closed=True)
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+            self._http_session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
         return self._http_session
 
+    def _stream_session(self):
+        """
+        Session of the long-lived streams, they are not counted
+        in the connection limit of the API requests.
+        """
+
+        if self._capture_session is None or self._capture_session.closed is True:
+            connector = aiohttp.TCPConnector(limit=None, enable_cleanup_closed=True)
+            self._capture_session = aiohttp.ClientSession(connector=connector)
+        return self._capture_session
+
+    async def _close_sessions(self):
+
+        for session in (self._http_session, self._capture_session):
+            if session and not session.closed:
+                await session.close()
+
+    async def _on_connection_created(self, session, context, params):
+
+        self._http_stats["connections_created"] += 1
+
+    async def _on_connection_reused(self, session, context, params):
+
+        self._http_stats["connections_reused"] += 1
+
+    def http_stats(self):
+        """
+        Statistics of the HTTP requests sent to this compute
+
+        :returns: Dictionary with the number of requests, the latency and the connection reuse ratio
+        """
+
+        stats = dict(self._http_stats)
+        connections = stats["connections_created"] + stats["connections_reused"]
+        stats["reuse_ratio"] = round(stats["connections_reused"] / connections, 3) if connections else 0.0
+        completed = stats["requests"] - stats["in_flight"]
+        stats["average_latency"] = round(stats["total_latency"] / completed, 6) if completed else 0.0
+        stats["total_latency"] = round(stats["total_latency"], 6)
+        stats["max_latency"] = round(stats["max_latency"], 6)
+        return stats
+
     #def __del__(self):
     #
     #   if self._http_session:
@@ -133,7 +200,13 @@ class Compute:
         Get the list of network on compute
         """
         if not self._interfaces_cache:
-            response = await self.get("/network/interfaces")
+            # the links of a project are created concurrently, only one request is sent
+            if self._interfaces_request is None:
+                self._interfaces_request = asyncio.ensure_future(self.get("/network/interfaces"))
+            try:
+                response = await asyncio.shield(self._interfaces_request)
+            finally:
+                self._interfaces_request = None
             self._interfaces_cache = response.json
         return self._interfaces_cache
 
@@ -144,8 +217,7 @@ class Compute:
         # It's important to set user and password at the same time
         if "user" in kwargs or "password" in kwargs:
             self._set_auth(kwargs.get("user", self._user), kwargs.get("password", self._password))
-        if self._http_session and not self._http_session.closed:
-            await self._http_session.close()
+        await self._close_sessions()
         self._connected = False
         self._controller.notification.controller_emit("compute.updated", self.__json__())
         self._controller.save()
@@ -153,12 +225,12 @@ class Compute:
     async def close(self):
 
         self._connected = False
-        if self._http_session and not self._http_session.closed:
-            await self._http_session.close()
+        await self._close_sessions()
         try:
             if self._notifications:
                 await self._notifications
-        except asyncio.CancelledError:
+        except (asyncio.CancelledError, aiohttp.ClientConnectionError):
+            # the notification stream may still be connecting
             pass
         self._closed = True
 
@@ -311,6 +383,27 @@ class Compute:
             raise aiohttp.web.HTTPNotFound(text="{} not found on compute".format(path))
         return response
 
+    async def stream_capture(self, url, method="GET", headers=None, data=None):
+        """
+        Stream a packet capture, the connection is not taken from the
+        pool of the API requests: a capture can stay open for hours.
+
+        :param url: The URL of the capture on the compute
+        :param method: HTTP method of the client request
+        :param headers: Headers of the client request
+        :param data: Body of the client request
+        :returns: A file stream
+        """
+
+        if self._auth and headers is not None and "Authorization" in headers:
+            # the credentials of the compute replace the ones of the controller
+            del headers["Authorization"]
+        response = await self._stream_session().request(method, url, auth=self._auth, headers=headers, data=data, timeout=None)
+        if response.status == 404:
+            response.release()
+            raise aiohttp.web.HTTPNotFound(text="Capture not found on compute")
+        return response
+
     async def download_image(self, image_type, image):
         """
         Read file of a project and download it
@@ -482,7 +575,14 @@ class Compute:
         """ Returns URL for specific path at Compute"""
         return self._getUrl(path)
 
-    async def _run_http_query(self, method, path, data=None, timeout=20, raw=False):
+    async def _run_http_query(self, method, path, data=None, timeout=20, raw=False, stream=False):
+        """
+        :param timeout: Timeout of the request, with stream the maximum delay between two reads
+        :param raw: The body is returned as bytes instead of JSON
+        :param stream: The body of a successful response is not read, the
+        caller reads response.content and releases the response
+        """
+
         with async_timeout.timeout(timeout):
             url = self._getUrl(path)
             headers = {}
@@ -505,15 +605,27 @@ class Compute:
                     headers['content-type'] = 'application/octet-stream'
                 else:
                     data = json.dumps(data).encode("utf-8")
+        stats = self._http_stats
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        begin = time.monotonic()
+        if stream:
+            # the response can take long to be fully received, only the reads are bounded
+            timeout = aiohttp.ClientTimeout(total=None, sock_read=timeout)
         try:
-            log.debug("Attempting request to compute: {method} {url} {headers}".format(method=method, url=url, headers=headers))
-            response = await self._session().request(method, url, headers=headers, data=data, auth=self._auth, chunked=chunked, timeout=timeout)
-        except asyncio.TimeoutError:
-            raise ComputeError("Timeout error for {} call to {} after {}s".format(method, url, timeout))
-        except (aiohttp.ClientError, aiohttp.ServerDisconnectedError, ValueError, KeyError, socket.gaierror) as e:
-            #  aiohttp 2.3.1 raises socket.gaierror when cannot find host
-            raise ComputeError(str(e))
-        body = await response.read()
+            response = await self._send_http_query(method, url, headers, data, chunked, timeout)
+            if stream and response.status < 300:
+                return response
+            body = await response.read()
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            latency = time.monotonic() - begin
+            stats["in_flight"] -= 1
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
         if body and not raw:
             body = body.decode()
 
@@ -562,6 +674,37 @@ class Compute:
             response.body = b""
         return response
 
+    async def _send_http_query(self, method, url, headers, data, chunked, timeout):
+        """
+        Send the request, if the compute closes a kept alive connection
+        when we use it an idempotent request is sent again on a new
+        connection. The other requests may have been received by the
+        compute (a node would be created twice) and are not sent again.
+
+        :returns: ClientResponse instance
+        """
+
+        # a streamed body can't be sent again
+        retries = 1 if method in ("GET", "HEAD", "PUT", "DELETE", "OPTIONS") and not chunked else 0
+        while True:
+            try:
+                log.debug("Attempting request to compute: {method} {url} {headers}".format(method=method, url=url, headers=headers))
+                response = await self._session().request(method, url, headers=headers, data=data, auth=self._auth, chunked=chunked, timeout=timeout)
+                return response
+            except asyncio.TimeoutError:
+                raise ComputeError("Timeout error for {} call to {} after {}s".format(method, url, getattr(timeout, "sock_read", timeout)))
+            except aiohttp.ClientConnectorError as e:
+                raise ComputeError(str(e))
+            except (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError) as e:
+                if retries == 0:
+                    raise ComputeError(str(e))
+                retries -= 1
+                self._http_stats["retries"] += 1
+                log.debug("Connection to compute '{}' closed, sending {} {} again: {}".format(self._id, method, url, e))
+            except (aiohttp.ClientError, ValueError, KeyError, socket.gaierror) as e:
+                #  aiohttp 2.3.1 raises socket.gaierror when cannot find host
+                raise ComputeError(str(e))
+
     async def get(self, path, **kwargs):
         return (await self.http_query("GET", path, **kwargs))
 
@@ -631,8 +774,21 @@ class Compute:
         if (self.host_ip not in ('0.0.0.0', '127.0.0.1') and other_compute.host_ip not in ('0.0.0.0', '127.0.0.1')):
             return (self.host_ip, other_compute.host_ip)
 
-        this_compute_interfaces = await self.interfaces()
-        other_compute_interfaces = await other_compute.interfaces()
+        this_compute_interfaces, other_compute_interfaces = await asyncio.gather(self.interfaces(), other_compute.interfaces())
+
+        # the result is reused while the computes and their interfaces are the same
+        key = (other_compute, self.host_ip, other_compute.host_ip)
+        cached = self._subnet_cache.get(other_compute.id)
+        if cached and cached[0] == key and cached[1] is this_compute_interfaces and cached[2] is other_compute_interfaces:
+            return cached[3]
+        result = self._find_ip_on_same_subnet(other_compute, this_compute_interfaces, other_compute_interfaces)
+        self._subnet_cache[other_compute.id] = (key, this_compute_interfaces, other_compute_interfaces, result)
+        return result
+
+    def _find_ip_on_same_subnet(self, other_compute, this_compute_interfaces, other_compute_interfaces):
+        """
+        :returns: Tuple (ip_for_this_compute, ip_for_other_compute)
+        """
 
         # Sort interface to put the compute host in first position
         # we guess that if user specified this host it could have a reason (VMware Nat / Host only interface)
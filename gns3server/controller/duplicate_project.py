@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Duplicate a project stored on the controller host without going through
+a zip file (see export_project and import_project).
+
+The files are cloned (reflink) when the file system supports it and the
+node directories are created directly with the new node IDs.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import aiohttp
+import collections
+
+from .export_project import _is_exportable
+from ..utils.file_clone import clone_file
+from ..utils.asyncio import wait_run_in_executor
+
+import logging
+log = logging.getLogger(__name__)
+
+
+async def duplicate_project(controller, project, project_id, location=None, name=None):
+    """
+    Duplicate a project where all the nodes run on the local compute.
+
+    Like an export / import: the snapshots, the packet captures and the logs
+    are not copied, the nodes, links and drawings get new IDs and the
+    MAC addresses are reset.
+
+    You must handle OSError exceptions
+
+    :param controller: GNS3 Controller
+    :param project: Project instance to duplicate (must be opened)
+    :param project_id: ID of the new project
+    :param location: Directory for the project if None put in the default directory
+    :param name: Wanted project name, generate one from the project name if None
+
+    :returns: Project
+    """
+
+    if project.is_running():
+        raise aiohttp.web.HTTPConflict(text="Project must be stopped in order to duplicate it")
+    await project.flush()
+
+    if location and ".gns3" in location:
+        raise aiohttp.web.HTTPConflict(text="The destination path should not contain .gns3")
+
+    topology = _read_topology(project)
+    project_name = controller.get_free_project_name(name or topology["name"])
+
+    if location:
+        path = location
+    else:
+        path = os.path.join(controller.projects_directory(), project_id)
+    created = not os.path.exists(path)
+    try:
+        os.makedirs(path, exist_ok=True)
+    except UnicodeEncodeError:
+        raise aiohttp.web.HTTPConflict(text="The project name contain non supported or invalid characters")
+
+    try:
+        node_old_to_new = _renew_ids(topology)
+        stats, skipped = await wait_run_in_executor(_clone_files, project.path, path, node_old_to_new)
+        for file, error in skipped:
+            msg = "Could not duplicate file {}: {}".format(file, error)
+            log.warning(msg)
+            project.emit_notification("log.warning", {"message": msg})
+        log.info("Project '{}' files duplicated: {}".format(project.name, ", ".join("{} {}".format(count, method) for method, count in sorted(stats.items())) or "no files"))
+
+        topology["name"] = project_name
+        topology["project_id"] = project_id
+        # To avoid unexpected behavior (project start without manual operations just after duplication)
+        topology["auto_start"] = False
+        topology["auto_open"] = False
+        topology["auto_close"] = True
+        dot_gns3_path = os.path.join(path, project_name + ".gns3")
+        with open(dot_gns3_path, "w+", encoding="utf-8") as f:
+            json.dump(topology, f, indent=4)
+    except BaseException:
+        if created:
+            shutil.rmtree(path, ignore_errors=True)
+        raise
+
+    return await controller.load_project(dot_gns3_path, load=False)
+
+
+def _read_topology(project):
+    """
+    Reads the topology of a project and prepares it for the duplication.
+    """
+
+    path = project._topology_file()
+    try:
+        with open(path, encoding="utf-8") as f:
+            topology = json.load(f)
+    except (OSError, ValueError) as e:
+        raise aiohttp.web.HTTPConflict(text="Project file '{}' cannot be read: {}".format(path, e))
+
+    for node in topology["topology"]["nodes"]:
+        if node["node_type"] == "virtualbox" and node.get("properties", {}).get("linked_clone"):
+            raise aiohttp.web.HTTPConflict(text="Projects with a linked {} clone node cannot not be duplicated. Please use Qemu instead.".format(node["node_type"]))
+        if "properties" in node and node["node_type"] != "docker":
+            for prop in ("mac_addr", "mac_address"):
+                if prop in node["properties"]:
+                    node["properties"][prop] = None
+    return topology
+
+
+def _renew_ids(topology):
+    """
+    Generates new IDs for the nodes, links and drawings.
+
+    :returns: Dictionary old node ID => new node ID
+    """
+
+    node_old_to_new = {}
+    for node in topology["topology"]["nodes"]:
+        new_id = str(uuid.uuid4())
+        if "node_id" in node:
+            node_old_to_new[node["node_id"]] = new_id
+        node["node_id"] = new_id
+
+    for link in topology["topology"]["links"]:
+        link["link_id"] = str(uuid.uuid4())
+        for node in link["nodes"]:
+            node["node_id"] = node_old_to_new[node["node_id"]]
+
+    for drawing in topology["topology"]["drawings"]:
+        drawing["drawing_id"] = str(uuid.uuid4())
+    return node_old_to_new
+
+
+def _clone_files(src, dst, node_old_to_new):
+    """
+    Clones the files of a project, the directories of the nodes
+    (project-files/<node type>/<node ID>) are renamed.
+
+    :returns: Counter of the methods used to copy the files and
+    list of the files which cannot be read with the error
+    """
+
+    stats = collections.Counter()
+    skipped = []
+    for root, dirs, files in os.walk(src, topdown=True, followlinks=False):
+        relpath = os.path.relpath(root, src)
+        parts = [] if relpath == os.curdir else relpath.split(os.path.sep)
+        if len(parts) >= 3 and parts[0] == "project-files" and parts[2] in node_old_to_new:
+            parts[2] = node_old_to_new[parts[2]]
+        dst_dir = os.path.join(dst, *parts)
+
+        # the snapshots, captures and temporary files are not duplicated
+        dirs[:] = [d for d in dirs if _is_exportable(os.path.join(root, d)) and not os.path.islink(os.path.join(root, d))]
+        for file in files:
+            path = os.path.join(root, file)
+            if file.endswith(".gns3") or not _is_exportable(path):
+                continue
+            # check if we can read the file
+            try:
+                open(path).close()
+            except OSError as e:
+                skipped.append((path, e))
+                continue
+            os.makedirs(dst_dir, exist_ok=True)
+            stats[clone_file(path, os.path.join(dst_dir, file))] += 1
+    return stats, skipped
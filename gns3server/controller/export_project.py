@@ -19,17 +19,18 @@ import os
 import sys
 import json
 import asyncio
-import aiofiles
 import aiohttp
 import zipfile
-import tempfile
 
 from datetime import datetime
 
+from ..config import Config
+
 import logging
 log = logging.getLogger(__name__)
 
-CHUNK_SIZE = 1024 * 8  # 8KB
+CHUNK_SIZE = 1024 * 64  # 64KB
+DOWNLOAD_BUFFER_CHUNKS = 64  # up to 4MB buffered in memory per remote file
 
 
 async def export_project(zstream, project, temporary_dir, include_images=False, include_snapshots=False, keep_compute_id=False, allow_all_nodes=False, reset_mac_addresses=False):
@@ -41,7 +42,7 @@ async def export_project(zstream, project, temporary_dir, include_images=False,
 
     :param zstream: ZipStream object
     :param project: Project instance
-    :param temporary_dir: A temporary dir where to store intermediate data
+    :param temporary_dir: A temporary dir where to store intermediate data (not used anymore, the remote files are streamed)
     :param include_images: save OS images to the zip file
     :param include_snapshots: save snapshots to the zip file
     :param keep_compute_id: If false replace all compute id by local (standard behavior for .gns3project to make it portable)
@@ -54,15 +55,17 @@ async def export_project(zstream, project, temporary_dir, include_images=False,
         raise aiohttp.web.HTTPConflict(text="Project must be stopped in order to export it")
 
     # Make sure we save the project
-    project.dump()
+    await project.flush()
 
     if not os.path.exists(project._path):
         raise aiohttp.web.HTTPNotFound(text="Project could not be found at '{}'".format(project._path))
 
+    downloads = _RemoteDownloads(_download_concurrency())
+
     # First we process the .gns3 in order to be sure we don't have an error
     for file in os.listdir(project._path):
         if file.endswith(".gns3"):
-            await _patch_project_file(project, os.path.join(project._path, file), zstream, include_images, keep_compute_id, allow_all_nodes, temporary_dir, reset_mac_addresses)
+            await _patch_project_file(project, os.path.join(project._path, file), zstream, include_images, keep_compute_id, allow_all_nodes, downloads, reset_mac_addresses)
 
     # Export the local files
     for root, dirs, files in os.walk(project._path, topdown=True, followlinks=False):
@@ -83,29 +86,171 @@ async def export_project(zstream, project, temporary_dir, include_images=False,
             _patch_mtime(path)
             zstream.write(path, os.path.relpath(path, project._path))
 
-    # Export files from remote computes
-    for compute in project.computes:
-        if compute.id != "local":
-            compute_files = await compute.list_files(project)
-            for compute_file in compute_files:
-                if _is_exportable(compute_file["path"], include_snapshots):
-                    log.debug("Downloading file '{}' from compute '{}'".format(compute_file["path"], compute.id))
-                    response = await compute.download_file(project, compute_file["path"])
-                    #if response.status != 200:
-                    #    raise aiohttp.web.HTTPConflict(text="Cannot export file from compute '{}'. Compute returned status code {}.".format(compute.id, response.status))
-                    (fd, temp_path) = tempfile.mkstemp(dir=temporary_dir)
-                    async with aiofiles.open(fd, 'wb') as f:
-                        while True:
-                            try:
-                                data = await response.content.read(CHUNK_SIZE)
-                            except asyncio.TimeoutError:
-                                raise aiohttp.web.HTTPRequestTimeout(text="Timeout when downloading file '{}' from remote compute {}:{}".format(compute_file["path"], compute.host, compute.port))
-                            if not data:
-                                break
-                            await f.write(data)
-                    response.close()
-                    _patch_mtime(temp_path)
-                    zstream.write(temp_path, arcname=compute_file["path"])
+    # Export files from remote computes, they are downloaded while the zip stream is read
+    remote_computes = [compute for compute in project.computes if compute.id != "local"]
+    compute_files = await asyncio.gather(*[compute.list_files(project) for compute in remote_computes])
+    for compute, files in zip(remote_computes, compute_files):
+        for compute_file in files:
+            if _is_exportable(compute_file["path"], include_snapshots):
+                remote_file = downloads.add("file '{}' from remote compute {}:{}".format(compute_file["path"], compute.host, compute.port),
+                                            _download_file, compute, project, compute_file["path"])
+                zstream.write_iter(compute_file["path"], remote_file)
+
+
+def _download_concurrency():
+    """
+    Maximum number of files downloaded at the same time from the remote computes.
+    """
+
+    return max(1, int(Config.instance().get_section_config("Server").get("export_download_concurrency", 4)))
+
+
+async def _download_file(compute, project, path):
+
+    log.debug("Downloading file '{}' from compute '{}'".format(path, compute.id))
+    return await compute.download_file(project, path)
+
+
+async def _download_image(compute, image_type, image):
+
+    log.debug("Downloading image '{}' from compute '{}'".format(image, compute.id))
+    response = await compute.download_image(image_type, image)
+    if response.status != 200:
+        response.close()
+        raise aiohttp.web.HTTPConflict(text="Cannot export image from compute '{}'. Compute returned status code {}.".format(compute.id, response.status))
+    return response
+
+
+class _RemoteDownloads:
+    """
+    Downloads of the remote files of an export.
+
+    The files are downloaded in the order of the archive entries, up to
+    `concurrency` at the same time, when the zip stream is read. The data of
+    a file is kept in a bounded memory buffer until the zip stream reaches
+    its entry: nothing is written to a temporary file.
+
+    :param concurrency: Maximum number of concurrent downloads
+    """
+
+    def __init__(self, concurrency):
+
+        self._concurrency = concurrency
+        self._files = []
+        self._next = 0
+        self._running = 0
+        self._closed = False
+
+    def add(self, description, request, *args):
+        """
+        Adds a file to download.
+
+        :param description: Description of the file for the error messages
+        :param request: Coroutine function returning the HTTP response with the file content
+        :param args: Arguments of the coroutine function
+
+        :returns: Asynchronous iterable of the file content for the zip stream
+        """
+
+        remote_file = _RemoteFile(self, description, request, *args)
+        self._files.append(remote_file)
+        return remote_file
+
+    def start_downloads(self):
+
+        while not self._closed and self._running < self._concurrency and self._next < len(self._files):
+            self._files[self._next].start()
+            self._next += 1
+            self._running += 1
+
+    def download_finished(self):
+
+        self._running -= 1
+        self.start_downloads()
+
+    def close(self):
+        """
+        Cancels the downloads, called when the zip stream is closed.
+        """
+
+        if not self._closed:
+            self._closed = True
+            for remote_file in self._files:
+                remote_file.cancel()
+
+
+class _RemoteFile:
+    """
+    Content of a remote file, read by the zip stream.
+    """
+
+    def __init__(self, downloads, description, request, *args):
+
+        self._downloads = downloads
+        self._description = description
+        self._request = request
+        self._args = args
+        self._queue = asyncio.Queue(maxsize=DOWNLOAD_BUFFER_CHUNKS)
+        self._task = None
+        self._finished = False
+
+    def start(self):
+
+        self._task = asyncio.ensure_future(self._download())
+
+    def cancel(self):
+
+        if self._task:
+            self._task.cancel()
+
+    async def _download(self):
+
+        try:
+            response = await self._request(*self._args)
+            try:
+                while True:
+                    try:
+                        data = await response.content.read(CHUNK_SIZE)
+                    except asyncio.TimeoutError:
+                        raise aiohttp.web.HTTPRequestTimeout(text="Timeout when downloading {}".format(self._description))
+                    await self._queue.put(data)
+                    if not data:
+                        break
+            finally:
+                response.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # raised when the zip stream reaches the error
+            await self._queue.put(e)
+
+    def _finish(self):
+
+        if not self._finished:
+            self._finished = True
+            self._downloads.download_finished()
+
+    def __aiter__(self):
+
+        self._downloads.start_downloads()
+        return self
+
+    async def __anext__(self):
+
+        if self._finished:
+            raise StopAsyncIteration
+        data = await self._queue.get()
+        if isinstance(data, Exception):
+            self._finish()
+            raise data
+        if not data:
+            self._finish()
+            raise StopAsyncIteration
+        return data
+
+    def close(self):
+
+        self._downloads.close()
 
 
 def _patch_mtime(path):
@@ -160,7 +305,7 @@ def _is_exportable(path, include_snapshots=False):
     return True
 
 
-async def _patch_project_file(project, path, zstream, include_images, keep_compute_id, allow_all_nodes, temporary_dir, reset_mac_addresses):
+async def _patch_project_file(project, path, zstream, include_images, keep_compute_id, allow_all_nodes, downloads, reset_mac_addresses):
     """
     Patch a project file (.gns3) to export a project.
     The .gns3 file is renamed to project.gns3
@@ -228,7 +373,7 @@ async def _patch_project_file(project, path, zstream, include_images, keep_compu
         for i in images if i['compute_id'] != 'local'])
 
     for compute_id, image_type, image in remote_images:
-        await _export_remote_images(project, compute_id, image_type, image, zstream, temporary_dir)
+        _export_remote_image(project, compute_id, image_type, image, zstream, downloads)
 
     zstream.writestr("project.gns3", json.dumps(topology).encode())
     return images
@@ -263,31 +408,17 @@ def _export_local_image(image, zstream):
             return
 
 
-async def _export_remote_images(project, compute_id, image_type, image, project_zipfile, temporary_dir):
+def _export_remote_image(project, compute_id, image_type, image, project_zipfile, downloads):
     """
     Export specific image from remote compute.
     """
 
-    log.debug("Downloading image '{}' from compute '{}'".format(image, compute_id))
     try:
         compute = [compute for compute in project.computes if compute.id == compute_id][0]
     except IndexError:
         raise aiohttp.web.HTTPConflict(text="Cannot export image from '{}' compute. Compute doesn't exist.".format(compute_id))
 
-    response = await compute.download_image(image_type, image)
-    if response.status != 200:
-        raise aiohttp.web.HTTPConflict(text="Cannot export image from compute '{}'. Compute returned status code {}.".format(compute_id, response.status))
-
-    (fd, temp_path) = tempfile.mkstemp(dir=temporary_dir)
-    async with aiofiles.open(fd, 'wb') as f:
-        while True:
-            try:
-                data = await response.content.read(CHUNK_SIZE)
-            except asyncio.TimeoutError:
-                raise aiohttp.web.HTTPRequestTimeout(text="Timeout when downloading image '{}' from remote compute {}:{}".format(image, compute.host, compute.port))
-            if not data:
-                break
-            await f.write(data)
-    response.close()
+    remote_file = downloads.add("image '{}' from remote compute {}:{}".format(image, compute.host, compute.port),
+                                _download_image, compute, image_type, image)
     arcname = os.path.join("images", image_type, image)
-    project_zipfile.write(temp_path, arcname=arcname, compress_type=zipfile.ZIP_DEFLATED)
+    project_zipfile.write_iter(arcname, remote_file, compress_type=zipfile.ZIP_DEFLATED)
@@ -19,14 +19,18 @@ import os
 import sys
 import json
 import uuid
+import zlib
 import shutil
 import zipfile
 import aiohttp
 import aiofiles
+import asyncio
 import itertools
 import tempfile
 
-from .topology import load_topology
+from .topology import load_topology, GNS3_FILE_FORMAT_REVISION
+from .snapshot_store import MANIFEST_EXTENSION, check_manifest
+from ..config import Config
 from ..utils.asyncio import wait_run_in_executor
 from ..utils.asyncio import aiozipstream
 
@@ -58,101 +62,119 @@ async def import_project(controller, project_id, stream, location=None, name=Non
         raise aiohttp.web.HTTPConflict(text="The destination path should not contain .gns3")
 
     try:
-        with zipfile.ZipFile(stream) as zip_file:
-            project_file = zip_file.read("project.gns3").decode()
+        zip_file = zipfile.ZipFile(stream)
     except zipfile.BadZipFile:
         raise aiohttp.web.HTTPConflict(text="Cannot import project, not a GNS3 project (invalid zip)")
-    except KeyError:
-        raise aiohttp.web.HTTPConflict(text="Cannot import project, project.gns3 file could not be found")
 
-    try:
-        topology = json.loads(project_file)
-        # We import the project on top of an existing project (snapshots)
-        if topology["project_id"] == project_id:
-            project_name = topology["name"]
-        else:
-            # If the project name is already used we generate a new one
-            if name:
-                project_name = controller.get_free_project_name(name)
+    with zip_file:
+        try:
+            project_file = zip_file.read("project.gns3").decode()
+        except KeyError:
+            raise aiohttp.web.HTTPConflict(text="Cannot import project, project.gns3 file could not be found")
+        except zipfile.BadZipFile:
+            raise aiohttp.web.HTTPConflict(text="Cannot import project, not a GNS3 project (invalid zip)")
+
+        try:
+            topology = json.loads(project_file)
+            # We import the project on top of an existing project (snapshots)
+            if topology["project_id"] == project_id:
+                project_name = topology["name"]
             else:
-                project_name = controller.get_free_project_name(topology["name"])
-    except (ValueError, KeyError):
-        raise aiohttp.web.HTTPConflict(text="Cannot import project, the project.gns3 file is corrupted")
-
-    if location:
-        path = location
-    else:
-        projects_path = controller.projects_directory()
-        path = os.path.join(projects_path, project_id)
-    try:
-        os.makedirs(path, exist_ok=True)
-    except UnicodeEncodeError:
-        raise aiohttp.web.HTTPConflict(text="The project name contain non supported or invalid characters")
-
-    try:
-        with zipfile.ZipFile(stream) as zip_file:
-            await wait_run_in_executor(zip_file.extractall, path)
-    except zipfile.BadZipFile:
-        raise aiohttp.web.HTTPConflict(text="Cannot extract files from GNS3 project (invalid zip)")
-
-    topology = load_topology(os.path.join(path, "project.gns3"))
-    topology["name"] = project_name
-    # To avoid unexpected behavior (project start without manual operations just after import)
-    topology["auto_start"] = False
-    topology["auto_open"] = False
-    topology["auto_close"] = True
-
-    # Generate a new node id
-    node_old_to_new = {}
-    for node in topology["topology"]["nodes"]:
-        if "node_id" in node:
-            node_old_to_new[node["node_id"]] = str(uuid.uuid4())
-            _move_node_file(path, node["node_id"], node_old_to_new[node["node_id"]])
-            node["node_id"] = node_old_to_new[node["node_id"]]
+                # If the project name is already used we generate a new one
+                if name:
+                    project_name = controller.get_free_project_name(name)
+                else:
+                    project_name = controller.get_free_project_name(topology["name"])
+        except (ValueError, KeyError):
+            raise aiohttp.web.HTTPConflict(text="Cannot import project, the project.gns3 file is corrupted")
+
+        if location:
+            path = location
         else:
-            node["node_id"] = str(uuid.uuid4())
-
-    # Update link to use new id
-    for link in topology["topology"]["links"]:
-        link["link_id"] = str(uuid.uuid4())
-        for node in link["nodes"]:
-            node["node_id"] = node_old_to_new[node["node_id"]]
-
-    # Generate new drawings id
-    for drawing in topology["topology"]["drawings"]:
-        drawing["drawing_id"] = str(uuid.uuid4())
-
-    # Modify the compute id of the node depending of compute capacity
-    if not keep_compute_id:
-        # For some VM type we move them to the GNS3 VM if possible
-        # unless it's a linux host without GNS3 VM
-        if not sys.platform.startswith("linux") or controller.has_compute("vm"):
-            for node in topology["topology"]["nodes"]:
-                if node["node_type"] in ("docker", "qemu", "iou", "nat"):
-                    node["compute_id"] = "vm"
-        else:
-            # Round-robin through available compute resources.
-            # computes = []
-            # for compute_id in controller.computes:
-            #     compute = controller.get_compute(compute_id)
-            #     # only use the local compute or any connected compute
-            #     if compute_id == "local" or compute.connected:
-            #         computes.append(compute_id)
-            #     else:
-            #         log.warning(compute.name, "is not connected!")
-            compute_nodes = itertools.cycle(controller.computes)
-            for node in topology["topology"]["nodes"]:
-                node["compute_id"] = next(compute_nodes)
-
-    compute_created = set()
-    for node in topology["topology"]["nodes"]:
-        if node["compute_id"] != "local":
-            # Project created on the remote GNS3 VM?
-            if node["compute_id"] not in compute_created:
+            projects_path = controller.projects_directory()
+            path = os.path.join(projects_path, project_id)
+        try:
+            os.makedirs(path, exist_ok=True)
+        except UnicodeEncodeError:
+            raise aiohttp.web.HTTPConflict(text="The project name contain non supported or invalid characters")
+
+        # The conversion of the topologies of the previous GNS3 versions
+        # moves files in the project, the archive is extracted first
+        extract_all = not isinstance(topology.get("revision"), int) or topology["revision"] < GNS3_FILE_FORMAT_REVISION
+        try:
+            if extract_all:
+                await wait_run_in_executor(zip_file.extractall, path)
+            else:
+                await wait_run_in_executor(zip_file.extract, "project.gns3", path)
+        except zipfile.BadZipFile:
+            raise aiohttp.web.HTTPConflict(text="Cannot extract files from GNS3 project (invalid zip)")
+
+        topology = load_topology(os.path.join(path, "project.gns3"))
+        topology["name"] = project_name
+        # To avoid unexpected behavior (project start without manual operations just after import)
+        topology["auto_start"] = False
+        topology["auto_open"] = False
+        topology["auto_close"] = True
+
+        # Generate a new node id
+        node_old_to_new = {}
+        for node in topology["topology"]["nodes"]:
+            if "node_id" in node:
+                node_old_to_new[node["node_id"]] = str(uuid.uuid4())
+                if extract_all:
+                    _move_node_file(path, node["node_id"], node_old_to_new[node["node_id"]])
+                node["node_id"] = node_old_to_new[node["node_id"]]
+            else:
+                node["node_id"] = str(uuid.uuid4())
+
+        # Update link to use new id
+        for link in topology["topology"]["links"]:
+            link["link_id"] = str(uuid.uuid4())
+            for node in link["nodes"]:
+                node["node_id"] = node_old_to_new[node["node_id"]]
+
+        # Generate new drawings id
+        for drawing in topology["topology"]["drawings"]:
+            drawing["drawing_id"] = str(uuid.uuid4())
+
+        # Modify the compute id of the node depending of compute capacity
+        if not keep_compute_id:
+            # For some VM type we move them to the GNS3 VM if possible
+            # unless it's a linux host without GNS3 VM
+            if not sys.platform.startswith("linux") or controller.has_compute("vm"):
+                for node in topology["topology"]["nodes"]:
+                    if node["node_type"] in ("docker", "qemu", "iou", "nat"):
+                        node["compute_id"] = "vm"
+            else:
+                # Round-robin through available compute resources.
+                # computes = []
+                # for compute_id in controller.computes:
+                #     compute = controller.get_compute(compute_id)
+                #     # only use the local compute or any connected compute
+                #     if compute_id == "local" or compute.connected:
+                #         computes.append(compute_id)
+                #     else:
+                #         log.warning(compute.name, "is not connected!")
+                compute_nodes = itertools.cycle(controller.computes)
+                for node in topology["topology"]["nodes"]:
+                    node["compute_id"] = next(compute_nodes)
+
+        compute_created = set()
+        for node in topology["topology"]["nodes"]:
+            if node["compute_id"] != "local":
                 compute = controller.get_compute(node["compute_id"])
-                await compute.post("/projects", data={"name": project_name, "project_id": project_id,})
-                compute_created.add(node["compute_id"])
-            await _move_files_to_compute(compute, project_id, path, os.path.join("project-files", node["node_type"], node["node_id"]))
+                # Project created on the remote GNS3 VM?
+                if node["compute_id"] not in compute_created:
+                    await compute.post("/projects", data={"name": project_name, "project_id": project_id,})
+                    compute_created.add(node["compute_id"])
+                if extract_all:
+                    await _move_files_to_compute(compute, project_id, path, os.path.join("project-files", node["node_type"], node["node_id"]))
+
+        if not extract_all:
+            try:
+                await _import_files(controller, zip_file, project_id, path, topology["topology"]["nodes"], node_old_to_new)
+            except zipfile.BadZipFile:
+                raise aiohttp.web.HTTPConflict(text="Cannot extract files from GNS3 project (invalid zip)")
 
     # And we dump the updated.gns3
     dot_gns3_path = os.path.join(path, project_name + ".gns3")
@@ -174,6 +196,120 @@ async def import_project(controller, project_id, stream, location=None, name=Non
     return project
 
 
+def _upload_concurrency():
+    """
+    Maximum number of files uploaded at the same time to the remote computes.
+    """
+
+    return max(1, int(Config.instance().get_section_config("Server").get("import_upload_concurrency", 4)))
+
+
+async def _import_files(controller, zip_file, project_id, path, nodes, node_old_to_new):
+    """
+    Copy the files of the archive to their destination without extracting
+    it first: the files of the nodes running on a remote compute are uploaded
+    from the archive, the images go to the images directory and the other
+    files to the project directory.
+
+    :param zip_file: ZipFile instance of the archive
+    :param path: Path of the project
+    :param nodes: Nodes of the topology with their new ID and compute
+    :param node_old_to_new: New node ID for each node ID of the archive
+    """
+
+    remote_nodes = {node["node_id"]: node["compute_id"] for node in nodes if node["compute_id"] != "local"}
+    local_files = []
+    image_files = []
+    remote_files = []
+    for info in zip_file.infolist():
+        if info.filename.endswith("/") or info.filename == "project.gns3":
+            continue
+        parts = [part for part in info.filename.replace("\\", "/").split("/") if part not in ("", ".")]
+        if not parts or ".." in parts or os.path.splitdrive(parts[0])[0]:
+            log.warning("Ignoring file '{}' in the project archive".format(info.filename))
+            continue
+        if parts[0] == "images" and len(parts) > 1:
+            image_files.append((info, os.path.join(controller.images_path(), *parts[1:])))
+            continue
+        if len(parts) > 3 and parts[0] == "project-files" and parts[2] in node_old_to_new:
+            parts[2] = node_old_to_new[parts[2]]
+            if parts[2] in remote_nodes:
+                remote_files.append((controller.get_compute(remote_nodes[parts[2]]), info, "/".join(parts)))
+                continue
+        local_files.append((info, os.path.join(path, *parts)))
+
+    semaphore = asyncio.Semaphore(_upload_concurrency())
+
+    async def upload(compute, info, dst):
+        async with semaphore:
+            log.debug("Uploading file '{}' to compute '{}'".format(dst, compute.id))
+            with zip_file.open(info) as f:
+                await compute.http_query("POST", "/projects/{}/files/{}".format(project_id, dst), f, timeout=None)
+
+    await asyncio.gather(wait_run_in_executor(_extract_files, zip_file, local_files),
+                         wait_run_in_executor(_extract_images, zip_file, image_files),
+                         *[upload(compute, info, dst) for compute, info, dst in remote_files])
+
+
+def _extract_files(zip_file, files):
+    """
+    Extract files of an archive.
+
+    :param files: List of tuples (ZipInfo, destination path)
+    """
+
+    for info, dst in files:
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with zip_file.open(info) as src:
+            with open(dst, "wb") as f:
+                shutil.copyfileobj(src, f, 1024 * 1024)
+
+
+def _extract_images(zip_file, files):
+    """
+    Extract images of an archive, an image is written to a temporary
+    file and then renamed: a VM using the previous image keeps reading it.
+
+    :param files: List of tuples (ZipInfo, destination path)
+    """
+
+    for info, dst in files:
+        if _same_content(info, dst):
+            log.debug("Image '{}' is already installed".format(dst))
+            continue
+        directory, filename = os.path.split(dst)
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, ".{}.{}.tmp".format(filename, uuid.uuid4().hex))
+        try:
+            with zip_file.open(info) as src:
+                with open(tmp, "xb") as f:
+                    shutil.copyfileobj(src, f, 1024 * 1024)
+            os.replace(tmp, dst)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+def _same_content(info, path):
+    """
+    :param info: ZipInfo of the archive entry
+    :param path: Path of the file
+    :returns: True if the file has the same size and checksum as the archive entry
+    """
+
+    try:
+        if os.path.getsize(path) != info.file_size:
+            return False
+        crc = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                crc = zlib.crc32(chunk, crc)
+        return crc == info.CRC
+    except OSError:
+        return False
+
+
 def _move_node_file(path, old_id, new_id):
     """
     Move a file from a node when changing its id
@@ -246,6 +382,9 @@ async def _import_snapshots(snapshots_path, project_name, project_id):
     """
 
     for snapshot in os.listdir(snapshots_path):
+        if snapshot.endswith(MANIFEST_EXTENSION):
+            _import_snapshot_manifest(os.path.join(snapshots_path, snapshot), project_name, project_id)
+            continue
         if not snapshot.endswith(".gns3project"):
             continue
         snapshot_path = os.path.join(snapshots_path, snapshot)
@@ -288,3 +427,22 @@ async def _import_snapshots(snapshots_path, project_name, project_id):
                             await f.write(chunk)
             except OSError as e:
                 raise aiohttp.web.HTTPConflict(text="Cannot update snapshot '{}': the snapshot cannot be recreated: {}".format(os.path.basename(snapshot), e))
+
+
+def _import_snapshot_manifest(manifest_path, project_name, project_id):
+    """
+    Update the project name and ID of a snapshot stored in the snapshot store.
+    """
+
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        check_manifest(manifest)
+        manifest["topology"]["name"] = project_name
+        manifest["topology"]["project_id"] = project_id
+        with open(manifest_path, "w+", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    except OSError as e:
+        raise aiohttp.web.HTTPConflict(text="Cannot update snapshot '{}': {}".format(os.path.basename(manifest_path), e))
+    except (ValueError, KeyError, TypeError) as e:
+        raise aiohttp.web.HTTPConflict(text="Cannot update snapshot '{}': the manifest is corrupted: {}".format(os.path.basename(manifest_path), e))
@@ -489,20 +489,28 @@ class Node:
     async def destroy(self):
         await self.delete()
 
+    def start_data(self, data=None):
+        """
+        Data sent to the compute to start the node
+
+        :param data: Data sent by the client
+        """
+
+        # For IOU we need to send the licence everytime
+        if self.node_type == "iou":
+            license_check = self._project.controller.iou_license.get("license_check", True)
+            iourc_content = self._project.controller.iou_license.get("iourc_content", None)
+            #if license_check and not iourc_content:
+            #    raise aiohttp.web.HTTPConflict(text="IOU licence is not configured")
+            return {"license_check": license_check, "iourc_content": iourc_content}
+        return data
+
     async def start(self, data=None):
         """
         Start a node
         """
         try:
-            # For IOU we need to send the licence everytime
-            if self.node_type == "iou":
-                license_check = self._project.controller.iou_license.get("license_check", True)
-                iourc_content = self._project.controller.iou_license.get("iourc_content", None)
-                #if license_check and not iourc_content:
-                #    raise aiohttp.web.HTTPConflict(text="IOU licence is not configured")
-                await self.post("/start", timeout=240, data={"license_check": license_check, "iourc_content": iourc_content})
-            else:
-                await self.post("/start", data=data, timeout=240)
+            await self.post("/start", data=self.start_data(data), timeout=240)
         except asyncio.TimeoutError:
             raise aiohttp.web.HTTPRequestTimeout(text="Timeout when starting {}".format(self._name))
 
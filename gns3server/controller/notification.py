@@ -16,10 +16,12 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import copy
+import asyncio
 import aiohttp
 from contextlib import contextmanager
 
-from ..notification_queue import NotificationQueue
+from ..notification_queue import NotificationQueue, NotificationMessage
 
 
 class Notification:
@@ -27,19 +29,33 @@ class Notification:
     Manage notification for the controller
     """
 
+    # Node updates received from the computes during this delay (in seconds)
+    # are merged and sent to the clients as a single node.updated
+    NODE_UPDATED_DELAY = 0.1
+
     def __init__(self, controller):
         self._controller = controller
         self._project_listeners = {}
         self._controller_listeners = []
+        self._pending_node_updates = {}
+        self._node_states = {}
 
     @contextmanager
-    def project_queue(self, project_id):
+    def project_queue(self, project_id, delta=False):
         """
         Get a queue of notifications
 
         Use it with Python with
+
+        :param project_id: Project identifier
+        :param delta: The client accepts node.updated with only the changed fields
         """
         queue = NotificationQueue()
+        queue.delta = delta
+        if delta:
+            # the new client doesn't know the previous states, the next
+            # update of each node will be complete
+            self._node_states.pop(project_id, None)
         self._project_listeners.setdefault(project_id, set())
         self._project_listeners[project_id].add(queue)
         try:
@@ -81,8 +97,9 @@ class Notification:
             except TypeError:  # If we receive a mock as an event it will raise TypeError when using json dump
                 pass
 
+        message = NotificationMessage(action, event)
         for controller_listener in self._controller_listeners:
-            controller_listener.put_nowait((action, event, {}))
+            controller_listener.put_nowait(message)
 
     def project_has_listeners(self, project_id):
         """
@@ -102,12 +119,11 @@ class Notification:
         """
         if action == "node.updated":
             try:
-                # Update controller node data and send the event node.updated
+                # Update controller node data, the event node.updated is sent later
                 project = self._controller.get_project(event["project_id"])
                 node = project.get_node(event["node_id"])
                 await node.parse_node_response(event)
-
-                self.project_emit("node.updated", node.__json__())
+                self._schedule_node_updated(project, node)
             except (aiohttp.web.HTTPNotFound, aiohttp.web.HTTPForbidden):  # Project closing
                 return
         elif action == "ping":
@@ -116,6 +132,78 @@ class Notification:
         else:
             self.project_emit(action, event, project_id)
 
+    def _schedule_node_updated(self, project, node):
+        """
+        Send a node.updated for this node after a short delay, all the
+        updates received from the compute in the meantime are sent at once.
+
+        :param project: Project instance
+        :param node: Node instance
+        """
+
+        if not self.project_has_listeners(project.id):
+            return
+        key = (project.id, node.id)
+        if key in self._pending_node_updates:
+            return
+        loop = asyncio.get_event_loop()
+        self._pending_node_updates[key] = loop.call_later(self.NODE_UPDATED_DELAY, self._send_node_updated, project, node)
+
+    def _send_node_updated(self, project, node):
+        """
+        Send the current state of a node to the project listeners
+
+        :param project: Project instance
+        :param node: Node instance
+        """
+
+        self._pending_node_updates.pop((project.id, node.id), None)
+        try:
+            # the node could have been deleted or the project closed in the meantime
+            project.get_node(node.id)
+        except (aiohttp.web.HTTPNotFound, aiohttp.web.HTTPForbidden):
+            return
+
+        try:
+            project_listeners = self._project_listeners[project.id]
+        except KeyError:
+            return
+
+        event = node.__json__()
+        previous = self._node_states.get(project.id, {}).get(node.id)
+        self._update_node_state("node.updated", event)
+        full = NotificationMessage("node.updated", event)
+        if previous is None:
+            delta = full
+        else:
+            changes = {key: value for key, value in event.items() if previous.get(key) != value}
+            changes["node_id"] = node.id
+            changes["project_id"] = project.id
+            delta = NotificationMessage("node.updated", changes, partial=True)
+        for listener in project_listeners:
+            listener.put_nowait(delta if listener.delta else full)
+
+    def _update_node_state(self, action, event):
+        """
+        Keep the last node state sent to the clients, used to
+        compute the changed fields for the clients supporting it.
+
+        :param action: Action name
+        :param event: Event sent
+        """
+
+        project_id = event.get("project_id")
+        if action == "node.updated":
+            if any(listener.delta for listener in self._project_listeners.get(project_id, ())):
+                # the event share the properties with the node, they are updated in place
+                self._node_states.setdefault(project_id, {})[event["node_id"]] = copy.deepcopy(event)
+        elif action == "node.deleted":
+            self._node_states.get(project_id, {}).pop(event.get("node_id"), None)
+        elif action == "project.closed":
+            self._node_states.pop(project_id, None)
+            for key in [key for key in self._pending_node_updates if key[0] == project_id]:
+                self._pending_node_updates.pop(key).cancel()
+
     def project_emit(self, action, event, project_id=None):
         """
         Send a notification to clients scoped by projects
@@ -136,6 +224,9 @@ class Notification:
             except TypeError:  # If we receive a mock as an event it will raise TypeError when using json dump
                 pass
 
+        if action in ("node.updated", "node.deleted", "project.closed") and isinstance(event, dict):
+            self._update_node_state(action, event)
+
         if "project_id" in event or project_id:
             self._send_event_to_project(event.get("project_id", project_id), action, event)
         else:
@@ -154,8 +245,9 @@ class Notification:
             project_listeners = self._project_listeners[project_id]
         except KeyError:
             return
+        message = NotificationMessage(action, event)
         for listener in project_listeners:
-            listener.put_nowait((action, event, {}))
+            listener.put_nowait(message)
 
     def _send_event_to_all_projects(self, action, event):
         """
@@ -165,6 +257,19 @@ class Notification:
         :param action: Action name
         :param event: Event to send
         """
+        message = NotificationMessage(action, event)
         for project_listeners in self._project_listeners.values():
             for listener in project_listeners:
-                listener.put_nowait((action, event, {}))
+                listener.put_nowait(message)
+
+    def stats(self):
+        """
+        Statistics of the notification queues
+
+        :returns: Dictionary with the size, dropped and coalesced notifications of each queue
+        """
+
+        return {
+            "controller": [queue.stats() for queue in self._controller_listeners],
+            "projects": {project_id: [queue.stats() for queue in listeners] for project_id, listeners in self._project_listeners.items()}
+        }
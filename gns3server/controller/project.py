@@ -33,21 +33,30 @@ from uuid import UUID, uuid4
 from .node import Node
 from .compute import ComputeError
 from .snapshot import Snapshot
+from .snapshot_store import SnapshotStore, MANIFEST_EXTENSION
 from .drawing import Drawing
 from .topology import project_to_topology, load_topology
 from .udp_link import UDPLink
 from ..config import Config
 from ..utils.path import check_path_allowed, get_default_project_directory
 from ..utils.application_id import get_next_application_id
-from ..utils.asyncio.pool import Pool
+from ..utils.asyncio.pool import Pool, PoolError
 from ..utils.asyncio import locking
+from ..utils.asyncio import wait_run_in_executor
 from ..utils.asyncio import aiozipstream
 from .export_project import export_project
 from .import_project import import_project
+from .duplicate_project import duplicate_project
 
 import logging
 log = logging.getLogger(__name__)
 
+# Timeout in seconds of a node action, the same as a single node request
+NODE_ACTION_TIMEOUT = 240
+
+# Timeout in seconds to get the console output of the nodes of a compute
+CONSOLE_HISTORY_TIMEOUT = 30
+
 
 def open_required(func):
     """
@@ -96,6 +105,10 @@ class Project:
 
         self._loading = False
         self._closing = False
+        self._snapshot_store = None
+        self._dump_pending = False
+        self._dump_handle = None
+        self._dump_loop = None
 
         # Disallow overwrite of existing project
         if project_id is None and path is not None:
@@ -125,9 +138,10 @@ class Project:
         # At project creation we write an empty .gns3 with the meta
         if not os.path.exists(self._topology_file()):
             assert self._status != "closed"
-            self.dump()
+            self._write_topology(self._serialize_topology())
 
         self._iou_id_lock = asyncio.Lock()
+        self._compute_project_lock = asyncio.Lock()
 
     def emit_notification(self, action, event):
         """
@@ -177,7 +191,7 @@ class Project:
         snapshot_dir = os.path.join(self.path, "snapshots")
         if os.path.exists(snapshot_dir):
             for snap in os.listdir(snapshot_dir):
-                if snap.endswith(".gns3project"):
+                if snap.endswith(".gns3project") or snap.endswith(MANIFEST_EXTENSION):
                     snapshot = Snapshot(self, filename=snap)
                     self._snapshots[snapshot.id] = snapshot
 
@@ -519,10 +533,22 @@ class Project:
         node = await self.add_node(compute, name, node_id, node_type=node_type, **template)
         return node
 
-    async def _create_node(self, compute, name, node_id, node_type=None, **kwargs):
+    async def _create_project_on_compute(self, compute):
+        """
+        Create the project on the compute if it doesn't exist yet.
+
+        Nodes can be created concurrently (e.g. when opening a project),
+        the lock makes sure we send only one creation request per compute.
+
+        :param compute: Compute instance
+        """
+
+        if compute in self._project_created_on_compute:
+            return
+        async with self._compute_project_lock:
+            if compute in self._project_created_on_compute:
+                return
 
-        node = Node(self, compute, name, node_id=node_id, node_type=node_type, **kwargs)
-        if compute not in self._project_created_on_compute:
             # For a local server we send the project path
             if compute.id == "local":
                 data = {
@@ -542,6 +568,10 @@ class Project:
             await compute.post("/projects", data=data)
             self._project_created_on_compute.add(compute)
 
+    async def _create_node(self, compute, name, node_id, node_type=None, **kwargs):
+
+        node = Node(self, compute, name, node_id=node_id, node_type=node_type, **kwargs)
+        await self._create_project_on_compute(compute)
         await node.create()
         self._nodes[node.id] = node
 
@@ -743,6 +773,17 @@ class Project:
         """
         return self._snapshots
 
+    @property
+    def snapshot_store(self):
+        """
+        :returns: SnapshotStore instance storing the snapshots of the project
+        """
+
+        path = os.path.join(self.path, "snapshots")
+        if self._snapshot_store is None or self._snapshot_store.path != path:
+            self._snapshot_store = SnapshotStore(path)
+        return self._snapshot_store
+
     @open_required
     def get_snapshot(self, snapshot_id):
         """
@@ -772,7 +813,7 @@ class Project:
     async def delete_snapshot(self, snapshot_id):
         snapshot = self.get_snapshot(snapshot_id)
         del self._snapshots[snapshot.id]
-        os.remove(snapshot.path)
+        await snapshot.delete()
 
     @locking
     async def close(self, ignore_notification=False):
@@ -789,6 +830,10 @@ class Project:
             # We don't care if a compute is down at this step
             except (ComputeError, aiohttp.web.HTTPError, aiohttp.ClientResponseError, TimeoutError):
                 pass
+        try:
+            await self.flush()
+        except aiohttp.web.HTTPError as e:
+            log.error("Could not save project {}: {}".format(self._name, e.text))
         self._clean_pictures()
         self._status = "closed"
         if not ignore_notification:
@@ -924,39 +969,16 @@ class Project:
                     setattr(self, key, val)
 
             topology = project_data["topology"]
-            for compute in topology.get("computes", []):
-                await self.controller.add_compute(**compute)
-            for node in topology.get("nodes", []):
-                compute = self.controller.get_compute(node.pop("compute_id"))
-                name = node.pop("name")
-                node_id = node.pop("node_id", str(uuid.uuid4()))
-                await self.add_node(compute, name, node_id, dump=False, **node)
-            for link_data in topology.get("links", []):
-                if 'link_id' not in link_data.keys():
-                    # skip the link
-                    continue
-                link = await self.add_link(link_id=link_data["link_id"])
-                if "filters" in link_data:
-                    await link.update_filters(link_data["filters"])
-                for node_link in link_data.get("nodes", []):
-                    node = self.get_node(node_link["node_id"])
-                    port = node.get_port(node_link["adapter_number"], node_link["port_number"])
-                    if port is None:
-                        log.warning("Port {}/{} for {} not found".format(node_link["adapter_number"], node_link["port_number"], node.name))
-                        continue
-                    if port.link is not None:
-                        log.warning("Port {}/{} is already connected to link ID {}".format(node_link["adapter_number"], node_link["port_number"], port.link.id))
-                        continue
-                    await link.add_node(node, node_link["adapter_number"], node_link["port_number"], label=node_link.get("label"), dump=False)
-                if len(link.nodes) != 2:
-                    # a link should have 2 attached nodes, this can happen with corrupted projects
-                    await self.delete_link(link.id, force_delete=True)
+            await self._load_computes(topology.get("computes", []))
+            await self._load_nodes(topology.get("nodes", []))
+            await self._load_links(topology.get("links", []))
             for drawing_data in topology.get("drawings", []):
                 await self.add_drawing(dump=False, **drawing_data)
 
             self.dump()
         # We catch all error to be able to rollback the .gns3 to the previous state
         except Exception as e:
+            self._cancel_pending_dump()
             for compute in list(self._project_created_on_compute):
                 try:
                     await compute.post("/projects/{}/close".format(self._id))
@@ -987,6 +1009,155 @@ class Project:
             # their project and fix it
             asyncio.ensure_future(self.start_all())
 
+    def _open_concurrency(self):
+        """
+        Maximum number of concurrent requests sent to each compute
+        when loading the project.
+        """
+
+        return max(1, int(self._config().get("project_open_concurrency", 10)))
+
+    def _emit_loading_progress(self, stage, loaded, total):
+        """
+        Notify the clients about the progress of the project loading.
+
+        :param stage: Loading stage (computes, nodes or links)
+        :param loaded: Number of elements loaded in this stage
+        :param total: Total number of elements in this stage
+        """
+
+        self.emit_notification("project.loading", {"project_id": self._id,
+                                                   "stage": stage,
+                                                   "loaded": loaded,
+                                                   "total": total})
+
+    async def _gather_loading_tasks(self, stage, coros):
+        """
+        Run the loading tasks concurrently and wait for all of them
+        to finish before raising the first error (if any) so the
+        rollback happens once the computes are not busy anymore.
+
+        :param stage: Loading stage
+        :param coros: List of coroutines to run
+        """
+
+        total = len(coros)
+        loaded = 0
+        self._emit_loading_progress(stage, loaded, total)
+
+        async def run(coro):
+            nonlocal loaded
+            await coro
+            loaded += 1
+            self._emit_loading_progress(stage, loaded, total)
+
+        results = await asyncio.gather(*[run(coro) for coro in coros], return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _load_computes(self, computes):
+        """
+        Add the computes used by the topology.
+
+        :param computes: List of computes from the topology file
+        """
+
+        await self._gather_loading_tasks("computes", [self.controller.add_compute(**compute) for compute in computes])
+
+    async def _load_nodes(self, nodes):
+        """
+        Create the nodes in parallel, the number of concurrent
+        creations is limited for each compute.
+
+        :param nodes: List of nodes from the topology file
+        """
+
+        semaphores = {}
+
+        async def create_node(compute, name, node_id, node):
+            async with semaphores[compute.id]:
+                await self.add_node(compute, name, node_id, dump=False, **node)
+
+        coros = []
+        for node in nodes:
+            compute = self.controller.get_compute(node.pop("compute_id"))
+            name = node.pop("name")
+            node_id = node.pop("node_id", str(uuid.uuid4()))
+            if compute.id not in semaphores:
+                semaphores[compute.id] = asyncio.Semaphore(self._open_concurrency())
+            coros.append(create_node(compute, name, node_id, node))
+        await self._gather_loading_tasks("nodes", coros)
+
+    async def _load_links(self, links):
+        """
+        Create the links in parallel once all nodes exist.
+
+        Ports are checked and reserved before any link is created so
+        corrupted projects with a port used twice are handled like
+        with a sequential loading.
+
+        :param links: List of links from the topology file
+        """
+
+        semaphores = {}
+        reserved_ports = set()
+        coros = []
+        for link_data in links:
+            if 'link_id' not in link_data.keys():
+                # skip the link
+                continue
+            link_nodes = []
+            for node_link in link_data.get("nodes", []):
+                node = self.get_node(node_link["node_id"])
+                port = node.get_port(node_link["adapter_number"], node_link["port_number"])
+                if port is None:
+                    log.warning("Port {}/{} for {} not found".format(node_link["adapter_number"], node_link["port_number"], node.name))
+                    continue
+                if port.link is not None:
+                    log.warning("Port {}/{} is already connected to link ID {}".format(node_link["adapter_number"], node_link["port_number"], port.link.id))
+                    continue
+                port_key = (node.id, node_link["adapter_number"], node_link["port_number"])
+                if port_key in reserved_ports:
+                    log.warning("Port {}/{} for {} is used by multiple links".format(node_link["adapter_number"], node_link["port_number"], node.name))
+                    continue
+                reserved_ports.add(port_key)
+                link_nodes.append((node, node_link))
+                if node.compute.id not in semaphores:
+                    semaphores[node.compute.id] = asyncio.Semaphore(self._open_concurrency())
+            coros.append(self._load_link(link_data, link_nodes, semaphores))
+        await self._gather_loading_tasks("links", coros)
+
+    async def _load_link(self, link_data, link_nodes, semaphores):
+        """
+        Create a link from the topology file.
+
+        :param link_data: Link from the topology file
+        :param link_nodes: List of (node, node_link) to attach to the link
+        :param semaphores: Dictionary of semaphores limiting the concurrency per compute
+        """
+
+        link = await self.add_link(link_id=link_data["link_id"], dump=False)
+        if "filters" in link_data:
+            await link.update_filters(link_data["filters"])
+
+        # always acquire the semaphores in the same order to avoid deadlocks
+        compute_ids = sorted(set(node.compute.id for node, _ in link_nodes))
+        acquired = []
+        try:
+            for compute_id in compute_ids:
+                await semaphores[compute_id].acquire()
+                acquired.append(semaphores[compute_id])
+            for node, node_link in link_nodes:
+                await link.add_node(node, node_link["adapter_number"], node_link["port_number"], label=node_link.get("label"), dump=False)
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+
+        if len(link.nodes) != 2:
+            # a link should have 2 attached nodes, this can happen with corrupted projects
+            await self.delete_link(link.id, force_delete=True)
+
     async def wait_loaded(self):
         """
         Wait until the project finish loading
@@ -998,9 +1169,9 @@ class Project:
         """
         Duplicate a project
 
-        It's the save as feature of the 1.X. It's implemented on top of the
-        export / import features. It will generate a gns3p and reimport it.
-        It's a little slower but we have only one implementation to maintain.
+        It's the save as feature of the 1.X. When all the nodes run on the local
+        compute the files are cloned directly, otherwise it's implemented on top
+        of the export / import features: it will generate a gns3p and reimport it.
 
         :param name: Name of the new project. A new one will be generated in case of conflicts
         :param location: Parent directory of the new project
@@ -1010,25 +1181,28 @@ class Project:
         if self._status == "closed":
             await self.open()
 
-        self.dump()
+        await self.flush()
         assert self._status != "closed"
         try:
             begin = time.time()
-            with tempfile.TemporaryDirectory() as tmpdir:
-                # Do not compress the exported project when duplicating
-                with aiozipstream.ZipFile(compression=zipfile.ZIP_STORED) as zstream:
-                    await export_project(zstream, self, tmpdir, keep_compute_id=True, allow_all_nodes=True, reset_mac_addresses=True)
-
-                    # export the project to a temporary location
-                    project_path = os.path.join(tmpdir, "project.gns3p")
-                    log.info("Exporting project to '{}'".format(project_path))
-                    async with aiofiles.open(project_path, 'wb') as f:
-                        async for chunk in zstream:
-                            await f.write(chunk)
-
-                    # import the temporary project
-                    with open(project_path, "rb") as f:
-                        project = await import_project(self._controller, str(uuid.uuid4()), f, location=location, name=name, keep_compute_id=True)
+            if all(compute.id == "local" for compute in self.computes):
+                project = await duplicate_project(self._controller, self, str(uuid.uuid4()), location=location, name=name)
+            else:
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    # Do not compress the exported project when duplicating
+                    with aiozipstream.ZipFile(compression=zipfile.ZIP_STORED) as zstream:
+                        await export_project(zstream, self, tmpdir, keep_compute_id=True, allow_all_nodes=True, reset_mac_addresses=True)
+
+                        # export the project to a temporary location
+                        project_path = os.path.join(tmpdir, "project.gns3p")
+                        log.info("Exporting project to '{}'".format(project_path))
+                        async with aiofiles.open(project_path, 'wb') as f:
+                            async for chunk in zstream:
+                                await f.write(chunk)
+
+                        # import the temporary project
+                        with open(project_path, "rb") as f:
+                            project = await import_project(self._controller, str(uuid.uuid4()), f, location=location, name=name, keep_compute_id=True)
 
             log.info("Project '{}' duplicated in {:.4f} seconds".format(project.name, time.time() - begin))
         except (ValueError, OSError, UnicodeEncodeError) as e:
@@ -1049,16 +1223,105 @@ class Project:
                 return True
         return False
 
+    def _save_delay(self):
+        """
+        Delay in seconds during which topology changes are merged
+        before being written to disk.
+        """
+
+        return float(self._config().get("project_save_delay", 1))
+
     def dump(self):
         """
         Dump topology to disk
+
+        When the event loop is running, the write is delayed and multiple
+        changes are merged into a single write. Use flush() to make sure
+        pending changes are on disk.
         """
+
+        try:
+            loop = asyncio.get_event_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or not loop.is_running() or self._save_delay() <= 0:
+            self._cancel_pending_dump()
+            self._write_topology(self._serialize_topology())
+            return
+
+        self._dump_pending = True
+        if self._dump_handle is None or self._dump_loop is not loop:
+            self._dump_loop = loop
+            self._dump_handle = loop.call_later(self._save_delay(), self._delayed_dump)
+
+    def _cancel_pending_dump(self):
+        """
+        Forget the changes waiting to be written to disk
+        """
+
+        if self._dump_handle is not None:
+            self._dump_handle.cancel()
+            self._dump_handle = None
+        self._dump_pending = False
+
+    def _delayed_dump(self):
+
+        self._dump_handle = None
+        asyncio.ensure_future(self._background_flush())
+
+    async def _background_flush(self):
+
+        try:
+            await self.flush()
+        except aiohttp.web.HTTPError as e:
+            log.error("Could not save project {}: {}".format(self._name, e.text))
+
+    async def flush(self):
+        """
+        Write pending topology changes to disk
+        """
+
+        if self._dump_handle is not None:
+            self._dump_handle.cancel()
+            self._dump_handle = None
+        await self._write_pending_topology()
+
+    @locking
+    async def _write_pending_topology(self):
+
+        if not self._dump_pending:
+            return
+        self._dump_pending = False
+        try:
+            # the topology is encoded on the event loop to get a consistent state,
+            # the formatting and the disk I/O are done in a thread
+            data = self._serialize_topology()
+            await wait_run_in_executor(self._write_topology, data)
+        except Exception:
+            # keep the changes so they are written by the next flush
+            self._dump_pending = True
+            raise
+
+    def _serialize_topology(self):
+        """
+        Encode the topology in compact JSON, unlike an indented
+        output this is done by the C encoder.
+        """
+
+        return json.dumps(project_to_topology(self), separators=(",", ":"))
+
+    def _write_topology(self, data):
+        """
+        Write the serialized topology to the .gns3 file
+
+        :param data: Topology serialized in compact JSON by _serialize_topology()
+        """
+
         try:
-            topo = project_to_topology(self)
             path = self._topology_file()
             log.debug("Write %s", path)
             with open(path + ".tmp", "w+", encoding="utf-8") as f:
-                json.dump(topo, f, indent=4, sort_keys=True)
+                json.dump(json.loads(data), f, indent=4, sort_keys=True)
             shutil.move(path + ".tmp", path)
         except OSError as e:
             raise aiohttp.web.HTTPInternalServerError(text="Could not write topology: {}".format(e))
@@ -1068,30 +1331,172 @@ class Project:
         """
         Start all nodes
         """
-        pool = Pool(concurrency=3)
-        for node in self.nodes.values():
-            pool.append(node.start)
-        await pool.join()
+        await self._nodes_action("start")
 
     @open_required
     async def stop_all(self):
         """
         Stop all nodes
         """
-        pool = Pool(concurrency=3)
-        for node in self.nodes.values():
-            pool.append(node.stop)
-        await pool.join()
+        await self._nodes_action("stop")
 
     @open_required
     async def suspend_all(self):
         """
         Suspend all nodes
         """
-        pool = Pool(concurrency=3)
+        await self._nodes_action("suspend")
+
+    async def _nodes_action(self, action):
+        """
+        Run an action on all the nodes, the nodes of a compute
+        are sent in a single request.
+
+        :param action: start, stop or suspend
+        """
+
+        compute_nodes = {}
         for node in self.nodes.values():
-            pool.append(node.suspend)
-        await pool.join()
+            compute_nodes.setdefault(node.compute, []).append(node)
+        results = await asyncio.gather(*[self._compute_nodes_action(compute, nodes, action) for compute, nodes in compute_nodes.items()],
+                                       return_exceptions=True)
+        exceptions = [result for result in results if isinstance(result, Exception)]
+        if len(exceptions) == 1:
+            raise exceptions[0]
+        elif len(exceptions) > 1:
+            raise aiohttp.web.HTTPConflict(text="\n".join(str(e) for e in exceptions))
+
+    @staticmethod
+    def _node_action_priority(node, action):
+        """
+        The switches, hubs, clouds and NAT are started first
+        so they are ready when the other nodes start.
+
+        :param node: Node instance
+        :param action: start, stop or suspend
+        """
+
+        if action == "start" and node.node_type in ("cloud", "nat", "ethernet_hub", "ethernet_switch", "frame_relay_switch", "atm_switch"):
+            return 1
+        return 0
+
+    async def _compute_nodes_action(self, compute, nodes, action):
+        """
+        Run an action on nodes running on the same compute
+
+        :param compute: Compute instance
+        :param nodes: List of nodes
+        :param action: start, stop or suspend
+        """
+
+        data = {"nodes": []}
+        for node in nodes:
+            node_action = {"node_id": node.id}
+            priority = self._node_action_priority(node, action)
+            if priority:
+                node_action["priority"] = priority
+            if action == "start":
+                node_data = node.start_data()
+                if node_data:
+                    node_action["data"] = node_data
+            data["nodes"].append(node_action)
+
+        try:
+            # we don't care if a node is down when stopping
+            # the result of each node is received as soon as its action is finished,
+            # the compute must send a result at least every NODE_ACTION_TIMEOUT seconds
+            response = await compute.post("/projects/{}/nodes/{}".format(self._id, action), data=data, timeout=NODE_ACTION_TIMEOUT, stream=True, dont_connect=action == "stop")
+        except aiohttp.web.HTTPNotFound:
+            # the compute doesn't support actions on multiple nodes
+            log.info("Compute {} doesn't support actions on multiple nodes".format(compute.id))
+            # the concurrency is reduced when the compute is busy
+            pool = Pool(concurrency=5, load=lambda: compute.cpu_usage_percent, timeout=NODE_ACTION_TIMEOUT)
+            for node in nodes:
+                pool.add_task(getattr(node, action), priority=self._node_action_priority(node, action))
+            try:
+                await pool.join()
+            except PoolError as e:
+                raise aiohttp.web.HTTPConflict(text=str(e))
+            return
+        except (ComputeError, aiohttp.ClientError, aiohttp.web.HTTPError):
+            if action == "stop":
+                return
+            raise
+        if action == "stop":
+            # we don't care if a node is down at this step, the status
+            # of the stopped nodes is received from the notifications
+            response.close()
+            return
+
+        nodes = {node.id: node for node in nodes}
+        errors = []
+        try:
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                result = json.loads(line.decode("utf-8"))
+                node = nodes.pop(result["node_id"], None)
+                if node is None:
+                    continue
+                if result["status"] < 300:
+                    await node.parse_node_response(result["node"])
+                else:
+                    errors.append("Cannot {} node {}: {}".format(action, node.name, result.get("message")))
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            errors.append("Compute {} has not sent the result of {} nodes in {} seconds: {}".format(compute.name, len(nodes), NODE_ACTION_TIMEOUT, e))
+            nodes = {}
+        finally:
+            response.release()
+        for node in nodes.values():
+            errors.append("Cannot {} node {}: no result received from compute {}".format(action, node.name, compute.name))
+        if errors:
+            raise aiohttp.web.HTTPConflict(text="\n".join(errors))
+
+    @open_required
+    async def console_history(self, node_ids=None, **query):
+        """
+        Get or search the console output of nodes, the nodes
+        of a compute are sent in a single request.
+
+        :param node_ids: Nodes UUID, all the nodes when None
+        :param query: size, search and limit sent to the computes
+        :returns: Results of the nodes
+        """
+
+        if node_ids is None:
+            nodes = list(self.nodes.values())
+        else:
+            nodes = [self.get_node(node_id) for node_id in node_ids]
+        compute_nodes = {}
+        for node in nodes:
+            compute_nodes.setdefault(node.compute, []).append(node)
+        results = {}
+        for compute_results in await asyncio.gather(*[self._compute_console_history(compute, nodes, query) for compute, nodes in compute_nodes.items()]):
+            for result in compute_results:
+                results[result["node_id"]] = result
+        return [results[node.id] for node in nodes]
+
+    async def _compute_console_history(self, compute, nodes, query):
+        """
+        Get the console output of nodes running on the same compute
+
+        :param compute: Compute instance
+        :param nodes: List of nodes
+        :param query: size, search and limit
+        """
+
+        data = dict(query, node_ids=[node.id for node in nodes])
+        try:
+            response = await compute.post("/projects/{}/console_history".format(self._id), data=data, timeout=CONSOLE_HISTORY_TIMEOUT)
+            return response.json["nodes"]
+        except aiohttp.web.HTTPError as e:
+            message = e.text
+        except (ComputeError, aiohttp.ClientError) as e:
+            # also raised when the compute doesn't answer before the timeout
+            message = str(e)
+        # a compute down doesn't prevent to get the output of the others
+        message = "Cannot get the console output from compute {}: {}".format(compute.name, message)
+        return [{"node_id": node.id, "status": 409, "message": message} for node in nodes]
 
     @open_required
     async def duplicate_node(self, node, x, y, z):
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+import aiohttp
+
+from ..version import __version__
+from .topology import load_topology_header
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class ProjectCatalog:
+    """
+    Index of the project properties (name, ID, auto open...) read from
+    the topology files when the controller starts.
+
+    The index is saved to disk, a topology file is read again only
+    when its modification time or its size has changed.
+
+    :param path: Path of the index file
+    """
+
+    def __init__(self, path):
+
+        self._path = path
+        # path of the topology => {"mtime": ..., "size": ..., "header": ... or "error": ...}
+        self._entries = None
+        self._changed = False
+
+    @property
+    def path(self):
+
+        return self._path
+
+    def _load(self):
+
+        self._entries = {}
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning("Could not read the projects index {}: {}".format(self._path, e))
+            return
+        # another version may convert or check the topologies differently
+        if isinstance(data, dict) and data.get("version") == __version__:
+            self._entries = data.get("projects", {})
+
+    def header(self, path):
+        """
+        Returns the properties of a project.
+
+        :param path: Path of the topology file
+
+        :returns: Dictionary (see load_topology_header)
+        """
+
+        if self._entries is None:
+            self._load()
+
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            raise aiohttp.web.HTTPConflict(text="Could not load topology {}: {}".format(path, str(e)))
+        entry = self._entries.get(path)
+        if entry is None or entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            try:
+                entry = {"header": load_topology_header(path)}
+            except aiohttp.web.HTTPConflict as e:
+                entry = {"error": e.text}
+            # the topology may have been converted
+            try:
+                stat = os.stat(path)
+            except OSError:
+                pass
+            entry["mtime"] = stat.st_mtime_ns
+            entry["size"] = stat.st_size
+            self._entries[path] = entry
+            self._changed = True
+
+        if "error" in entry:
+            raise aiohttp.web.HTTPConflict(text=entry["error"])
+        return dict(entry["header"])
+
+    def prune(self, paths):
+        """
+        Forgets the topology files which are not in paths.
+
+        :param paths: Paths of the existing topology files
+        """
+
+        if self._entries is None:
+            self._load()
+        paths = set(paths)
+        for path in list(self._entries):
+            if path not in paths:
+                del self._entries[path]
+                self._changed = True
+
+    def save(self):
+        """
+        Writes the index if it has changed.
+        """
+
+        if not self._changed:
+            return
+        tmp_path = self._path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            with open(tmp_path, "w+", encoding="utf-8") as f:
+                json.dump({"version": __version__, "projects": self._entries}, f)
+            os.replace(tmp_path, self._path)
+            self._changed = False
+        except OSError as e:
+            log.warning("Could not write the projects index {}: {}".format(self._path, e))
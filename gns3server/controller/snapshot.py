@@ -17,19 +17,20 @@
 
 
 import os
+import json
 import uuid
 import shutil
+import asyncio
 import tempfile
 import aiofiles
-import zipfile
 import time
 import aiohttp.web
 from datetime import datetime, timezone
 
 from ..utils.asyncio import wait_run_in_executor
-from ..utils.asyncio import aiozipstream
-from .export_project import export_project
-from .import_project import import_project
+from .export_project import _is_exportable
+from .import_project import import_project, _upload_file
+from .snapshot_store import MANIFEST_EXTENSION, CHUNK_SIZE, project_file_path
 
 import logging
 log = logging.getLogger(__name__)
@@ -42,6 +43,10 @@ FILENAME_TIME_FORMAT = "%d%m%y_%H%M%S"
 class Snapshot:
     """
     A snapshot object
+
+    The snapshots are stored in the snapshot store of the project (see
+    snapshot_store.py), the snapshots created by previous versions are
+    zip files (.gns3project) which can still be restored.
     """
 
     def __init__(self, project, name=None, filename=None):
@@ -53,7 +58,7 @@ class Snapshot:
         if name:
             self._name = name
             self._created_at = datetime.now().timestamp()
-            filename = self._name + "_" + datetime.utcfromtimestamp(self._created_at).replace(tzinfo=None).strftime(FILENAME_TIME_FORMAT) + ".gns3project"
+            filename = self._name + "_" + datetime.utcfromtimestamp(self._created_at).replace(tzinfo=None).strftime(FILENAME_TIME_FORMAT) + MANIFEST_EXTENSION
         else:
             self._name = filename.split("_")[0]
             datestring = filename.replace(self._name + "_", "").split(".")[0]
@@ -79,9 +84,17 @@ class Snapshot:
     def created_at(self):
         return int(self._created_at)
 
+    def _is_zip(self):
+        """
+        Snapshot created by a previous version
+        """
+
+        return self._path.endswith(".gns3project")
+
     async def create(self):
         """
-        Create the snapshot
+        Create the snapshot, only the chunks of files which are not
+        already in the snapshot store are written.
         """
 
         if os.path.exists(self.path):
@@ -93,41 +106,224 @@ class Snapshot:
         except OSError as e:
             raise aiohttp.web.HTTPInternalServerError(text="Could not create the snapshot directory '{}': {}".format(snapshot_directory, e))
 
+        # To avoid issue with data not saved we disallow the snapshot of a running project
+        if self._project.is_running():
+            raise aiohttp.web.HTTPConflict(text="Project must be stopped in order to create a snapshot")
+        await self._project.flush()
+
+        store = self._project.snapshot_store
         try:
             begin = time.time()
-            with tempfile.TemporaryDirectory() as tmpdir:
-                # Do not compress the snapshots
-                with aiozipstream.ZipFile(compression=zipfile.ZIP_STORED) as zstream:
-                    await export_project(zstream, self._project, tmpdir, keep_compute_id=True, allow_all_nodes=True)
-                    async with aiofiles.open(self.path, 'wb') as f:
-                        async for chunk in zstream:
-                            await f.write(chunk)
-            log.info("Snapshot '{}' created in {:.4f} seconds".format(self.name, time.time() - begin))
+            async with store.lock:
+                store.bytes_written = 0
+                topology = self._read_topology()
+                previous = await wait_run_in_executor(store.latest_files)
+                files = await wait_run_in_executor(self._add_local_files, store, previous)
+                for compute in self._project.computes:
+                    if compute.id != "local":
+                        files.update(await self._add_compute_files(store, compute))
+                await wait_run_in_executor(store.write_manifest, self.path, {"topology": topology, "files": files})
+            log.info("Snapshot '{}' created in {:.4f} seconds, {} files, {} bytes written".format(self.name, time.time() - begin, len(files), store.bytes_written))
         except (ValueError, OSError, RuntimeError) as e:
             raise aiohttp.web.HTTPConflict(text="Could not create snapshot file '{}': {}".format(self.path, e))
 
+    def _read_topology(self):
+
+        path = self._project._topology_file()
+        try:
+            with open(path, encoding="utf-8") as f:
+                topology = json.load(f)
+        except (OSError, ValueError) as e:
+            raise aiohttp.web.HTTPConflict(text="Project file '{}' cannot be read: {}".format(path, e))
+        for node in topology.get("topology", {}).get("nodes", []):
+            if node["node_type"] == "virtualbox" and node.get("properties", {}).get("linked_clone"):
+                raise aiohttp.web.HTTPConflict(text="Projects with a linked {} clone node cannot be snapshotted. Please use Qemu instead.".format(node["node_type"]))
+        return topology
+
+    def _add_local_files(self, store, previous):
+        """
+        Stores the files of the project like an export does
+        (the snapshots, captures and logs are ignored).
+
+        :returns: Dictionary relative path => entry
+        """
+
+        files = {}
+        project_path = self._project.path
+        for root, dirs, filenames in os.walk(project_path, topdown=True, followlinks=False):
+            dirs[:] = [d for d in dirs if _is_exportable(os.path.join(root, d))]
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                if filename.endswith(".gns3") or not _is_exportable(path):
+                    continue
+                relpath = os.path.relpath(path, project_path).replace(os.path.sep, "/")
+                try:
+                    files[relpath] = store.add_file(path, previous.get(relpath))
+                except PermissionError as e:
+                    log.warning("Could not add file {} to the snapshot: {}".format(path, e))
+        return files
+
+    async def _add_compute_files(self, store, compute):
+        """
+        Stores the files of the project on a remote compute.
+
+        :returns: Dictionary relative path => entry
+        """
+
+        files = {}
+        for compute_file in await compute.list_files(self._project):
+            if not _is_exportable(compute_file["path"]):
+                continue
+            log.debug("Downloading file '{}' from compute '{}'".format(compute_file["path"], compute.id))
+            response = await compute.download_file(self._project, compute_file["path"])
+            chunks = []
+            size = 0
+            buffer = bytearray()
+            try:
+                while True:
+                    try:
+                        data = await response.content.read(CHUNK_SIZE)
+                    except asyncio.TimeoutError:
+                        raise aiohttp.web.HTTPRequestTimeout(text="Timeout when downloading file '{}' from remote compute {}:{}".format(compute_file["path"], compute.host, compute.port))
+                    buffer.extend(data)
+                    while len(buffer) >= CHUNK_SIZE or (not data and buffer):
+                        chunk = bytes(buffer[:CHUNK_SIZE])
+                        del buffer[:CHUNK_SIZE]
+                        chunks.append(await wait_run_in_executor(store.write_object, chunk))
+                        size += len(chunk)
+                    if not data:
+                        break
+            finally:
+                response.close()
+            files[compute_file["path"]] = {"size": size,
+                                           "mtime": int(time.time() * 1e9),
+                                           "mode": 0o644,
+                                           "chunks": chunks,
+                                           "compute_id": compute.id}
+        return files
+
     async def restore(self):
         """
         Restore the snapshot
         """
 
+        manifest = None
+        if not self._is_zip():
+            # an invalid manifest is refused before closing the project
+            try:
+                manifest = await wait_run_in_executor(self._project.snapshot_store.read_manifest, self._path)
+            except (OSError, ValueError) as e:
+                raise aiohttp.web.HTTPConflict(text="Cannot restore snapshot '{}': {}".format(self.name, e))
+
         await self._project.delete_on_computes()
         # We don't send close notification to clients because the close / open dance is purely internal
         await self._project.close(ignore_notification=True)
 
         try:
-            # delete the current project files
-            project_files_path = os.path.join(self._project.path, "project-files")
-            if os.path.exists(project_files_path):
-                await wait_run_in_executor(shutil.rmtree, project_files_path)
-            with open(self._path, "rb") as f:
-                project = await import_project(self._project.controller, self._project.id, f, location=self._project.path)
-        except (OSError, PermissionError) as e:
+            if self._is_zip():
+                # delete the current project files
+                project_files_path = os.path.join(self._project.path, "project-files")
+                if os.path.exists(project_files_path):
+                    await wait_run_in_executor(shutil.rmtree, project_files_path)
+                with open(self._path, "rb") as f:
+                    await import_project(self._project.controller, self._project.id, f, location=self._project.path)
+            else:
+                store = self._project.snapshot_store
+                async with store.lock:
+                    await self._restore_manifest(store, manifest)
+        except (OSError, PermissionError, ValueError) as e:
             raise aiohttp.web.HTTPConflict(text=str(e))
-        await project.open()
+        await self._project.open()
         self._project.emit_notification("snapshot.restored", self.__json__())
         return self._project
 
+    async def _restore_manifest(self, store, manifest):
+
+        begin = time.time()
+        chunk_size = manifest.get("chunk_size", CHUNK_SIZE)
+        local_files = {}
+        compute_files = {}
+        for relpath, entry in manifest["files"].items():
+            if entry.get("compute_id", "local") == "local":
+                local_files[relpath] = entry
+            else:
+                compute_files.setdefault(entry["compute_id"], {})[relpath] = entry
+
+        modified = await wait_run_in_executor(self._restore_local_files, store, local_files, chunk_size)
+        for compute_id, files in compute_files.items():
+            await self._restore_compute_files(store, compute_id, files)
+
+        topology = manifest["topology"]
+        topology["project_id"] = self._project.id
+        # To avoid unexpected behavior (project start without manual operations just after the restore)
+        topology["auto_start"] = False
+        topology["auto_open"] = False
+        topology["auto_close"] = True
+        with open(self._project._topology_file(), "w+", encoding="utf-8") as f:
+            json.dump(topology, f, indent=4)
+        log.info("Snapshot '{}' restored in {:.4f} seconds, {} files modified".format(self.name, time.time() - begin, modified))
+
+    def _restore_local_files(self, store, files, chunk_size):
+        """
+        Rewrites the files which are different from the snapshot and
+        deletes the node files which are not in the snapshot.
+
+        :returns: Number of modified files
+        """
+
+        project_path = self._project.path
+        project_files_path = os.path.join(project_path, "project-files")
+        if os.path.isdir(project_files_path):
+            for root, dirs, filenames in os.walk(project_files_path, topdown=False):
+                for filename in filenames:
+                    path = os.path.join(root, filename)
+                    if os.path.relpath(path, project_path).replace(os.path.sep, "/") not in files:
+                        os.remove(path)
+                for directory in dirs:
+                    path = os.path.join(root, directory)
+                    if os.path.islink(path):
+                        os.remove(path)
+                    elif not os.listdir(path):
+                        os.rmdir(path)
+
+        modified = 0
+        for relpath, entry in files.items():
+            if store.restore_file(project_file_path(project_path, relpath), entry, chunk_size):
+                modified += 1
+        return modified
+
+    async def _restore_compute_files(self, store, compute_id, files):
+        """
+        Uploads the files of the nodes running on a remote compute.
+        """
+
+        compute = self._project.controller.get_compute(compute_id)
+        await compute.post("/projects", data={"name": self._project.name, "project_id": self._project.id})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for relpath, entry in files.items():
+                path = os.path.join(tmpdir, "file")
+                async with aiofiles.open(path, "wb") as f:
+                    for digest in entry["chunks"]:
+                        await f.write(await wait_run_in_executor(store.read_object, digest))
+                await _upload_file(compute, self._project.id, path, relpath)
+
+    async def delete(self):
+        """
+        Delete the snapshot and the objects no longer used by another snapshot
+        """
+
+        if self._is_zip():
+            os.remove(self._path)
+            return
+        store = self._project.snapshot_store
+        async with store.lock:
+            os.remove(self._path)
+            try:
+                deleted = await wait_run_in_executor(store.collect_garbage)
+                log.info("Snapshot '{}' deleted, {} objects released".format(self.name, deleted))
+            except (OSError, ValueError, KeyError) as e:
+                log.warning("Could not release the objects of snapshot '{}': {}".format(self.name, e))
+
     def __json__(self):
         return {
             "snapshot_id": self._id,
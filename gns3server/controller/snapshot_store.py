@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Content addressed storage of the project snapshots.
+
+A snapshot is a manifest (JSON file) with the topology and the list of the
+project files. The content of the files is split in chunks stored once in
+the objects directory and named after their SHA-256 hash: the files which
+have not changed between two snapshots and the unmodified parts of the
+disks are shared by the snapshots.
+
+    snapshots/<name>_<date>.gns3snapshot
+    snapshots/objects/<first 2 characters of the hash>/<hash>
+"""
+
+import os
+import re
+import json
+import stat
+import asyncio
+import hashlib
+import tempfile
+
+import logging
+log = logging.getLogger(__name__)
+
+
+MANIFEST_VERSION = 1
+MANIFEST_EXTENSION = ".gns3snapshot"
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def check_manifest(manifest):
+    """
+    Checks the paths and the chunks of the files of a manifest, a manifest
+    can come from an imported project and must not write outside of it.
+
+    :raises ValueError: if the manifest is invalid
+    """
+
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("files"), dict):
+        raise ValueError("the snapshot manifest has no files")
+    for relpath, entry in manifest["files"].items():
+        parts = relpath.split("/")
+        if "\\" in relpath or ":" in relpath or relpath.startswith("/") or any(part in ("", ".", "..") for part in parts):
+            raise ValueError("invalid file path '{}' in the snapshot manifest".format(relpath))
+        if not isinstance(entry, dict) or not isinstance(entry.get("chunks"), list):
+            raise ValueError("invalid entry for '{}' in the snapshot manifest".format(relpath))
+        for digest in entry["chunks"]:
+            if not isinstance(digest, str) or not _DIGEST_RE.match(digest):
+                raise ValueError("invalid chunk for '{}' in the snapshot manifest".format(relpath))
+
+
+def project_file_path(project_path, relpath):
+    """
+    :param project_path: Path of the project
+    :param relpath: Path of a file of a manifest
+
+    :returns: Path of the file in the project
+
+    :raises ValueError: if the file is outside of the project
+    """
+
+    path = os.path.join(project_path, *relpath.split("/"))
+    root = os.path.realpath(project_path)
+    if os.path.commonpath([root, os.path.realpath(path)]) != root:
+        raise ValueError("the file '{}' of the snapshot is outside of the project".format(relpath))
+    return path
+
+
+class SnapshotStore:
+    """
+    Objects and manifests of the snapshots of a project.
+
+    The methods reading or writing files are blocking, they are meant
+    to be run in an executor while holding the lock of the store.
+
+    :param path: Path of the snapshots directory
+    """
+
+    def __init__(self, path):
+
+        self._path = path
+        self._objects_path = os.path.join(path, "objects")
+        self._lock = asyncio.Lock()
+        self.bytes_written = 0
+
+    @property
+    def path(self):
+
+        return self._path
+
+    @property
+    def lock(self):
+        """
+        Lock held while a snapshot is created, restored or deleted
+        """
+
+        return self._lock
+
+    def _object_path(self, digest):
+
+        if not _DIGEST_RE.match(digest):
+            raise ValueError("invalid snapshot object '{}'".format(digest))
+        return os.path.join(self._objects_path, digest[:2], digest)
+
+    def _write_atomic(self, path, data):
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp")
+        try:
+            with open(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def write_object(self, data):
+        """
+        Stores a chunk of data if it's not already stored.
+
+        :param data: Chunk of data (bytes)
+
+        :returns: SHA-256 of the data
+        """
+
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            self._write_atomic(path, data)
+            self.bytes_written += len(data)
+        return digest
+
+    def read_object(self, digest):
+        """
+        :returns: Chunk of data (bytes)
+        """
+
+        with open(self._object_path(digest), "rb") as f:
+            return f.read()
+
+    def add_file(self, path, previous=None):
+        """
+        Stores the content of a file.
+
+        :param path: Path of the file
+        :param previous: Entry of the file in the previous snapshot, the file is
+        not read again if its size and modification time have not changed
+
+        :returns: Entry of the file for the manifest
+        """
+
+        st = os.stat(path)
+        if previous and previous["size"] == st.st_size and previous["mtime"] == st.st_mtime_ns:
+            if all(os.path.exists(self._object_path(digest)) for digest in previous["chunks"]):
+                return dict(previous)
+
+        chunks = []
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                chunks.append(self.write_object(data))
+        return {"size": st.st_size,
+                "mtime": st.st_mtime_ns,
+                "mode": stat.S_IMODE(st.st_mode),
+                "chunks": chunks}
+
+    def restore_file(self, path, entry, chunk_size=CHUNK_SIZE):
+        """
+        Restores a file, only the chunks which are different are written.
+
+        :param path: Path of the file
+        :param entry: Entry of the file in the manifest
+        :param chunk_size: Size of the chunks of the manifest
+
+        :returns: True if the file has been modified
+        """
+
+        try:
+            st = os.stat(path)
+            if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime"]:
+                return False
+        except FileNotFoundError:
+            st = None
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if st is not None and (st.st_nlink > 1 or not st.st_mode & stat.S_IWUSR or not os.access(path, os.W_OK)):
+            # the file is shared with another project (hard link) or read-only,
+            # it is replaced by a new file instead of being modified
+            modified = self._replace_file(path, entry, chunk_size)
+        else:
+            modified = self._rewrite_file(path, entry, chunk_size, exists=st is not None)
+        os.chmod(path, entry["mode"])
+        os.utime(path, ns=(entry["mtime"], entry["mtime"]))
+        return modified
+
+    def _rewrite_file(self, path, entry, chunk_size, exists):
+        """
+        Writes the chunks which are different in the file.
+        """
+
+        modified = False
+        with open(path, "r+b" if exists else "wb") as f:
+            offset = 0
+            for digest in entry["chunks"]:
+                f.seek(offset)
+                current = f.read(chunk_size) if exists else b""
+                if hashlib.sha256(current).hexdigest() == digest:
+                    offset += len(current)
+                    continue
+                data = self.read_object(digest)
+                f.seek(offset)
+                f.write(data)
+                offset += len(data)
+                modified = True
+            if os.fstat(f.fileno()).st_size != offset:
+                f.truncate(offset)
+                modified = True
+        return modified
+
+    def _replace_file(self, path, entry, chunk_size):
+        """
+        Writes the file to a temporary file replacing it, the chunks
+        which have not changed are copied from the current file.
+        """
+
+        modified = False
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp")
+        try:
+            with open(fd, "wb") as f, open(path, "rb") as current_file:
+                for digest in entry["chunks"]:
+                    data = current_file.read(chunk_size)
+                    if hashlib.sha256(data).hexdigest() != digest:
+                        data = self.read_object(digest)
+                        current_file.seek(f.tell() + len(data))
+                        modified = True
+                    f.write(data)
+                if current_file.read(1):
+                    modified = True
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return modified
+
+    def write_manifest(self, path, manifest):
+
+        manifest = dict(manifest, version=MANIFEST_VERSION, chunk_size=CHUNK_SIZE)
+        self._write_atomic(path, json.dumps(manifest).encode())
+
+    def read_manifest(self, path):
+        """
+        :returns: Manifest of a snapshot
+
+        :raises ValueError: if the manifest is invalid or from a more recent version
+        """
+
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if not isinstance(manifest, dict) or manifest.get("version", 0) > MANIFEST_VERSION:
+            raise ValueError("unsupported snapshot manifest {}".format(path))
+        check_manifest(manifest)
+        return manifest
+
+    def manifests(self):
+        """
+        :returns: Paths of the manifests sorted by modification time
+        """
+
+        try:
+            paths = [os.path.join(self._path, f) for f in os.listdir(self._path) if f.endswith(MANIFEST_EXTENSION)]
+        except FileNotFoundError:
+            return []
+        return sorted(paths, key=lambda p: os.stat(p).st_mtime_ns)
+
+    def latest_files(self):
+        """
+        :returns: Files of the most recent snapshot (used to skip the unchanged files)
+        """
+
+        for path in reversed(self.manifests()):
+            try:
+                return self.read_manifest(path)["files"]
+            except (OSError, ValueError, KeyError) as e:
+                log.warning("Could not read snapshot manifest {}: {}".format(path, e))
+        return {}
+
+    def collect_garbage(self):
+        """
+        Deletes the objects which are not used by any snapshot anymore.
+
+        :returns: Number of deleted objects
+        """
+
+        referenced = set()
+        for path in self.manifests():
+            # never delete objects if a manifest cannot be read
+            for entry in self.read_manifest(path)["files"].values():
+                referenced.update(entry["chunks"])
+
+        deleted = 0
+        if not os.path.isdir(self._objects_path):
+            return deleted
+        for directory in os.listdir(self._objects_path):
+            directory = os.path.join(self._objects_path, directory)
+            for digest in os.listdir(directory):
+                if digest not in referenced:
+                    os.remove(os.path.join(directory, digest))
+                    deleted += 1
+            if not os.listdir(directory):
+                os.rmdir(directory)
+        return deleted
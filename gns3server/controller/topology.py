@@ -31,6 +31,7 @@ from ..version import __version__
 from ..schemas.topology import TOPOLOGY_SCHEMA
 from ..schemas import dynamips_vm
 from ..utils.qt import qt_font_to_style
+from ..utils import json_schema
 from ..compute.dynamips import PLATFORMS_DEFAULT_RAM
 
 import logging
@@ -39,25 +40,46 @@ log = logging.getLogger(__name__)
 
 GNS3_FILE_FORMAT_REVISION = 9
 
+# node type => schema of the node properties in a topology
+_topology_node_schemas = {}
+
+# schema of the project properties in a topology (without the nodes, links...)
+_topology_header_schema = None
+
+
+def _topology_node_schema(node_type):
+    """
+    Returns the schema of the properties of a node in a topology, the
+    schemas are built once.
+
+    :param node_type: Node type
+    :returns: JSON schema or None if the properties are not checked
+    """
+
+    if node_type not in _topology_node_schemas:
+        schema = None
+        if node_type == "dynamips":
+            schema = copy.deepcopy(dynamips_vm.VM_CREATE_SCHEMA)
+
+        if schema:
+            # Properties send to compute but in an other place in topology
+            delete_properties = ["name", "node_id"]
+            for prop in delete_properties:
+                del schema["properties"][prop]
+            schema["required"] = [p for p in schema["required"] if p not in delete_properties]
+        _topology_node_schemas[node_type] = schema
+    return _topology_node_schemas[node_type]
+
 
 def _check_topology_schema(topo):
     try:
-        jsonschema.validate(topo, TOPOLOGY_SCHEMA)
+        json_schema.validate(topo, TOPOLOGY_SCHEMA)
 
         # Check the nodes property against compute schemas
         for node in topo["topology"].get("nodes", []):
-            schema = None
-            if node["node_type"] == "dynamips":
-                schema = copy.deepcopy(dynamips_vm.VM_CREATE_SCHEMA)
-
+            schema = _topology_node_schema(node["node_type"])
             if schema:
-                # Properties send to compute but in an other place in topology
-                delete_properties = ["name", "node_id"]
-                for prop in delete_properties:
-                    del schema["properties"][prop]
-                schema["required"] = [p for p in schema["required"] if p not in delete_properties]
-
-                jsonschema.validate(node.get("properties", {}), schema)
+                json_schema.validate(node.get("properties", {}), schema)
 
     except jsonschema.ValidationError as e:
         error = "Invalid data in topology file: {} in schema: {}".format(
@@ -67,6 +89,24 @@ def _check_topology_schema(topo):
         raise aiohttp.web.HTTPConflict(text=error)
 
 
+def _check_topology_header_schema(header):
+
+    global _topology_header_schema
+    if _topology_header_schema is None:
+        schema = copy.deepcopy(TOPOLOGY_SCHEMA)
+        del schema["properties"]["topology"]
+        schema["required"] = [p for p in schema["required"] if p != "topology"]
+        _topology_header_schema = schema
+    try:
+        json_schema.validate(header, _topology_header_schema)
+    except jsonschema.ValidationError as e:
+        error = "Invalid data in topology file: {} in schema: {}".format(
+            e.message,
+            json.dumps(e.schema))
+        log.error(error)
+        raise aiohttp.web.HTTPConflict(text=error)
+
+
 def project_to_topology(project):
     """
     :return: A dictionnary with the topology ready to dump to a .gns3
@@ -191,6 +231,35 @@ def load_topology(path):
     return topo
 
 
+def load_topology_header(path):
+    """
+    Open a topology file and return the properties of the project without
+    the topology (nodes, links...). The nodes are not checked, this is done
+    by load_topology() when the project is opened.
+
+    Topologies from a previous release are converted by load_topology().
+    """
+
+    log.debug("Read topology header %s", path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            topo = json.load(f)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        raise aiohttp.web.HTTPConflict(text="Could not load topology {}: {}".format(path, str(e)))
+
+    if topo.get("revision", 0) != GNS3_FILE_FORMAT_REVISION:
+        topo = load_topology(path)
+    header = {key: value for key, value in topo.items() if key != "topology"}
+
+    # make sure we can open a project with empty variable name
+    variables = header.get("variables")
+    if variables:
+        header["variables"] = [var for var in variables if var.get("name")]
+
+    _check_topology_header_schema(header)
+    return header
+
+
 def _convert_2_1_0(topo, topo_path):
     """
     Convert topologies from GNS3 2.1.x to 2.2
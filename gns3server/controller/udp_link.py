@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-
+import asyncio
 import aiohttp
 
 
@@ -55,10 +55,10 @@ class UDPLink(Link):
             raise aiohttp.web.HTTPConflict(text="Cannot get an IP address on same subnet: {}".format(e))
 
         # Reserve a UDP port on both side
-        response = await node1.compute.post("/projects/{}/ports/udp".format(self._project.id))
-        self._node1_port = response.json["udp_port"]
-        response = await node2.compute.post("/projects/{}/ports/udp".format(self._project.id))
-        self._node2_port = response.json["udp_port"]
+        response1, response2 = await asyncio.gather(node1.compute.post("/projects/{}/ports/udp".format(self._project.id)),
+                                                    node2.compute.post("/projects/{}/ports/udp".format(self._project.id)))
+        self._node1_port = response1.json["udp_port"]
+        self._node2_port = response2.json["udp_port"]
 
         node1_filters = {}
         node2_filters = {}
@@ -77,8 +77,6 @@ class UDPLink(Link):
             "filters": node1_filters,
             "suspend": self._suspended
         })
-        await node1.post("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number1, port_number=port_number1), data=self._link_data[0], timeout=120)
-
         self._link_data.append({
             "lport": self._node2_port,
             "rhost": node1_host,
@@ -87,12 +85,17 @@ class UDPLink(Link):
             "filters": node2_filters,
             "suspend": self._suspended
         })
-        try:
-            await node2.post("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number2, port_number=port_number2), data=self._link_data[1], timeout=120)
-        except Exception as e:
-            # We clean the first NIO
-            await node1.delete("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number1, port_number=port_number1), timeout=120)
-            raise e
+        results = await asyncio.gather(node1.post("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number1, port_number=port_number1), data=self._link_data[0], timeout=120),
+                                       node2.post("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number2, port_number=port_number2), data=self._link_data[1], timeout=120),
+                                       return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            # We clean the NIO created on the other side
+            if not isinstance(results[0], Exception):
+                await node1.delete("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number1, port_number=port_number1), timeout=120)
+            if not isinstance(results[1], Exception):
+                await node2.delete("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number2, port_number=port_number2), timeout=120)
+            raise errors[0]
         self._created = True
 
     async def update(self):
@@ -113,19 +116,22 @@ class UDPLink(Link):
         elif filter_node == node2:
             node2_filters = self.get_active_filters()
 
+        # Both sides are updated at the same time
+        coros = []
         adapter_number1 = self._nodes[0]["adapter_number"]
         port_number1 = self._nodes[0]["port_number"]
         self._link_data[0]["filters"] = node1_filters
         self._link_data[0]["suspend"] = self._suspended
         if node1.node_type not in ("ethernet_switch", "ethernet_hub"):
-            await node1.put("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number1, port_number=port_number1), data=self._link_data[0], timeout=120)
+            coros.append(node1.put("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number1, port_number=port_number1), data=self._link_data[0], timeout=120))
 
         adapter_number2 = self._nodes[1]["adapter_number"]
         port_number2 = self._nodes[1]["port_number"]
         self._link_data[1]["filters"] = node2_filters
         self._link_data[1]["suspend"] = self._suspended
         if node2.node_type not in ("ethernet_switch", "ethernet_hub"):
-            await node2.put("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number2, port_number=port_number2), data=self._link_data[1], timeout=221)
+            coros.append(node2.put("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number2, port_number=port_number2), data=self._link_data[1], timeout=221))
+        await asyncio.gather(*coros)
 
     async def delete(self):
         """
@@ -133,30 +139,25 @@ class UDPLink(Link):
         """
         if not self._created:
             return
-        try:
-            node1 = self._nodes[0]["node"]
-            adapter_number1 = self._nodes[0]["adapter_number"]
-            port_number1 = self._nodes[0]["port_number"]
-        except IndexError:
+        # Both sides are deleted at the same time
+        coros = []
+        for link_node in self._nodes[:2]:
+            coros.append(self._delete_nio(link_node["node"], link_node["adapter_number"], link_node["port_number"]))
+        await asyncio.gather(*coros)
+        if len(self._nodes) < 2:
             return
-        try:
-            await node1.delete("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number1, port_number=port_number1), timeout=120)
-        # If the node is already delete (user selected multiple element and delete all in the same time)
-        except aiohttp.web.HTTPNotFound:
-            pass
+        await super().delete()
+
+    async def _delete_nio(self, node, adapter_number, port_number):
+        """
+        Delete the NIO of one side of the link
+        """
 
         try:
-            node2 = self._nodes[1]["node"]
-            adapter_number2 = self._nodes[1]["adapter_number"]
-            port_number2 = self._nodes[1]["port_number"]
-        except IndexError:
-            return
-        try:
-            await node2.delete("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number2, port_number=port_number2), timeout=120)
+            await node.delete("/adapters/{adapter_number}/ports/{port_number}/nio".format(adapter_number=adapter_number, port_number=port_number), timeout=120)
         # If the node is already delete (user selected multiple element and delete all in the same time)
         except aiohttp.web.HTTPNotFound:
             pass
-        await super().delete()
 
     async def start_capture(self, data_link_type="DLT_EN10MB", capture_file_name=None):
         """
@@ -160,11 +160,7 @@ class DynamipsVMHandler:
 
         dynamips_manager = Dynamips.instance()
         vm = dynamips_manager.get_node(request.match_info["node_id"], project_id=request.match_info["project_id"])
-        try:
-            await dynamips_manager.ghost_ios_support(vm)
-        except GeneratorExit:
-            pass
-        await vm.start()
+        await dynamips_manager.node_action(vm, "start")
         response.set_status(204)
 
     @Route.post(
@@ -19,12 +19,22 @@ import aiohttp
 import asyncio
 import json
 import os
+import re
 import tempfile
 
 from gns3server.web.route import Route
+from gns3server.config import Config
 from gns3server.compute.project_manager import ProjectManager
 from gns3server.compute import MODULES
+from gns3server.compute.error import NodeError
+from gns3server.ubridge.ubridge_error import UbridgeError
 from gns3server.utils.ping_stats import PingStats
+from gns3server.utils.asyncio.pool import Pool, PoolError
+from gns3server.schemas.node import (
+    NODES_ACTION_SCHEMA,
+    CONSOLE_HISTORY_SCHEMA,
+    CONSOLE_HISTORY_OBJECT_SCHEMA
+)
 
 from gns3server.schemas.project import (
     PROJECT_OBJECT_SCHEMA,
@@ -38,6 +48,7 @@ import logging
 log = logging.getLogger()
 
 CHUNK_SIZE = 1024 * 8  # 8KB
+NODE_ACTION_TIMEOUT = 240  # seconds
 
 
 class ProjectHandler:
@@ -160,6 +171,138 @@ class ProjectHandler:
         pm.remove_project(project.id)
         response.set_status(204)
 
+    @Route.post(
+        r"/projects/{project_id}/nodes/{action}",
+        description="Run the same action on multiple nodes, the result of each node is sent on its own line as soon as its action is finished",
+        parameters={
+            "project_id": "Project UUID",
+            "action": "start, stop, suspend or reload"
+        },
+        status_codes={
+            200: "Results of the nodes",
+            400: "Invalid request",
+            404: "The project doesn't exist"
+        },
+        input=NODES_ACTION_SCHEMA)
+    async def nodes_action(request, response):
+
+        pm = ProjectManager.instance()
+        project = pm.get_project(request.match_info["project_id"])
+        action = request.match_info["action"]
+        if action not in ("start", "stop", "suspend", "reload"):
+            raise aiohttp.web.HTTPBadRequest(text="Unknown node action '{}'".format(action))
+        concurrency = request.json.get("concurrency")
+        if concurrency is None:
+            concurrency = int(Config.instance().get_section_config("Server").get("node_actions_concurrency", 5))
+
+        async def run_action(node_action, results):
+            result = {"node_id": node_action["node_id"], "status": 200}
+            try:
+                node = project.get_node(node_action["node_id"])
+                # same lock as the node routes, an action is not run while another request is processed for this node
+                lock_key = "compute:{}:{}".format(project.id, node.id)
+                await Route.run_with_node_lock(lock_key, node.manager.node_action, node, action, node_action.get("data"))
+                result["node"] = node.__json__()
+            except aiohttp.web.HTTPException as e:
+                result["status"] = e.status
+                result["message"] = e.text
+            except (NodeError, UbridgeError) as e:
+                result["status"] = 409
+                result["message"] = str(e)
+            except asyncio.CancelledError:
+                # the pool has cancelled the action after its timeout
+                result["status"] = 504
+                result["message"] = "Timeout after {} seconds".format(NODE_ACTION_TIMEOUT)
+                results.put_nowait(result)
+                raise
+            except Exception as e:
+                log.error("Could not {} node {}".format(action, node_action["node_id"]), exc_info=1)
+                result["status"] = 500
+                result["message"] = str(e)
+            results.put_nowait(result)
+
+        results = asyncio.Queue()
+        pool = Pool(concurrency=concurrency, load=ProjectHandler._getLoad, timeout=NODE_ACTION_TIMEOUT)
+        for node_action in request.json["nodes"]:
+            pool.add_task(run_action, args=(node_action, results), priority=node_action.get("priority", 0))
+        # the actions continue if the client disconnects
+        join = asyncio.ensure_future(pool.join())
+
+        response.content_type = "application/json"
+        response.set_status(200)
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for _ in request.json["nodes"]:
+            result = await results.get()
+            await response.write("{}\n".format(json.dumps(result, sort_keys=True)).encode("utf-8"))
+        try:
+            await join
+        except (asyncio.TimeoutError, PoolError):
+            # the timeouts are already in the results
+            pass
+
+    @Route.post(
+        r"/projects/{project_id}/console_history",
+        description="Get or search the last output of the consoles of multiple nodes",
+        parameters={
+            "project_id": "Project UUID"
+        },
+        status_codes={
+            200: "Output of the nodes",
+            400: "Invalid request",
+            404: "The project doesn't exist"
+        },
+        input=CONSOLE_HISTORY_SCHEMA,
+        output=CONSOLE_HISTORY_OBJECT_SCHEMA)
+    async def console_history(request, response):
+
+        pm = ProjectManager.instance()
+        project = pm.get_project(request.match_info["project_id"])
+        pattern = None
+        if "search" in request.json:
+            try:
+                pattern = re.compile(request.json["search"])
+            except re.error as e:
+                raise aiohttp.web.HTTPBadRequest(text="Invalid search pattern '{}': {}".format(request.json["search"], e))
+        node_ids = request.json.get("node_ids")
+        if node_ids is None:
+            node_ids = [node.id for node in project.nodes]
+
+        results = []
+        for node_id in node_ids:
+            result = {"node_id": node_id, "status": 200}
+            try:
+                node = project.get_node(node_id)
+            except aiohttp.web.HTTPException as e:
+                result["status"] = e.status
+                result["message"] = e.text
+                results.append(result)
+                continue
+            history = getattr(node, "console_history", None)
+            if history is None:
+                result["status"] = 409
+                result["message"] = "The console output of node {} is not recorded".format(node.name)
+            elif pattern:
+                result["matches"] = await history.search(pattern, limit=request.json.get("limit", 100))
+            else:
+                output = await history.read(request.json.get("size", 4096))
+                result["output"] = output.decode("utf-8", errors="replace")
+            if history is not None:
+                result["size"] = history.size
+                result["total"] = history.total
+            results.append(result)
+
+        response.set_status(200)
+        response.json({"nodes": results})
+
+    @staticmethod
+    def _getLoad():
+        """
+        :returns: CPU usage in percent of the compute
+        """
+
+        return PingStats.get()["cpu_usage_percent"]
+
     @Route.get(
         r"/projects/{project_id}/notifications",
         description="Receive notifications about the project",
@@ -15,13 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import sys
 import os.path
 
 import aiohttp.web
 
 from gns3server.web.route import Route
-from gns3server.compute.project_manager import ProjectManager
 from gns3server.schemas.nio import NIO_SCHEMA
 from gns3server.compute.qemu import Qemu
 from gns3server.config import Config
@@ -205,17 +203,7 @@ class QEMUHandler:
 
         qemu_manager = Qemu.instance()
         vm = qemu_manager.get_node(request.match_info["node_id"], project_id=request.match_info["project_id"])
-        hardware_accel = qemu_manager.config.get_section_config("Qemu").getboolean("enable_hardware_acceleration", True)
-        if sys.platform.startswith("linux"):
-            # the enable_kvm option was used before version 2.0 and has priority
-            enable_kvm = qemu_manager.config.get_section_config("Qemu").getboolean("enable_kvm")
-            if enable_kvm is not None:
-                hardware_accel = enable_kvm
-        if hardware_accel and "-no-kvm" not in vm.options and "-no-hax" not in vm.options:
-            pm = ProjectManager.instance()
-            if pm.check_hardware_virtualization(vm) is False:
-                raise aiohttp.web.HTTPConflict(text="Cannot start VM with hardware acceleration (KVM/HAX) enabled because hardware virtualization (VT-x/AMD-V) is already used by another software like VMware or VirtualBox")
-        await vm.start()
+        await qemu_manager.node_action(vm, "start")
         response.json(vm)
 
     @Route.post(
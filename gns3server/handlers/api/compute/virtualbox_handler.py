@@ -183,11 +183,7 @@ class VirtualBoxHandler:
 
         vbox_manager = VirtualBox.instance()
         vm = vbox_manager.get_node(request.match_info["node_id"], project_id=request.match_info["project_id"])
-        if (await vm.check_hw_virtualization()):
-            pm = ProjectManager.instance()
-            if pm.check_hardware_virtualization(vm) is False:
-                raise HTTPConflict(text="Cannot start VM because hardware virtualization (VT-x/AMD-V) is already used by another software like VMware or KVM (on Linux)")
-        await vm.start()
+        await vbox_manager.node_action(vm, "start")
         response.set_status(204)
 
     @Route.post(
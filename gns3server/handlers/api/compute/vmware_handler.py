@@ -150,11 +150,7 @@ class VMwareHandler:
 
         vmware_manager = VMware.instance()
         vm = vmware_manager.get_node(request.match_info["node_id"], project_id=request.match_info["project_id"])
-        if vm.check_hw_virtualization():
-            pm = ProjectManager.instance()
-            if pm.check_hardware_virtualization(vm) is False:
-                raise HTTPConflict(text="Cannot start VM because hardware virtualization (VT-x/AMD-V) is already used by another software like VirtualBox or KVM (on Linux)")
-        await vm.start()
+        await vmware_manager.node_action(vm, "start")
         response.set_status(204)
 
     @Route.post(
@@ -220,21 +220,20 @@ class LinkHandler:
             raise aiohttp.web.HTTPConflict(text="This link has no active packet capture")
 
         compute = link.compute
-        pcap_streaming_url = link.pcap_streaming_url()
         headers = multidict.MultiDict(request.headers)
         headers['Host'] = compute.host
         headers['Router-Host'] = request.host
         body = await request.read()
-
-        connector = aiohttp.TCPConnector(limit=None, force_close=True)
-        async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
-            async with session.request(request.method, pcap_streaming_url, timeout=None, data=body) as response:
-                proxied_response = aiohttp.web.Response(headers=response.headers, status=response.status)
-                if response.headers.get('Transfer-Encoding', '').lower() == 'chunked':
-                    proxied_response.enable_chunked_encoding()
-
-                await proxied_response.prepare(request)
-                async for data in response.content.iter_any():
-                    if not data:
-                        break
-                    await proxied_response.write(data)
+        stream = await compute.stream_capture(link.pcap_streaming_url(), request.method, headers=headers, data=body)
+        try:
+            proxied_response = aiohttp.web.Response(headers=stream.headers, status=stream.status)
+            if stream.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                proxied_response.enable_chunked_encoding()
+
+            await proxied_response.prepare(request)
+            async for data in stream.content.iter_any():
+                if not data:
+                    break
+                await proxied_response.write(data)
+        finally:
+            stream.release()
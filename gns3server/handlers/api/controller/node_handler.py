@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import re
 import aiohttp
 import asyncio
 
@@ -26,7 +27,9 @@ from gns3server.schemas.node import (
     NODE_OBJECT_SCHEMA,
     NODE_UPDATE_SCHEMA,
     NODE_CREATE_SCHEMA,
-    NODE_DUPLICATE_SCHEMA
+    NODE_DUPLICATE_SCHEMA,
+    CONSOLE_HISTORY_SCHEMA,
+    CONSOLE_HISTORY_OBJECT_SCHEMA
 )
 
 
@@ -143,6 +146,32 @@ class NodeHandler:
         await project.start_all()
         response.set_status(204)
 
+    @Route.post(
+        r"/projects/{project_id}/console_history",
+        parameters={
+            "project_id": "Project UUID"
+        },
+        status_codes={
+            200: "Output of the nodes",
+            400: "Invalid request",
+            404: "Instance doesn't exist"
+        },
+        description="Get or search the last output of the consoles of multiple nodes",
+        input=CONSOLE_HISTORY_SCHEMA,
+        output=CONSOLE_HISTORY_OBJECT_SCHEMA)
+    async def console_history(request, response):
+
+        project = await Controller.instance().get_loaded_project(request.match_info["project_id"])
+        query = dict(request.json)
+        if "search" in query:
+            try:
+                re.compile(query["search"])
+            except re.error as e:
+                raise aiohttp.web.HTTPBadRequest(text="Invalid search pattern '{}': {}".format(query["search"], e))
+        results = await project.console_history(**query)
+        response.set_status(200)
+        response.json({"nodes": results})
+
     @Route.get(
         r"/projects/{project_id}/nodes/{node_id}",
         status_codes={
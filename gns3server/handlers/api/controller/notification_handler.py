@@ -53,8 +53,9 @@ class NotificationHandler:
         await response.prepare(request)
         with controller.notification.controller_queue() as queue:
             while True:
-                msg = await queue.get_json(5)
-                await response.write(("{}\n".format(msg)).encode("utf-8"))
+                # late clients receive all the pending notifications in one write
+                msgs = await queue.get_json_batch(5)
+                await response.write("".join("{}\n".format(msg) for msg in msgs).encode("utf-8"))
 
     @Route.get(
         r"/notifications/ws",
@@ -74,10 +75,12 @@ class NotificationHandler:
         try:
             with controller.notification.controller_queue() as queue:
                 while True:
-                    notification = await queue.get_json(5)
+                    notifications = await queue.get_json_batch(5)
                     if ws.closed:
                         break
-                    await ws.send_str(notification)
+                    # one notification per frame to stay compatible with the clients
+                    for notification in notifications:
+                        await ws.send_str(notification)
         finally:
             log.info("Client has disconnected from controller WebSocket")
             if not ws.closed:
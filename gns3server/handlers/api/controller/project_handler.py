@@ -233,10 +233,13 @@ class ProjectHandler:
         log.info("New client has connected to the notification stream for project ID '{}' (HTTP long-polling method)".format(project.id))
 
         try:
-            with controller.notification.project_queue(project.id) as queue:
+            # clients supporting it can receive only the changed fields in node.updated
+            delta = request.query.get("delta", "no").lower() == "yes"
+            with controller.notification.project_queue(project.id, delta=delta) as queue:
                 while True:
-                    msg = await queue.get_json(5)
-                    await response.write(("{}\n".format(msg)).encode("utf-8"))
+                    # late clients receive all the pending notifications in one write
+                    msgs = await queue.get_json_batch(5)
+                    await response.write("".join("{}\n".format(msg) for msg in msgs).encode("utf-8"))
         finally:
             log.info("Client has disconnected from notification for project ID '{}' (HTTP long-polling method)".format(project.id))
             if project.auto_close:
@@ -269,12 +272,16 @@ class ProjectHandler:
         asyncio.ensure_future(process_websocket(ws))
         log.info("New client has connected to the notification stream for project ID '{}' (WebSocket method)".format(project.id))
         try:
-            with controller.notification.project_queue(project.id) as queue:
+            # clients supporting it can receive only the changed fields in node.updated
+            delta = request.query.get("delta", "no").lower() == "yes"
+            with controller.notification.project_queue(project.id, delta=delta) as queue:
                 while True:
-                    notification = await queue.get_json(5)
+                    notifications = await queue.get_json_batch(5)
                     if ws.closed:
                         break
-                    await ws.send_str(notification)
+                    # one notification per frame to stay compatible with the clients
+                    for notification in notifications:
+                        await ws.send_str(notification)
         finally:
             log.info("Client has disconnected from notification stream for project ID '{}' (WebSocket method)".format(project.id))
             if not ws.closed:
@@ -326,7 +333,7 @@ class ProjectHandler:
         try:
             begin = time.time()
             with tempfile.TemporaryDirectory() as tmp_dir:
-                with aiozipstream.ZipFile(compression=compression) as zstream:
+                with aiozipstream.ZipFile(compression=compression, parallel_deflate=True) as zstream:
                     await export_project(zstream, project, tmp_dir, include_snapshots=include_snapshots, include_images=include_images)
 
                     # We need to do that now because export could failed and raise an HTTP error
@@ -370,8 +377,8 @@ class ProjectHandler:
         path = request.json.get("path")
         name = request.json.get("name")
 
-        # We write the content to a temporary location and after we extract it all.
-        # It could be more optimal to stream this but it is not implemented in Python.
+        # We write the content to a temporary location because the list of the files
+        # is at the end of a zip file, they are then copied to their destination.
         try:
             begin = time.time()
             with tempfile.TemporaryDirectory() as tmpdir:
@@ -25,6 +25,7 @@ from gns3server.version import __version__
 from aiohttp.web import HTTPConflict, HTTPForbidden
 
 import os
+import json
 import psutil
 import shutil
 import asyncio
@@ -234,6 +235,11 @@ Processus:
             except psutil.NoSuchProcess:
                 pass
 
+        compute_stats = {compute.id: compute.http_stats() for compute in Controller.instance().computes.values()}
+        data += "\n\nCompute HTTP requests\n{}".format(json.dumps(compute_stats, indent=4, sort_keys=True))
+
+        data += "\n\nNotification queues\n{}".format(json.dumps(Controller.instance().notification.stats(), indent=4, sort_keys=True))
+
         data += "\n\nProjects"
         for project in Controller.instance().projects.values():
             data += "\n\nProject name: {}\nProject ID: {}\n".format(project.name, project.id)
@@ -21,39 +21,226 @@ import json
 from gns3server.utils.ping_stats import PingStats
 
 
+class NotificationMessage:
+    """
+    A notification shared by all the queues it is sent to.
+    The message is serialized only once whatever the number of clients.
+
+    :param action: Action name
+    :param event: Event to send
+    :param kwargs: Add this meta to the notification (project_id for example)
+    :param partial: The event contains only the changed fields of the object
+    """
+
+    # Notifications containing the full state of an object, when a client
+    # is late only the most recent one needs to be sent
+    COALESCED_ACTIONS = {
+        "node.updated": "node_id",
+        "link.updated": "link_id",
+        "compute.updated": "compute_id",
+        "ping": "compute_id",
+        "project.loading": "stage"
+    }
+
+    __slots__ = ("action", "event", "kwargs", "partial", "_json")
+
+    def __init__(self, action, event, kwargs=None, partial=False):
+
+        self.action = action
+        self.event = event
+        self.kwargs = kwargs or {}
+        self.partial = partial
+        self._json = None
+
+    @property
+    def coalesce_key(self):
+        """
+        :returns: Key identifying the object the notification is about or None
+        """
+
+        key_name = self.COALESCED_ACTIONS.get(self.action)
+        if key_name is None or not isinstance(self.event, dict) or key_name not in self.event:
+            return None
+        return (self.action, self.event.get("project_id", self.kwargs.get("project_id")), self.event[key_name])
+
+    def merge(self, message):
+        """
+        Merge a more recent notification about the same object
+
+        :param message: NotificationMessage instance
+        :returns: NotificationMessage replacing this one
+        """
+
+        if not message.partial:
+            return message
+        event = dict(self.event)
+        event.update(message.event)
+        return NotificationMessage(message.action, event, message.kwargs, partial=self.partial)
+
+    def json(self):
+        """
+        :returns: The notification serialized in JSON
+        """
+
+        if self._json is None:
+            if hasattr(self.event, "__json__"):
+                msg = {"action": self.action, "event": self.event.__json__()}
+            else:
+                msg = {"action": self.action, "event": self.event}
+            msg.update(self.kwargs)
+            self._json = json.dumps(msg, sort_keys=True)
+        return self._json
+
+
 class NotificationQueue(asyncio.Queue):
     """
     Queue returned by the notification manager.
+
+    The queue is bounded: when a client is too slow the oldest notifications
+    are dropped, and pending notifications with the full state of an object
+    (node.updated for example) are replaced by the most recent one or merged
+    with it when the notification contains only the changed fields.
+
+    :param maxsize: Maximum number of pending notifications
     """
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, maxsize=10000):
+        super().__init__(maxsize=maxsize)
         self._first = True
+        self.delta = False
+        self._pending = {}
+        self._dropped = 0
+        self._coalesced = 0
+        self._not_empty = None
 
-    async def get(self, timeout):
+    @property
+    def dropped(self):
+        """
+        Number of notifications dropped because the queue was full
+        """
+
+        return self._dropped
+
+    @property
+    def coalesced(self):
+        """
+        Number of notifications replaced by a more recent one
+        """
+
+        return self._coalesced
+
+    def stats(self):
+
+        return {"size": self.qsize(),
+                "maxsize": self.maxsize,
+                "dropped": self._dropped,
+                "coalesced": self._coalesced}
+
+    def put_nowait(self, item):
+        """
+        Add a notification to the queue
+
+        :param item: NotificationMessage or a tuple (action, event, kwargs)
+        """
+
+        if not isinstance(item, NotificationMessage):
+            item = NotificationMessage(*item)
+
+        key = item.coalesce_key
+        if key is not None and key in self._pending:
+            # replace the pending notification but keep its position in the queue
+            entry = self._pending[key]
+            entry[0] = entry[0].merge(item)
+            self._coalesced += 1
+            return
+
+        if self.full():
+            self._drop_oldest()
+        entry = [item, key]
+        if key is not None:
+            self._pending[key] = entry
+        super().put_nowait(entry)
+        if self._not_empty is not None:
+            self._not_empty.set()
+
+    def _drop_oldest(self):
+
+        entry = super().get_nowait()
+        self._forget(entry)
+        self._dropped += 1
+
+    def _forget(self, entry):
+
+        key = entry[1]
+        if key is not None and self._pending.get(key) is entry:
+            del self._pending[key]
+
+    def _next_message(self):
+
+        entry = super().get_nowait()
+        self._forget(entry)
+        return entry[0]
+
+    def get_nowait(self):
+        """
+        :returns: Tuple (action, event, kwargs) like get()
+        """
+
+        message = self._next_message()
+        return (message.action, message.event, message.kwargs)
+
+    async def get_message(self, timeout):
         """
         When timeout is expire we send a ping notification with server information
+
+        :returns: NotificationMessage instance
         """
 
         # At first get we return a ping so the client immediately receives data
         if self._first:
             self._first = False
-            return ("ping", PingStats.get(), {})
+            return NotificationMessage("ping", PingStats.get())
+
+        # asyncio.Queue.get() would return the result of get_nowait()
+        if self.empty():
+            if self._not_empty is None:
+                self._not_empty = asyncio.Event()
+            self._not_empty.clear()
+            try:
+                await asyncio.wait_for(self._not_empty.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            if self.empty():
+                return NotificationMessage("ping", PingStats.get())
+        return self._next_message()
+
+    async def get(self, timeout):
+        """
+        When timeout is expire we send a ping notification with server information
+        """
 
-        try:
-            (action, msg, kwargs) = await asyncio.wait_for(super().get(), timeout)
-        except asyncio.TimeoutError:
-            return ("ping", PingStats.get(), {})
-        return (action, msg, kwargs)
+        message = await self.get_message(timeout)
+        return (message.action, message.event, message.kwargs)
 
     async def get_json(self, timeout):
         """
         Get a message as a JSON
         """
-        (action, msg, kwargs) = await self.get(timeout)
-        if hasattr(msg, "__json__"):
-            msg = {"action": action, "event": msg.__json__()}
-        else:
-            msg = {"action": action, "event": msg}
-        msg.update(kwargs)
-        return json.dumps(msg, sort_keys=True)
+
+        message = await self.get_message(timeout)
+        return message.json()
+
+    async def get_json_batch(self, timeout, max_messages=100):
+        """
+        Get all the pending messages as JSON, used to send
+        multiple notifications at once to a late client.
+
+        :param timeout: Timeout to wait for the first message
+        :param max_messages: Maximum number of messages returned
+        :returns: List of JSON messages
+        """
+
+        messages = [(await self.get_message(timeout)).json()]
+        while len(messages) < max_messages and not self.empty():
+            messages.append(self._next_message().json())
+        return messages
@@ -96,6 +96,131 @@ NODE_CAPTURE_SCHEMA = {
 }
 
 
+NODES_ACTION_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": "Request validation to run the same action on multiple nodes",
+    "type": "object",
+    "properties": {
+        "nodes": {
+            "description": "Nodes to run the action on",
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "node_id": {
+                        "description": "Node UUID",
+                        "type": "string",
+                        "minLength": 36,
+                        "maxLength": 36,
+                        "pattern": "^[a-fA-F0-9]{8}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{12}$"
+                    },
+                    "data": {
+                        "description": "Data sent with the action (IOU license for example)",
+                        "type": "object"
+                    },
+                    "priority": {
+                        "description": "Actions with a higher priority are finished before the others are started",
+                        "type": "integer"
+                    }
+                },
+                "additionalProperties": False,
+                "required": ["node_id"]
+            }
+        },
+        "concurrency": {
+            "description": "Maximum number of actions running at the same time, reduced when the compute is busy",
+            "type": "integer",
+            "minimum": 1
+        }
+    },
+    "additionalProperties": False,
+    "required": ["nodes"]
+}
+
+CONSOLE_HISTORY_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": "Request validation to get the console output of multiple nodes",
+    "type": "object",
+    "properties": {
+        "node_ids": {
+            "description": "Nodes UUID, all the nodes of the project when not set",
+            "type": "array",
+            "items": {
+                "type": "string",
+                "minLength": 36,
+                "maxLength": 36,
+                "pattern": "^[a-fA-F0-9]{8}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{12}$"
+            }
+        },
+        "size": {
+            "description": "Maximum number of bytes of output returned for each node",
+            "type": "integer",
+            "minimum": 0
+        },
+        "search": {
+            "description": "Regular expression, only the lines of output matching it are returned",
+            "type": "string"
+        },
+        "limit": {
+            "description": "Maximum number of lines returned for each node when searching",
+            "type": "integer",
+            "minimum": 0
+        }
+    },
+    "additionalProperties": False
+}
+
+CONSOLE_HISTORY_OBJECT_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": "Console output of multiple nodes",
+    "type": "object",
+    "properties": {
+        "nodes": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "node_id": {
+                        "description": "Node UUID",
+                        "type": "string"
+                    },
+                    "status": {
+                        "description": "HTTP status of the node",
+                        "type": "integer"
+                    },
+                    "message": {
+                        "description": "Error message when the output of the node is not available",
+                        "type": "string"
+                    },
+                    "output": {
+                        "description": "Last output of the console",
+                        "type": "string"
+                    },
+                    "matches": {
+                        "description": "Last lines of output matching the search",
+                        "type": "array",
+                        "items": {
+                            "type": "string"
+                        }
+                    },
+                    "size": {
+                        "description": "Number of bytes of output kept",
+                        "type": "integer"
+                    },
+                    "total": {
+                        "description": "Number of bytes of output received since the console started",
+                        "type": "integer"
+                    }
+                },
+                "additionalProperties": False,
+                "required": ["node_id", "status"]
+            }
+        }
+    },
+    "additionalProperties": False,
+    "required": ["nodes"]
+}
+
 NODE_OBJECT_SCHEMA = {
     "$schema": "http://json-schema.org/draft-04/schema#",
     "description": "A node object",
@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Pool of uBridge hypervisors shared by the nodes of a compute.
+
+Instead of one uBridge process per node, the nodes are spread over a few
+hypervisors. The bridge names already contain the node identifier (or
+a port allocated by the compute) so the bridges of the nodes don't collide.
+
+The commands configuring the bridges of each node are recorded, if a
+hypervisor crashes it is restarted and the bridges of its nodes are
+created again. Only the nodes assigned to this hypervisor are affected.
+"""
+
+import os
+import shlex
+import shutil
+import asyncio
+import tempfile
+
+from .hypervisor import Hypervisor
+from .ubridge_error import UbridgeError
+from ..utils.asyncio import monitor_process
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class SharedHypervisor:
+    """
+    Hypervisor of the pool as seen by a node.
+
+    It exposes the methods of a Hypervisor used by the nodes, stopping
+    it only deletes the bridges of the node.
+
+    :param pool: UbridgeHypervisorPool instance
+    :param slot: Slot of the pool running the bridges of the node
+    :param name: Name of the node (for the logs)
+    """
+
+    def __init__(self, pool, slot, name):
+
+        self._pool = pool
+        self._slot = slot
+        self._name = name
+        # bridge name => commands to create the bridge again
+        self._bridges = {}
+        self._released = False
+
+    @property
+    def host(self):
+
+        return self._slot.host
+
+    @property
+    def port(self):
+
+        if self._slot.hypervisor:
+            return self._slot.hypervisor.port
+        return None
+
+    @property
+    def version(self):
+
+        if self._slot.hypervisor:
+            return self._slot.hypervisor.version
+        return None
+
+    @property
+    def bridges(self):
+        """
+        :returns: Names of the bridges created by the node
+        """
+
+        return list(self._bridges.keys())
+
+    def is_running(self):
+
+        return not self._released
+
+    async def connect(self):
+
+        pass
+
+    def read_stdout(self):
+
+        if self._slot.hypervisor:
+            return self._slot.hypervisor.read_stdout()
+        return ""
+
+    async def send(self, command):
+        """
+        Sends a command to the shared hypervisor, the hypervisor is
+        restarted if it has crashed.
+
+        :param command: a uBridge hypervisor command
+
+        :returns: results as a list
+        """
+
+        results = await self.send_batch([command])
+        return results[0]
+
+    async def send_batch(self, commands, ignore_errors=False):
+        """
+        Sends multiple commands to the shared hypervisor.
+
+        :param commands: list of uBridge hypervisor commands
+        :param ignore_errors: return the errors instead of raising the first one
+
+        :returns: list with the results of each command
+        """
+
+        if self._released:
+            raise UbridgeError("Not connected")
+        hypervisor = await self._pool.hypervisor(self._slot)
+        results = await hypervisor.send_batch(commands, ignore_errors=True)
+        for command, result in zip(commands, results):
+            if not isinstance(result, UbridgeError):
+                self._record(command)
+        if not ignore_errors:
+            for result in results:
+                if isinstance(result, UbridgeError):
+                    raise result
+        return results
+
+    async def stop(self):
+        """
+        Deletes the bridges of the node and leaves the hypervisor running
+        for the other nodes.
+        """
+
+        if not self._released:
+            self._released = True
+            await self._pool.release(self)
+
+    def replay_commands(self):
+        """
+        :returns: Commands to create the bridges of the node again
+        """
+
+        commands = []
+        for bridge_commands in self._bridges.values():
+            commands.extend(bridge_commands)
+        return commands
+
+    def delete_commands(self):
+        """
+        :returns: Commands to delete the bridges of the node
+        """
+
+        return ["{} delete {}".format(bridge_commands[0].split()[0], name) for name, bridge_commands in self._bridges.items()]
+
+    def _record(self, command):
+        """
+        Keeps the commands needed to create the bridges again.
+        """
+
+        try:
+            args = shlex.split(command)
+        except ValueError:
+            return
+        if len(args) < 3 or args[0] not in ("bridge", "iol_bridge"):
+            return
+        action = args[1]
+        name = args[2]
+        if action == "create":
+            self._bridges[name] = [command]
+            return
+        if name not in self._bridges:
+            return
+        if action == "delete":
+            del self._bridges[name]
+        elif action == "stop_capture":
+            self._remove(name, "start_capture", args[3:])
+        elif action == "stop":
+            self._remove(name, "start", [])
+        elif action == "reset_packet_filters":
+            self._remove(name, "add_packet_filter", args[3:])
+        elif action == "delete_nio_udp":
+            # iol_bridge delete_nio_udp <name> <bay> <unit>
+            # iol_bridge add_nio_udp <name> <iol_id> <bay> <unit> <lport> <rhost> <rport>
+            self._remove(name, "add_nio_udp", args[3:5], offset=1)
+            self._remove(name, "start_capture", args[3:5])
+        else:
+            self._bridges[name].append(command)
+
+    def _remove(self, name, action, prefix, offset=0):
+        """
+        Removes the recorded commands of a bridge with an action and
+        arguments starting with a prefix.
+
+        :param offset: Number of arguments before the prefix
+        """
+
+        commands = []
+        start = 3 + offset
+        for command in self._bridges[name]:
+            args = shlex.split(command)
+            if args[1] == action and args[start:start + len(prefix)] == prefix:
+                continue
+            commands.append(command)
+        self._bridges[name] = commands
+
+
+class _Slot:
+    """
+    Hypervisor of the pool and the nodes using it.
+    """
+
+    def __init__(self, index, host):
+
+        self.index = index
+        self.host = host
+        self.path = None
+        self.hypervisor = None
+        self.clients = set()
+        self.restarts = 0
+        self.lock = asyncio.Lock()
+
+
+class UbridgeHypervisorPool:
+    """
+    Pool of uBridge hypervisors shared by the nodes.
+
+    :param size: Maximum number of hypervisors
+    :param host: Host of the hypervisors
+    """
+
+    def __init__(self, size, host):
+
+        self._slots = [_Slot(index, host) for index in range(size)]
+        self._working_dir = None
+
+    @property
+    def size(self):
+
+        return len(self._slots)
+
+    def hypervisors(self):
+        """
+        :returns: Running hypervisors
+        """
+
+        return [slot.hypervisor for slot in self._slots if slot.hypervisor and slot.hypervisor.is_running()]
+
+    async def acquire(self, path, name):
+        """
+        Assigns a node to the hypervisor with the fewest nodes.
+
+        :param path: path to the uBridge executable
+        :param name: name of the node
+
+        :returns: SharedHypervisor instance
+        """
+
+        slot = min(self._slots, key=lambda s: len(s.clients))
+        slot.path = path
+        client = SharedHypervisor(self, slot, name)
+        slot.clients.add(client)
+        try:
+            await self.hypervisor(slot)
+        except UbridgeError:
+            slot.clients.discard(client)
+            raise
+        log.info("Node {} uses the shared uBridge hypervisor {} ({} nodes)".format(name, slot.index, len(slot.clients)))
+        return client
+
+    async def release(self, client):
+        """
+        Deletes the bridges of a node, the hypervisor is stopped
+        when no node uses it anymore.
+
+        :param client: SharedHypervisor instance
+        """
+
+        slot = client._slot
+        slot.clients.discard(client)
+        async with slot.lock:
+            hypervisor = slot.hypervisor
+            if hypervisor is None or not hypervisor.is_running():
+                return
+            if slot.clients:
+                try:
+                    results = await hypervisor.send_batch(client.delete_commands(), ignore_errors=True)
+                except UbridgeError as e:
+                    results = [e]
+                for result in results:
+                    if isinstance(result, UbridgeError):
+                        log.warning("Could not delete the bridge of node {}: {}".format(client._name, result))
+            else:
+                log.info("Stopping the shared uBridge hypervisor {} {}:{}".format(slot.index, hypervisor.host, hypervisor.port))
+                slot.hypervisor = None
+                await hypervisor.stop()
+
+    async def hypervisor(self, slot):
+        """
+        Returns the running hypervisor of a slot, the hypervisor is started
+        if needed and the bridges of the nodes are created again after a crash.
+
+        :param slot: slot of the pool
+
+        :returns: Hypervisor instance
+        """
+
+        async with slot.lock:
+            if slot.hypervisor and slot.hypervisor.is_running():
+                return slot.hypervisor
+
+            crashed = slot.hypervisor is not None
+            if crashed:
+                slot.restarts += 1
+                log.error("Shared uBridge hypervisor {} has stopped, restarting it for {} node(s)".format(slot.index, len(slot.clients)))
+            hypervisor = Hypervisor(None, slot.path, self._get_working_dir(slot), slot.host)
+            log.info("Starting shared uBridge hypervisor {} {}:{}".format(slot.index, hypervisor.host, hypervisor.port))
+            await hypervisor.start()
+            await hypervisor.connect()
+            slot.hypervisor = hypervisor
+            if hypervisor.process:
+                monitor_process(hypervisor.process, self._termination_callback(slot, hypervisor))
+            if crashed:
+                for client in list(slot.clients):
+                    commands = client.replay_commands()
+                    results = await hypervisor.send_batch(commands, ignore_errors=True)
+                    for command, result in zip(commands, results):
+                        if isinstance(result, UbridgeError):
+                            log.error("Could not restore the bridges of node {} with '{}': {}".format(client._name, command, result))
+            return hypervisor
+
+    async def close(self):
+        """
+        Stops the hypervisors and removes their working directory.
+        """
+
+        for slot in self._slots:
+            async with slot.lock:
+                hypervisor = slot.hypervisor
+                slot.hypervisor = None
+                if hypervisor and hypervisor.is_running():
+                    log.info("Stopping the shared uBridge hypervisor {} {}:{}".format(slot.index, hypervisor.host, hypervisor.port))
+                    await hypervisor.stop()
+        if self._working_dir:
+            shutil.rmtree(self._working_dir, ignore_errors=True)
+            self._working_dir = None
+
+    def _termination_callback(self, slot, hypervisor):
+
+        async def callback(returncode):
+            # the hypervisor has not been stopped by the pool
+            if slot.hypervisor is hypervisor and slot.clients:
+                log.error("Shared uBridge hypervisor {} has stopped, return code: {}\n{}".format(slot.index, returncode, hypervisor.read_stdout()))
+                try:
+                    await self.hypervisor(slot)
+                except UbridgeError as e:
+                    log.error("Could not restart the shared uBridge hypervisor {}: {}".format(slot.index, e))
+        return callback
+
+    def _get_working_dir(self, slot):
+        """
+        Each hypervisor has its own directory for its log file.
+        """
+
+        if self._working_dir is None:
+            self._working_dir = tempfile.mkdtemp(prefix="gns3-ubridge-")
+        path = os.path.join(self._working_dir, str(slot.index))
+        os.makedirs(path, exist_ok=True)
+        return path
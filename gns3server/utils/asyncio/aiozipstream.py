@@ -20,16 +20,23 @@ Iterable ZIP archive generator.
 
 Derived directly from zipfile.py and the zipstream project
 https://github.com/allanlei/python-zipstream
+
+The files are read, checksummed and compressed one buffer at a time in a
+pool of threads shared by all the archives, a few buffers ahead of the
+stream. A stream which is not read holds no thread of the pool. With the parallel deflate option the big files are split in blocks
+compressed on all the CPUs (like pigz), each block using the end of the
+previous one as dictionary.
 """
 
 import os
 import sys
 import stat
+import zlib
 import struct
 import time
 import zipfile
 import asyncio
-import aiofiles
+import collections
 from concurrent import futures
 from async_generator import async_generator, yield_
 
@@ -38,6 +45,17 @@ from zipfile import (structCentralDir, structEndArchive64, structEndArchive, str
 
 stringDataDescriptor = b'PK\x07\x08'  # magic number for data descriptor
 
+BUFFER_SIZE = 1024 * 1024  # 1MB
+READ_AHEAD = 8  # buffers prepared ahead of the stream for each entry
+PARALLEL_DEFLATE_MIN_SIZE = 1024 * 1024 * 16  # 16MB
+DEFLATE_WINDOW_SIZE = 1024 * 32  # 32KB
+
+# The steps reading the entries use one pool, the blocks compressed
+# in parallel and the buffers of the iterables use another pool.
+_cpu_count = os.cpu_count() or 1
+_entry_pool = futures.ThreadPoolExecutor(max_workers=max(4, _cpu_count))
+_compression_pool = futures.ThreadPoolExecutor(max_workers=_cpu_count)
+
 
 def _get_compressor(compress_type):
     """
@@ -57,6 +75,199 @@ def _get_compressor(compress_type):
         return None
 
 
+def _compress_buffer(cmpr, data, crc):
+    """
+    Checksum and compress a buffer.
+
+    :returns: tuple CRC, compressed data
+    """
+
+    crc = zipfile.crc32(data, crc) & 0xffffffff
+    if cmpr:
+        data = cmpr.compress(data)
+    return crc, data
+
+
+def _deflate_block(data, zdict, last):
+    """
+    Compress a block of a file independently of the other blocks, the deflate
+    stream is flushed to a byte boundary so the blocks can be concatenated.
+
+    :param data: Block of data
+    :param zdict: End of the previous block, the block can reference it
+    :param last: True for the last block of the file
+    """
+
+    if zdict:
+        cmpr = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15, zdict=zdict)
+    else:
+        cmpr = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return cmpr.compress(data) + cmpr.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class _FileReader:
+    """
+    Reads, checksums and compresses a file, one buffer at each step.
+    """
+
+    def __init__(self, path, compress_type, chunksize):
+
+        self._path = path
+        self._chunksize = chunksize
+        self._cmpr = _get_compressor(compress_type)
+        self._file = None
+        self._done = False
+        self.crc = self.file_size = self.compress_size = 0
+
+    def step(self):
+        """
+        :returns: Next compressed data (can be empty) or None at the end of the file
+        """
+
+        if self._done:
+            return None
+        if self._file is None:
+            self._file = open(self._path, "rb")
+        data = self._file.read(self._chunksize)
+        if not data:
+            self.close()
+            if not self._cmpr:
+                return None
+            data = self._cmpr.flush()
+        else:
+            self.file_size += len(data)
+            self.crc = zipfile.crc32(data, self.crc) & 0xffffffff
+            if self._cmpr:
+                data = self._cmpr.compress(data)
+        self.compress_size += len(data)
+        return data
+
+    def close(self):
+
+        self._done = True
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _ParallelDeflateReader:
+    """
+    Reads and checksums a file, its blocks are compressed in parallel in the
+    compression pool and one compressed block is returned at each step.
+    """
+
+    def __init__(self, path, chunksize):
+
+        self._path = path
+        self._chunksize = chunksize
+        self._file = None
+        self._done = False
+        self._data = b""
+        self._previous = b""
+        self._pending = collections.deque()
+        self._max_pending = _cpu_count * 2
+        self.crc = self.file_size = self.compress_size = 0
+
+    def step(self):
+        """
+        :returns: Next compressed block or None at the end of the file
+        """
+
+        if self._done:
+            return None
+        if self._file is None:
+            self._file = open(self._path, "rb")
+            self._data = self._file.read(self._chunksize)
+        while self._data and len(self._pending) < self._max_pending:
+            next_data = self._file.read(self._chunksize)
+            self.file_size += len(self._data)
+            self.crc = zipfile.crc32(self._data, self.crc) & 0xffffffff
+            self._pending.append(_compression_pool.submit(_deflate_block, self._data, self._previous[-DEFLATE_WINDOW_SIZE:], not next_data))
+            self._previous, self._data = self._data, next_data
+        if self._pending:
+            block = self._pending.popleft().result()
+        else:
+            self.close()
+            if self.file_size:
+                return None
+            block = _get_compressor(zipfile.ZIP_DEFLATED).flush()
+        self.compress_size += len(block)
+        return block
+
+    def close(self):
+
+        self._done = True
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _Prefetcher:
+    """
+    Runs the steps of a reader in the entry pool a few buffers ahead of
+    the stream. The steps are chained by a task of the event loop and each
+    step is a job of the pool: while the stream is not read no thread waits.
+
+    :param reader: Object with step() and close() methods
+    :param size: Maximum number of buffers waiting to be read
+    """
+
+    def __init__(self, reader, size):
+
+        self._reader = reader
+        self._queue = asyncio.Queue(maxsize=size)
+        self._step = None
+        self._closed = False
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+
+        try:
+            while True:
+                self._step = _entry_pool.submit(self._reader.step)
+                data = await asyncio.wrap_future(self._step)
+                self._step = None
+                if data is None:
+                    break
+                if data:
+                    await self._queue.put(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._step = None
+            await self._queue.put(e)
+            return
+        await self._queue.put(None)
+
+    async def get(self):
+        """
+        :returns: Next buffer or None at the end of the entry
+        """
+
+        data = await self._queue.get()
+        if isinstance(data, Exception):
+            raise data
+        return data
+
+    def close(self):
+        """
+        Stops reading the entry.
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+        self._task.cancel()
+        if self._step is not None:
+            # the reader is closed when its running step is finished
+            self._step.add_done_callback(lambda future: self._reader.close())
+        else:
+            self._reader.close()
+
+
 class PointerIO(object):
 
     def __init__(self, mode='wb'):
@@ -106,14 +317,16 @@ class ZipInfo(zipfile.ZipInfo):
     def __init__(self, *args, **kwargs):
         zipfile.ZipInfo.__init__(self, *args, **kwargs)
 
-    def DataDescriptor(self):
+    def DataDescriptor(self, zip64=False):
         """
         crc-32                          4 bytes
-        compressed size                 4 bytes
-        uncompressed size               4 bytes
+        compressed size                 4 bytes (8 bytes with zip64)
+        uncompressed size               4 bytes (8 bytes with zip64)
+
+        :param zip64: The local header has the zip64 extra field
         """
 
-        if self.compress_size > zipfile.ZIP64_LIMIT or self.file_size > zipfile.ZIP64_LIMIT:
+        if zip64 or self.compress_size > zipfile.ZIP64_LIMIT or self.file_size > zipfile.ZIP64_LIMIT:
             fmt = b'<4sLQQ'
         else:
             fmt = b'<4sLLL'
@@ -122,8 +335,13 @@ class ZipInfo(zipfile.ZipInfo):
 
 class ZipFile(zipfile.ZipFile):
 
-    def __init__(self, fileobj=None, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True, chunksize=32768):
-        """Open the ZIP file with mode write "w"."""
+    def __init__(self, fileobj=None, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True, chunksize=BUFFER_SIZE, parallel_deflate=False):
+        """
+        Open the ZIP file with mode write "w".
+
+        :param chunksize: Size of the buffers
+        :param parallel_deflate: Compress the big deflated files on all the CPUs
+        """
 
         if mode not in ('w', ):
             raise RuntimeError('aiozipstream.ZipFile() requires mode "w"')
@@ -133,6 +351,8 @@ class ZipFile(zipfile.ZipFile):
         self._comment = b''
         zipfile.ZipFile.__init__(self, fileobj, mode=mode, compression=compression, allowZip64=allowZip64)
         self._chunksize = chunksize
+        self._parallel_deflate = parallel_deflate
+        self._prefetcher = None
         self.paths_to_write = []
 
     def __aiter__(self):
@@ -163,23 +383,14 @@ class ZipFile(zipfile.ZipFile):
         self._didModify = True
 
     @async_generator
-    async def data_generator(self, path):
+    async def _iterable_generator(self, iterable):
 
-        async with aiofiles.open(path, "rb") as f:
-            while True:
-                part = await f.read(self._chunksize)
-                if not part:
-                    break
+        if hasattr(iterable, "__aiter__"):
+            async for part in iterable:
+                await yield_(part)
+        else:
+            for part in iterable:
                 await yield_(part)
-        return
-
-    async def _run_in_executor(self, task, *args, **kwargs):
-        """
-        Run synchronous task in separate thread and await for result.
-        """
-
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(futures.ThreadPoolExecutor(max_workers=1), task, *args, **kwargs)
 
     @async_generator
     async def _stream(self):
@@ -198,12 +409,16 @@ class ZipFile(zipfile.ZipFile):
         kwargs = {'filename': filename, 'arcname': arcname, 'compress_type': compress_type}
         self.paths_to_write.append(kwargs)
 
-    def write_iter(self, arcname, iterable, compress_type=None):
+    def write_iter(self, arcname, iterable, compress_type=None, size=None):
         """
         Write the bytes iterable `iterable` to the archive under the name `arcname`.
+        The iterable can be asynchronous, it is read when the zip stream is iterated.
+
+        :param size: Size of the data if known, the entries of unknown
+        size always have zip64 headers since they can be larger than 2GB
         """
 
-        kwargs = {'arcname': arcname, 'iterable': iterable, 'compress_type': compress_type}
+        kwargs = {'arcname': arcname, 'iterable': iterable, 'compress_type': compress_type, 'size': size}
         self.paths_to_write.append(kwargs)
 
     def writestr(self, arcname, data, compress_type=None):
@@ -213,10 +428,10 @@ class ZipFile(zipfile.ZipFile):
 
         def _iterable():
             yield data
-        return self.write_iter(arcname, _iterable(), compress_type=compress_type)
+        return self.write_iter(arcname, _iterable(), compress_type=compress_type, size=len(data))
 
     @async_generator
-    async def _write(self, filename=None, iterable=None, arcname=None, compress_type=None):
+    async def _write(self, filename=None, iterable=None, arcname=None, compress_type=None, size=None):
         """
         Put the bytes from filename into the archive under the name `arcname`.
         """
@@ -254,6 +469,8 @@ class ZipFile(zipfile.ZipFile):
 
         if st:
             zinfo.file_size = st[6]
+        elif size is not None:
+            zinfo.file_size = size
         else:
             zinfo.file_size = 0
         zinfo.flag_bits = 0x00
@@ -275,40 +492,52 @@ class ZipFile(zipfile.ZipFile):
             await yield_(self.fp.write(zinfo.FileHeader(False)))
             return
 
-        cmpr = _get_compressor(zinfo.compress_type)
-
         # Must overwrite CRC and sizes with correct data later
         zinfo.CRC = CRC = 0
         zinfo.compress_size = compress_size = 0
         # Compressed size can be larger than uncompressed size
-        zip64 = self._allowZip64 and zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        zip64 = self._allowZip64 and (zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT or (iterable is not None and size is None))
         await yield_(self.fp.write(zinfo.FileHeader(zip64)))
 
+        loop = asyncio.get_event_loop()
         file_size = 0
         if filename:
-            async for buf in self.data_generator(filename):
-                file_size = file_size + len(buf)
-                CRC = zipfile.crc32(buf, CRC) & 0xffffffff
-                if cmpr:
-                    buf = await self._run_in_executor(cmpr.compress, buf)
-                    compress_size = compress_size + len(buf)
-                await yield_(self.fp.write(buf))
-        else: # we have an iterable
-            for buf in iterable:
+            if self._parallel_deflate and zinfo.compress_type == zipfile.ZIP_DEFLATED and zinfo.file_size >= PARALLEL_DEFLATE_MIN_SIZE:
+                reader = _ParallelDeflateReader(filename, self._chunksize)
+            else:
+                reader = _FileReader(filename, zinfo.compress_type, self._chunksize)
+            prefetcher = _Prefetcher(reader, READ_AHEAD)
+            self._prefetcher = prefetcher
+            try:
+                while True:
+                    buf = await prefetcher.get()
+                    if buf is None:
+                        break
+                    await yield_(self.fp.write(buf))
+            finally:
+                prefetcher.close()
+                self._prefetcher = None
+            CRC, file_size, compress_size = reader.crc, reader.file_size, reader.compress_size
+        else:  # we have an iterable
+            cmpr = _get_compressor(zinfo.compress_type)
+            buffer = bytearray()
+            async for buf in self._iterable_generator(iterable):
                 file_size = file_size + len(buf)
-                CRC = zipfile.crc32(buf, CRC) & 0xffffffff
-                if cmpr:
-                    buf = await self._run_in_executor(cmpr.compress, buf)
+                buffer += buf
+                if len(buffer) >= self._chunksize:
+                    CRC, buf = await loop.run_in_executor(_compression_pool, _compress_buffer, cmpr, bytes(buffer), CRC)
+                    buffer = bytearray()
                     compress_size = compress_size + len(buf)
+                    if buf:
+                        await yield_(self.fp.write(buf))
+            CRC, buf = await loop.run_in_executor(_compression_pool, _compress_buffer, cmpr, bytes(buffer), CRC)
+            if cmpr:
+                buf += cmpr.flush()
+            compress_size = compress_size + len(buf)
+            if buf:
                 await yield_(self.fp.write(buf))
 
-        if cmpr:
-            buf = cmpr.flush()
-            compress_size = compress_size + len(buf)
-            await yield_(self.fp.write(buf))
-            zinfo.compress_size = compress_size
-        else:
-            zinfo.compress_size = file_size
+        zinfo.compress_size = compress_size
         zinfo.CRC = CRC
         zinfo.file_size = file_size
         if not zip64 and self._allowZip64:
@@ -317,10 +546,23 @@ class ZipFile(zipfile.ZipFile):
             if compress_size > zipfile.ZIP64_LIMIT:
                 raise RuntimeError('Compressed size larger than uncompressed size')
 
-        await yield_(self.fp.write(zinfo.DataDescriptor()))
+        await yield_(self.fp.write(zinfo.DataDescriptor(zip64)))
         self.filelist.append(zinfo)
         self.NameToInfo[zinfo.filename] = zinfo
 
+    def close(self):
+        """
+        Close the archive and the iterables, which may not have been fully read.
+        """
+
+        if getattr(self, "_prefetcher", None):
+            self._prefetcher.close()
+        for kwargs in getattr(self, "paths_to_write", []):
+            iterable = kwargs.get("iterable")
+            if hasattr(iterable, "close"):
+                iterable.close()
+        super().close()
+
     def _close(self):
         """
         Close the file, and for mode "w" write the ending records.
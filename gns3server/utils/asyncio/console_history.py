@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import zlib
+import collections
+
+from . import wait_run_in_executor
+
+import logging
+log = logging.getLogger(__name__)
+
+PAGE_SIZE = 1024 * 16  # 16KB
+MAX_SIZE = 1024 * 256  # 256KB
+
+
+class ConsoleHistory:
+    """
+    Output of a console kept in pages compressed once they are full,
+    the oldest pages are dropped when the compressed size goes over
+    the maximum size.
+
+    :param max_size: Maximum size of the compressed pages in bytes
+    :param page_size: Size of a page before compression
+    """
+
+    def __init__(self, max_size=MAX_SIZE, page_size=PAGE_SIZE):
+
+        self._max_size = max_size
+        self._page_size = page_size
+        # compressed pages with their size before compression
+        self._pages = collections.deque()
+        self._compressed_size = 0
+        self._page = bytearray()
+        self._start = 0
+        self._end = 0
+
+    @property
+    def size(self):
+        """
+        :returns: Size of the output kept
+        """
+
+        return self._end - self._start
+
+    @property
+    def total(self):
+        """
+        :returns: Size of all the output received
+        """
+
+        return self._end
+
+    @property
+    def memory_size(self):
+        """
+        :returns: Memory used by the pages
+        """
+
+        return self._compressed_size + len(self._page)
+
+    def append(self, data):
+
+        self._end += len(data)
+        data = memoryview(data)
+        while data:
+            free = self._page_size - len(self._page)
+            self._page += data[:free]
+            data = data[free:]
+            if len(self._page) >= self._page_size:
+                self._compress_page()
+
+    def _compress_page(self):
+
+        compressed = zlib.compress(self._page, 1)
+        self._pages.append((compressed, len(self._page)))
+        self._compressed_size += len(compressed)
+        self._page = bytearray()
+        while self._compressed_size > self._max_size:
+            compressed, length = self._pages.popleft()
+            self._compressed_size -= len(compressed)
+            self._start += length
+
+    def _snapshot(self, size=None):
+        """
+        :param size: Minimum size of output wanted from the end, all the pages when None
+        :returns: Pages covering the output wanted, the last page is not compressed
+        """
+
+        pages = [bytes(self._page)]
+        length = len(self._page)
+        for page in reversed(self._pages):
+            if size is not None and length >= size:
+                break
+            pages.append(page)
+            length += page[1]
+        pages.reverse()
+        return pages
+
+    async def read(self, size=None):
+        """
+        Returns the last output of the console.
+
+        :param size: Maximum number of bytes returned, all the history when None
+        :returns: Output of the console
+        """
+
+        if size == 0:
+            return b""
+        data = await wait_run_in_executor(_decompress, self._snapshot(size))
+        if size is not None:
+            data = data[-size:]
+        return data
+
+    async def search(self, pattern, limit=None):
+        """
+        Searches the output of the console.
+
+        :param pattern: Compiled regular expression
+        :param limit: Maximum number of lines returned
+        :returns: Last lines of the output matching the pattern
+        """
+
+        return await wait_run_in_executor(_search, self._snapshot(), pattern, limit)
+
+
+def _decompress(pages):
+
+    return b"".join([zlib.decompress(page[0]) for page in pages[:-1]] + [pages[-1]])
+
+
+def _search(pages, pattern, limit):
+
+    text = _decompress(pages).decode("utf-8", errors="replace")
+    lines = [line.rstrip("\r") for line in text.split("\n") if pattern.search(line)]
+    if limit is not None:
+        lines = lines[-limit:] if limit else []
+    return lines
@@ -0,0 +1,490 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Follow a file growing on disk (like tail -f) and send the data to multiple
+readers. Used to stream the packet captures.
+
+On Linux the reader is woken up by inotify when the file is modified,
+on the other platforms the file is polled.
+"""
+
+import os
+import sys
+import math
+import weakref
+import ctypes
+import ctypes.util
+import collections
+import asyncio
+import aiofiles
+
+import logging
+log = logging.getLogger(__name__)
+
+
+CHUNK_SIZE = 1024 * 64  # 64KB
+
+
+class _FilePoller:
+    """
+    Does not watch the file, the FileTail reads it at a fixed interval.
+    """
+
+    def __init__(self, path, callback, interval=0.1):
+
+        self.poll_interval = interval
+
+    def pause(self):
+
+        pass
+
+    def resume(self):
+
+        pass
+
+    def close(self):
+
+        pass
+
+
+class _FileNotifier:
+    """
+    Calls the callback when the file is modified with inotify (Linux only).
+
+    The file is watched with a single inotify watch for the life of
+    the notifier. While paused the events are not received, the kernel
+    merges them until the notifier is resumed.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVE_SELF = 0x00000800
+    IN_DELETE_SELF = 0x00000400
+
+    poll_interval = None
+    _libc = None
+
+    def __init__(self, path, callback):
+
+        self._callback = callback
+        self._watching = False
+        libc = self._load_libc()
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVE_SELF | self.IN_DELETE_SELF
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            self.close()
+            raise OSError(errno, "inotify_add_watch failed for {}: {}".format(path, os.strerror(errno)))
+        self._loop = asyncio.get_event_loop()
+        try:
+            self._loop.add_reader(self._fd, self._modified)
+        except NotImplementedError:
+            self.close()
+            raise OSError("The event loop cannot watch file descriptors")
+        self._watching = True
+
+    @classmethod
+    def _load_libc(cls):
+
+        if cls._libc is None:
+            cls._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        return cls._libc
+
+    def _modified(self):
+
+        try:
+            while os.read(self._fd, 4096):
+                pass
+        except OSError:
+            # no more events (EAGAIN)
+            pass
+        self._callback()
+
+    def pause(self):
+
+        if self._watching:
+            self._loop.remove_reader(self._fd)
+            self._watching = False
+
+    def resume(self):
+
+        if not self._watching and self._fd is not None:
+            # the events received while paused are delivered at once
+            self._loop.add_reader(self._fd, self._modified)
+            self._watching = True
+
+    def close(self):
+
+        if self._fd is not None:
+            if self._watching:
+                self._loop.remove_reader(self._fd)
+                self._watching = False
+            # the watch is removed with the file descriptor
+            os.close(self._fd)
+            self._fd = None
+
+
+def _read_nowait(fd, buffer, offset):
+    """
+    Reads the data if it is in the page cache without blocking (Linux 4.14+ and Python 3.7+)
+
+    :param buffer: memoryview of the buffer used for the read
+    :returns: data or None if the data must be read from the disk
+    """
+
+    try:
+        length = os.preadv(fd, [buffer], offset, os.RWF_NOWAIT)
+    except BlockingIOError:
+        return None
+    return bytes(buffer[:length])
+
+
+def file_notifier(path, callback):
+    """
+    :param path: Path of the file
+    :param callback: Called when the file may have been modified
+
+    :returns: Object with pause(), resume() and close() methods and a poll_interval
+    attribute, the delay between two reads when the file modifications are not notified
+    """
+
+    if sys.platform.startswith("linux"):
+        try:
+            return _FileNotifier(path, callback)
+        except (OSError, AttributeError) as e:
+            log.debug("Cannot watch {} with inotify, polling the file: {}".format(path, e))
+    return _FilePoller(path, callback)
+
+
+class _Ticker:
+    """
+    Calls the registered callbacks once at the next multiple of the interval,
+    the files being written are read together with a single timer.
+    """
+
+    # event loop => interval => _Ticker
+    _tickers = weakref.WeakKeyDictionary()
+
+    def __init__(self, loop, interval):
+
+        self._loop = loop
+        self._interval = interval
+        self._callbacks = set()
+        self._handle = None
+
+    @classmethod
+    def get(cls, interval):
+
+        loop = asyncio.get_event_loop()
+        tickers = cls._tickers.setdefault(loop, {})
+        if interval not in tickers:
+            tickers[interval] = cls(loop, interval)
+        return tickers[interval]
+
+    def add(self, callback):
+
+        self._callbacks.add(callback)
+        if self._handle is None:
+            when = (math.floor(self._loop.time() / self._interval) + 1) * self._interval
+            self._handle = self._loop.call_at(when, self._tick)
+
+    def remove(self, callback):
+
+        self._callbacks.discard(callback)
+
+    def _tick(self):
+
+        self._handle = None
+        callbacks = self._callbacks
+        self._callbacks = set()
+        for callback in callbacks:
+            callback()
+
+
+class FileTailReader:
+    """
+    Reader of a FileTail, the data already read by the FileTail before the reader
+    was created (or while it was too slow) is read from its own file object.
+    """
+
+    def __init__(self, tail, f, catch_up, max_chunks):
+
+        self._tail = tail
+        self._file = f
+        self._position = 0
+        self._file_position = 0
+        self._catch_up = catch_up
+        self._max_chunks = max_chunks
+        self._chunks = collections.deque()
+        self._waiter = None
+
+    async def read(self):
+        """
+        :returns: Next data of the file, empty when the file is no longer followed
+        """
+
+        if self._position < self._catch_up:
+            if self._file_position != self._position:
+                await self._file.seek(self._position)
+            data = await self._file.read(min(self._tail.chunk_size, self._catch_up - self._position))
+            if data:
+                self._position += len(data)
+                self._file_position = self._position
+                return data
+            # the file has been truncated
+            return b""
+
+        while not self._chunks:
+            self._waiter = asyncio.get_event_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        if self._chunks[0] is None:
+            return b""
+        data = self._chunks.popleft()
+        self._position += len(data)
+        return data
+
+    def _push(self, data, offset):
+        """
+        Queues the data read by the tail, a reader too slow reads
+        the data from the file instead of consuming more memory.
+
+        :param data: data or None for the end of the file
+        :param offset: offset of the tail after the data
+        """
+
+        if len(self._chunks) >= self._max_chunks:
+            self._chunks.clear()
+            self._catch_up = offset
+            if data is not None:
+                return
+        self._chunks.append(data)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def close(self):
+
+        self._tail._remove_reader(self)
+        await self._file.close()
+
+
+class FileTailClosedError(Exception):
+    """
+    Raised when a reader is added to a FileTail which no longer follows its file.
+    """
+
+
+class FileTail:
+    """
+    Follows a file and sends the new data to the readers,
+    the file is read once whatever the number of readers.
+
+    The reads are scheduled with callbacks of the event loop, woken up by
+    the file notifier when the file is idle.
+
+    :param path: Path of the file
+    :param is_active: Callable returning False when the file will no longer grow
+    :param chunk_size: Size of the reads
+    :param max_chunks: Maximum number of chunks waiting for a reader
+    :param check_interval: Maximum delay before checking is_active again
+    :param min_interval: Delay between two reads while the file is being written,
+    the writes received in the meantime are read at once
+    """
+
+    def __init__(self, path, is_active, chunk_size=CHUNK_SIZE, max_chunks=256, check_interval=1, min_interval=0.1):
+
+        self._path = path
+        self._is_active = is_active
+        self._chunk_size = chunk_size
+        self._max_chunks = max_chunks
+        self._check_interval = check_interval
+        self._min_interval = min_interval
+        self._offset = 0
+        self._readers = set()
+        self._started = False
+        self._closed = False
+        self._file = None
+        self._notifier = None
+        self._nowait = hasattr(os, "RWF_NOWAIT")
+        self._buffer = None
+        self._handle = None
+        self._batching = False
+        self._ticker = None
+        self._read_task = None
+
+    @property
+    def chunk_size(self):
+
+        return self._chunk_size
+
+    @property
+    def closed(self):
+
+        return self._closed
+
+    @property
+    def readers(self):
+
+        return len(self._readers)
+
+    async def open_reader(self):
+        """
+        Adds a reader, the reader will receive the file from the beginning.
+
+        :returns: FileTailReader instance
+        """
+
+        if self._closed:
+            raise FileTailClosedError("{} is no longer followed".format(self._path))
+        f = await aiofiles.open(self._path, "rb")
+        if self._closed:
+            # the last reader has been closed while the file was opened
+            await f.close()
+            raise FileTailClosedError("{} is no longer followed".format(self._path))
+        reader = FileTailReader(self, f, self._offset, self._max_chunks)
+        self._readers.add(reader)
+        if not self._started:
+            self._started = True
+            self._start()
+        return reader
+
+    def _remove_reader(self, reader):
+
+        self._readers.discard(reader)
+        if not self._readers and self._started:
+            # nobody reads the file anymore
+            self._close()
+
+    def _start(self):
+
+        try:
+            self._file = open(self._path, "rb", buffering=0)
+            self._notifier = file_notifier(self._path, self._modified)
+        except OSError as e:
+            log.error("Cannot follow file {}: {}".format(self._path, e))
+            self._close()
+            return
+        self._read()
+
+    def _schedule(self, delay):
+
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = asyncio.get_event_loop().call_later(delay, self._read)
+
+    def _modified(self):
+
+        # while the file is being written the next read is already scheduled
+        if not self._batching and self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            self._read()
+
+    def _read(self):
+
+        self._handle = None
+        if self._closed or self._read_task is not None:
+            return
+        try:
+            fd = self._file.fileno()
+            # the data just written is usually in the page cache and read
+            # without blocking, otherwise it is read in a thread
+            data = None
+            if self._nowait:
+                try:
+                    if self._buffer is None:
+                        self._buffer = memoryview(bytearray(self._chunk_size))
+                    data = _read_nowait(fd, self._buffer, self._offset)
+                except OSError:
+                    # not supported by the file system
+                    self._nowait = False
+            if data:
+                self._received(data)
+                return
+            size = os.fstat(fd).st_size - self._offset
+            if data is None and size > 0:
+                self._read_task = asyncio.ensure_future(self._read_in_thread(fd, min(size, self._chunk_size)))
+                return
+            if size < 0 or not self._is_active():
+                self._close()
+                return
+        except OSError as e:
+            log.error("Cannot follow file {}: {}".format(self._path, e))
+            self._close()
+            return
+        self._batching = False
+        self._notifier.resume()
+        interval = self._check_interval
+        if self._notifier.poll_interval is not None:
+            interval = min(interval, self._notifier.poll_interval)
+        self._schedule(interval)
+
+    async def _read_in_thread(self, fd, size):
+
+        loop = asyncio.get_event_loop()
+        try:
+            data = await loop.run_in_executor(None, os.pread, fd, size, self._offset)
+        except OSError as e:
+            self._read_task = None
+            log.error("Cannot follow file {}: {}".format(self._path, e))
+            self._close()
+            return
+        self._read_task = None
+        if data:
+            self._received(data)
+        else:
+            self._read()
+
+    def _received(self, data):
+
+        self._offset += len(data)
+        for reader in self._readers:
+            reader._push(data, self._offset)
+        if len(data) < self._chunk_size:
+            # the file is being written, the next writes are read at once
+            if not self._batching:
+                self._batching = True
+                self._notifier.pause()
+                self._ticker = _Ticker.get(self._min_interval)
+            self._ticker.add(self._read)
+        else:
+            self._schedule(0)
+
+    def _close(self):
+
+        if self._closed:
+            return
+        self._closed = True
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._ticker is not None:
+            self._ticker.remove(self._read)
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._notifier is not None:
+            self._notifier.close()
+        if self._file is not None:
+            self._file.close()
+        for reader in list(self._readers):
+            reader._push(None, self._offset)
@@ -18,34 +18,113 @@
 import asyncio
 
 
+class PoolError(Exception):
+    """
+    Raised when multiple tasks of a pool have failed
+
+    :param exceptions: List of exceptions raised by the tasks
+    """
+
+    def __init__(self, exceptions):
+        super().__init__("\n".join(str(e) or e.__class__.__name__ for e in exceptions))
+        self.exceptions = exceptions
+
+
 class Pool():
     """
     Limit concurrency for running parallel tasks
+
+    Tasks with a higher priority are all finished before the tasks
+    with a lower priority are started. When a load function is given
+    the concurrency is reduced while the CPU of the host is busy, the
+    memory usage is not used: it's routinely high on the hosts running
+    labs and doesn't slow down the start of the nodes.
+
+    :param concurrency: Maximum number of tasks running at the same time
+    :param load: Function returning the CPU usage in percent of the host running the tasks
+    :param timeout: Default timeout in seconds of each task
     """
 
-    def __init__(self, concurrency=5):
+    # CPU usage in percent above which the concurrency is reduced
+    LOAD_THRESHOLD = 50
+    # CPU usage in percent from which only one task is run at a time
+    LOAD_MAX = 90
+
+    def __init__(self, concurrency=5, load=None, timeout=None):
         self._tasks = []
         self._concurrency = concurrency
+        self._load = load
+        self._timeout = timeout
 
     def append(self, task, *args, **kwargs):
-        self._tasks.append((task, args, kwargs))
+        self._tasks.append((task, args, kwargs, 0, self._timeout))
+
+    def add_task(self, task, args=(), kwargs=None, priority=0, timeout=None):
+        """
+        Add a task to the pool
+
+        :param task: Coroutine function
+        :param args: Arguments of the task
+        :param kwargs: Keyword arguments of the task
+        :param priority: Tasks with the highest priority are run first
+        :param timeout: Timeout in seconds, by default the timeout of the pool
+        """
+
+        if timeout is None:
+            timeout = self._timeout
+        self._tasks.append((task, args, kwargs or {}, priority, timeout))
+
+    def concurrency(self):
+        """
+        :returns: Number of tasks which can run at the same time
+        """
+
+        if self._load is None:
+            return self._concurrency
+        usage = self._load()
+        try:
+            if usage <= self.LOAD_THRESHOLD:
+                return self._concurrency
+        except TypeError:
+            # no statistics available
+            return self._concurrency
+        if usage >= self.LOAD_MAX:
+            return 1
+        ratio = (self.LOAD_MAX - usage) / (self.LOAD_MAX - self.LOAD_THRESHOLD)
+        return max(1, round(self._concurrency * ratio))
+
+    async def _run(self, task, args, kwargs, timeout):
+
+        if timeout:
+            return await asyncio.wait_for(task(*args, **kwargs), timeout)
+        return await task(*args, **kwargs)
 
     async def join(self):
         """
         Wait for all task to finish
+
+        If a single task has failed its exception is raised, if multiple
+        tasks have failed a PoolError with all the exceptions is raised.
         """
-        pending = set()
-        exceptions = set()
-        while len(self._tasks) > 0 or len(pending) > 0:
-            while len(self._tasks) > 0 and len(pending) < self._concurrency:
-                task, args, kwargs = self._tasks.pop(0)
-                pending.add(task(*args, **kwargs))
-            (done, pending) = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
-            for task in done:
-                if task.exception():
-                    exceptions.add(task.exception())
-        if len(exceptions) > 0:
-            raise exceptions.pop()
+
+        exceptions = []
+        priorities = sorted(set(task[3] for task in self._tasks), reverse=True)
+        for priority in priorities:
+            tasks = [task for task in self._tasks if task[3] == priority]
+            self._tasks = [task for task in self._tasks if task[3] != priority]
+            pending = set()
+            while len(tasks) > 0 or len(pending) > 0:
+                while len(tasks) > 0 and len(pending) < self.concurrency():
+                    task, args, kwargs, _, timeout = tasks.pop(0)
+                    pending.add(asyncio.ensure_future(self._run(task, args, kwargs, timeout)))
+                (done, pending) = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception():
+                        exceptions.append(task.exception())
+        if len(exceptions) == 1:
+            raise exceptions[0]
+        elif len(exceptions) > 1:
+            raise PoolError(exceptions)
 
 
 def main():
@@ -56,6 +56,116 @@ NAWS = 31     # Negotiate About Window Size
 LINEMO = 34     # Line Mode
 
 READ_SIZE = 1024
+OUTPUT_READ_SIZE = 1024 * 64  # 64KB
+SCROLLBACK_SIZE = 1024 * 64  # 64KB
+CLIENT_WRITE_BUFFER_SIZE = 1024 * 64  # 64KB
+
+
+class ConsoleBuffer:
+    """
+    Ring buffer keeping the last output of a console.
+
+    The positions are offsets from the beginning of the output, the
+    data before `start` has been overwritten.
+
+    :param size: Size of the buffer in bytes
+    """
+
+    def __init__(self, size=SCROLLBACK_SIZE):
+
+        self._data = bytearray(size)
+        self._size = size
+        self._end = 0
+
+    @property
+    def start(self):
+
+        return max(0, self._end - self._size)
+
+    @property
+    def end(self):
+
+        return self._end
+
+    def append(self, data):
+
+        length = len(data)
+        data = memoryview(data)[-self._size:]
+        position = (self._end + length - len(data)) % self._size
+        first = min(len(data), self._size - position)
+        self._data[position:position + first] = data[:first]
+        self._data[:len(data) - first] = data[first:]
+        self._end += length
+
+    def read(self, position):
+        """
+        Returns the data from a position to the end of the output, without copy.
+
+        :param position: Position in the output, must not be before start
+        :returns: List of memoryviews (the data can wrap around the end of the buffer)
+        """
+
+        length = self._end - position
+        if length <= 0:
+            return []
+        begin = position % self._size
+        view = memoryview(self._data)
+        if begin + length <= self._size:
+            return [view[begin:begin + length]]
+        return [view[begin:], view[:begin + length - self._size]]
+
+
+class _ConsoleClient:
+    """
+    Client reading the output of a console at its own pace.
+
+    The output is written to the client transport as soon as it's read
+    from the console, until the transport buffer is full. Then the client
+    is drained in the background and catches up from the ring buffer, the
+    output older than the buffer is lost for this client.
+    """
+
+    def __init__(self, writer, buffer):
+
+        self._writer = writer
+        self._buffer = buffer
+        # replay the scrollback
+        self._position = buffer.start
+        self._draining = None
+        self.lost = 0
+
+    def flush(self):
+        """
+        Writes the output not sent yet to the client.
+        """
+
+        if self._draining or self._writer.transport.is_closing():
+            return
+        if self._position < self._buffer.start:
+            self.lost += self._buffer.start - self._position
+            self._position = self._buffer.start
+        for data in self._buffer.read(self._position):
+            self._writer.write(data)
+            self._position += len(data)
+            data.release()
+        if self._writer.transport.get_write_buffer_size() > CLIENT_WRITE_BUFFER_SIZE:
+            self._draining = asyncio.ensure_future(self._drain())
+
+    async def _drain(self):
+
+        try:
+            await self._writer.drain()
+        except ConnectionError:
+            return
+        finally:
+            self._draining = None
+        self.flush()
+
+    def close(self):
+
+        if self._draining:
+            self._draining.cancel()
+        self._writer.close()
 
 
 class TelnetConnection(object):
@@ -114,11 +224,13 @@ class TelnetConnection(object):
 class AsyncioTelnetServer:
     MAX_NEGOTIATION_READ = 10
 
-    def __init__(self, reader=None, writer=None, binary=True, echo=False, naws=False, window_size_changed_callback=None, connection_factory=None):
+    def __init__(self, reader=None, writer=None, binary=True, echo=False, naws=False, window_size_changed_callback=None, connection_factory=None, scrollback_size=SCROLLBACK_SIZE, history=None):
         """
         Initializes telnet server
         :param naws when True make a window size negotiation
         :param connection_factory: when set it's possible to inject own implementation of connection
+        :param scrollback_size: size of the output kept for the clients which are late and replayed to the new clients
+        :param history: ConsoleHistory instance recording the output
         """
         assert connection_factory is None or (connection_factory is not None and reader is None and writer is None), \
             "Please use either reader and writer either connection_factory, otherwise duplicate data may be produced."
@@ -126,9 +238,10 @@ class AsyncioTelnetServer:
         self._reader = reader
         self._writer = writer
         self._connections = dict()
-        self._lock = asyncio.Lock()
-        self._reader_process = None
-        self._current_read = None
+        self._clients = dict()
+        self._buffer = ConsoleBuffer(scrollback_size)
+        self._reader_task = None
+        self._history = history
         self._window_size_changed_callback = window_size_changed_callback
 
         self._binary = binary
@@ -146,6 +259,10 @@ class AsyncioTelnetServer:
 
         self._connection_factory = connection_factory
 
+        if self._reader and self._history is not None:
+            # the output is recorded even when no client is connected
+            self._reader_task = asyncio.ensure_future(self._read_output())
+
     @staticmethod
     async def write_client_intro(writer, echo=False):
         # Send initial telnet session opening
@@ -198,21 +315,32 @@ class AsyncioTelnetServer:
         try:
             await self._write_intro(network_writer, echo=self._echo, binary=self._binary, naws=self._naws)
             await connection.connected()
+            if self._reader:
+                client = _ConsoleClient(network_writer, self._buffer)
+                self._clients[network_writer] = client
+                client.flush()
+                if self._reader_task is None:
+                    # the output is read once for all the clients
+                    self._reader_task = asyncio.ensure_future(self._read_output())
+                elif self._reader_task.done():
+                    # the console has been closed, the client only gets the last output
+                    raise ConnectionResetError()
             await self._process(network_reader, network_writer, connection)
         except ConnectionError:
-            async with self._lock:
-                network_writer.close()
-                if self._reader_process == network_reader:
-                    self._reader_process = None
-                    # Cancel current read from this reader
-                    if self._current_read is not None:
-                        self._current_read.cancel()
-
+            network_writer.close()
             await connection.disconnected()
-            del self._connections[network_writer]
+        finally:
+            client = self._clients.pop(network_writer, None)
+            if client:
+                client.close()
+                if client.lost:
+                    log.debug("Console client lost {} bytes of output".format(client.lost))
+            self._connections.pop(network_writer, None)
 
     async def close(self):
-        for writer, connection in self._connections.items():
+        if self._reader_task:
+            self._reader_task.cancel()
+        for writer, connection in list(self._connections.items()):
             try:
                 writer.write_eof()
                 await writer.drain()
@@ -222,75 +350,57 @@ class AsyncioTelnetServer:
     async def client_connected_hook(self):
         pass
 
-    async def _get_reader(self, network_reader):
+    async def _read_output(self):
         """
-        Get a reader or None if another reader is already reading.
+        Reads the console output into the ring buffer and sends it
+        to the clients, a client late does not block the others.
         """
-        async with self._lock:
-            if self._reader_process is None:
-                self._reader_process = network_reader
-            if self._reader:
-                if self._reader_process == network_reader:
-                    self._current_read = asyncio.ensure_future(self._reader.read(READ_SIZE))
-                    return self._current_read
-        return None
+
+        try:
+            while True:
+                try:
+                    data = await self._reader.read(OUTPUT_READ_SIZE)
+                except ConnectionError:
+                    break
+                if not data:
+                    break
+                self._buffer.append(data)
+                if self._history is not None:
+                    self._history.append(data)
+                for client in list(self._clients.values()):
+                    client.flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("Error while reading the console output: {}".format(e), exc_info=1)
+        finally:
+            # the console is closed, disconnect the clients
+            for client in list(self._clients.values()):
+                client.close()
 
     async def _process(self, network_reader, network_writer, connection):
-        network_read = asyncio.ensure_future(network_reader.read(READ_SIZE))
-        reader_read = await self._get_reader(network_reader)
 
         while True:
-            if reader_read is None:
-                reader_read = await self._get_reader(network_reader)
-            if reader_read is None:
-                done, pending = await asyncio.wait(
-                    [
-                        network_read,
-                    ],
-                    timeout=1,
-                    return_when=asyncio.FIRST_COMPLETED)
-            else:
-                done, pending = await asyncio.wait(
-                    [
-                        network_read,
-                        reader_read
-                    ],
-                    return_when=asyncio.FIRST_COMPLETED)
-            for coro in done:
-                data = coro.result()
-                if coro == network_read:
-                    if network_reader.at_eof():
-                        raise ConnectionResetError()
-
-                    network_read = asyncio.ensure_future(network_reader.read(READ_SIZE))
-
-                    if IAC in data:
-                        data = await self._IAC_parser(data, network_reader, network_writer, connection)
-
-                    if len(data) == 0:
-                        continue
-
-                    if not self._binary:
-                        data = data.replace(b"\r\n", b"\n")
-
-                    if self._writer:
-                        self._writer.write(data)
-                        await self._writer.drain()
-
-                    await connection.feed(data)
-                    if connection.is_closing:
-                        raise ConnectionResetError()
-
-                elif coro == reader_read:
-                    if self._reader and self._reader.at_eof():
-                        raise ConnectionResetError()
-
-                    reader_read = await self._get_reader(network_reader)
-
-                    # Replicate the output on all clients
-                    for connection in self._connections.values():
-                        connection.writer.write(data)
-                        await connection.writer.drain()
+            data = await network_reader.read(READ_SIZE)
+            if network_reader.at_eof() and not data:
+                raise ConnectionResetError()
+
+            if IAC in data:
+                data = await self._IAC_parser(data, network_reader, network_writer, connection)
+
+            if len(data) == 0:
+                continue
+
+            if not self._binary:
+                data = data.replace(b"\r\n", b"\n")
+
+            if self._writer:
+                self._writer.write(data)
+                await self._writer.drain()
+
+            await connection.feed(data)
+            if connection.is_closing:
+                raise ConnectionResetError()
 
     async def _read(self, cmd, buffer, location, reader):
         """ Reads next op from the buffer or reader"""
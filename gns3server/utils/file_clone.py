@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Copy files without duplicating their data when the file system allows it.
+"""
+
+import os
+import sys
+import stat
+import errno
+import shutil
+
+import logging
+log = logging.getLogger(__name__)
+
+# _IOW(0x94, 9, int): share the extents of a file (Btrfs, XFS, OCFS2...)
+FICLONE = 0x40049409
+
+# errors returned when the file system cannot clone or link the file
+_UNSUPPORTED_ERRORS = (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.EPERM, errno.EMLINK, errno.ENOSYS)
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+def _reflink(src, dst):
+    """
+    Clones a file, the data is shared until one of the files is modified.
+
+    :returns: True if the file has been cloned
+    """
+
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+    with open(src, "rb") as fsrc:
+        with open(dst, "wb") as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                return True
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRORS:
+                    raise
+    return False
+
+
+def _copy(src, dst):
+    """
+    Copies the data of a file, the data is not sent through Python on Linux.
+    """
+
+    with open(src, "rb") as fsrc:
+        with open(dst, "wb") as fdst:
+            if sys.platform.startswith("linux"):
+                size = os.fstat(fsrc.fileno()).st_size
+                offset = 0
+                try:
+                    while offset < size:
+                        sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, min(size - offset, 1 << 30))
+                        if sent == 0:
+                            break
+                        offset += sent
+                    return
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_ERRORS or offset:
+                        raise
+            shutil.copyfileobj(fsrc, fdst, CHUNK_SIZE)
+
+
+def clone_file(src, dst, allow_hardlink=True):
+    """
+    Copies a file with the cheapest method supported by the file system:
+    a reflink, a hard link when the file is read-only (nobody
+    can modify it) or a copy of the data.
+
+    The permission bits and modification time are kept.
+
+    :param src: Source path
+    :param dst: Destination path, must not exist
+    :param allow_hardlink: A read-only file can be hard linked
+
+    :returns: Method used ("reflink", "hardlink" or "copy")
+    """
+
+    st = os.stat(src)
+    if allow_hardlink and not st.st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRORS:
+                raise
+
+    if _reflink(src, dst):
+        method = "reflink"
+    else:
+        _copy(src, dst)
+        method = "copy"
+    shutil.copystat(src, dst)
+    return method
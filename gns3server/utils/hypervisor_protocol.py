@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Parser of the responses sent by the Dynamips and uBridge hypervisors.
+
+Responses are of the form:
+  1xx yyyyyy\r\n
+  1xx yyyyyy\r\n
+  ...
+  100-yyyy\r\n
+or
+  2xx-yyyy\r\n
+
+Where 1xx is a code from 100-199 for a success or 200-299 for an error.
+The hypervisors answer the commands in the order they have been received
+so several commands can be sent before reading the responses.
+"""
+
+import re
+
+
+class HypervisorResponseParser:
+    """
+    Splits the data received from a hypervisor into responses.
+    """
+
+    error_re = re.compile(r"""^2[0-9]{2}-""")
+    success_re = re.compile(r"""^1[0-9]{2}\s{1}""")
+
+    def __init__(self):
+
+        self._buffer = ""
+        self._lines = []
+
+    def feed(self, data):
+        """
+        Parses received data.
+
+        :param data: Data received from the hypervisor (string)
+
+        :returns: List of complete responses, each response is a tuple
+        (error, lines) where lines are the result lines without the codes
+        or the error message if error is True
+        """
+
+        responses = []
+        lines = (self._buffer + data).split("\r\n")
+        # the last element is an incomplete line (or empty)
+        self._buffer = lines.pop()
+        for line in lines:
+            if self.error_re.search(line):
+                responses.append((True, line[4:]))
+                self._lines = []
+            elif line[:4] == "100-":
+                result = self._lines
+                self._lines = []
+                if line[4:] != "OK":
+                    result.append(line[4:])
+                responses.append((False, [l[4:] if self.success_re.search(l) else l for l in result]))
+            else:
+                self._lines.append(line)
+        return responses
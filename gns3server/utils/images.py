@@ -16,7 +16,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import sys
+import json
+import time
+import ctypes
+import ctypes.util
+import struct
 import hashlib
+import threading
+import concurrent.futures
 
 from ..config import Config
 from . import force_unix_path
@@ -25,15 +33,308 @@ from . import force_unix_path
 import logging
 log = logging.getLogger(__name__)
 
+CHECKSUM_BUFFER_SIZE = 1024 * 1024
+CHECKSUM_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class _DirectoryWatcher:
+    """
+    Watches the images directories with a single inotify instance (Linux only).
+    The events are read on demand from a non-blocking file descriptor,
+    no thread is needed.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ONLYDIR = 0x01000000
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self):
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor => indexes watching the directory
+        self._indexes = {}
+        self._changed = set()
+        self._lock = threading.Lock()
+
+    def watch(self, directory, index):
+        """
+        Watches the files added, removed or written in a directory
+
+        :param directory: Directory path
+        :param index: DirectoryIndex notified of the changes
+        """
+
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO | self.IN_CREATE | \
+            self.IN_DELETE | self.IN_DELETE_SELF | self.IN_MOVE_SELF | self.IN_ONLYDIR
+        with self._lock:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), mask)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, "inotify_add_watch failed for {}: {}".format(directory, os.strerror(errno)))
+            self._indexes.setdefault(wd, set()).add(index)
+
+    def changed(self, index):
+        """
+        :returns: True if the directories of the index have changed since the
+        last call, the checksum files and hidden files are ignored
+        """
+
+        with self._lock:
+            self._read_events()
+            if index in self._changed:
+                self._changed.discard(index)
+                return True
+            return False
+
+    def _read_events(self):
+
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    # events have been lost
+                    for indexes in self._indexes.values():
+                        self._changed.update(indexes)
+                # events without name are about the watched directory itself
+                elif not name or not (name.startswith(b".") or name.endswith(b".md5sum")):
+                    self._changed.update(self._indexes.get(wd, ()))
+
+
+_directory_watcher_instance = None
+_directory_watcher_lock = threading.Lock()
+
+
+def _directory_watcher():
+    """
+    :returns: The _DirectoryWatcher shared by the indexes or None if inotify is not available
+    """
+
+    global _directory_watcher_instance
+
+    with _directory_watcher_lock:
+        if _directory_watcher_instance is None and sys.platform.startswith("linux"):
+            try:
+                _directory_watcher_instance = _DirectoryWatcher()
+            except (OSError, AttributeError) as e:
+                log.debug("Can't watch the images directories, they are polled: {}".format(e))
+                _directory_watcher_instance = False
+        return _directory_watcher_instance or None
+
+
+class DirectoryIndex:
+    """
+    In-memory index of the files in an images directory.
+
+    On Linux the directories are watched with inotify, the index is
+    scanned again when a file is added, removed or written. On the other
+    platforms the index is revalidated using the modification time of the
+    directories (adding, removing or renaming a file changes it) and the
+    files are checked at an interval to detect the images modified in place.
+
+    :param directory: Directory to index
+    :param recurse: Index the sub directories
+    """
+
+    # directories modified recently are scanned again because the
+    # modification time granularity of some file systems is coarse
+    UNSTABLE_DELAY = 2
+
+    # without inotify, delay between two checks of the size and
+    # modification time of the files
+    FILES_CHECK_INTERVAL = 30
+
+    def __init__(self, directory, recurse=True):
+
+        self._directory = directory
+        self._recurse = recurse
+        self._mtimes = None
+        self._files = []
+        self._by_name = {}
+        self._generation = 0
+        self._unstable = False
+        self._watcher = None
+        self._signatures = None
+        self._files_checked = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        """
+        Incremented every time the directory content changes
+        """
+
+        return self._generation
+
+    def _is_valid(self):
+
+        if self._mtimes is None or self._directory not in self._mtimes:
+            return False
+        if self._watcher is not None:
+            return not self._watcher.changed(self)
+        if self._unstable:
+            return False
+        for directory, mtime in self._mtimes.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        if time.monotonic() - self._files_checked > self.FILES_CHECK_INTERVAL:
+            self._files_checked = time.monotonic()
+            return self._file_signatures() == self._signatures
+        return True
+
+    def _file_signatures(self):
+
+        signatures = {}
+        for root, filename in self._files:
+            try:
+                signatures[(root, filename)] = ChecksumIndex.signature(os.stat(os.path.join(root, filename)))
+            except OSError:
+                signatures[(root, filename)] = None
+        return signatures
+
+    def _watch(self, directory):
+        """
+        Watches a directory before it is listed, falls back to the
+        modification times when inotify is not available.
+        """
+
+        if self._watcher is None:
+            return
+        try:
+            self._watcher.watch(directory, self)
+        except OSError as e:
+            log.debug("Can't watch images directory {}: {}".format(directory, e))
+            self._watcher = None
+
+    def _scan(self):
+
+        if self._mtimes is None and self._watcher is None:
+            self._watcher = _directory_watcher()
+        elif self._watcher is not None:
+            # the events received before the scan are outdated
+            self._watcher.changed(self)
+
+        mtimes = {}
+        files = []
+        by_name = {}
+        unstable = False
+        now = time.time()
+        if os.path.isdir(self._directory):
+            self._watch(self._directory)
+        for root, dirs, filenames in _os_walk(self._directory, recurse=self._recurse):
+            try:
+                mtime = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
+            mtimes[root] = mtime
+            if now - mtime / 1e9 < self.UNSTABLE_DELAY:
+                unstable = True
+            for directory in dirs:
+                self._watch(os.path.join(root, directory))
+            for filename in filenames:
+                files.append((root, filename))
+                by_name.setdefault(filename, []).append(root)
+        self._mtimes = mtimes
+        self._files = files
+        self._by_name = by_name
+        self._unstable = unstable
+        if self._watcher is None:
+            self._signatures = self._file_signatures()
+            self._files_checked = time.monotonic()
+        self._generation += 1
+
+    def refresh(self):
+        """
+        Scan the directory again if its content has changed
+        """
+
+        with self._lock:
+            if not self._is_valid():
+                try:
+                    self._scan()
+                except OSError as e:
+                    log.warning("Can't index images directory {}: {}".format(self._directory, e))
+                    self._mtimes = None
+                    self._files = []
+                    self._by_name = {}
+                    self._generation += 1
+
+    def files(self):
+        """
+        :returns: List of (root, filename) in the directory
+        """
+
+        self.refresh()
+        return self._files
+
+    def find(self, searched_file):
+        """
+        Search for a file in the directory and its sub directories
+
+        :param searched_file: File name, optionally prefixed by its parent directory name
+        :returns: Path or None if not found
+        """
+
+        self.refresh()
+        s = os.path.split(searched_file)
+        for root in self._by_name.get(s[1], []):
+            # If filename is the same
+            if s[0] == '' or s[0] == os.path.basename(root):
+                path = os.path.normpath(os.path.join(root, s[1]))
+                if os.path.exists(path):
+                    return path
+        return None
+
+
+_directory_indexes = {}
+_directory_indexes_lock = threading.Lock()
+_images_cache = {}
+_images_cache_lock = threading.Lock()
+
+
+def directory_index(directory, recurse=True):
+    """
+    :returns: The shared DirectoryIndex instance for a directory
+    """
+
+    key = (os.path.normpath(directory), recurse)
+    with _directory_indexes_lock:
+        if key not in _directory_indexes:
+            _directory_indexes[key] = DirectoryIndex(key[0], recurse=recurse)
+        return _directory_indexes[key]
+
 
 def list_images(type):
     """
     Scan directories for available image for a type
 
+    The result is cached until the content of one of the images
+    directories changes, including an image modified in place.
+
     :param type: emulator type (dynamips, qemu, iou)
     """
-    files = set()
-    images = []
 
     server_config = Config.instance().get_section_config("Server")
     general_images_directory = os.path.expanduser(server_config.get("images_path", "~/GNS3/images"))
@@ -41,6 +342,7 @@ def list_images(type):
     # Subfolder of the general_images_directory specific to this VM type
     default_directory = default_images_directory(type)
 
+    indexes = []
     for directory in images_directories(type):
 
         # We limit recursion to path outside the default images directory
@@ -49,41 +351,68 @@ def list_images(type):
         recurse = True
         if os.path.commonprefix([directory, general_images_directory]) == general_images_directory:
             recurse = False
+        index = directory_index(directory, recurse=recurse)
+        index.refresh()
+        indexes.append(index)
+
+    signature = (default_directory, tuple((id(index), index.generation) for index in indexes))
+    with _images_cache_lock:
+        cached = _images_cache.get(type)
+    if cached is not None and cached[0] == signature:
+        images = cached[1]
+    else:
+        images = _scan_images(type, indexes, default_directory)
+        with _images_cache_lock:
+            _images_cache[type] = (signature, images)
+    return [dict(image) for image in images]
 
-        directory = os.path.normpath(directory)
-        for root, _, filenames in _os_walk(directory, recurse=recurse):
-            for filename in filenames:
-                path = os.path.join(root, filename)
-                if filename not in files:
-                    if filename.endswith(".md5sum") or filename.startswith("."):
-                        continue
-                    elif ((filename.endswith(".image") or filename.endswith(".bin")) and type == "dynamips") \
-                            or ((filename.endswith(".bin") or filename.startswith("i86bi")) and type == "iou") \
-                            or (not filename.endswith(".bin") and not filename.endswith(".image") and type == "qemu"):
-                        files.add(filename)
-
-                        # It the image is located in the standard directory the path is relative
-                        if os.path.commonprefix([root, default_directory]) != default_directory:
-                            path = os.path.join(root, filename)
-                        else:
-                            path = os.path.relpath(os.path.join(root, filename), default_directory)
-
-                        try:
-                            if type in ["dynamips", "iou"]:
-                                with open(os.path.join(root, filename), "rb") as f:
-                                    # read the first 7 bytes of the file.
-                                    elf_header_start = f.read(7)
-                                # valid IOS images must start with the ELF magic number, be 32-bit, big endian and have an ELF version of 1
-                                if not elf_header_start == b'\x7fELF\x01\x02\x01' and not elf_header_start == b'\x7fELF\x01\x01\x01':
-                                    continue
-
-                            images.append({
-                                "filename": filename,
-                                "path": force_unix_path(path),
-                                "md5sum": md5sum(os.path.join(root, filename)),
-                                "filesize": os.stat(os.path.join(root, filename)).st_size})
-                        except OSError as e:
-                            log.warning("Can't add image {}: {}".format(path, str(e)))
+
+def _scan_images(type, indexes, default_directory):
+
+    files = set()
+    images = []
+    images_paths = []
+
+    for index in indexes:
+        for root, filename in index.files():
+            path = os.path.join(root, filename)
+            if filename not in files:
+                if filename.endswith(".md5sum") or filename.startswith("."):
+                    continue
+                elif ((filename.endswith(".image") or filename.endswith(".bin")) and type == "dynamips") \
+                        or ((filename.endswith(".bin") or filename.startswith("i86bi")) and type == "iou") \
+                        or (not filename.endswith(".bin") and not filename.endswith(".image") and type == "qemu"):
+                    files.add(filename)
+
+                    # It the image is located in the standard directory the path is relative
+                    if os.path.commonprefix([root, default_directory]) != default_directory:
+                        path = os.path.join(root, filename)
+                    else:
+                        path = os.path.relpath(os.path.join(root, filename), default_directory)
+
+                    try:
+                        if type in ["dynamips", "iou"]:
+                            with open(os.path.join(root, filename), "rb") as f:
+                                # read the first 7 bytes of the file.
+                                elf_header_start = f.read(7)
+                            # valid IOS images must start with the ELF magic number, be 32-bit, big endian and have an ELF version of 1
+                            if not elf_header_start == b'\x7fELF\x01\x02\x01' and not elf_header_start == b'\x7fELF\x01\x01\x01':
+                                continue
+
+                        stat = os.stat(os.path.join(root, filename))
+                        images.append({
+                            "filename": filename,
+                            "path": force_unix_path(path),
+                            "filesize": stat.st_size})
+                        images_paths.append(os.path.join(root, filename))
+                    except OSError as e:
+                        log.warning("Can't add image {}: {}".format(path, str(e)))
+
+    # checksums are computed in parallel, hashlib releases the GIL on large buffers
+    with concurrent.futures.ThreadPoolExecutor(max_workers=CHECKSUM_WORKERS) as executor:
+        for image, digest in zip(images, executor.map(md5sum, images_paths)):
+            image["md5sum"] = digest
+    _checksum_index().save()
     return images
 
 
@@ -143,6 +472,141 @@ def images_directories(type):
     return [force_unix_path(p) for p in paths if os.path.exists(p)]
 
 
+class ChecksumIndex:
+    """
+    Persistent index of the image checksums.
+
+    An entry is valid as long as the size, modification time and
+    inode of the image are unchanged, so images are never hashed twice.
+
+    :param path: Path of the index file
+    """
+
+    def __init__(self, path):
+
+        self._path = path
+        self._entries = None
+        self._modified = False
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def _load(self):
+
+        self._entries = {}
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                self._entries = entries
+        except (OSError, ValueError) as e:
+            if os.path.exists(self._path):
+                log.warning("Can't load the checksum index {}: {}".format(self._path, e))
+
+    @staticmethod
+    def signature(stat):
+
+        return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+    def lookup(self, path, stat):
+        """
+        Lookup the checksum of an image
+
+        :param path: Path to the image
+        :param stat: Result of os.stat() for the image
+        :returns: Tuple (known, digest), known is True if the image is in the index
+        and digest is None if the image has changed since it has been indexed
+        """
+
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            entry = self._entries.get(path)
+        if entry is None:
+            return False, None
+        if entry[:3] == self.signature(stat):
+            return True, entry[3]
+        return True, None
+
+    def update(self, path, stat, digest):
+
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            self._entries[path] = self.signature(stat) + [digest]
+            self._modified = True
+
+    def remove(self, path):
+
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            if self._entries.pop(path, None) is not None:
+                self._modified = True
+
+    def save(self):
+        """
+        Write the index on disk if it has been modified
+        """
+
+        with self._lock:
+            if not self._modified:
+                return
+            try:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                with open(self._path + ".tmp", "w+", encoding="utf-8") as f:
+                    json.dump(self._entries, f)
+                os.replace(self._path + ".tmp", self._path)
+                self._modified = False
+            except OSError as e:
+                log.error("Can't write the checksum index {}: {}".format(self._path, e))
+
+
+_checksum_index_instance = None
+
+
+def _checksum_index():
+    """
+    :returns: The checksum index stored next to the images directory
+    """
+
+    global _checksum_index_instance
+
+    server_config = Config.instance().get_section_config("Server")
+    img_dir = os.path.expanduser(server_config.get("images_path", "~/GNS3/images"))
+    # not in the images directory, writing the index would invalidate its cache
+    path = os.path.join(os.path.dirname(os.path.normpath(img_dir)), ".image_checksums.json")
+    if _checksum_index_instance is None or _checksum_index_instance.path != path:
+        _checksum_index_instance = ChecksumIndex(path)
+    return _checksum_index_instance
+
+
+def compute_md5sum(path, stopped_event=None):
+    """
+    Compute the md5sum of a file using large buffers
+
+    :param path: Path to the file
+    :param stopped_event: In case you execute this function on thread and would like to have possibility
+                          to cancel operation pass the `threading.Event`
+    :returns: Digest of the file or None if the operation has been cancelled
+    """
+
+    m = hashlib.md5()
+    buf = bytearray(CHECKSUM_BUFFER_SIZE)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            if stopped_event is not None and stopped_event.is_set():
+                return None
+            size = f.readinto(buf)
+            if not size:
+                break
+            m.update(view[:size])
+    return m.hexdigest()
+
+
 def md5sum(path, stopped_event=None):
     """
     Return the md5sum of an image and cache it on disk
@@ -157,26 +621,33 @@ def md5sum(path, stopped_event=None):
         return None
 
     try:
-        with open(path + '.md5sum') as f:
-            md5 = f.read().strip()
-            if len(md5) == 32:
-                return md5
-    # Unicode error is when user rename an image to .md5sum ....
-    except (OSError, UnicodeDecodeError):
-        pass
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    index = _checksum_index()
+    path = os.path.abspath(path)
+    known, digest = index.lookup(path, stat)
+    if digest is not None:
+        return digest
+
+    # the .md5sum file is trusted unless the index knows the image has changed
+    if not known:
+        try:
+            with open(path + '.md5sum') as f:
+                md5 = f.read().strip()
+                if len(md5) == 32:
+                    index.update(path, stat, md5)
+                    return md5
+        # Unicode error is when user rename an image to .md5sum ....
+        except (OSError, UnicodeDecodeError):
+            pass
 
     try:
-        m = hashlib.md5()
-        with open(path, 'rb') as f:
-            while True:
-                if stopped_event is not None and stopped_event.is_set():
-                    log.error("MD5 sum calculation of `{}` has stopped due to cancellation".format(path))
-                    return
-                buf = f.read(128)
-                if not buf:
-                    break
-                m.update(buf)
-        digest = m.hexdigest()
+        digest = compute_md5sum(path, stopped_event)
+        if digest is None:
+            log.error("MD5 sum calculation of `{}` has stopped due to cancellation".format(path))
+            return None
     except OSError as e:
         log.error("Can't create digest of %s: %s", path, str(e))
         return None
@@ -187,6 +658,8 @@ def md5sum(path, stopped_event=None):
     except OSError as e:
         log.error("Can't write digest of %s: %s", path, str(e))
 
+    index.update(path, stat, digest)
+    index.save()
     return digest
 
 
@@ -195,6 +668,7 @@ def remove_checksum(path):
     Remove the checksum of an image from cache if exists
     """
 
+    _checksum_index().remove(os.path.abspath(path))
     path = '{}.md5sum'.format(path)
     if os.path.exists(path):
         os.remove(path)
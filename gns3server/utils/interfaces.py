@@ -18,10 +18,12 @@
 
 import os
 import sys
+import time
 import aiohttp
 import socket
 import struct
 import psutil
+import threading
 
 from .windows_service import check_windows_service_is_running
 from gns3server.config import Config
@@ -32,6 +34,14 @@ if psutil.version_info < (3, 0, 0):
 import logging
 log = logging.getLogger(__name__)
 
+# Delay in seconds before the interfaces are refreshed when the changes can't be received from netlink
+INTERFACES_SNAPSHOT_TTL = 5
+
+# Netlink multicast groups of the link and address changes
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
 
 def _get_windows_interfaces_from_registry():
 
@@ -175,6 +185,76 @@ def is_interface_bridge(interface):
     return os.path.exists(os.path.join("/sys/class/net/", interface, "bridge"))
 
 
+class _InterfacesSnapshot:
+    """
+    Network interfaces of the host shared by all the nodes. On Linux the
+    snapshot is refreshed after a link or address change is received from
+    netlink, on the other platforms it's refreshed after a delay.
+    """
+
+    def __init__(self):
+
+        self._interfaces = None
+        self._allowed_interfaces = None
+        self._timestamp = 0
+        self._netlink = None
+        self._lock = threading.Lock()
+
+    def get(self, allowed_interfaces):
+        """
+        :param allowed_interfaces: allowed_interfaces setting of the server
+        :returns: list of network interfaces
+        """
+
+        with self._lock:
+            if self._interfaces is None or allowed_interfaces != self._allowed_interfaces or self._changed():
+                if self._netlink is None and sys.platform.startswith("linux"):
+                    # listen before reading the interfaces to not miss a change
+                    self._netlink = self._open_netlink()
+                self._interfaces = _host_interfaces(allowed_interfaces)
+                self._allowed_interfaces = allowed_interfaces
+                self._timestamp = time.monotonic()
+            return self._interfaces
+
+    def _changed(self):
+        """
+        :returns: True if the interfaces may have changed since the snapshot
+        """
+
+        if not self._netlink:
+            return time.monotonic() - self._timestamp > INTERFACES_SNAPSHOT_TTL
+        changed = False
+        while True:
+            try:
+                if not self._netlink.recv(65536):
+                    break
+            except BlockingIOError:
+                break
+            except OSError:
+                # too many changes, the kernel has dropped messages
+                return True
+            changed = True
+        return changed
+
+    @staticmethod
+    def _open_netlink():
+        """
+        :returns: Netlink socket receiving the link and address changes, False if not available
+        """
+
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+            sock.setblocking(False)
+            return sock
+        except (OSError, AttributeError) as e:
+            log.warning("Cannot receive the network interface changes, the interfaces are refreshed every {} seconds: {}".format(INTERFACES_SNAPSHOT_TTL, e))
+            return False
+
+
+_snapshot = _InterfacesSnapshot()
+
+
 def interfaces():
     """
     Gets the network interfaces on this server.
@@ -182,9 +262,23 @@ def interfaces():
     :returns: list of network interfaces
     """
 
-    results = []
+    allowed_interfaces = None
     if not sys.platform.startswith("win"):
         allowed_interfaces = Config.instance().get_section_config("Server").get("allowed_interfaces", None)
+    # the caller can modify the interfaces without changing the snapshot
+    return [dict(interface) for interface in _snapshot.get(allowed_interfaces)]
+
+
+def _host_interfaces(allowed_interfaces):
+    """
+    Reads the network interfaces of the host.
+
+    :param allowed_interfaces: allowed_interfaces setting of the server
+    :returns: list of network interfaces
+    """
+
+    results = []
+    if not sys.platform.startswith("win"):
         if allowed_interfaces:
             allowed_interfaces = allowed_interfaces.split(',')
         net_if_addrs = psutil.net_if_addrs()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Registry of compiled JSON schema validators.
+
+jsonschema.validate() checks the schema itself and builds a new validator
+each time it is called, schemas are registered here once and their
+validator is reused.
+"""
+
+import logging
+import itertools
+import jsonschema
+import jsonschema.validators
+
+from ..config import Config
+
+log = logging.getLogger(__name__)
+
+# id of the schema => (schema, validator)
+_validators = {}
+
+_output_counter = itertools.count()
+
+
+def get_validator(schema):
+    """
+    Returns the validator of a schema, the schema is checked and
+    the validator is built the first time.
+
+    :param schema: JSON schema (dictionary)
+
+    :returns: jsonschema validator instance
+    """
+
+    entry = _validators.get(id(schema))
+    # the id of a schema could be reused after it has been garbage collected
+    if entry is None or entry[0] is not schema:
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        entry = (schema, cls(schema))
+        _validators[id(schema)] = entry
+    return entry[1]
+
+
+def register(*schemas):
+    """
+    Compiles the validators of schemas, empty schemas are ignored.
+
+    :param schemas: JSON schemas
+    """
+
+    for schema in schemas:
+        if schema:
+            get_validator(schema)
+
+
+def validate(instance, schema):
+    """
+    Validates an instance like jsonschema.validate() with a cached validator.
+
+    :param instance: Object to validate
+    :param schema: JSON schema
+
+    :raises jsonschema.ValidationError: if the instance is invalid
+    """
+
+    get_validator(schema).validate(instance)
+
+
+def should_validate_output():
+    """
+    Returns if an API response must be checked against its output schema.
+
+    The "output_validation" server setting can be:
+      * always: every response is checked
+      * sample: one response out of "output_validation_sample_rate" is checked
+      * debug: responses are checked only when the debug logs are enabled (default)
+      * never: responses are never checked
+
+    :returns: boolean
+    """
+
+    server_config = Config.instance().get_section_config("Server")
+    mode = server_config.get("output_validation", "debug")
+    if mode == "always":
+        return True
+    if mode == "sample":
+        rate = max(1, int(server_config.get("output_validation_sample_rate", 100)))
+        return next(_output_counter) % rate == 0
+    if mode == "never":
+        return False
+    return log.getEffectiveLevel() <= logging.DEBUG
@@ -27,6 +27,7 @@ import sys
 import os
 
 from ..utils.get_resource import get_resource
+from ..utils import json_schema
 from ..version import __version__
 
 log = logging.getLogger(__name__)
@@ -41,7 +42,10 @@ class Response(aiohttp.web.Response):
         self._route = route
         self._output_schema = output_schema
         self._request = request
-        headers['Connection'] = "close"  # Disable keep alive because create trouble with old Qt (5.2, 5.3 and 5.4)
+        headers = dict(headers)
+        # The compute API is only used by the controller which keeps its connections alive
+        if route is None or "/compute/" not in route:
+            headers['Connection'] = "close"  # Disable keep alive because create trouble with old Qt (5.2, 5.3 and 5.4)
         headers['X-Route'] = self._route
         headers['Server'] = "Python/{0[0]}.{0[1]} GNS3/{1}".format(sys.version_info, __version__)
         super().__init__(headers=headers, **kwargs)
@@ -106,9 +110,9 @@ class Response(aiohttp.web.Response):
                     elem = elem.__json__()
                 newanswer.append(elem)
             answer = newanswer
-        if self._output_schema is not None:
+        if self._output_schema and json_schema.should_validate_output():
             try:
-                jsonschema.validate(answer, self._output_schema)
+                json_schema.validate(answer, self._output_schema)
             except jsonschema.ValidationError as e:
                 log.error("Invalid output query. JSON schema error: {}".format(e.message))
                 raise aiohttp.web.HTTPBadRequest(text="{}".format(e))
@@ -31,6 +31,7 @@ from ..controller.gns3vm.gns3_vm_error import GNS3VMError
 from .response import Response
 from ..crash_report import CrashReport
 from ..config import Config
+from ..utils import json_schema
 
 
 import logging
@@ -57,7 +58,7 @@ async def parse_request(request, input_schema, raw):
 
     if input_schema:
         try:
-            jsonschema.validate(request.json, input_schema)
+            json_schema.validate(request.json, input_schema)
         except jsonschema.ValidationError as e:
             message = "JSON schema error with API request '{}' and JSON data '{}': {}".format(request.path_qs,
                                                                                               request.json,
@@ -137,6 +138,8 @@ class Route(object):
         input_schema = kw.get("input", {})
         api_version = kw.get("api_version", 2)
         raw = kw.get("raw", False)
+        # compile the validators when the handlers are loaded
+        json_schema.register(input_schema, output_schema)
 
         def register(func):
             # Add the type of server to the route
@@ -266,16 +269,7 @@ class Route(object):
                     else:
                         type = "controller"
                     lock_key = "{}:{}:{}".format(type, request.match_info["project_id"], node_id)
-                    cls._node_locks.setdefault(lock_key, {"lock": asyncio.Lock(), "concurrency": 0})
-                    cls._node_locks[lock_key]["concurrency"] += 1
-
-                    async with cls._node_locks[lock_key]["lock"]:
-                        response = await control_schema(request)
-                    cls._node_locks[lock_key]["concurrency"] -= 1
-
-                    # No more waiting requests, garbage collect the lock
-                    if cls._node_locks[lock_key]["concurrency"] <= 0:
-                        del cls._node_locks[lock_key]
+                    response = await cls.run_with_node_lock(lock_key, control_schema, request)
                 else:
                     response = await control_schema(request)
                 return response
@@ -285,6 +279,27 @@ class Route(object):
             return node_concurrency
         return register
 
+    @classmethod
+    async def run_with_node_lock(cls, lock_key, func, *args):
+        """
+        Run a coroutine function while holding the lock of a node
+
+        :param lock_key: Lock identifier (type:project_id:node_id)
+        :param func: Coroutine function
+        :returns: Result of the function
+        """
+
+        cls._node_locks.setdefault(lock_key, {"lock": asyncio.Lock(), "concurrency": 0})
+        cls._node_locks[lock_key]["concurrency"] += 1
+        try:
+            async with cls._node_locks[lock_key]["lock"]:
+                return await func(*args)
+        finally:
+            cls._node_locks[lock_key]["concurrency"] -= 1
+            # No more waiting requests, garbage collect the lock
+            if cls._node_locks[lock_key]["concurrency"] <= 0:
+                del cls._node_locks[lock_key]
+
     @classmethod
     def get_routes(cls):
         return cls._routes
@@ -38,6 +38,7 @@ from .route import Route
 from ..config import Config
 from ..compute import MODULES
 from ..compute.port_manager import PortManager
+from ..compute.base_manager import BaseManager
 from ..compute.qemu import Qemu
 from ..controller import Controller
 
@@ -122,6 +123,7 @@ class WebServer:
             log.debug("Unloading module {}".format(module.__name__))
             m = module.instance()
             await m.unload()
+        await BaseManager.close_ubridge_pool()
 
         if PortManager.instance().tcp_ports:
             log.warning("TCP ports are still used {}".format(PortManager.instance().tcp_ports))
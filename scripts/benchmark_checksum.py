@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the throughput of the image checksum with 128 bytes reads
+(previous implementation) and the large buffer engine on sparse files.
+
+Usage: python scripts/benchmark_checksum.py --size 4096 --legacy-size 256
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gns3server.config import Config
+from gns3server.utils.images import compute_md5sum, md5sum
+
+
+def legacy_md5sum(path):
+
+    m = hashlib.md5()
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(128)
+            if not buf:
+                break
+            m.update(buf)
+    return m.hexdigest()
+
+
+def create_sparse_file(path, size):
+
+    with open(path, "wb") as f:
+        f.truncate(size)
+        # some data to not only hash zeroes
+        f.write(os.urandom(1024 * 1024))
+
+
+def measure(name, func, path):
+
+    size = os.path.getsize(path)
+    begin = time.time()
+    func(path)
+    elapsed = time.time() - begin
+    print("{:<32} {:>8.0f} MB in {:>7.3f}s {:>8.1f} MB/s".format(name, size / 1024 / 1024, elapsed, size / 1024 / 1024 / elapsed))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the image checksum")
+    parser.add_argument("--size", type=int, default=4096, help="size of the sparse image in MB")
+    parser.add_argument("--legacy-size", type=int, default=256, help="size of the image in MB for the 128 bytes implementation")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        Config.instance().set("Server", "images_path", tmpdir)
+
+        legacy_image = os.path.join(tmpdir, "legacy.qcow2")
+        create_sparse_file(legacy_image, args.legacy_size * 1024 * 1024)
+        measure("128 bytes reads", legacy_md5sum, legacy_image)
+        measure("large buffer", compute_md5sum, legacy_image)
+
+        image = os.path.join(tmpdir, "image.qcow2")
+        create_sparse_file(image, args.size * 1024 * 1024)
+        measure("large buffer", compute_md5sum, image)
+        measure("md5sum() first call", md5sum, image)
+        measure("md5sum() unchanged image", md5sum, image)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Console of a chatty router shared by many telnet clients.
+
+A thread writes router log lines as fast as it can to a pipe read by the
+telnet server, like an emulator writing to its console: it blocks when the
+pipe is full. The telnet clients read everything, except the stalled client
+which connects but never reads.
+
+With --history the output is also recorded in a compressed console history.
+
+Usage: python scripts/benchmark_console_fanout.py --clients 1 10 50 --duration 5 [--history]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gns3server.utils.asyncio.telnet_server import AsyncioTelnetServer
+from gns3server.utils.asyncio.console_history import ConsoleHistory
+
+LINE = b"*Mar  1 00:00:00.000: %LINEPROTO-5-UPDOWN: Line protocol on Interface GigabitEthernet0/0, changed state to up\r\n"
+
+
+class Router(threading.Thread):
+
+    def __init__(self, fd):
+
+        super().__init__(daemon=True)
+        self._fd = fd
+        self.written = 0
+        self.running = True
+
+    def run(self):
+
+        data = LINE * 64
+        while self.running:
+            try:
+                self.written += os.write(self._fd, data)
+            except OSError:
+                break
+
+
+async def client(host, port, received, index):
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            received[index] += len(data)
+    except (asyncio.CancelledError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run(clients, stalled, duration, history):
+
+    loop = asyncio.get_event_loop()
+    read_fd, write_fd = os.pipe()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, "rb", 0))
+    telnet = AsyncioTelnetServer(reader=reader, writer=None, binary=True, echo=True, history=ConsoleHistory() if history else None)
+    server = await asyncio.start_server(telnet.run, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    stalled_connection = None
+    if stalled:
+        # connected but never reads
+        stalled_connection = await asyncio.open_connection("127.0.0.1", port)
+    received = [0] * clients
+    tasks = [asyncio.ensure_future(client("127.0.0.1", port, received, i)) for i in range(clients)]
+    await asyncio.sleep(0.5)
+
+    router = Router(write_fd)
+    cpu = time.process_time()
+    router.start()
+    await asyncio.sleep(duration)
+    router.running = False
+    written = router.written
+    cpu = time.process_time() - cpu
+    os.close(write_fd)
+    await asyncio.sleep(0.5)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if stalled_connection:
+        stalled_connection[1].close()
+    server.close()
+    await server.wait_closed()
+    return written / duration, sum(received) / max(1, clients) / duration, cpu / max(1, written / 1024 / 1024)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the console fan-out")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50], help="numbers of clients")
+    parser.add_argument("--duration", type=float, default=5, help="duration of each run in seconds")
+    parser.add_argument("--history", action="store_true", help="record the output in a console history")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    print("{:>8} {:>8} {:>16} {:>20} {:>12}".format("clients", "stalled", "router (MB/s)", "per client (MB/s)", "CPU s/MB"))
+    for clients in args.clients:
+        for stalled in (False, True):
+            router_rate, client_rate, cpu = loop.run_until_complete(run(clients, stalled, args.duration, args.history))
+            print("{:>8} {:>8} {:>16.1f} {:>20.1f} {:>12.3f}".format(clients, "yes" if stalled else "no", router_rate / 1024 / 1024, client_rate / 1024 / 1024, cpu))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare one round trip per command (previous implementation) with the
+batched commands when configuring the bridges of the links of a node.
+
+A fake hypervisor answers each command after --latency milliseconds to
+simulate a remote hypervisor (for instance in the GNS3 VM).
+
+Usage: python scripts/benchmark_hypervisor_batch.py --links 200 --latency 0.5
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gns3server.ubridge.ubridge_hypervisor import UBridgeHypervisor
+
+
+class FakeHypervisor:
+
+    def __init__(self, latency):
+
+        self._latency = latency
+
+    async def _handle(self, reader, writer):
+
+        # the responses are delayed without delaying the next commands
+        # like the round trip time of a network
+        loop = asyncio.get_event_loop()
+        responses = asyncio.Queue()
+        sender = asyncio.ensure_future(self._send(writer, responses))
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b"hypervisor version"):
+                response = b"100-0.9.18\r\n"
+            else:
+                response = b"100-OK\r\n"
+            await responses.put((loop.time() + self._latency, response))
+        sender.cancel()
+        writer.close()
+
+    async def _send(self, writer, responses):
+
+        loop = asyncio.get_event_loop()
+        while True:
+            due, response = await responses.get()
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            writer.write(response)
+            await writer.drain()
+
+    async def start(self):
+
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return server, server.sockets[0].getsockname()[1]
+
+
+def link_commands(index):
+
+    bridge_name = "QEMU-{}".format(index)
+    port = 20000 + index * 4
+    return ["bridge create {}".format(bridge_name),
+            "bridge add_nio_udp {} {} 127.0.0.1 {}".format(bridge_name, port, port + 1),
+            "bridge add_nio_udp {} {} 127.0.0.1 {}".format(bridge_name, port + 2, port + 3),
+            "bridge start {}".format(bridge_name),
+            "bridge reset_packet_filters {}".format(bridge_name),
+            "bridge add_packet_filter {} filter0 latency 10".format(bridge_name)]
+
+
+async def sequential(hypervisor, links):
+
+    for index in range(links):
+        for command in link_commands(index):
+            await hypervisor.send(command)
+
+
+async def batched(hypervisor, links):
+
+    for index in range(links):
+        await hypervisor.send_batch(link_commands(index))
+
+
+async def benchmark(args):
+
+    server, port = await FakeHypervisor(args.latency / 1000).start()
+    hypervisor = UBridgeHypervisor("127.0.0.1", port)
+    await hypervisor.connect()
+
+    print("{:<12} {:>10} {:>10} {:>14}".format("mode", "commands", "time (s)", "per link (ms)"))
+    commands = args.links * len(link_commands(0))
+    for name, func in (("sequential", sequential), ("batched", batched)):
+        begin = time.time()
+        await func(hypervisor, args.links)
+        elapsed = time.time() - begin
+        print("{:<12} {:>10} {:>10.3f} {:>14.3f}".format(name, commands, elapsed, elapsed / args.links * 1000))
+
+    await hypervisor.close()
+    server.close()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the batched hypervisor commands")
+    parser.add_argument("--links", type=int, default=200, help="number of links")
+    parser.add_argument("--latency", type=float, default=0, help="round trip time to the hypervisor in milliseconds")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(benchmark(args))
+
+
+if __name__ == '__main__':
+    main()
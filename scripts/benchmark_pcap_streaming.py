@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the CPU used to stream packet captures by polling the files every
+100ms (previous implementation) and by following them with FileTail.
+
+Each capture receives --rate packets per second and is watched by --viewers
+clients. The captures are written by another process, like uBridge does, and
+the CPU time of the streaming process includes the threads reading the files.
+The modes are measured in turn for --rounds rounds and the median is reported.
+
+Usage: python scripts/benchmark_pcap_streaming.py --captures 50 --viewers 2 --rate 10 --duration 10
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gns3server.utils.asyncio.file_tail import FileTail
+
+PACKET = b"\x00" * 100
+
+
+class Capture:
+
+    def __init__(self, path):
+
+        self.path = path
+        self.capturing = True
+        self.received = 0
+        with open(path, "wb") as f:
+            f.write(b"\xd4\xc3\xb2\xa1" + b"\x00" * 20)
+
+
+def write_packets(paths, rate, stop):
+    """
+    Writes the packets of all the captures, runs in a separate process.
+    """
+
+    files = [open(path, "ab", buffering=0) for path in paths]
+    next_write = time.monotonic()
+    while not stop.is_set():
+        for f in files:
+            f.write(PACKET)
+        next_write += 1 / rate
+        time.sleep(max(0, next_write - time.monotonic()))
+    for f in files:
+        f.close()
+
+
+async def legacy_viewer(capture):
+
+    with open(capture.path, "rb") as f:
+        while capture.capturing:
+            data = f.read(1024 * 8)
+            if not data:
+                await asyncio.sleep(0.1)
+                continue
+            capture.received += len(data)
+
+
+async def tail_viewer(capture, tail):
+
+    reader = await tail.open_reader()
+    try:
+        while True:
+            data = await reader.read()
+            if not data:
+                break
+            capture.received += len(data)
+    finally:
+        await reader.close()
+
+
+async def run(mode, args, tmpdir, index):
+
+    captures = [Capture(os.path.join(tmpdir, "{}-{}-{}.pcap".format(mode, index, i))) for i in range(args.captures)]
+    stop = multiprocessing.Event()
+    writer = multiprocessing.Process(target=write_packets, args=([capture.path for capture in captures], args.rate, stop))
+    writer.start()
+    tasks = []
+    for capture in captures:
+        if mode == "polling":
+            viewers = [legacy_viewer(capture) for _ in range(args.viewers)]
+        else:
+            tail = FileTail(capture.path, lambda capture=capture: capture.capturing)
+            viewers = [tail_viewer(capture, tail) for _ in range(args.viewers)]
+        tasks.extend(asyncio.ensure_future(viewer) for viewer in viewers)
+
+    cpu = time.process_time()
+    await asyncio.sleep(args.duration)
+    cpu = time.process_time() - cpu
+    stop.set()
+    writer.join()
+    for capture in captures:
+        capture.capturing = False
+    await asyncio.gather(*tasks)
+    return cpu, sum(capture.received for capture in captures)
+
+
+async def benchmark(args, tmpdir):
+
+    results = {"polling": [], "tail": []}
+    for index in range(args.rounds):
+        for mode in results:
+            results[mode].append(await run(mode, args, tmpdir, index))
+
+    print("{:<10} {:>10} {:>10} {:>20} {:>14}".format("mode", "captures", "viewers", "streaming CPU (%)", "received (KB)"))
+    for mode, measures in results.items():
+        cpu = statistics.median(cpu for cpu, _ in measures)
+        received = statistics.median(received for _, received in measures)
+        print("{:<10} {:>10} {:>10} {:>20.1f} {:>14}".format(mode, args.captures, args.viewers, cpu / args.duration * 100, int(received) // 1024))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the packet capture streaming")
+    parser.add_argument("--captures", type=int, default=50, help="number of captures")
+    parser.add_argument("--viewers", type=int, default=1, help="number of viewers per capture")
+    parser.add_argument("--rate", type=float, default=10, help="packets per second on each capture")
+    parser.add_argument("--duration", type=float, default=10, help="duration of the measure in seconds")
+    parser.add_argument("--rounds", type=int, default=3, help="number of measures of each mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(benchmark(args, tmpdir))
+
+
+if __name__ == '__main__':
+    main()
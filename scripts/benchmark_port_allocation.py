@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the linear port search (previous implementation) with the
+bitmap allocator when allocating console and UDP ports.
+
+Some ports of the ranges can be bound by this script with --busy to
+simulate other programs running on the host.
+
+Usage: python scripts/benchmark_port_allocation.py --ports 2000 --busy 200
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import aiohttp.web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gns3server.compute.port_manager import PortManager, BANNED_PORTS
+
+
+class Project:
+
+    def record_tcp_port(self, port):
+        pass
+
+    def record_udp_port(self, port):
+        pass
+
+    def remove_tcp_port(self, port):
+        pass
+
+    def remove_udp_port(self, port):
+        pass
+
+
+def legacy_find_unused_port(start_port, end_port, host="127.0.0.1", socket_type="TCP", ignore_ports=None):
+
+    for port in range(start_port, end_port + 1):
+        if ignore_ports and (port in ignore_ports or port in BANNED_PORTS):
+            continue
+        try:
+            PortManager._check_port(host, port, socket_type)
+            if host != "0.0.0.0":
+                PortManager._check_port("0.0.0.0", port, socket_type)
+            return port
+        except OSError:
+            continue
+    raise aiohttp.web.HTTPConflict(text="Could not find a free port")
+
+
+def legacy_allocate(count, start_port, end_port, host, socket_type):
+
+    used = set()
+    for _ in range(count):
+        used.add(legacy_find_unused_port(start_port, end_port, host=host, socket_type=socket_type, ignore_ports=used))
+    return used
+
+
+def allocate(count, socket_type):
+
+    port_manager = PortManager()
+    port_manager.console_host = "127.0.0.1"
+    project = Project()
+    if socket_type == "TCP":
+        return port_manager.get_free_tcp_ports(project, count)
+    return port_manager.get_free_udp_ports(project, count)
+
+
+def bind_busy_ports(count, start_port, socket_type):
+    """
+    Binds ports spread at the beginning of the range like other programs would.
+    """
+
+    sockets = []
+    for port in range(start_port, start_port + count * 2, 2):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM if socket_type == "TCP" else socket.SOCK_DGRAM)
+        try:
+            sock.bind(("0.0.0.0", port))
+            if socket_type == "TCP":
+                sock.listen(1)
+        except OSError:
+            sock.close()
+            continue
+        sockets.append(sock)
+    return sockets
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the port allocation")
+    parser.add_argument("--ports", type=int, default=2000, help="number of ports to allocate")
+    parser.add_argument("--busy", type=int, default=0, help="number of ports already used by other programs")
+    args = parser.parse_args()
+
+    print("{:<6} {:<10} {:>8} {:>14} {:>10} {:>8}".format("type", "range", "ports", "linear (ms)", "bitmap (ms)", "speedup"))
+    for socket_type, (start_port, end_port), host in (("TCP", (5000, 10000), "127.0.0.1"), ("UDP", (20000, 30000), "0.0.0.0")):
+        sockets = bind_busy_ports(args.busy, start_port, socket_type)
+        try:
+            begin = time.time()
+            legacy_allocate(args.ports, start_port, end_port, host, socket_type)
+            legacy = (time.time() - begin) * 1000
+            begin = time.time()
+            allocate(args.ports, socket_type)
+            bitmap = (time.time() - begin) * 1000
+        finally:
+            for sock in sockets:
+                sock.close()
+        print("{:<6} {:<10} {:>8} {:>14.1f} {:>10.1f} {:>7.1f}x".format(socket_type,
+                                                                        "{}-{}".format(start_port, end_port),
+                                                                        args.ports,
+                                                                        legacy,
+                                                                        bitmap,
+                                                                        legacy / bitmap))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the time to list the projects when the controller starts: full
+topology loading (previous implementation), first start with the project
+catalog and next starts with the catalog index.
+
+Usage: python scripts/benchmark_project_catalog.py --projects 300 --nodes 100
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+
+from fake_compute import synthetic_topology, setup_controller
+
+
+async def benchmark(args, tmpdir):
+
+    from gns3server.controller.topology import load_topology
+
+    controller = setup_controller(tmpdir)
+    projects_path = os.path.join(tmpdir, "projects")
+    paths = []
+    for index in range(args.projects):
+        project_id = str(uuid.uuid4())
+        project_dir = os.path.join(projects_path, "project{}".format(index))
+        os.makedirs(project_dir)
+        topology = synthetic_topology(project_id, args.nodes, ["local"])
+        topology["name"] = "project{}".format(index)
+        path = os.path.join(project_dir, "project{}.gns3".format(index))
+        with open(path, "w+") as f:
+            json.dump(topology, f)
+        paths.append(path)
+
+    begin = time.time()
+    for path in paths:
+        load_topology(path)
+    print("{:<34} {:>8.3f} seconds".format("full topology loading", time.time() - begin))
+
+    for name in ("catalog (first start)", "catalog (next start)"):
+        controller._projects = {}
+        controller._project_catalog = None
+        begin = time.time()
+        await controller.load_projects()
+        print("{:<34} {:>8.3f} seconds".format(name, time.time() - begin))
+    assert len(controller.projects) == args.projects
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the project catalog")
+    parser.add_argument("--projects", type=int, default=300, help="number of projects")
+    parser.add_argument("--nodes", type=int, default=100, help="number of nodes per project")
+    args = parser.parse_args()
+
+    sys._called_from_test = True
+    with tempfile.TemporaryDirectory() as tmpdir:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(benchmark(args, tmpdir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the duplication of a local project through a zip file (export then
+import, previous implementation) and the direct duplication.
+
+Each node has a disk filled with random data. The directory must be on the
+file system to test (use a Btrfs or XFS directory to test the reflinks),
+it needs three times the size of the disks.
+
+Usage: python scripts/benchmark_project_duplicate.py --nodes 10 --size 20 --dir /var/tmp
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import zipfile
+import asyncio
+import argparse
+import tempfile
+
+from fake_compute import synthetic_topology, setup_controller
+
+
+def create_disks(project_dir, topology, size):
+
+    block = os.urandom(1024 * 1024)
+    per_node = size * 1024 // len(topology["topology"]["nodes"])
+    for node in topology["topology"]["nodes"]:
+        node_dir = os.path.join(project_dir, "project-files", node["node_type"], node["node_id"])
+        os.makedirs(node_dir)
+        with open(os.path.join(node_dir, "hda_disk.qcow2"), "wb") as f:
+            for i in range(per_node):
+                # avoid blocks deduplicated or compressed by the file system
+                f.write(i.to_bytes(8, "little") + block[8:])
+
+
+async def zip_duplicate(controller, project):
+
+    import aiofiles
+    from gns3server.utils.asyncio import aiozipstream
+    from gns3server.controller.export_project import export_project
+    from gns3server.controller.import_project import import_project
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(project.path)) as tmpdir:
+        with aiozipstream.ZipFile(compression=zipfile.ZIP_STORED) as zstream:
+            await export_project(zstream, project, tmpdir, keep_compute_id=True, allow_all_nodes=True, reset_mac_addresses=True)
+            project_path = os.path.join(tmpdir, "project.gns3p")
+            async with aiofiles.open(project_path, 'wb') as f:
+                async for chunk in zstream:
+                    await f.write(chunk)
+            with open(project_path, "rb") as f:
+                return await import_project(controller, str(uuid.uuid4()), f, keep_compute_id=True)
+
+
+async def direct_duplicate(controller, project):
+
+    from gns3server.controller.duplicate_project import duplicate_project
+    return await duplicate_project(controller, project, str(uuid.uuid4()))
+
+
+async def benchmark(args, tmpdir):
+
+    controller = setup_controller(tmpdir)
+    project_id = str(uuid.uuid4())
+    project_dir = os.path.join(tmpdir, "projects", project_id)
+    os.makedirs(project_dir)
+    topology = synthetic_topology(project_id, args.nodes, ["local"])
+    with open(os.path.join(project_dir, "benchmark.gns3"), "w+") as f:
+        json.dump(topology, f)
+    create_disks(project_dir, topology, args.size)
+    project = await controller.load_project(os.path.join(project_dir, "benchmark.gns3"), load=False)
+
+    print("{} nodes, {} GB of disks".format(args.nodes, args.size))
+    for name, duplicate in (("zip export / import", zip_duplicate), ("direct", direct_duplicate)):
+        os.sync()
+        begin = time.time()
+        new_project = await duplicate(controller, project)
+        os.sync()
+        print("{:<22} {:>8.1f} seconds".format(name, time.time() - begin))
+        controller.remove_project(new_project)
+        shutil.rmtree(new_project.path)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the project duplication")
+    parser.add_argument("--nodes", type=int, default=10, help="number of nodes")
+    parser.add_argument("--size", type=int, default=20, help="total size of the disks in GB")
+    parser.add_argument("--dir", help="directory where the projects are created")
+    args = parser.parse_args()
+
+    sys._called_from_test = True
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmpdir:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(benchmark(args, tmpdir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the export of the files of remote computes downloaded one at a time
+into temporary files (previous implementation) and the streamed export.
+
+Each fake compute serves small configuration files and a few disks with a
+bandwidth limit per download. The archive is read like the HTTP handler
+does but its content is discarded.
+
+Usage: python scripts/benchmark_project_export.py --computes 2 --files 200 --disks 4 --disk-size 64
+"""
+
+import os
+import sys
+import time
+import uuid
+import asyncio
+import zipfile
+import argparse
+import tempfile
+
+from fake_compute import FakeCompute, setup_controller
+
+
+async def sequential_export(zstream, project, temporary_dir):
+
+    import aiofiles
+
+    for compute in project.computes:
+        for compute_file in await compute.list_files(project):
+            response = await compute.download_file(project, compute_file["path"])
+            (fd, temp_path) = tempfile.mkstemp(dir=temporary_dir)
+            async with aiofiles.open(fd, 'wb') as f:
+                while True:
+                    data = await response.content.read(1024 * 8)
+                    if not data:
+                        break
+                    await f.write(data)
+            response.close()
+            zstream.write(temp_path, arcname=compute_file["path"])
+
+
+async def streamed_export(zstream, project, temporary_dir):
+
+    from gns3server.controller.export_project import export_project
+    await export_project(zstream, project, temporary_dir, keep_compute_id=True, allow_all_nodes=True)
+
+
+def directory_size(path):
+
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            size += os.path.getsize(os.path.join(root, file))
+    return size
+
+
+async def benchmark(args, tmpdir):
+
+    from gns3server.config import Config
+    from gns3server.controller.compute import Compute
+    from gns3server.controller.project import Project
+    from gns3server.utils.asyncio import aiozipstream
+
+    controller = setup_controller(tmpdir)
+    Config.instance().set("Server", "export_download_concurrency", str(args.concurrency))
+    fake_computes = []
+    project = Project(controller=controller, name="benchmark", path=os.path.join(tmpdir, "project"))
+    with open(os.path.join(project.path, "benchmark.gns3"), "w+") as f:
+        f.write("{}")
+    for i in range(args.computes):
+        files = {}
+        for j in range(args.files):
+            files["project-files/vpcs/node{}-{}/startup.vpc".format(i, j)] = 4096
+        for j in range(args.disks):
+            files["project-files/qemu/disk{}-{}/hda_disk.qcow2".format(i, j)] = args.disk_size * 1024 * 1024
+        fake_compute = FakeCompute(latency=args.latency, files=files, bandwidth=args.bandwidth * 1024 * 1024 if args.bandwidth else None)
+        await fake_compute.start()
+        fake_computes.append(fake_compute)
+        compute_id = "compute{}".format(i)
+        compute = Compute(compute_id, controller=controller, host=fake_compute.host, port=fake_compute.port, name=compute_id)
+        controller._computes[compute_id] = compute
+        project._project_created_on_compute.add(compute)
+
+    total = sum(files.values()) * args.computes / 1024 / 1024
+    print("{} computes, {} files of 4KB and {} disks of {}MB per compute ({:.0f}MB), {}ms per request, {} MB/s per download".format(args.computes, args.files, args.disks, args.disk_size, total, int(args.latency * 1000), args.bandwidth or "unlimited"))
+    print("{:<12} {:>10} {:>12} {:>18}".format("mode", "time (s)", "MB/s", "temp files (MB)"))
+    for name, export in (("sequential", sequential_export), ("streamed", streamed_export)):
+        temporary_dir = os.path.join(tmpdir, str(uuid.uuid4()))
+        os.makedirs(temporary_dir)
+        begin = time.time()
+        size = 0
+        with aiozipstream.ZipFile(compression=zipfile.ZIP_STORED) as zstream:
+            await export(zstream, project, temporary_dir)
+            async for chunk in zstream:
+                size += len(chunk)
+        elapsed = time.time() - begin
+        print("{:<12} {:>10.2f} {:>12.1f} {:>18.1f}".format(name, elapsed, total / elapsed, directory_size(temporary_dir) / 1024 / 1024))
+
+    for compute in list(controller.computes.values()):
+        await compute.close()
+    for fake_compute in fake_computes:
+        await fake_compute.stop()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the export of the files of remote computes")
+    parser.add_argument("--computes", type=int, default=2, help="number of fake computes")
+    parser.add_argument("--files", type=int, default=200, help="small files per compute")
+    parser.add_argument("--disks", type=int, default=4, help="disks per compute")
+    parser.add_argument("--disk-size", type=int, default=64, help="size of the disks in MB")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bandwidth of each download in MB/s (0 for unlimited)")
+    parser.add_argument("--latency", type=float, default=0.01, help="latency of each compute request in seconds")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent downloads of the streamed export")
+    args = parser.parse_args()
+
+    sys._called_from_test = True  # do not try to reconnect the computes
+    with tempfile.TemporaryDirectory() as tmpdir:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(benchmark(args, tmpdir))
+
+
+if __name__ == '__main__':
+    main()
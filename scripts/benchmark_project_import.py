@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the import of a project on a GNS3 VM after extracting the whole
+archive (previous implementation, still used for the topologies of the
+previous GNS3 versions) and the import copying each file of the archive
+to its destination.
+
+The QEMU nodes run on a fake GNS3 VM, the VPCS nodes on the local compute.
+The bytes written to the disk are read from /proc/self/io (Linux only).
+
+Usage: python scripts/benchmark_project_import.py --nodes 10 --size 2 --dir /var/tmp
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import zipfile
+import asyncio
+import argparse
+import tempfile
+from unittest.mock import patch
+
+from fake_compute import FakeCompute, setup_controller
+
+
+def create_archive(path, nodes, size):
+
+    from gns3server.version import __version__
+
+    topology_nodes = []
+    block = os.urandom(1024 * 1024)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as zip_file:
+        for i in range(nodes):
+            node_id = str(uuid.uuid4())
+            topology_nodes.append({"compute_id": "vm", "node_id": node_id, "node_type": "qemu", "name": "QEMU{}".format(i), "properties": {}})
+            with zip_file.open("project-files/qemu/{}/hda_disk.qcow2".format(node_id), "w", force_zip64=True) as f:
+                for j in range(size * 1024 // nodes):
+                    f.write(j.to_bytes(8, "little") + block[8:])
+            node_id = str(uuid.uuid4())
+            topology_nodes.append({"compute_id": "local", "node_id": node_id, "node_type": "vpcs", "name": "PC{}".format(i), "properties": {}})
+            zip_file.writestr("project-files/vpcs/{}/startup.vpc".format(node_id), "ip dhcp\n")
+        topology = {
+            "name": "benchmark",
+            "project_id": str(uuid.uuid4()),
+            "revision": 9,
+            "topology": {"computes": [], "drawings": [], "links": [], "nodes": topology_nodes},
+            "type": "topology",
+            "version": __version__
+        }
+        zip_file.writestr("project.gns3", json.dumps(topology))
+
+
+def written_bytes():
+
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+async def benchmark(args, tmpdir):
+
+    from gns3server.controller.compute import Compute
+    from gns3server.controller.import_project import import_project
+
+    controller = setup_controller(tmpdir)
+    fake_compute = FakeCompute(latency=0.01)
+    await fake_compute.start()
+    controller._computes["vm"] = Compute("vm", controller=controller, host=fake_compute.host, port=fake_compute.port, name="vm")
+
+    archive = os.path.join(tmpdir, "project.gns3project")
+    create_archive(archive, args.nodes, args.size)
+    print("{} QEMU nodes on a GNS3 VM and {} VPCS nodes, {} GB of disks".format(args.nodes, args.nodes, args.size))
+    print("{:<14} {:>10} {:>16} {:>14}".format("mode", "time (s)", "disk writes (GB)", "uploaded (GB)"))
+    for mode in ("extract all", "streaming"):
+        os.sync()
+        fake_compute.uploaded = 0
+        writes = written_bytes()
+        begin = time.time()
+        with open(archive, "rb") as f:
+            if mode == "extract all":
+                # a revision more recent than the archive selects the previous implementation
+                with patch("gns3server.controller.import_project.GNS3_FILE_FORMAT_REVISION", 10):
+                    project = await import_project(controller, str(uuid.uuid4()), f, keep_compute_id=True)
+            else:
+                project = await import_project(controller, str(uuid.uuid4()), f, keep_compute_id=True)
+        os.sync()
+        elapsed = time.time() - begin
+        print("{:<14} {:>10.1f} {:>16.2f} {:>14.2f}".format(mode, elapsed, (written_bytes() - writes) / 1024 ** 3, fake_compute.uploaded / 1024 ** 3))
+        controller.remove_project(project)
+
+    for compute in list(controller.computes.values()):
+        await compute.close()
+    await fake_compute.stop()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the project import")
+    parser.add_argument("--nodes", type=int, default=10, help="number of QEMU nodes")
+    parser.add_argument("--size", type=int, default=2, help="total size of the disks in GB")
+    parser.add_argument("--dir", help="directory where the projects are created")
+    args = parser.parse_args()
+
+    sys._called_from_test = True  # do not try to reconnect the computes
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmpdir:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(benchmark(args, tmpdir))
+
+
+if __name__ == '__main__':
+    main()
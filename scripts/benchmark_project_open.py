@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Open a synthetic topology against local fake computes and report the wall time.
+
+Usage: python scripts/benchmark_project_open.py --nodes 300 --computes 3 --latency 0.01
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+
+from fake_compute import FakeCompute, synthetic_topology, setup_controller
+
+
+async def benchmark(args, tmpdir):
+
+    from gns3server.controller.compute import Compute
+
+    controller = setup_controller(tmpdir)
+    fake_computes = []
+    compute_ids = []
+    for i in range(args.computes):
+        fake_compute = FakeCompute(latency=args.latency)
+        await fake_compute.start()
+        fake_computes.append(fake_compute)
+        compute_id = "local" if i == 0 else "compute{}".format(i)
+        controller._computes[compute_id] = Compute(compute_id, controller=controller, host=fake_compute.host, port=fake_compute.port, name=compute_id)
+        compute_ids.append(compute_id)
+
+    project_id = str(uuid.uuid4())
+    project_dir = os.path.join(tmpdir, "projects", project_id)
+    os.makedirs(project_dir)
+    path = os.path.join(project_dir, "benchmark.gns3")
+    with open(path, "w+") as f:
+        json.dump(synthetic_topology(project_id, args.nodes, compute_ids), f)
+
+    begin = time.time()
+    project = await controller.load_project(path)
+    elapsed = time.time() - begin
+
+    print("Opened {} nodes and {} links on {} compute(s) in {:.3f} seconds".format(len(project.nodes),
+                                                                                 len(project.links),
+                                                                                 args.computes,
+                                                                                 elapsed))
+    for i, fake_compute in enumerate(fake_computes):
+        print("Compute {}: {} requests, {} max in flight".format(compute_ids[i], fake_compute.requests, fake_compute.max_in_flight))
+        stats = controller.get_compute(compute_ids[i]).http_stats()
+        print("    {} connections created, reuse ratio {}, average latency {:.1f}ms".format(stats["connections_created"],
+                                                                                      stats["reuse_ratio"],
+                                                                                      stats["average_latency"] * 1000))
+
+    await project.close()
+    for compute in list(controller.computes.values()):
+        await compute.close()
+    for fake_compute in fake_computes:
+        await fake_compute.stop()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the project opening")
+    parser.add_argument("--nodes", type=int, default=300, help="number of nodes")
+    parser.add_argument("--computes", type=int, default=3, help="number of fake computes")
+    parser.add_argument("--latency", type=float, default=0.01, help="latency of each compute request in seconds")
+    args = parser.parse_args()
+
+    sys._called_from_test = True  # do not try to reconnect the computes
+    with tempfile.TemporaryDirectory() as tmpdir:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(benchmark(args, tmpdir))
+
+
+if __name__ == '__main__':
+    main()
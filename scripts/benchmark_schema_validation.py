@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare jsonschema.validate() (previous implementation) with the cached
+validators on the schemas of the hottest routes and on a topology dump.
+
+Usage: python scripts/benchmark_schema_validation.py --iterations 1000
+"""
+
+import os
+import sys
+import copy
+import time
+import uuid
+import argparse
+import aiohttp.web  # imported before the controller modules
+import jsonschema
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gns3server.utils import json_schema
+from gns3server.schemas.node import NODE_OBJECT_SCHEMA, NODE_UPDATE_SCHEMA
+from gns3server.schemas.link import LINK_OBJECT_SCHEMA
+from gns3server.schemas.vpcs import VPCS_CREATE_SCHEMA
+from gns3server.schemas.topology import TOPOLOGY_SCHEMA
+from gns3server.schemas import dynamips_vm
+from gns3server.controller.topology import _topology_node_schema
+
+
+def node(node_type="vpcs", properties=None):
+
+    return {
+        "compute_id": "local",
+        "project_id": str(uuid.uuid4()),
+        "node_id": str(uuid.uuid4()),
+        "template_id": None,
+        "node_type": node_type,
+        "node_directory": None,
+        "name": "PC1",
+        "console": 5000,
+        "console_host": "127.0.0.1",
+        "console_type": "telnet",
+        "console_auto_start": False,
+        "command_line": "",
+        "properties": properties or {},
+        "status": "started",
+        "label": {"text": "PC1", "style": "", "x": 0, "y": -20, "rotation": 0},
+        "symbol": ":/symbols/computer.svg",
+        "width": 65,
+        "height": 45,
+        "x": 0,
+        "y": 0,
+        "z": 1,
+        "locked": False,
+        "port_name_format": "Ethernet{0}",
+        "port_segment_size": 0,
+        "first_port_name": None,
+        "custom_adapters": [],
+        "ports": []
+    }
+
+
+def topology(nodes):
+
+    dynamips_properties = {"platform": "c7200", "image": "c7200.image", "ram": 256, "dynamips_id": 1}
+    return {
+        "project_id": str(uuid.uuid4()),
+        "name": "benchmark",
+        "auto_start": False,
+        "auto_open": False,
+        "auto_close": True,
+        "revision": 9,
+        "type": "topology",
+        "version": "2.2.0",
+        "topology": {
+            "nodes": [{"compute_id": "local",
+                       "node_id": str(uuid.uuid4()),
+                       "node_type": "dynamips",
+                       "name": "R{}".format(i),
+                       "properties": dynamips_properties,
+                       "x": 0,
+                       "y": 0,
+                       "z": 1} for i in range(nodes)],
+            "links": [],
+            "drawings": [],
+            "computes": []
+        }
+    }
+
+
+def legacy_check_topology_schema(topo):
+
+    jsonschema.validate(topo, TOPOLOGY_SCHEMA)
+    for node in topo["topology"]["nodes"]:
+        schema = copy.deepcopy(dynamips_vm.VM_CREATE_SCHEMA)
+        for prop in ["name", "node_id"]:
+            del schema["properties"][prop]
+        schema["required"] = [p for p in schema["required"] if p not in ["name", "node_id"]]
+        jsonschema.validate(node["properties"], schema)
+
+
+def check_topology_schema(topo):
+
+    json_schema.validate(topo, TOPOLOGY_SCHEMA)
+    for node in topo["topology"]["nodes"]:
+        json_schema.validate(node["properties"], _topology_node_schema(node["node_type"]))
+
+
+def measure(func, iterations):
+
+    begin = time.time()
+    for _ in range(iterations):
+        func()
+    elapsed = time.time() - begin
+    return elapsed / iterations * 1000000
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the JSON schema validation")
+    parser.add_argument("--iterations", type=int, default=1000, help="number of validations per case")
+    parser.add_argument("--nodes", type=int, default=100, help="number of Dynamips nodes in the topology")
+    args = parser.parse_args()
+
+    cases = [
+        ("POST vpcs/nodes (input)", {"name": "PC1", "console": 5000, "startup_script": "ip dhcp"}, VPCS_CREATE_SCHEMA),
+        ("PUT nodes/{node_id} (input)", {"name": "PC1", "x": 10, "y": 20, "z": 1}, NODE_UPDATE_SCHEMA),
+        ("GET nodes/{node_id} (output)", node(), NODE_OBJECT_SCHEMA),
+        ("GET links/{link_id} (output)", {"link_id": str(uuid.uuid4()), "project_id": str(uuid.uuid4()), "nodes": [], "capturing": False, "link_type": "ethernet", "suspend": False, "filters": {}}, LINK_OBJECT_SCHEMA),
+    ]
+
+    print("{:<36} {:>14} {:>14} {:>8}".format("case", "validate (us)", "cached (us)", "speedup"))
+    for name, instance, schema in cases:
+        legacy = measure(lambda: jsonschema.validate(instance, schema), args.iterations)
+        cached = measure(lambda: json_schema.validate(instance, schema), args.iterations)
+        print("{:<36} {:>14.1f} {:>14.1f} {:>7.1f}x".format(name, legacy, cached, legacy / cached))
+
+    topo = topology(args.nodes)
+    iterations = max(1, args.iterations // 10)
+    legacy = measure(lambda: legacy_check_topology_schema(topo), iterations)
+    cached = measure(lambda: check_topology_schema(topo), iterations)
+    print("{:<36} {:>14.1f} {:>14.1f} {:>7.1f}x".format("Project.dump() {} Dynamips nodes".format(args.nodes), legacy, cached, legacy / cached))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the zip snapshots (previous implementation) and the snapshot store.
+
+Each node has a disk filled with random data, between two snapshots a few
+random clusters of the disks are modified like a running VM would do.
+
+Usage: python scripts/benchmark_snapshots.py --nodes 10 --size 2 --snapshots 10 --writes 50
+"""
+
+import os
+import sys
+import time
+import random
+import zipfile
+import asyncio
+import argparse
+import tempfile
+
+from fake_compute import setup_controller
+
+CLUSTER_SIZE = 64 * 1024
+
+
+def create_disks(project_path, nodes, size):
+
+    disks = []
+    block = os.urandom(1024 * 1024)
+    for index in range(nodes):
+        path = os.path.join(project_path, "project-files", "qemu", "node{}".format(index), "hda_disk.qcow2")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            for i in range(size * 1024 // nodes):
+                f.write(i.to_bytes(8, "little") + index.to_bytes(8, "little") + block[16:])
+        disks.append(path)
+    return disks
+
+
+def modify_disks(disks, writes):
+
+    for _ in range(writes):
+        path = random.choice(disks)
+        clusters = os.path.getsize(path) // CLUSTER_SIZE
+        with open(path, "r+b") as f:
+            f.seek(random.randrange(clusters) * CLUSTER_SIZE)
+            f.write(os.urandom(CLUSTER_SIZE))
+
+
+def directory_size(path):
+
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            size += os.path.getsize(os.path.join(root, file))
+    return size
+
+
+async def zip_snapshot(project, name):
+
+    import aiofiles
+    from gns3server.utils.asyncio import aiozipstream
+    from gns3server.controller.export_project import export_project
+
+    path = os.path.join(project.path, "snapshots", "{}_010120_000000.gns3project".format(name))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with aiozipstream.ZipFile(compression=zipfile.ZIP_STORED) as zstream:
+            await export_project(zstream, project, tmpdir, keep_compute_id=True, allow_all_nodes=True)
+            async with aiofiles.open(path, 'wb') as f:
+                async for chunk in zstream:
+                    await f.write(chunk)
+    project.reset()
+    return [s for s in project.snapshots.values() if s.name == name][0]
+
+
+async def store_snapshot(project, name):
+
+    return await project.snapshot(name)
+
+
+async def run(controller, mode, args, tmpdir):
+
+    from gns3server.controller.project import Project
+
+    random.seed(42)
+    project = Project(controller=controller, name=mode, path=os.path.join(tmpdir, mode))
+    controller._projects[project.id] = project
+    os.makedirs(os.path.join(project.path, "snapshots"))
+    disks = create_disks(project.path, args.nodes, args.size)
+
+    snapshot = zip_snapshot if mode == "zip" else store_snapshot
+    times = []
+    first = None
+    for index in range(args.snapshots):
+        begin = time.time()
+        result = await snapshot(project, "snap{}".format(index))
+        times.append(time.time() - begin)
+        if first is None:
+            first = result
+        modify_disks(disks, args.writes)
+
+    begin = time.time()
+    await first.restore()
+    restore_time = time.time() - begin
+    size = directory_size(os.path.join(project.path, "snapshots")) / 1024 / 1024 / 1024
+    print("{:<6} {:>16.1f} {:>14.1f} {:>12.1f} {:>12.2f}".format(mode, times[0], sum(times[1:]) / max(1, len(times) - 1), restore_time, size))
+
+
+async def benchmark(args, tmpdir):
+
+    controller = setup_controller(tmpdir)
+    print("{} nodes, {} GB of disks, {} snapshots, {} clusters of 64KB modified between snapshots".format(args.nodes, args.size, args.snapshots, args.writes))
+    print("{:<6} {:>16} {:>14} {:>12} {:>12}".format("mode", "first snap (s)", "next snap (s)", "restore (s)", "store (GB)"))
+    for mode in ("zip", "store"):
+        await run(controller, mode, args, tmpdir)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the snapshots")
+    parser.add_argument("--nodes", type=int, default=10, help="number of nodes")
+    parser.add_argument("--size", type=int, default=2, help="total size of the disks in GB")
+    parser.add_argument("--snapshots", type=int, default=10, help="number of snapshots")
+    parser.add_argument("--writes", type=int, default=50, help="clusters modified between two snapshots")
+    parser.add_argument("--dir", help="directory where the projects are created")
+    args = parser.parse_args()
+
+    sys._called_from_test = True
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmpdir:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(benchmark(args, tmpdir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Start all the nodes of a synthetic topology on local fake computes
+and report the time until all the nodes are started.
+
+Usage: python scripts/benchmark_start_all.py --nodes 200 --computes 2 --action-delay 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+
+from fake_compute import FakeCompute, synthetic_topology, setup_controller
+
+
+async def benchmark(args, tmpdir, nodes_action):
+
+    from gns3server.controller.compute import Compute
+
+    controller = setup_controller(tmpdir)
+    fake_computes = []
+    compute_ids = []
+    for i in range(args.computes):
+        fake_compute = FakeCompute(latency=args.latency, action_delay=args.action_delay, nodes_action=nodes_action)
+        await fake_compute.start()
+        fake_computes.append(fake_compute)
+        compute_id = "local" if i == 0 else "compute{}".format(i)
+        controller._computes[compute_id] = Compute(compute_id, controller=controller, host=fake_compute.host, port=fake_compute.port, name=compute_id)
+        compute_ids.append(compute_id)
+
+    project_id = str(uuid.uuid4())
+    project_dir = os.path.join(tmpdir, "projects", project_id)
+    os.makedirs(project_dir)
+    path = os.path.join(project_dir, "benchmark.gns3")
+    with open(path, "w+") as f:
+        json.dump(synthetic_topology(project_id, args.nodes, compute_ids), f)
+    project = await controller.load_project(path)
+
+    requests = sum(fake_compute.requests for fake_compute in fake_computes)
+    begin = time.time()
+    await project.start_all()
+    elapsed = time.time() - begin
+    requests = sum(fake_compute.requests for fake_compute in fake_computes) - requests
+
+    print("{:<28} {} nodes started in {:.3f} seconds with {} requests".format("multiple nodes action" if nodes_action else "one request per node",
+                                                                             len(project.nodes),
+                                                                             elapsed,
+                                                                             requests))
+
+    await project.close()
+    for compute in list(controller.computes.values()):
+        await compute.close()
+    for fake_compute in fake_computes:
+        await fake_compute.stop()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the start of all the nodes")
+    parser.add_argument("--nodes", type=int, default=200, help="number of nodes")
+    parser.add_argument("--computes", type=int, default=2, help="number of fake computes")
+    parser.add_argument("--latency", type=float, default=0.01, help="latency of each compute request in seconds")
+    parser.add_argument("--action-delay", type=float, default=0.05, help="time to start a node in seconds")
+    args = parser.parse_args()
+
+    sys._called_from_test = True  # do not try to reconnect the computes
+    loop = asyncio.get_event_loop()
+    for nodes_action in (False, True):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            loop.run_until_complete(benchmark(args, tmpdir, nodes_action))
+
+
+if __name__ == '__main__':
+    main()
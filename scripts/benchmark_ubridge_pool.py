@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the resources used by one uBridge hypervisor per node (previous
+implementation) and the shared hypervisors pool.
+
+The nodes create a bridge with two UDP NIOs like a VPCS node. Without
+uBridge installed, scripts/fake_ubridge.py is used: the number of processes
+and file descriptors are meaningful but the RSS is the one of a Python process.
+
+Usage: python scripts/benchmark_ubridge_pool.py --nodes 400 --shared 4 --ubridge /usr/bin/ubridge
+"""
+
+import os
+import sys
+import time
+import shutil
+import psutil
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gns3server.ubridge.hypervisor import Hypervisor
+from gns3server.ubridge.hypervisor_pool import UbridgeHypervisorPool
+
+
+def fake_ubridge(tmpdir):
+
+    path = os.path.join(tmpdir, "ubridge")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_ubridge.py")
+    with open(path, "w") as f:
+        f.write('#!/bin/sh\nexec "{}" "{}" "$@"\n'.format(sys.executable, script))
+    os.chmod(path, 0o755)
+    return path
+
+
+async def configure_node(hypervisor, index):
+
+    port = 20000 + index * 4
+    bridge_name = "VPCS-{}".format(index)
+    await hypervisor.send("bridge create {}".format(bridge_name))
+    await hypervisor.send("bridge add_nio_udp {} {} 127.0.0.1 {}".format(bridge_name, port, port + 1))
+    await hypervisor.send("bridge add_nio_udp {} {} 127.0.0.1 {}".format(bridge_name, port + 2, port + 3))
+    await hypervisor.send("bridge start {}".format(bridge_name))
+
+
+def measure():
+    """
+    :returns: number of uBridge processes, their RSS in MB and the file descriptors
+    of the server and uBridge processes
+    """
+
+    server = psutil.Process()
+    children = server.children(recursive=True)
+    rss = 0
+    fds = server.num_fds()
+    for child in children:
+        try:
+            rss += child.memory_info().rss
+            fds += child.num_fds()
+        except psutil.Error:
+            continue
+    return len(children), rss / 1024 / 1024, fds
+
+
+async def dedicated(path, tmpdir, nodes):
+
+    hypervisors = []
+    for index in range(nodes):
+        working_dir = os.path.join(tmpdir, "node{}".format(index))
+        os.makedirs(working_dir)
+        hypervisor = Hypervisor(None, path, working_dir, "127.0.0.1")
+        await hypervisor.start()
+        await hypervisor.connect()
+        await configure_node(hypervisor, index)
+        hypervisors.append(hypervisor)
+    result = measure()
+    for hypervisor in hypervisors:
+        await hypervisor.stop()
+    return result
+
+
+async def shared(path, nodes, size):
+
+    pool = UbridgeHypervisorPool(size, "127.0.0.1")
+    clients = []
+    for index in range(nodes):
+        client = await pool.acquire(path, "PC{}".format(index))
+        await configure_node(client, index)
+        clients.append(client)
+    result = measure()
+    for client in clients:
+        await client.stop()
+    return result
+
+
+async def benchmark(args, tmpdir):
+
+    path = args.ubridge or shutil.which("ubridge")
+    if path is None:
+        print("uBridge not found, using a fake uBridge (the RSS is not significant)")
+        path = fake_ubridge(tmpdir)
+
+    print("{:<28} {:>10} {:>10} {:>8} {:>9}".format("mode", "processes", "RSS (MB)", "fds", "time (s)"))
+    baseline = measure()
+    for name, coroutine in (("one hypervisor per node", dedicated(path, tmpdir, args.nodes)),
+                            ("{} shared hypervisors".format(args.shared), shared(path, args.nodes, args.shared))):
+        begin = time.time()
+        processes, rss, fds = await coroutine
+        print("{:<28} {:>10} {:>10.1f} {:>8} {:>9.2f}".format(name, processes, rss, fds - baseline[2], time.time() - begin))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the shared uBridge hypervisors")
+    parser.add_argument("--nodes", type=int, default=400, help="number of nodes")
+    parser.add_argument("--shared", type=int, default=4, help="number of shared hypervisors")
+    parser.add_argument("--ubridge", help="path to the uBridge executable")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(benchmark(args, tmpdir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Throughput of the zip stream used by the project exports.
+
+The files look like disk images: half of the blocks are random, the other
+half are compressible. The archive is read like the HTTP handler does but
+its content is discarded. The event loop lag is the maximum delay of a
+timer ticking every 10ms during the export.
+
+Usage: python scripts/benchmark_zipstream.py --files 4 --size 1024
+"""
+
+import os
+import sys
+import time
+import zipfile
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gns3server.utils.asyncio import aiozipstream
+
+
+def create_files(directory, files, size):
+
+    paths = []
+    random_block = os.urandom(1024 * 1024)
+    text_block = b"".join("line {} of a configuration file\n".format(i).encode() for i in range(32000))[:1024 * 1024]
+    for index in range(files):
+        path = os.path.join(directory, "disk{}.qcow2".format(index))
+        with open(path, "wb") as f:
+            for i in range(size // files):
+                block = random_block if i % 2 else text_block
+                f.write(i.to_bytes(8, "little") + index.to_bytes(8, "little") + block[16:])
+        paths.append(path)
+    return paths
+
+
+async def measure_lag(lags):
+
+    while True:
+        begin = time.monotonic()
+        await asyncio.sleep(0.01)
+        lags.append(time.monotonic() - begin - 0.01)
+
+
+async def export(paths, compression, options):
+
+    size = 0
+    lags = []
+    ticker = asyncio.ensure_future(measure_lag(lags))
+    begin = time.monotonic()
+    with aiozipstream.ZipFile(compression=compression, **options) as zstream:
+        for path in paths:
+            zstream.write(path, os.path.basename(path))
+        async for chunk in zstream:
+            size += len(chunk)
+    elapsed = time.monotonic() - begin
+    ticker.cancel()
+    return elapsed, size, max(lags) if lags else 0
+
+
+async def benchmark(args, tmpdir):
+
+    paths = create_files(tmpdir, args.files, args.size)
+    print("{} files, {} MB".format(args.files, args.size))
+    print("{:<20} {:>10} {:>10} {:>14} {:>16}".format("mode", "time (s)", "MB/s", "archive (MB)", "loop lag (ms)"))
+    modes = [("stored", zipfile.ZIP_STORED, {}), ("deflated", zipfile.ZIP_DEFLATED, {})]
+    if "parallel_deflate" in aiozipstream.ZipFile.__init__.__code__.co_varnames:
+        modes.append(("deflated (parallel)", zipfile.ZIP_DEFLATED, {"parallel_deflate": True}))
+    for name, compression, options in modes:
+        elapsed, size, lag = await export(paths, compression, options)
+        print("{:<20} {:>10.2f} {:>10.1f} {:>14.1f} {:>16.1f}".format(name, elapsed, args.size / elapsed, size / 1024 / 1024, lag * 1000))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the zip stream")
+    parser.add_argument("--files", type=int, default=4, help="number of files")
+    parser.add_argument("--size", type=int, default=1024, help="total size of the files in MB")
+    parser.add_argument("--dir", help="directory where the files are created")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmpdir:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(benchmark(args, tmpdir))
+
+
+if __name__ == '__main__':
+    main()
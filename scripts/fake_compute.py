@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A fake compute answering the controller requests with an artificial latency.
+Used by the benchmark scripts.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import aiohttp.web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gns3server.version import __version__
+
+
+class FakeCompute:
+    """
+    Fake compute server
+
+    :param latency: Delay in seconds added to each request
+    :param action_delay: Time in seconds to start, stop or suspend a node
+    :param nodes_action: Support the actions on multiple nodes
+    :param files: Project files served by the compute (dictionary path: size)
+    :param bandwidth: Maximum bytes per second sent for each downloaded file
+    """
+
+    _instances = 0
+
+    def __init__(self, latency=0.01, action_delay=0, nodes_action=True, files=None, bandwidth=None):
+
+        self._latency = latency
+        self._files = files or {}
+        self._bandwidth = bandwidth
+        self.uploaded = 0
+        self._action_delay = action_delay
+        self._nodes_action = nodes_action
+        self._next_udp_port = 20000
+        self._next_console_port = 5000
+        self.requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._runner = None
+        self.host = "127.0.0.1"
+        self.port = None
+        FakeCompute._instances += 1
+        self._ip_address = "10.0.0.{}".format(FakeCompute._instances)
+
+    @aiohttp.web.middleware
+    async def _latency_middleware(self, request, handler):
+
+        self.requests += 1
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            if self._latency:
+                await asyncio.sleep(self._latency)
+            return await handler(request)
+        finally:
+            self._in_flight -= 1
+
+    async def _capabilities(self, request):
+
+        return aiohttp.web.json_response({"version": __version__,
+                                          "node_types": ["vpcs", "ethernet_switch"],
+                                          "platform": sys.platform,
+                                          "cpus": 1,
+                                          "memory": 1024,
+                                          "disk_size": 1024})
+
+    async def _notifications(self, request):
+
+        ws = aiohttp.web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            pass
+        return ws
+
+    async def _interfaces(self, request):
+
+        return aiohttp.web.json_response([{"id": "eth0",
+                                           "name": "eth0",
+                                           "ip_address": self._ip_address,
+                                           "netmask": "255.255.255.0",
+                                           "mac_address": "00:00:00:00:00:00",
+                                           "type": "ethernet"}])
+
+    async def _empty(self, request):
+
+        return aiohttp.web.json_response({})
+
+    async def _create_node(self, request):
+
+        data = await request.json()
+        data["project_id"] = request.match_info["project_id"]
+        data["status"] = "stopped"
+        data["console"] = self._next_console_port
+        self._next_console_port += 1
+        return aiohttp.web.json_response(data, status=201)
+
+    async def _node_action(self, request):
+
+        if self._action_delay:
+            await asyncio.sleep(self._action_delay)
+        return aiohttp.web.Response(status=204)
+
+    async def _empty_action(self, request):
+
+        return aiohttp.web.Response(status=204)
+
+    async def _multiple_nodes_action(self, request):
+
+        data = await request.json()
+        semaphore = asyncio.Semaphore(data.get("concurrency", 5))
+        status = {"start": "started", "stop": "stopped", "suspend": "suspended", "reload": "started"}[request.match_info["action"]]
+
+        async def run_action(node_action):
+            async with semaphore:
+                if self._action_delay:
+                    await asyncio.sleep(self._action_delay)
+            return {"node_id": node_action["node_id"], "status": 200, "node": {"status": status}}
+
+        response = aiohttp.web.StreamResponse()
+        response.content_type = "application/json"
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for future in asyncio.as_completed([run_action(node_action) for node_action in data["nodes"]]):
+            result = await future
+            await response.write("{}\n".format(json.dumps(result)).encode("utf-8"))
+        return response
+
+    async def _udp_port(self, request):
+
+        port = self._next_udp_port
+        self._next_udp_port += 1
+        return aiohttp.web.json_response({"udp_port": port}, status=201)
+
+    async def _list_files(self, request):
+
+        return aiohttp.web.json_response([{"path": path, "md5sum": None} for path in self._files])
+
+    async def _download_file(self, request):
+
+        path = request.match_info["path"]
+        if path not in self._files:
+            raise aiohttp.web.HTTPNotFound()
+        response = aiohttp.web.StreamResponse()
+        response.content_type = "application/octet-stream"
+        await response.prepare(request)
+        block = os.urandom(64 * 1024)
+        remaining = self._files[path]
+        while remaining > 0:
+            data = block[:remaining]
+            await response.write(data)
+            remaining -= len(data)
+            if self._bandwidth:
+                await asyncio.sleep(len(data) / self._bandwidth)
+        return response
+
+    async def _upload_file(self, request):
+
+        while True:
+            data = await request.content.read(64 * 1024)
+            if not data:
+                break
+            self.uploaded += len(data)
+            if self._bandwidth:
+                await asyncio.sleep(len(data) / self._bandwidth)
+        return aiohttp.web.Response(status=200)
+
+    async def start(self):
+
+        app = aiohttp.web.Application(middlewares=[self._latency_middleware])
+        app.router.add_get("/v2/compute/capabilities", self._capabilities)
+        app.router.add_get("/v2/compute/notifications/ws", self._notifications)
+        app.router.add_get("/v2/compute/network/interfaces", self._interfaces)
+        app.router.add_post("/v2/compute/projects", self._empty)
+        app.router.add_post("/v2/compute/projects/{project_id}/close", self._empty_action)
+        app.router.add_delete("/v2/compute/projects/{project_id}", self._empty_action)
+        if self._nodes_action:
+            app.router.add_post("/v2/compute/projects/{project_id}/nodes/{action:start|stop|suspend|reload}", self._multiple_nodes_action)
+        app.router.add_post("/v2/compute/projects/{project_id}/ports/udp", self._udp_port)
+        app.router.add_get("/v2/compute/projects/{project_id}/files", self._list_files)
+        app.router.add_get("/v2/compute/projects/{project_id}/files/{path:.+}", self._download_file)
+        app.router.add_post("/v2/compute/projects/{project_id}/files/{path:.+}", self._upload_file)
+        app.router.add_post("/v2/compute/projects/{project_id}/{node_type}/nodes", self._create_node)
+        app.router.add_post("/v2/compute/projects/{project_id}/{node_type}/nodes/{node_id}/{action:start|stop|suspend|reload}", self._node_action)
+        app.router.add_route("*", "/v2/compute/projects/{project_id}/{node_type}/nodes/{node_id}/adapters/{adapter_number}/ports/{port_number}/nio", self._empty)
+        self._runner = aiohttp.web.AppRunner(app)
+        await self._runner.setup()
+        site = aiohttp.web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+
+        if self._runner:
+            await self._runner.cleanup()
+
+
+def synthetic_topology(project_id, nodes, computes):
+    """
+    Generate a topology with VPCS nodes connected in a chain
+    and spread across the computes.
+
+    :param project_id: Project identifier
+    :param nodes: Number of nodes
+    :param computes: List of compute identifiers
+    """
+
+    import uuid
+    topology_nodes = []
+    topology_links = []
+    for i in range(nodes):
+        topology_nodes.append({
+            "compute_id": computes[i % len(computes)],
+            "name": "PC{}".format(i + 1),
+            "node_id": str(uuid.uuid4()),
+            "node_type": "vpcs",
+            "properties": {},
+            "x": (i % 20) * 100,
+            "y": (i // 20) * 100,
+            "z": 1
+        })
+    for i in range(1, nodes):
+        # VPCS has a single port, connect nodes by pairs
+        if i % 2 == 1:
+            topology_links.append({
+                "link_id": str(uuid.uuid4()),
+                "nodes": [
+                    {"node_id": topology_nodes[i - 1]["node_id"], "adapter_number": 0, "port_number": 0},
+                    {"node_id": topology_nodes[i]["node_id"], "adapter_number": 0, "port_number": 0}
+                ]
+            })
+    return {
+        "auto_close": True,
+        "auto_open": False,
+        "auto_start": False,
+        "name": "benchmark",
+        "project_id": project_id,
+        "revision": 9,
+        "topology": {
+            "computes": [],
+            "drawings": [],
+            "links": topology_links,
+            "nodes": topology_nodes
+        },
+        "type": "topology",
+        "version": __version__
+    }
+
+
+def setup_controller(tmpdir):
+    """
+    Configure a controller storing everything in a temporary directory
+    """
+
+    from gns3server.config import Config
+    from gns3server.controller import Controller
+
+    config = Config.instance()
+    config.set("Server", "projects_path", os.path.join(tmpdir, "projects"))
+    config.set("Server", "images_path", os.path.join(tmpdir, "images"))
+    Controller._instance = None
+    controller = Controller.instance()
+    controller._config_file = os.path.join(tmpdir, "gns3_controller.conf")
+    controller._config_loaded = True
+    return controller
+
+
+if __name__ == '__main__':
+    loop = asyncio.get_event_loop()
+    compute = FakeCompute()
+    loop.run_until_complete(compute.start())
+    print("Fake compute listening on {}:{}".format(compute.host, compute.port))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        loop.run_until_complete(compute.stop())
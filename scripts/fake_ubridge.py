@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A fake uBridge hypervisor accepting all the commands.
+Used by the benchmark scripts when uBridge is not installed.
+
+Usage: python scripts/fake_ubridge.py -H 127.0.0.1:4242
+"""
+
+import asyncio
+import argparse
+
+VERSION = "0.9.18"
+
+
+async def handle(reader, writer):
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        command = line.decode().strip()
+        if command == "hypervisor version":
+            writer.write("100-{}\r\n".format(VERSION).encode())
+        else:
+            writer.write(b"100-OK\r\n")
+        await writer.drain()
+        if command == "hypervisor stop":
+            asyncio.get_event_loop().stop()
+            break
+    writer.close()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Fake uBridge hypervisor")
+    parser.add_argument("-v", action="store_true", help="show the version")
+    parser.add_argument("-H", help="host:port of the hypervisor")
+    parser.add_argument("-d", help="debug level")
+    args = parser.parse_args()
+    if args.v:
+        print("ubridge version {}".format(VERSION))
+        return
+    host, port = args.H.rsplit(":", 1)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(asyncio.start_server(handle, host, int(port)))
+    loop.run_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -163,16 +163,17 @@ def test_linux_ethernet_raw_add_nio(linux_platform, project, async_run, nio):
     with patch("shutil.which", return_value="/bin/ubridge"):
         with patch("gns3server.compute.base_manager.BaseManager.has_privileged_access", return_value=True):
             with asyncio_patch("gns3server.compute.builtin.nodes.cloud.Cloud._ubridge_send") as ubridge_mock:
-                with patch("gns3server.compute.builtin.nodes.cloud.Cloud._interfaces", return_value=[{"name": "eth0"}]):
-                    async_run(cloud.add_nio(nio, 0))
+                with asyncio_patch("gns3server.compute.builtin.nodes.cloud.Cloud._ubridge_send_batch", return_value=[[]]) as ubridge_batch_mock:
+                    with patch("gns3server.compute.builtin.nodes.cloud.Cloud._interfaces", return_value=[{"name": "eth0"}]):
+                        async_run(cloud.add_nio(nio, 0))
 
     ubridge_mock.assert_has_calls([
         call("bridge create {}-0".format(cloud._id)),
         call("bridge add_nio_udp {}-0 4242 127.0.0.1 4343".format(cloud._id)),
-        call('bridge reset_packet_filters {}-0'.format(cloud._id)),
         call("bridge add_nio_linux_raw {}-0 \"eth0\"".format(cloud._id)),
         call("bridge start {}-0".format(cloud._id)),
     ])
+    ubridge_batch_mock.assert_called_with(['bridge reset_packet_filters {}-0'.format(cloud._id)], ignore_errors=True)
 
 
 def test_linux_ethernet_raw_add_nio_bridge(linux_platform, project, async_run, nio):
@@ -193,16 +194,17 @@ def test_linux_ethernet_raw_add_nio_bridge(linux_platform, project, async_run, n
     with patch("shutil.which", return_value="/bin/ubridge"):
         with patch("gns3server.compute.base_manager.BaseManager.has_privileged_access", return_value=True):
             with asyncio_patch("gns3server.compute.builtin.nodes.cloud.Cloud._ubridge_send") as ubridge_mock:
-                with patch("gns3server.compute.builtin.nodes.cloud.Cloud._interfaces", return_value=[{"name": "bridge0"}]):
-                    with patch("gns3server.utils.interfaces.is_interface_bridge", return_value=True):
-                        async_run(cloud.add_nio(nio, 0))
+                with asyncio_patch("gns3server.compute.builtin.nodes.cloud.Cloud._ubridge_send_batch", return_value=[[]]) as ubridge_batch_mock:
+                    with patch("gns3server.compute.builtin.nodes.cloud.Cloud._interfaces", return_value=[{"name": "bridge0"}]):
+                        with patch("gns3server.utils.interfaces.is_interface_bridge", return_value=True):
+                            async_run(cloud.add_nio(nio, 0))
 
     tap = "gns3tap0-0"
     ubridge_mock.assert_has_calls([
         call("bridge create {}-0".format(cloud._id)),
         call("bridge add_nio_udp {}-0 4242 127.0.0.1 4343".format(cloud._id)),
-        call('bridge reset_packet_filters {}-0'.format(cloud._id)),
         call("bridge add_nio_tap \"{}-0\" \"{}\"".format(cloud._id, tap)),
         call("brctl addif \"bridge0\" \"{}\"".format(tap)),
         call("bridge start {}-0".format(cloud._id)),
     ])
+    ubridge_batch_mock.assert_called_with(['bridge reset_packet_filters {}-0'.format(cloud._id)], ignore_errors=True)
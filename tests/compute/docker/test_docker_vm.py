@@ -1130,6 +1130,7 @@ def test_add_ubridge_connection(loop, vm):
     nio = vm.manager.create_nio(nio)
     nio.start_packet_capture("/tmp/capture.pcap")
     vm._ubridge_hypervisor = MagicMock()
+    vm._ubridge_hypervisor.send_batch = AsyncioMagicMock(return_value=[[]])
     vm._namespace = 42
 
     loop.run_until_complete(asyncio.ensure_future(vm._add_ubridge_connection(nio, 0)))
@@ -1140,7 +1141,8 @@ def test_add_ubridge_connection(loop, vm):
         call.send('docker move_to_ns tap-gns3-e0 42 eth0'),
         call.send('bridge add_nio_udp bridge0 4242 127.0.0.1 4343'),
         call.send('bridge start_capture bridge0 "/tmp/capture.pcap"'),
-        call.send('bridge start bridge0')
+        call.send('bridge start bridge0'),
+        call.send_batch(['bridge reset_packet_filters bridge0'], ignore_errors=True)
     ]
     assert 'bridge0' in vm._bridges
     # We need to check any_order ortherwise mock is confused by asyncio
@@ -21,8 +21,11 @@ import pytest
 import asyncio
 import configparser
 
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
+from tests.utils import asyncio_patch, AsyncioMagicMock
 from gns3server.compute.dynamips.nodes.router import Router
+from gns3server.compute.dynamips.nios.nio import NIO
+from gns3server.compute.dynamips.adapters.c7200_io_fe import C7200_IO_FE
 from gns3server.compute.dynamips.dynamips_error import DynamipsError
 from gns3server.compute.dynamips import Dynamips
 from gns3server.config import Config
@@ -73,3 +76,58 @@ def test_router_invalid_dynamips_path(project, manager, loop):
         loop.run_until_complete(asyncio.ensure_future(router.create()))
         assert router.name == "test"
         assert router.id == "00010203-0405-0607-0809-0a0b0c0d0e0e"
+
+
+def test_slot_add_nio_binding(router, async_run):
+
+    router._slots = [C7200_IO_FE()]
+    router._hypervisor = MagicMock()
+    router._hypervisor.send_batch = AsyncioMagicMock(return_value=[[], []])
+    nio = MagicMock()
+    nio.__str__.return_value = "nio1"
+    with asyncio_patch("gns3server.compute.dynamips.nodes.router.Router.is_running", return_value=True):
+        async_run(router.slot_add_nio_binding(0, 0, nio))
+    # the NIO is bound and enabled in a single round trip
+    router._hypervisor.send_batch.assert_called_once_with(['vm slot_add_nio_binding "test" 0 0 nio1',
+                                                           'vm slot_enable_nio "test" 0 0'], ignore_errors=True)
+    assert router.get_nio(0, 0) == nio
+
+
+def test_slot_add_nio_binding_existing(router, async_run):
+
+    router._slots = [C7200_IO_FE()]
+    router._hypervisor = MagicMock()
+    results = [[DynamipsError("already bound"), DynamipsError("not bound")], [[], [], []]]
+
+    async def send_batch(commands, ignore_errors=False):
+        return results.pop(0)
+
+    router._hypervisor.send_batch = MagicMock(side_effect=send_batch)
+    nio = MagicMock()
+    nio.__str__.return_value = "nio1"
+    with asyncio_patch("gns3server.compute.dynamips.nodes.router.Router.is_running", return_value=True):
+        async_run(router.slot_add_nio_binding(0, 0, nio))
+    # the binding is removed and added again
+    router._hypervisor.send_batch.assert_called_with(['vm slot_remove_nio_binding "test" 0 0',
+                                                      'vm slot_add_nio_binding "test" 0 0 nio1',
+                                                      'vm slot_enable_nio "test" 0 0'])
+
+
+def test_nio_start_packet_capture(async_run):
+
+    hypervisor = MagicMock()
+    hypervisor.send_batch = AsyncioMagicMock(return_value=[[], []])
+    nio = NIO("nio1", hypervisor)
+    async_run(nio.start_packet_capture("/tmp/test.pcap"))
+    hypervisor.send_batch.assert_called_once_with(["nio bind_filter nio1 2 capture",
+                                                   'nio setup_filter nio1 2 DLT_EN10MB "/tmp/test.pcap"'], ignore_errors=True)
+    assert nio.capturing
+    assert nio.input_filter == ("capture", 'DLT_EN10MB "/tmp/test.pcap"')
+
+    # the filter is bound but cannot be set up
+    hypervisor.send_batch = AsyncioMagicMock(return_value=[[], DynamipsError("invalid file")])
+    nio = NIO("nio2", hypervisor)
+    with pytest.raises(DynamipsError):
+        async_run(nio.start_packet_capture("/tmp/test.pcap"))
+    assert not nio.capturing
+    assert nio.input_filter[0] == "capture"
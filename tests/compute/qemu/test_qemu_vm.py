@@ -71,8 +71,10 @@ def vm(project, manager, fake_qemu_binary, fake_qemu_img_binary):
     vm = QemuVM("test", "00010203-0405-0607-0809-0a0b0c0d0e0f", project, manager, qemu_path=fake_qemu_binary)
     vm._process_priority = "normal"  # Avoid complexity for Windows tests
     vm._start_ubridge = AsyncioMagicMock()
+    vm._open_qmp_session = AsyncioMagicMock()
     vm._ubridge_hypervisor = MagicMock()
     vm._ubridge_hypervisor.is_running.return_value = True
+    vm._ubridge_hypervisor.send_batch = AsyncioMagicMock(return_value=[])
     vm.manager.config.set("Qemu", "enable_hardware_acceleration", False)
     return vm
 
@@ -444,33 +446,83 @@ def test_json(vm, project):
     assert json["project_id"] == project.id
 
 
-def test_control_vm(vm, loop):
+def test_control_vm(vm, loop, running_subprocess_mock):
 
-    vm._process = MagicMock()
-    reader = MagicMock()
-    writer = MagicMock()
-    with asyncio_patch("asyncio.open_connection", return_value=(reader, writer)) as open_connect:
-        res = loop.run_until_complete(asyncio.ensure_future(vm._control_vm("test")))
-        assert writer.write.called_with("test")
+    vm._process = running_subprocess_mock
+    vm._qmp = MagicMock()
+    vm._qmp.human_monitor_command = AsyncioMagicMock(return_value="")
+    res = loop.run_until_complete(asyncio.ensure_future(vm._control_vm("test")))
+    vm._qmp.human_monitor_command.assert_called_with("test", timeout=30)
     assert res is None
 
 
 def test_control_vm_expect_text(vm, loop, running_subprocess_mock):
 
     vm._process = running_subprocess_mock
-    reader = MagicMock()
-    writer = MagicMock()
-    with asyncio_patch("asyncio.open_connection", return_value=(reader, writer)) as open_connect:
+    vm._qmp = MagicMock()
+    vm._qmp.human_monitor_command = AsyncioMagicMock(return_value="a line\r\nepic product\r\n")
+    res = loop.run_until_complete(asyncio.ensure_future(vm._control_vm("test", [b"epic"])))
+    vm._qmp.human_monitor_command.assert_called_with("test", timeout=30)
+    assert res == "epic product"
 
-        future = asyncio.Future()
-        future.set_result(b"epic product")
-        reader.readline.return_value = future
 
-        vm._monitor = 4242
-        res = loop.run_until_complete(asyncio.ensure_future(vm._control_vm("test", [b"epic"])))
-        assert writer.write.called_with("test")
+def test_control_vm_no_session(vm, loop, running_subprocess_mock):
 
-    assert res == "epic product"
+    vm._process = running_subprocess_mock
+    assert loop.run_until_complete(asyncio.ensure_future(vm._control_vm("test"))) is None
+
+
+def test_control_vm_reconnect(vm, loop, running_subprocess_mock):
+
+    qmp = MagicMock()
+    qmp.human_monitor_command = AsyncioMagicMock(return_value="")
+
+    async def open_qmp_session():
+        vm._qmp = qmp
+
+    vm._process = running_subprocess_mock
+    # the session has been dropped by QEMU
+    vm._qmp = MagicMock()
+    vm._qmp.connected = False
+    vm._open_qmp_session = AsyncioMagicMock(side_effect=open_qmp_session)
+    loop.run_until_complete(asyncio.ensure_future(vm._control_vm("stop")))
+    assert vm._open_qmp_session.called
+    qmp.human_monitor_command.assert_called_with("stop", timeout=30)
+
+
+def test_control_vm_commands(vm, loop, running_subprocess_mock):
+
+    vm._process = running_subprocess_mock
+    vm._qmp = MagicMock()
+    vm._qmp.human_monitor_command = AsyncioMagicMock(return_value="")
+    loop.run_until_complete(asyncio.ensure_future(vm._control_vm_commands(["set_link gns3-0 off", "set_link gns3-1 off"])))
+    assert vm._qmp.human_monitor_command.call_count == 2
+
+
+def test_get_vm_status(vm, loop, running_subprocess_mock):
+
+    vm._process = running_subprocess_mock
+    vm._qmp = MagicMock()
+    vm._qmp.execute = AsyncioMagicMock(return_value={"running": False, "singlestep": False, "status": "suspended"})
+    assert loop.run_until_complete(asyncio.ensure_future(vm._get_vm_status())) == "suspended"
+    vm._qmp.execute.assert_called_with("query-status")
+    assert vm.status == "suspended"
+
+
+def test_qmp_event(vm, running_subprocess_mock):
+
+    vm._process = running_subprocess_mock
+    vm.status = "started"
+    vm._qmp_event("STOP", {})
+    assert vm.status == "suspended"
+    vm._qmp_event("RESUME", {})
+    assert vm.status == "started"
+    # QEMU exits after the shutdown
+    vm._qmp_event("SHUTDOWN", {"guest": True})
+    assert vm.status == "started"
+    vm.options = "-no-shutdown"
+    vm._qmp_event("SHUTDOWN", {"guest": True})
+    assert vm.status == "stopped"
 
 
 def test_build_command(vm, loop, fake_qemu_binary, port_manager):
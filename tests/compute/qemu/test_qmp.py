@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import socket
+import pytest
+import asyncio
+
+from gns3server.compute.qemu.qemu_error import QemuError
+from gns3server.compute.qemu.utils.qmp import QMPClient
+
+
+class FakeQMPServer:
+    """
+    Answers the QMP commands like QEMU, "query-status" answers are
+    sent in the reverse order to check the responses correlation.
+    """
+
+    def __init__(self):
+        self.commands = []
+        self.connections = 0
+        self._server = None
+        self._writers = []
+        self.port = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.append(writer)
+        writer.write(b'{"QMP": {"version": {"qemu": {"micro": 0, "minor": 1, "major": 3}}, "capabilities": []}}\r\n')
+        delayed = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line.decode())
+            self.commands.append(message)
+            command = message["execute"]
+            if command == "query-status":
+                delayed.append(message["id"])
+                if len(delayed) == 2:
+                    for message_id in reversed(delayed):
+                        writer.write(json.dumps({"return": {"status": "running", "id_seen": message_id}, "id": message_id}).encode() + b"\r\n")
+                    delayed = []
+            elif command == "human-monitor-command":
+                cmd = message["arguments"]["command-line"]
+                if cmd == "stop":
+                    writer.write(b'{"timestamp": {"seconds": 1, "microseconds": 2}, "event": "STOP"}\r\n')
+                writer.write(json.dumps({"return": "output of {}\r\n".format(cmd), "id": message["id"]}).encode() + b"\r\n")
+            elif command == "unknown":
+                writer.write(json.dumps({"error": {"class": "CommandNotFound", "desc": "The command unknown has not been found"}, "id": message["id"]}).encode() + b"\r\n")
+            elif command == "quit":
+                writer.close()
+                break
+            else:
+                writer.write(json.dumps({"return": {}, "id": message["id"]}).encode() + b"\r\n")
+
+    async def stop(self):
+        for writer in self._writers:
+            writer.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+
+@pytest.fixture
+def qmp_server(loop):
+
+    server = FakeQMPServer()
+    loop.run_until_complete(server.start())
+    yield server
+    loop.run_until_complete(server.stop())
+
+
+@pytest.fixture
+def qmp(loop, qmp_server):
+
+    events = []
+    client = QMPClient("127.0.0.1", qmp_server.port, event_callback=lambda event, data: events.append(event))
+    client.events = events
+    loop.run_until_complete(client.connect())
+    yield client
+    loop.run_until_complete(client.close())
+
+
+def test_connect(qmp, qmp_server):
+
+    assert qmp.connected
+    assert qmp.greeting["version"]["qemu"]["major"] == 3
+    assert qmp_server.commands[0]["execute"] == "qmp_capabilities"
+
+
+def test_connect_refused(loop):
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    client = QMPClient("127.0.0.1", port)
+    with pytest.raises(QemuError):
+        loop.run_until_complete(client.connect(timeout=0.1))
+    assert not client.connected
+
+
+def test_execute_correlation(loop, qmp):
+
+    results = loop.run_until_complete(asyncio.gather(qmp.execute("query-status"), qmp.execute("query-status")))
+    assert results[0]["id_seen"] < results[1]["id_seen"]
+
+
+def test_execute_error(loop, qmp):
+
+    with pytest.raises(QemuError):
+        loop.run_until_complete(qmp.execute("unknown"))
+    # the session is still usable
+    assert loop.run_until_complete(qmp.execute("cont")) == {}
+
+
+def test_human_monitor_command_and_events(loop, qmp, qmp_server):
+
+    assert loop.run_until_complete(qmp.human_monitor_command("stop")) == "output of stop\r\n"
+    assert qmp.events == ["STOP"]
+    loop.run_until_complete(qmp.human_monitor_command("set_link gns3-0 off"))
+    # a single connection for all the commands
+    assert qmp_server.connections == 1
+
+
+def test_connection_closed(loop, qmp):
+
+    with pytest.raises(QemuError):
+        loop.run_until_complete(qmp.execute("quit"))
+    assert not qmp.connected
+    with pytest.raises(QemuError):
+        loop.run_until_complete(qmp.execute("cont"))
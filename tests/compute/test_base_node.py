@@ -23,13 +23,15 @@ import os
 from tests.utils import asyncio_patch, AsyncioMagicMock
 
 
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, PropertyMock
 from gns3server.compute.vpcs.vpcs_vm import VPCSVM
 from gns3server.compute.docker.docker_vm import DockerVM
 from gns3server.compute.vpcs.vpcs_error import VPCSError
 from gns3server.compute.error import NodeError
 from gns3server.compute.vpcs import VPCS
 from gns3server.compute.nios.nio_udp import NIOUDP
+from gns3server.compute.base_manager import BaseManager
+from gns3server.ubridge.ubridge_error import UbridgeError
 
 
 @pytest.fixture(scope="function")
@@ -114,6 +116,18 @@ def test_allocate_aux(project, manager):
     assert node.aux is not None
 
 
+def test_allocate_ports_range_exhausted(project, manager, port_manager):
+    port = port_manager.get_free_tcp_port(project)
+    port_manager.release_tcp_port(port, project)
+    port_manager.console_port_range = (port, port)
+    used_ports = set(port_manager.tcp_ports)
+
+    # the console and the aux ports cannot both be allocated
+    with pytest.raises(aiohttp.web.HTTPConflict):
+        DockerVM("test", "00010203-0405-0607-0809-0a0b0c0d0e0f", project, manager, "ubuntu")
+    assert set(port_manager.tcp_ports) == used_ports
+
+
 def test_change_aux_port(node, port_manager):
     port1 = port_manager.get_free_tcp_port(node.project)
     port2 = port_manager.get_free_tcp_port(node.project)
@@ -143,18 +157,91 @@ def test_ubridge_apply_filters(node, async_run):
         ('latency', [10]),
         ('bpf', ["icmp[icmptype] == 8\ntcp src port 53"])
     ))
-    node._ubridge_send = AsyncioMagicMock()
+    node._ubridge_send_batch = AsyncioMagicMock(return_value=[[], [], []])
     async_run(node._ubridge_apply_filters("VPCS-10", filters))
-    node._ubridge_send.assert_any_call("bridge reset_packet_filters VPCS-10")
-    node._ubridge_send.assert_any_call("bridge add_packet_filter VPCS-10 filter0 latency 10")
+    commands = node._ubridge_send_batch.call_args[0][0]
+    assert commands[0] == "bridge reset_packet_filters VPCS-10"
+    assert "bridge add_packet_filter VPCS-10 filter0 latency 10" in commands
 
 
 def test_ubridge_apply_bpf_filters(node, async_run):
     filters = {
         "bpf": ["icmp[icmptype] == 8\ntcp src port 53"]
     }
-    node._ubridge_send = AsyncioMagicMock()
+    node._ubridge_send_batch = AsyncioMagicMock(return_value=[[], [], []])
     async_run(node._ubridge_apply_filters("VPCS-10", filters))
-    node._ubridge_send.assert_any_call("bridge reset_packet_filters VPCS-10")
-    node._ubridge_send.assert_any_call("bridge add_packet_filter VPCS-10 filter0 bpf \"icmp[icmptype] == 8\"")
-    node._ubridge_send.assert_any_call("bridge add_packet_filter VPCS-10 filter1 bpf \"tcp src port 53\"")
+    node._ubridge_send_batch.assert_called_with(["bridge reset_packet_filters VPCS-10",
+                                                 "bridge add_packet_filter VPCS-10 filter0 bpf \"icmp[icmptype] == 8\"",
+                                                 "bridge add_packet_filter VPCS-10 filter1 bpf \"tcp src port 53\""], ignore_errors=True)
+
+
+def test_ubridge_apply_filters_syntax_error(node, async_run):
+    filters = {
+        "bpf": ["icmp["]
+    }
+    error = UbridgeError("Error while sending command: Cannot compile filter 'icmp[': syntax error")
+    node._ubridge_send_batch = AsyncioMagicMock(return_value=[[], error])
+    # BPF syntax errors are only reported
+    async_run(node._ubridge_apply_filters("VPCS-10", filters))
+
+    node._ubridge_send_batch = AsyncioMagicMock(return_value=[UbridgeError("Bridge VPCS-10 doesn't exist"), []])
+    with pytest.raises(UbridgeError):
+        async_run(node._ubridge_apply_filters("VPCS-10", filters))
+
+
+def test_add_ubridge_udp_connection(node, async_run):
+    source = NIOUDP(4242, "127.0.0.1", 4343)
+    destination = NIOUDP(4343, "127.0.0.1", 4242)
+    node._ubridge_send = AsyncioMagicMock()
+    node._ubridge_send_batch = AsyncioMagicMock(return_value=[[]] * 4)
+    async_run(node.add_ubridge_udp_connection("VPCS-10", source, destination))
+    node._ubridge_send.assert_called_once_with("bridge create VPCS-10")
+    # the connection and its filters are configured in one round trip
+    node._ubridge_send_batch.assert_called_once_with(["bridge add_nio_udp VPCS-10 4242 127.0.0.1 4343",
+                                                      "bridge add_nio_udp VPCS-10 4343 127.0.0.1 4242",
+                                                      "bridge start VPCS-10",
+                                                      "bridge reset_packet_filters VPCS-10"], ignore_errors=True)
+
+    node._ubridge_send_batch = AsyncioMagicMock(return_value=[[], UbridgeError("Cannot add NIO"), [], []])
+    node._ubridge_send = AsyncioMagicMock()
+    with pytest.raises(UbridgeError):
+        async_run(node.add_ubridge_udp_connection("VPCS-10", source, destination))
+    # the half-configured bridge is deleted
+    node._ubridge_send.assert_called_with("bridge delete VPCS-10")
+
+
+def test_add_ubridge_udp_connection_create_error(node, async_run):
+    source = NIOUDP(4242, "127.0.0.1", 4343)
+    destination = NIOUDP(4343, "127.0.0.1", 4242)
+    node._ubridge_send = AsyncioMagicMock(side_effect=UbridgeError("Bridge VPCS-10 already exist"))
+    node._ubridge_send_batch = AsyncioMagicMock(return_value=[[]] * 4)
+    with pytest.raises(UbridgeError):
+        async_run(node.add_ubridge_udp_connection("VPCS-10", source, destination))
+    # nothing is sent to the existing bridge
+    node._ubridge_send.assert_called_once_with("bridge create VPCS-10")
+    assert not node._ubridge_send_batch.called
+
+
+def test_start_ubridge_shared(node, async_run):
+
+    shared_hypervisor = MagicMock()
+    pool = MagicMock()
+    pool.acquire = AsyncioMagicMock(return_value=shared_hypervisor)
+    with patch("gns3server.compute.base_node.BaseNode.ubridge_path", new_callable=PropertyMock, return_value="/bin/ubridge"):
+        with patch("gns3server.compute.base_manager.BaseManager.ubridge_pool", new_callable=PropertyMock, return_value=pool):
+            async_run(node._start_ubridge())
+    pool.acquire.assert_called_with("/bin/ubridge", "test")
+    assert node._ubridge_hypervisor == shared_hypervisor
+
+
+def test_ubridge_pool(manager):
+
+    with patch("gns3server.config.Config.get_section_config", return_value={"ubridge_shared_hypervisors": "0"}):
+        assert manager.ubridge_pool is None
+    with patch("gns3server.config.Config.get_section_config", return_value={"ubridge_shared_hypervisors": "4", "host": "127.0.0.1"}):
+        pool = manager.ubridge_pool
+        assert pool.size == 4
+        # the pool is shared by all the modules
+        from gns3server.compute.qemu import Qemu
+        assert Qemu.instance().ubridge_pool is pool
+    BaseManager._ubridge_pool = None
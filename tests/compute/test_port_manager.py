@@ -21,7 +21,7 @@ import sys
 import uuid
 from unittest.mock import patch
 
-from gns3server.compute.port_manager import PortManager
+from gns3server.compute.port_manager import PortManager, PortSet
 from gns3server.compute.project import Project
 
 
@@ -121,6 +121,76 @@ def test_find_unused_port_invalid_range():
         p = PortManager().find_unused_port(10000, 1000)
 
 
+def test_find_unused_port_skip_reserved_ports():
+    with patch("gns3server.compute.port_manager.PortManager._check_port") as mock_check:
+        port = PortManager.find_unused_port(5000, 10000, host="0.0.0.0", ignore_ports=set(range(5000, 7000)))
+        assert port == 7000
+        # the reserved ports are not probed
+        assert mock_check.call_count == 1
+
+
+def test_find_unused_port_banned_ports():
+    with patch("gns3server.compute.port_manager.PortManager._check_port"):
+        assert PortManager.find_unused_port(6000, 6010, host="0.0.0.0") == 6001
+
+
+def test_find_unused_port_cursor():
+    with patch("gns3server.compute.port_manager.PortManager._check_port"):
+        assert PortManager.find_unused_port(1000, 1010, host="0.0.0.0", cursor=1005) == 1005
+        # the search continues at the beginning of the range
+        assert PortManager.find_unused_port(1000, 1010, host="0.0.0.0", ignore_ports={1009, 1010}, cursor=1009) == 1000
+
+
+def test_find_unused_port_no_port_available():
+    with pytest.raises(aiohttp.web.HTTPConflict):
+        PortManager.find_unused_port(1000, 1002, ignore_ports={1000, 1001, 1002})
+
+
+def test_port_set():
+    ports = PortSet([1000, 1002])
+    assert 1000 in ports
+    assert "1000" not in ports
+    assert len(ports) == 2
+    assert list(ports.free_ports(1000, 1004)) == [1001, 1003, 1004]
+    assert list(ports.free_ports(1000, 1004, cursor=1003)) == [1003, 1004, 1001]
+    ports.remove(1000)
+    ports.discard(1000)
+    assert sorted(ports) == [1002]
+    assert list(ports.free_ports(1000, 1004)) == [1000, 1001, 1003, 1004]
+
+
+def test_get_free_tcp_port_rotation():
+    pm = PortManager()
+    pm.console_host = "127.0.0.1"
+    project = Project(project_id=str(uuid.uuid4()))
+    with patch("gns3server.compute.port_manager.PortManager._check_port"):
+        port1 = pm.get_free_tcp_port(project)
+        pm.release_tcp_port(port1, project)
+        # a port just released is not handed out again immediately
+        port2 = pm.get_free_tcp_port(project)
+        assert port2 == port1 + 1
+
+
+def test_get_free_udp_ports():
+    pm = PortManager()
+    project = Project(project_id=str(uuid.uuid4()))
+    with patch("gns3server.compute.port_manager.PortManager._check_port"):
+        ports = pm.get_free_udp_ports(project, 3)
+    assert ports == [20000, 20001, 20002]
+    assert all(port in pm.udp_ports for port in ports)
+
+
+def test_get_free_tcp_ports_not_enough_ports():
+    pm = PortManager()
+    pm.console_host = "127.0.0.1"
+    project = Project(project_id=str(uuid.uuid4()))
+    with patch("gns3server.compute.port_manager.PortManager._check_port"):
+        with pytest.raises(aiohttp.web.HTTPConflict):
+            pm.get_free_tcp_ports(project, 3, port_range_start=2000, port_range_end=2001)
+    # the ports are released
+    assert len(pm.tcp_ports) == 0
+
+
 def test_set_console_host(config):
     """
     If allow remote connection we need to bind console host
@@ -42,6 +42,7 @@ def vm(project, manager, ubridge_path):
     vm._start_ubridge = AsyncioMagicMock()
     vm._ubridge_hypervisor = MagicMock()
     vm._ubridge_hypervisor.is_running.return_value = True
+    vm._ubridge_hypervisor.send_batch = AsyncioMagicMock(return_value=[])
     return vm
 
 
@@ -111,6 +112,7 @@ def test_stop(loop, vm, async_run):
                     async_run(vm.port_add_nio_binding(0, nio))
 
                     vm._ubridge_send = AsyncioMagicMock()
+                    vm._ubridge_send_batch = AsyncioMagicMock(return_value=[])
                     async_run(vm.start("192.168.1.2"))
                     assert vm.is_running()
 
@@ -145,6 +147,7 @@ def test_reload(loop, vm, async_run):
                 async_run(vm.port_add_nio_binding(0, nio))
 
                 vm._ubridge_send = AsyncioMagicMock()
+                vm._ubridge_send_batch = AsyncioMagicMock(return_value=[])
                 async_run(vm.start("192.168.1.2"))
                 assert vm.is_running()
 
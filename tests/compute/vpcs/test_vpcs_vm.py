@@ -45,6 +45,7 @@ def vm(project, manager, ubridge_path):
     vm._start_ubridge = AsyncioMagicMock()
     vm._ubridge_hypervisor = MagicMock()
     vm._ubridge_hypervisor.is_running.return_value = True
+    vm._ubridge_hypervisor.send_batch = AsyncioMagicMock(return_value=[])
     return vm
 
 
@@ -203,6 +204,7 @@ def test_reload(loop, vm, async_run):
                 assert vm.is_running()
 
                 vm._ubridge_send = AsyncioMagicMock()
+                vm._ubridge_send_batch = AsyncioMagicMock(return_value=[])
                 with asyncio_patch("gns3server.utils.asyncio.wait_for_process_termination"):
                     async_run(vm.reload())
                 assert vm.is_running() is True
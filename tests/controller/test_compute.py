@@ -86,6 +86,77 @@ def test_compute_httpQuery(compute, async_run):
         assert compute._auth is None
 
 
+def test_compute_httpQuery_stream(compute, async_run):
+    response = MagicMock()
+    response.status = 200
+    response.read = AsyncioMagicMock(return_value=b"")
+    with asyncio_patch("aiohttp.ClientSession.request", return_value=response) as mock:
+        assert async_run(compute.post("/projects/test/nodes/start", {"a": "b"}, timeout=240, stream=True)) == response
+        async_run(compute.close())
+    # the body is read by the caller and only the reads are bounded
+    assert not response.read.called
+    assert mock.call_args[1]["timeout"] == aiohttp.ClientTimeout(total=None, sock_read=240)
+    assert compute.http_stats()["in_flight"] == 0
+
+
+def test_compute_httpQuery_connection_closed(compute, async_run):
+    """
+    The request is sent again when the compute has closed a kept alive connection
+    """
+
+    response = MagicMock()
+    response.status = 200
+    response.read = AsyncioMagicMock(return_value=b"")
+    calls = []
+
+    async def request(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise aiohttp.ServerDisconnectedError()
+        return response
+
+    with patch("aiohttp.ClientSession.request", side_effect=request):
+        async_run(compute.put("/projects/test", {"a": "b"}))
+        async_run(compute.close())
+    assert len(calls) == 2
+    stats = compute.http_stats()
+    assert stats["requests"] == 1
+    assert stats["retries"] == 1
+    assert stats["errors"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_compute_httpQuery_connection_closed_post(compute, async_run):
+    """
+    A POST may have been received by the compute, it's not sent again
+    """
+
+    calls = []
+
+    async def request(*args, **kwargs):
+        calls.append(args)
+        raise aiohttp.ClientOSError()
+
+    with patch("aiohttp.ClientSession.request", side_effect=request):
+        with pytest.raises(ComputeError):
+            async_run(compute.post("/projects", {"a": "b"}))
+        async_run(compute.close())
+    assert len(calls) == 1
+    assert compute.http_stats()["retries"] == 0
+
+
+def test_compute_httpQuery_stats(compute, async_run):
+    with asyncio_patch("aiohttp.ClientSession.request", side_effect=aiohttp.ClientConnectorError(MagicMock(), OSError())):
+        with pytest.raises(ComputeError):
+            async_run(compute.post("/projects", {"a": "b"}))
+        async_run(compute.close())
+    stats = compute.http_stats()
+    assert stats["requests"] == 1
+    assert stats["retries"] == 0
+    assert stats["errors"] == 1
+    assert stats["reuse_ratio"] == 0.0
+
+
 def test_compute_httpQueryAuth(compute, async_run):
     response = MagicMock()
     with asyncio_patch("aiohttp.ClientSession.request", return_value=response) as mock:
@@ -302,6 +373,23 @@ def test_downloadFile(project, async_run, compute):
     async_run(compute.close())
 
 
+def test_stream_capture(compute, async_run):
+    response = MagicMock()
+    response.status = 200
+    compute.user = "root"
+    compute.password = "toor"
+    url = compute._getUrl("/projects/test/links/test/pcap")
+    with asyncio_patch("aiohttp.ClientSession.request", return_value=response) as mock:
+        stream = async_run(compute.stream_capture(url, "GET", headers={"Authorization": "controller", "Range": "bytes=0-"}, data=b""))
+    assert stream == response
+    mock.assert_called_with("GET", url, auth=compute._auth, headers={"Range": "bytes=0-"}, data=b"", timeout=None)
+    # the captures are not counted in the connection limit of the API requests
+    assert compute._stream_session() is not compute._session()
+    assert not compute._stream_session().connector.limit
+    async_run(compute.close())
+    assert compute._capture_session.closed
+
+
 def test_close(compute, async_run):
     assert compute.connected is True
     async_run(compute.close())
@@ -484,3 +572,44 @@ def test_get_ip_on_same_subnet(controller, async_run):
         },
     ]
     assert async_run(compute1.get_ip_on_same_subnet(compute2)) == ('192.168.2.1', '192.168.1.2')
+
+
+def test_get_ip_on_same_subnet_cache(controller, async_run):
+    compute1 = Compute("compute1", host="127.0.0.1", controller=controller)
+    compute1._interfaces_cache = [
+        {
+            "ip_address": "192.168.1.1",
+            "netmask": "255.255.255.0"
+        }
+    ]
+    compute2 = Compute("compute2", host="127.0.0.1", controller=controller)
+    compute2._interfaces_cache = [
+        {
+            "ip_address": "192.168.1.2",
+            "netmask": "255.255.255.0"
+        }
+    ]
+    assert async_run(compute1.get_ip_on_same_subnet(compute2)) == ("192.168.1.1", "192.168.1.2")
+    with patch("gns3server.controller.compute.Compute._find_ip_on_same_subnet") as mock:
+        assert async_run(compute1.get_ip_on_same_subnet(compute2)) == ("192.168.1.1", "192.168.1.2")
+        assert not mock.called
+
+    # the interfaces have changed
+    compute2._interfaces_cache = [
+        {
+            "ip_address": "192.168.2.2",
+            "netmask": "255.255.255.0"
+        }
+    ]
+    with pytest.raises(ValueError):
+        async_run(compute1.get_ip_on_same_subnet(compute2))
+
+
+def test_interfaces_single_request(compute, async_run):
+    res = [{"id": "vmnet99", "ip_address": "", "mac_address": "", "name": "vmnet99", "netmask": "", "type": "ethernet"}]
+    response = MagicMock()
+    response.json = res
+    compute.get = AsyncioMagicMock(return_value=response)
+    results = async_run(asyncio.gather(compute.interfaces(), compute.interfaces(), compute.interfaces()))
+    assert results == [res, res, res]
+    assert compute.get.call_count == 1
@@ -25,6 +25,7 @@ from unittest.mock import MagicMock, patch
 from tests.utils import AsyncioMagicMock, asyncio_patch
 
 from gns3server.controller.compute import Compute
+from gns3server.controller.topology import GNS3_FILE_FORMAT_REVISION
 from gns3server.version import __version__
 
 
@@ -117,6 +118,33 @@ def test_load_projects(controller, projects_dir, async_run):
     mock_load_project.assert_called_with(os.path.join(projects_dir, "project1", "project1.gns3"), load=False)
 
 
+def test_load_projects_catalog(controller, projects_dir, async_run):
+    controller.save()
+
+    project_id = str(uuid.uuid4())
+    os.makedirs(os.path.join(projects_dir, "project1"))
+    path = os.path.join(projects_dir, "project1", "project1.gns3")
+    with open(path, "w+") as f:
+        json.dump({
+            "project_id": project_id,
+            "name": "project1",
+            "revision": GNS3_FILE_FORMAT_REVISION,
+            "topology": {"nodes": [], "links": [], "computes": [], "drawings": []},
+            "type": "topology",
+            "version": __version__}, f)
+
+    with patch("gns3server.controller.load_topology") as mock_load_topology:
+        async_run(controller.load_projects())
+    # the topology is loaded when the project is opened
+    assert not mock_load_topology.called
+    project = controller.get_project(project_id)
+    assert project.name == "project1"
+    assert project.status == "closed"
+
+    with open(controller._get_project_catalog().path) as f:
+        assert path in json.load(f)["projects"]
+
+
 def test_add_compute(controller, controller_config_path, async_run):
     controller._notification = MagicMock()
     c = async_run(controller.add_compute(compute_id="test1", connect=False))
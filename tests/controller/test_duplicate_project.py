@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+import uuid
+import pytest
+import aiohttp
+from unittest.mock import MagicMock, patch
+
+from tests.utils import AsyncioMagicMock
+
+from gns3server.controller.project import Project
+from gns3server.controller.duplicate_project import duplicate_project
+
+
+@pytest.fixture
+def project(controller, async_run):
+
+    project = Project(controller=controller, name="Test")
+    controller._projects[project.id] = project
+    compute = MagicMock()
+    compute.id = "local"
+    response = MagicMock()
+    response.json = {"console": 2048}
+    compute.post = AsyncioMagicMock(return_value=response)
+    async_run(project.add_node(compute, "PC1", None, node_type="vpcs", properties={"mac_address": "00:50:79:68:68:00"}))
+    return project
+
+
+def write_file(path, content):
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w+") as f:
+        f.write(content)
+
+
+def test_duplicate_project(async_run, controller, project):
+
+    node = list(project.nodes.values())[0]
+    node_dir = os.path.join(project.path, "project-files", "vpcs", node.id)
+    write_file(os.path.join(node_dir, "startup.vpc"), "ip 192.168.1.1")
+    write_file(os.path.join(node_dir, "configs", "test.cfg"), "test")
+    write_file(os.path.join(node_dir, "vpcs.log"), "log")
+    write_file(os.path.join(project.path, "project-files", "captures", "test.pcap"), "pcap")
+    write_file(os.path.join(project.path, "snapshots", "test.gns3project"), "snapshot")
+    write_file(os.path.join(project.path, "notes.txt"), "notes")
+
+    project_id = str(uuid.uuid4())
+    new_project = async_run(duplicate_project(controller, project, project_id, name="Copy"))
+    assert new_project.id == project_id
+    assert new_project.name == "Copy"
+    assert new_project.status == "closed"
+    assert new_project.path != project.path
+
+    with open(os.path.join(new_project.path, "Copy.gns3")) as f:
+        topology = json.load(f)
+    assert topology["project_id"] == project_id
+    new_node = topology["topology"]["nodes"][0]
+    assert new_node["node_id"] != node.id
+    assert new_node["properties"]["mac_address"] is None
+
+    new_node_dir = os.path.join(new_project.path, "project-files", "vpcs", new_node["node_id"])
+    with open(os.path.join(new_node_dir, "startup.vpc")) as f:
+        assert f.read() == "ip 192.168.1.1"
+    assert os.path.exists(os.path.join(new_node_dir, "configs", "test.cfg"))
+    assert os.path.exists(os.path.join(new_project.path, "notes.txt"))
+    assert not os.path.exists(os.path.join(new_project.path, "project-files", "vpcs", node.id))
+    assert not os.path.exists(os.path.join(new_node_dir, "vpcs.log"))
+    assert not os.path.exists(os.path.join(new_project.path, "project-files", "captures"))
+    assert not os.path.exists(os.path.join(new_project.path, "snapshots"))
+    assert not os.path.exists(os.path.join(new_project.path, "Test.gns3"))
+
+    # the original project is not modified
+    assert os.path.exists(os.path.join(node_dir, "startup.vpc"))
+
+
+def test_duplicate_project_running(async_run, controller, project):
+
+    list(project.nodes.values())[0]._status = "started"
+    with pytest.raises(aiohttp.web.HTTPConflict):
+        async_run(duplicate_project(controller, project, str(uuid.uuid4())))
+
+
+def test_duplicate_project_error(async_run, controller, project, tmpdir):
+
+    node = list(project.nodes.values())[0]
+    write_file(os.path.join(project.path, "project-files", "vpcs", node.id, "startup.vpc"), "ip 192.168.1.1")
+    location = str(tmpdir / "copy")
+
+    with pytest.raises(OSError):
+        with patch("gns3server.controller.duplicate_project.clone_file", side_effect=OSError("No space left on device")):
+            async_run(duplicate_project(controller, project, str(uuid.uuid4()), location=location))
+    # the directory created for the project is removed
+    assert not os.path.exists(location)
+
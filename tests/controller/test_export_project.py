@@ -18,6 +18,7 @@
 
 import os
 import json
+import asyncio
 import pytest
 import aiohttp
 import zipfile
@@ -459,3 +460,65 @@ def test_export_with_ignoring_snapshots(tmpdir, project, async_run):
 
     with zipfile.ZipFile(str(tmpdir / 'zipfile.zip')) as myzip:
         assert not os.path.join('snapshots', 'snap.gns3project') in [f.filename for f in myzip.filelist]
+
+
+def test_export_vm_concurrent_downloads(tmpdir, project, async_run):
+    """
+    The remote files are downloaded concurrently while the zip stream
+    is read, without temporary files.
+    """
+
+    downloads = {"running": 0, "max": 0}
+
+    async def download_file(project, path):
+        downloads["running"] += 1
+        downloads["max"] = max(downloads["max"], downloads["running"])
+        await asyncio.sleep(0.01)
+        downloads["running"] -= 1
+        response = AsyncioMagicMock()
+        response.content = AsyncioBytesIO(path.encode())
+        return response
+
+    computes = []
+    for compute_id in ("vm", "remote"):
+        compute = MagicMock()
+        compute.id = compute_id
+        compute.list_files = AsyncioMagicMock(return_value=[{"path": "{}/file{}".format(compute_id, i)} for i in range(10)])
+        compute.download_file = download_file
+        project._project_created_on_compute.add(compute)
+        computes.append(compute)
+
+    with open(os.path.join(project.path, "test.gns3"), 'w+') as f:
+        f.write("{}")
+
+    temporary_dir = str(tmpdir / "tmp")
+    os.makedirs(temporary_dir)
+    with patch("gns3server.controller.export_project._download_concurrency", return_value=3):
+        with aiozipstream.ZipFile() as z:
+            async_run(export_project(z, project, temporary_dir))
+            async_run(write_file(str(tmpdir / 'zipfile.zip'), z))
+
+    assert 1 < downloads["max"] <= 3
+    assert os.listdir(temporary_dir) == []
+    with zipfile.ZipFile(str(tmpdir / 'zipfile.zip')) as myzip:
+        for compute in computes:
+            for i in range(10):
+                path = "{}/file{}".format(compute.id, i)
+                assert myzip.read(path) == path.encode()
+
+
+def test_export_vm_download_error(tmpdir, project, async_run):
+
+    compute = MagicMock()
+    compute.id = "vm"
+    compute.list_files = AsyncioMagicMock(return_value=[{"path": "vm-1/dynamips/test"}])
+    compute.download_file = AsyncioMagicMock(side_effect=aiohttp.web.HTTPNotFound(text="vm-1/dynamips/test not found on compute"))
+    project._project_created_on_compute.add(compute)
+
+    with open(os.path.join(project.path, "test.gns3"), 'w+') as f:
+        f.write("{}")
+
+    with aiozipstream.ZipFile() as z:
+        async_run(export_project(z, project, str(tmpdir)))
+        with pytest.raises(aiohttp.web.HTTPNotFound):
+            async_run(write_file(str(tmpdir / 'zipfile.zip'), z))
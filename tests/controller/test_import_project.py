@@ -19,6 +19,8 @@ import os
 import uuid
 import json
 import zipfile
+import pytest
+import aiohttp
 
 
 from tests.utils import asyncio_patch, AsyncioMagicMock
@@ -541,3 +543,182 @@ def test_import_project_name_and_location(async_run, tmpdir, controller):
     with open(zip_path, "rb") as f:
         project = async_run(import_project(controller, str(uuid.uuid4()), f, name="hello", location=str(tmpdir / "test")))
     assert project.name == "hello-1"
+
+
+def test_import_project_with_snapshot_manifest(async_run, tmpdir, controller):
+
+    project_id = str(uuid.uuid4())
+    topology = {
+        "project_id": str(uuid.uuid4()),
+        "name": "test",
+        "topology": {
+        },
+        "version": "2.0.0"
+    }
+    manifest = {
+        "version": 1,
+        "topology": dict(topology),
+        "files": {}
+    }
+
+    zip_path = str(tmpdir / "project.zip")
+    with zipfile.ZipFile(zip_path, 'w') as myzip:
+        myzip.writestr("project.gns3", json.dumps(topology))
+        myzip.writestr("snapshots/snap1_260716_100439.gns3snapshot", json.dumps(manifest))
+
+    with open(zip_path, "rb") as f:
+        project = async_run(import_project(controller, project_id, f, name="imported"))
+
+    with open(os.path.join(project.path, "snapshots", "snap1_260716_100439.gns3snapshot")) as f:
+        manifest = json.load(f)
+    assert manifest["topology"]["project_id"] == project_id
+    assert manifest["topology"]["name"] == project.name
+
+
+def test_import_project_with_invalid_snapshot_manifest(async_run, tmpdir, controller):
+
+    topology = {
+        "project_id": str(uuid.uuid4()),
+        "name": "test",
+        "topology": {
+        },
+        "version": "2.0.0"
+    }
+    manifest = {
+        "version": 1,
+        "topology": dict(topology),
+        "files": {"../outside.txt": {"size": 0, "mtime": 0, "mode": 0o644, "chunks": []}}
+    }
+
+    zip_path = str(tmpdir / "project.zip")
+    with zipfile.ZipFile(zip_path, 'w') as myzip:
+        myzip.writestr("project.gns3", json.dumps(topology))
+        myzip.writestr("snapshots/snap1_260716_100439.gns3snapshot", json.dumps(manifest))
+
+    with open(zip_path, "rb") as f:
+        with pytest.raises(aiohttp.web.HTTPConflict):
+            async_run(import_project(controller, str(uuid.uuid4()), f, name="imported"))
+
+
+def test_import_project_streaming(async_run, tmpdir, controller):
+    """
+    The files of a current project are copied from the archive to their
+    destination, the files of the remote nodes are uploaded from the archive
+    """
+
+    project_id = str(uuid.uuid4())
+    uploads = {}
+
+    async def http_query(method, path, data, timeout=None):
+        uploads[path] = data.read()
+
+    controller._computes["vm"] = AsyncioMagicMock()
+    controller._computes["vm"].id = "vm"
+    controller._computes["vm"].http_query = http_query
+
+    topology = {
+        "project_id": str(uuid.uuid4()),
+        "name": "test",
+        "type": "topology",
+        "topology": {
+            "nodes": [
+                {
+                    "compute_id": "local",
+                    "node_id": "0fd3dd4d-dc93-4a04-a9b9-7396a9e22e8b",
+                    "node_type": "vpcs",
+                    "name": "PC1",
+                    "properties": {}
+                },
+                {
+                    "compute_id": "vm",
+                    "node_id": "c3ae286c-c81f-40d9-a2d0-5874b2f2478d",
+                    "node_type": "qemu",
+                    "name": "QEMU1",
+                    "properties": {}
+                }
+            ],
+            "links": [],
+            "computes": [],
+            "drawings": []
+        },
+        "revision": 9,
+        "version": __version__
+    }
+
+    zip_path = str(tmpdir / "project.zip")
+    with zipfile.ZipFile(zip_path, 'w') as myzip:
+        myzip.writestr("project.gns3", json.dumps(topology))
+        myzip.writestr("project-files/vpcs/0fd3dd4d-dc93-4a04-a9b9-7396a9e22e8b/startup.vpc", "ip dhcp")
+        myzip.writestr("project-files/qemu/c3ae286c-c81f-40d9-a2d0-5874b2f2478d/hda_disk.qcow2", "DISK")
+        myzip.writestr("project-files/qemu/c3ae286c-c81f-40d9-a2d0-5874b2f2478d/hdb_disk.qcow2", "DISK2")
+        myzip.writestr("images/QEMU/linux.qcow2", "IMAGE")
+        myzip.writestr("../outside", "NO")
+
+    with open(zip_path, "rb") as f:
+        with asyncio_patch("gns3server.controller.import_project._move_files_to_compute") as mock:
+            project = async_run(import_project(controller, project_id, f, keep_compute_id=True))
+            assert not mock.called
+
+    with open(os.path.join(project.path, "test.gns3")) as f:
+        nodes = json.load(f)["topology"]["nodes"]
+    local_node_id, remote_node_id = nodes[0]["node_id"], nodes[1]["node_id"]
+    assert local_node_id != "0fd3dd4d-dc93-4a04-a9b9-7396a9e22e8b"
+
+    with open(os.path.join(project.path, "project-files", "vpcs", local_node_id, "startup.vpc")) as f:
+        assert f.read() == "ip dhcp"
+    assert uploads == {
+        "/projects/{}/files/project-files/qemu/{}/hda_disk.qcow2".format(project_id, remote_node_id): b"DISK",
+        "/projects/{}/files/project-files/qemu/{}/hdb_disk.qcow2".format(project_id, remote_node_id): b"DISK2"
+    }
+    assert not os.path.exists(os.path.join(project.path, "project-files", "qemu"))
+    assert not os.path.exists(os.path.join(project.path, "images"))
+    assert not os.path.exists(os.path.join(os.path.dirname(project.path), "outside"))
+    with open(os.path.join(project._config().get("images_path"), "QEMU", "linux.qcow2")) as f:
+        assert f.read() == "IMAGE"
+
+
+def test_import_project_replace_image(async_run, tmpdir, controller):
+    """
+    An existing image is replaced by a new file, a VM using it keeps
+    reading the previous image
+    """
+
+    topology = {
+        "project_id": str(uuid.uuid4()),
+        "name": "test",
+        "type": "topology",
+        "topology": {
+            "nodes": [],
+            "links": [],
+            "computes": [],
+            "drawings": []
+        },
+        "revision": 9,
+        "version": __version__
+    }
+
+    images_path = os.path.join(controller.images_path(), "QEMU")
+    os.makedirs(images_path, exist_ok=True)
+    with open(os.path.join(images_path, "linux.qcow2"), "w") as f:
+        f.write("OLD")
+    with open(os.path.join(images_path, "same.qcow2"), "w") as f:
+        f.write("SAME")
+    same_inode = os.stat(os.path.join(images_path, "same.qcow2")).st_ino
+
+    zip_path = str(tmpdir / "project.zip")
+    with zipfile.ZipFile(zip_path, 'w') as myzip:
+        myzip.writestr("project.gns3", json.dumps(topology))
+        myzip.writestr("images/QEMU/linux.qcow2", "IMAGE")
+        myzip.writestr("images/QEMU/same.qcow2", "SAME")
+        myzip.writestr(".", "NO")
+
+    with open(os.path.join(images_path, "linux.qcow2")) as running_vm:
+        with open(zip_path, "rb") as f:
+            async_run(import_project(controller, str(uuid.uuid4()), f))
+        assert running_vm.read() == "OLD"
+
+    with open(os.path.join(images_path, "linux.qcow2")) as f:
+        assert f.read() == "IMAGE"
+    # the image already installed is not rewritten
+    assert os.stat(os.path.join(images_path, "same.qcow2")).st_ino == same_inode
+    assert sorted(os.listdir(images_path)) == ["linux.qcow2", "same.qcow2"]
@@ -123,3 +123,57 @@ def test_various_notification(controller, node):
     notif.project_emit("log.warning", {"message": "Warning ASA 8 is not officialy supported by GNS3"})
     notif.project_emit("log.error", {"message": "Permission denied on /tmp"})
     notif.project_emit("node.updated", node.__json__())
+
+
+def test_dispatch_node_updated_coalesced(async_run, controller, node, project):
+    """
+    Multiple updates of the same node from the compute are
+    sent as a single node.updated
+    """
+
+    notif = controller.notification
+    with notif.project_queue(project.id) as queue:
+        async_run(queue.get(0.1))  # ping
+        for status in ("started", "suspended", "started"):
+            async_run(notif.dispatch("node.updated", {
+                "node_id": node.id,
+                "project_id": project.id,
+                "status": status
+            },
+                project_id=project.id,
+                compute_id=1))
+        assert node.status == "started"
+        action, event, _ = async_run(queue.get(5))
+        assert action == "node.updated"
+        assert event["status"] == "started"
+        assert queue.empty()
+
+
+def test_dispatch_node_updated_delta(async_run, controller, node, project):
+    """
+    Clients accepting it receive only the changed fields
+    """
+
+    notif = controller.notification
+    with notif.project_queue(project.id, delta=True) as delta_queue:
+        with notif.project_queue(project.id) as queue:
+            async_run(delta_queue.get(0.1))  # ping
+            async_run(queue.get(0.1))  # ping
+
+            async_run(notif.dispatch("node.updated", {"node_id": node.id, "project_id": project.id, "name": "hello"},
+                                     project_id=project.id, compute_id=1))
+            # first update is complete
+            _, event, _ = async_run(delta_queue.get(5))
+            assert event["name"] == "hello"
+            assert "properties" in event
+            async_run(queue.get(5))
+
+            async_run(notif.dispatch("node.updated", {"node_id": node.id, "project_id": project.id, "startup_config": "ip 192"},
+                                     project_id=project.id, compute_id=1))
+            _, event, _ = async_run(delta_queue.get(5))
+            assert event == {"node_id": node.id,
+                             "project_id": project.id,
+                             "properties": node.__json__()["properties"]}
+            _, event, _ = async_run(queue.get(5))
+            assert event["name"] == "hello"
+            assert event["properties"]["startup_config"] == "ip 192"
@@ -17,9 +17,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import json
 import sys
 import uuid
 import pytest
+import asyncio
 import aiohttp
 from unittest.mock import MagicMock
 from tests.utils import AsyncioMagicMock, asyncio_patch
@@ -27,6 +29,7 @@ from unittest.mock import patch
 from uuid import uuid4
 
 from gns3server.controller.project import Project
+from gns3server.controller.compute import ComputeError
 from gns3server.controller.template import Template
 from gns3server.controller.node import Node
 from gns3server.controller.ports.ethernet_port import EthernetPort
@@ -320,6 +323,7 @@ def test_add_node_iou_no_id_available(async_run, controller):
     compute.id = "local"
     project = async_run(controller.add_project(project_id=str(uuid.uuid4()), name="test"))
     project.emit_notification = MagicMock()
+    project._project_created_on_compute.add(compute)
     response = MagicMock()
     compute.post = AsyncioMagicMock(return_value=response)
 
@@ -645,6 +649,57 @@ def test_dump():
             assert "00010203-0405-0607-0809-0a0b0c0d0e0f" in content
 
 
+def test_dump_delayed(async_run, project):
+    """
+    Changes done while the loop is running are merged in a single write
+    """
+
+    async def change_project():
+        with patch.object(project, "_write_topology") as mock_write:
+            project.dump()
+            project.dump()
+            project.dump()
+            assert not mock_write.called
+            await project.flush()
+            assert mock_write.call_count == 1
+            await project.flush()
+            assert mock_write.call_count == 1
+
+    async_run(change_project())
+
+
+def test_dump_delayed_invalid_topology(async_run, project):
+    """
+    A topology rejected by the schema check is logged and kept
+    to be written by the next flush
+    """
+
+    async def change_project():
+        with patch("gns3server.controller.project.project_to_topology", side_effect=aiohttp.web.HTTPConflict(text="Invalid topology")):
+            project.dump()
+            await project._background_flush()
+            assert project._dump_pending
+        project.name = "Renamed"
+        await project.flush()
+        assert not project._dump_pending
+
+    async_run(change_project())
+    with open(os.path.join(project.path, project._filename)) as f:
+        assert json.load(f)["name"] == "Renamed"
+
+
+def test_dump_delayed_written_on_close(async_run, project):
+
+    async def change_project():
+        project.name = "Renamed"
+        project.dump()
+        await project.close()
+
+    async_run(change_project())
+    with open(os.path.join(project.path, project._filename)) as f:
+        assert json.load(f)["name"] == "Renamed"
+
+
 def test_open_close(async_run, controller):
     project = Project(controller=controller, name="Test")
     assert project.status == "opened"
@@ -707,6 +762,24 @@ def test_duplicate(project, async_run, controller):
     assert list(new_project.nodes.values())[1].compute.id == "remote"
 
 
+def test_duplicate_local(project, async_run, controller, node):
+    """
+    When all the nodes run on the local compute the files are cloned
+    instead of exporting the project
+    """
+
+    controller._computes["local"] = node.compute
+    with asyncio_patch("gns3server.controller.project.export_project") as mock_export:
+        new_project = async_run(project.duplicate(name="Hello"))
+    assert not mock_export.called
+    assert new_project.id != project.id
+    assert new_project.name == "Hello"
+
+    async_run(new_project.open())
+    assert len(new_project.nodes) == 1
+    assert list(new_project.nodes.values())[0].id != node.id
+
+
 def test_snapshots(project):
     """
     List the snapshots
@@ -764,6 +837,35 @@ def test_snapshot(project, async_run):
         snapshot = async_run(project.snapshot("test1"))
 
 
+class _NodesActionContent:
+    """
+    Lines of the results sent by the compute, None for a compute which doesn't answer
+    """
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            line = next(self._lines)
+        except StopIteration:
+            raise StopAsyncIteration
+        if line is None:
+            raise asyncio.TimeoutError()
+        return line
+
+
+def _nodes_action_response(nodes, status="started", results=None):
+    response = MagicMock()
+    if results is None:
+        results = [{"node_id": node.id, "status": 200, "node": {"status": status}} for node in nodes]
+    response.content = _NodesActionContent([result if result is None else (json.dumps(result) + "\n").encode() for result in results])
+    return response
+
+
 def test_start_all(project, async_run):
     compute = MagicMock()
     compute.id = "local"
@@ -774,9 +876,114 @@ def test_start_all(project, async_run):
     for node_i in range(0, 10):
         async_run(project.add_node(compute, "test", None, node_type="vpcs", properties={"startup_config": "test.cfg"}))
 
-    compute.post = AsyncioMagicMock()
+    compute.post = AsyncioMagicMock(return_value=_nodes_action_response(project.nodes.values()))
     async_run(project.start_all())
-    assert len(compute.post.call_args_list) == 10
+    assert len(compute.post.call_args_list) == 1
+    args, kwargs = compute.post.call_args
+    assert args[0] == "/projects/{}/nodes/start".format(project.id)
+    assert len(kwargs["data"]["nodes"]) == 10
+    assert kwargs["timeout"] == 240
+    assert kwargs["stream"]
+    for node in project.nodes.values():
+        assert node.status == "started"
+
+
+def test_start_all_error(project, async_run):
+    compute = MagicMock()
+    compute.id = "local"
+    response = MagicMock()
+    response.json = {"console": 2048}
+    compute.post = AsyncioMagicMock(return_value=response)
+
+    node = async_run(project.add_node(compute, "test", None, node_type="vpcs", properties={"startup_config": "test.cfg"}))
+
+    response = _nodes_action_response([node], results=[{"node_id": node.id, "status": 409, "message": "VPCS error"}])
+    compute.post = AsyncioMagicMock(return_value=response)
+    with pytest.raises(aiohttp.web.HTTPConflict):
+        async_run(project.start_all())
+    assert response.release.called
+
+
+def test_start_all_compute_timeout(project, async_run):
+    """
+    The nodes are updated as soon as their results are received,
+    even if the compute stops answering
+    """
+
+    compute = MagicMock()
+    compute.id = "local"
+    response = MagicMock()
+    response.json = {"console": 2048}
+    compute.post = AsyncioMagicMock(return_value=response)
+
+    node1 = async_run(project.add_node(compute, "test1", None, node_type="vpcs"))
+    node2 = async_run(project.add_node(compute, "test2", None, node_type="vpcs"))
+
+    response = _nodes_action_response([node1, node2], results=[{"node_id": node1.id, "status": 200, "node": {"status": "started"}}, None])
+    compute.post = AsyncioMagicMock(return_value=response)
+    with pytest.raises(aiohttp.web.HTTPConflict) as e:
+        async_run(project.start_all())
+    assert "1 nodes" in e.value.text
+    assert node1.status == "started"
+    assert node2.status == "stopped"
+    assert response.release.called
+
+
+def test_start_all_legacy_compute(project, async_run):
+    """
+    Compute without support of the actions on multiple nodes
+    """
+
+    compute = MagicMock()
+    compute.id = "local"
+    response = MagicMock()
+    response.json = {"console": 2048}
+    compute.post = AsyncioMagicMock(return_value=response)
+
+    for node_i in range(0, 10):
+        async_run(project.add_node(compute, "test", None, node_type="vpcs", properties={"startup_config": "test.cfg"}))
+
+    compute.post = AsyncioMagicMock(side_effect=[aiohttp.web.HTTPNotFound()] + [MagicMock()] * 10)
+    async_run(project.start_all())
+    assert len(compute.post.call_args_list) == 11
+
+
+def test_console_history(project, async_run):
+    compute1 = MagicMock()
+    compute1.id = "local"
+    compute2 = MagicMock()
+    compute2.id = "remote"
+    compute2.name = "Remote"
+    response = MagicMock()
+    response.json = {"console": 2048}
+    compute1.post = AsyncioMagicMock(return_value=response)
+    compute2.post = AsyncioMagicMock(return_value=response)
+
+    node1 = async_run(project.add_node(compute1, "test1", None, node_type="vpcs"))
+    node2 = async_run(project.add_node(compute2, "test2", None, node_type="vpcs"))
+    node3 = async_run(project.add_node(compute1, "test3", None, node_type="vpcs"))
+
+    response = MagicMock()
+    response.json = {"nodes": [{"node_id": node3.id, "status": 200, "matches": []},
+                               {"node_id": node1.id, "status": 200, "matches": ["PC1> ping"]}]}
+    compute1.post = AsyncioMagicMock(return_value=response)
+    compute2.post = AsyncioMagicMock(side_effect=aiohttp.web.HTTPNotFound(text="Not found"))
+    results = async_run(project.console_history(search="ping"))
+    assert [result["node_id"] for result in results] == [node1.id, node2.id, node3.id]
+    assert results[0]["matches"] == ["PC1> ping"]
+    assert results[1]["status"] == 409
+    assert "Remote" in results[1]["message"]
+    args, kwargs = compute1.post.call_args
+    assert args[0] == "/projects/{}/console_history".format(project.id)
+    assert kwargs["data"] == {"node_ids": [node1.id, node3.id], "search": "ping"}
+    assert kwargs["timeout"] == 30
+
+    # the compute doesn't answer
+    compute2.post = AsyncioMagicMock(side_effect=ComputeError("Timeout error for POST call"))
+    results = async_run(project.console_history(node_ids=[node1.id, node2.id]))
+    assert results[0]["matches"] == ["PC1> ping"]
+    assert results[1]["status"] == 409
+    assert "Timeout" in results[1]["message"]
 
 
 def test_stop_all(project, async_run):
@@ -789,9 +996,10 @@ def test_stop_all(project, async_run):
     for node_i in range(0, 10):
         async_run(project.add_node(compute, "test", None, node_type="vpcs", properties={"startup_config": "test.cfg"}))
 
-    compute.post = AsyncioMagicMock()
+    compute.post = AsyncioMagicMock(return_value=MagicMock())
     async_run(project.stop_all())
-    assert len(compute.post.call_args_list) == 10
+    assert len(compute.post.call_args_list) == 1
+    assert compute.post.call_args[0][0] == "/projects/{}/nodes/stop".format(project.id)
 
 
 def test_suspend_all(project, async_run):
@@ -804,9 +1012,10 @@ def test_suspend_all(project, async_run):
     for node_i in range(0, 10):
         async_run(project.add_node(compute, "test", None, node_type="vpcs", properties={"startup_config": "test.cfg"}))
 
-    compute.post = AsyncioMagicMock()
+    compute.post = AsyncioMagicMock(return_value=_nodes_action_response(project.nodes.values(), "suspended"))
     async_run(project.suspend_all())
-    assert len(compute.post.call_args_list) == 10
+    assert len(compute.post.call_args_list) == 1
+    assert compute.post.call_args[0][0] == "/projects/{}/nodes/suspend".format(project.id)
 
 
 def test_node_name(project, async_run):
@@ -850,3 +1059,20 @@ def test_duplicate_node(project, async_run):
         }))
     new_node = async_run(project.duplicate_node(original, 42, 10, 11))
     assert new_node.x == 42
+
+
+def test_start_all_priority(project, async_run):
+    compute = MagicMock()
+    compute.id = "local"
+    response = MagicMock()
+    response.json = {"console": 2048}
+    compute.post = AsyncioMagicMock(return_value=response)
+
+    switch = async_run(project.add_node(compute, "switch", None, node_type="ethernet_switch"))
+    vpcs = async_run(project.add_node(compute, "test", None, node_type="vpcs", properties={"startup_config": "test.cfg"}))
+
+    compute.post = AsyncioMagicMock(return_value=_nodes_action_response(project.nodes.values()))
+    async_run(project.start_all())
+    nodes = {node_action["node_id"]: node_action for node_action in compute.post.call_args[1]["data"]["nodes"]}
+    assert nodes[switch.id]["priority"] == 1
+    assert "priority" not in nodes[vpcs.id]
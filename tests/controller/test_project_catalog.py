@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+import pytest
+import aiohttp
+from unittest.mock import patch
+
+from gns3server.controller.project_catalog import ProjectCatalog
+from gns3server.controller.topology import load_topology_header, GNS3_FILE_FORMAT_REVISION
+from gns3server.version import __version__
+
+
+def write_topology(path, name):
+
+    with open(path, "w+") as f:
+        json.dump({
+            "project_id": "69f26504-7aa3-48aa-9f29-798d44841211",
+            "name": name,
+            "revision": GNS3_FILE_FORMAT_REVISION,
+            "topology": {
+                "nodes": [],
+                "links": [],
+                "computes": [],
+                "drawings": []
+            },
+            "type": "topology",
+            "version": __version__}, f)
+
+
+def test_header(tmpdir):
+
+    path = str(tmpdir / "test.gns3")
+    write_topology(path, "Test")
+    catalog = ProjectCatalog(str(tmpdir / "index.json"))
+    with patch("gns3server.controller.project_catalog.load_topology_header", side_effect=load_topology_header) as mock:
+        assert catalog.header(path)["name"] == "Test"
+        assert catalog.header(path)["name"] == "Test"
+        assert mock.call_count == 1
+
+        # the topology has been modified
+        write_topology(path, "Test2")
+        os.utime(path, ns=(0, 0))
+        assert catalog.header(path)["name"] == "Test2"
+        assert mock.call_count == 2
+
+
+def test_save(tmpdir):
+
+    path1 = str(tmpdir / "test1.gns3")
+    path2 = str(tmpdir / "test2.gns3")
+    write_topology(path1, "Test1")
+    write_topology(path2, "Test2")
+    index = str(tmpdir / "index.json")
+    catalog = ProjectCatalog(index)
+    catalog.header(path1)
+    catalog.header(path2)
+    catalog.prune([path1])
+    catalog.save()
+
+    catalog = ProjectCatalog(index)
+    with patch("gns3server.controller.project_catalog.load_topology_header") as mock:
+        assert catalog.header(path1)["name"] == "Test1"
+        assert not mock.called
+        catalog.header(path2)
+        assert mock.called
+
+
+def test_other_version(tmpdir):
+
+    path = str(tmpdir / "test.gns3")
+    write_topology(path, "Test")
+    index = str(tmpdir / "index.json")
+    catalog = ProjectCatalog(index)
+    catalog.header(path)
+    catalog.save()
+    with open(index) as f:
+        data = json.load(f)
+    data["version"] = "1.0"
+    with open(index, "w") as f:
+        json.dump(data, f)
+
+    catalog = ProjectCatalog(index)
+    with patch("gns3server.controller.project_catalog.load_topology_header", side_effect=load_topology_header) as mock:
+        catalog.header(path)
+        assert mock.called
+
+
+def test_error(tmpdir):
+
+    path = str(tmpdir / "test.gns3")
+    with open(path, "w+") as f:
+        f.write("{")
+    catalog = ProjectCatalog(str(tmpdir / "index.json"))
+    with pytest.raises(aiohttp.web.HTTPConflict):
+        catalog.header(path)
+    # the error is kept until the file is modified
+    with patch("gns3server.controller.project_catalog.load_topology_header") as mock:
+        with pytest.raises(aiohttp.web.HTTPConflict):
+            catalog.header(path)
+        assert not mock.called
+    with pytest.raises(aiohttp.web.HTTPConflict):
+        catalog.header(str(tmpdir / "missing.gns3"))
@@ -19,6 +19,7 @@
 import json
 import pytest
 import aiohttp
+from unittest.mock import patch
 
 from tests.utils import asyncio_patch, AsyncioMagicMock
 
@@ -220,3 +221,18 @@ def test_open_missing_compute(controller, tmpdir, demo_topology, async_run, http
     with open(str(tmpdir / "demo.gns3"), "r") as f:
         topo = json.load(f)
         assert len(topo["topology"]["nodes"]) == 2
+
+
+def test_load_project_progress(controller, tmpdir, demo_topology, async_run, http_server):
+    with open(str(tmpdir / "demo.gns3"), "w+") as f:
+        json.dump(demo_topology, f)
+
+    controller._computes["local"] = Compute("local", controller=controller, host=http_server[0], port=http_server[1])
+    controller._computes["vm"] = controller._computes["local"]
+
+    with asyncio_patch("gns3server.compute.vpcs.vpcs_vm.VPCSVM.add_ubridge_udp_connection"):
+        with patch("gns3server.controller.project.Project.emit_notification") as mock_notification:
+            project = async_run(controller.load_project(str(tmpdir / "demo.gns3")))
+    assert project.status == "opened"
+    mock_notification.assert_any_call("project.loading", {"project_id": project.id, "stage": "nodes", "loaded": 2, "total": 2})
+    mock_notification.assert_any_call("project.loading", {"project_id": project.id, "stage": "links", "loaded": 1, "total": 1})
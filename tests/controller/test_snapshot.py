@@ -16,6 +16,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import json
+import zipfile
+import aiohttp
 import pytest
 from unittest.mock import patch, MagicMock
 
@@ -40,7 +43,7 @@ def test_snapshot_name(project):
     assert snapshot.name == "test1"
     assert snapshot._created_at > 0
     assert snapshot.path.startswith(os.path.join(project.path, "snapshots", "test1_"))
-    assert snapshot.path.endswith(".gns3project")
+    assert snapshot.path.endswith(".gns3snapshot")
 
     # Check if UTC conversion doesn't corrupt the path
     snap2 = Snapshot(project, filename=os.path.basename(snapshot.path))
@@ -101,3 +104,103 @@ def test_restore(project, controller, async_run):
     project = controller.get_project(project.id)
     assert not os.path.exists(test_file)
     assert len(project.nodes) == 1
+
+
+def test_snapshot_incremental(project, async_run):
+
+    disk = os.path.join(project.path, "project-files", "qemu", "node1", "hda_disk.qcow2")
+    os.makedirs(os.path.dirname(disk))
+    with open(disk, "wb") as f:
+        f.write(os.urandom(1024))
+
+    store = project.snapshot_store
+    async_run(project.snapshot(name="test1"))
+    assert store.bytes_written == 1024
+
+    # the unchanged files are shared by the snapshots
+    async_run(project.snapshot(name="test2"))
+    assert store.bytes_written == 0
+    assert len(project.snapshots) == 2
+
+
+def test_restore_modified_files(project, controller, async_run):
+
+    node_dir = os.path.join(project.path, "project-files", "qemu", "node1")
+    os.makedirs(node_dir)
+    with open(os.path.join(node_dir, "hda_disk.qcow2"), "wb") as f:
+        f.write(b"disk")
+    snapshot = async_run(project.snapshot(name="test"))
+
+    with open(os.path.join(node_dir, "hda_disk.qcow2"), "wb") as f:
+        f.write(b"modified disk")
+    with open(os.path.join(node_dir, "new_file"), "wb") as f:
+        f.write(b"new")
+
+    with patch("gns3server.config.Config.get_section_config", return_value={"local": True}):
+        async_run(snapshot.restore())
+
+    with open(os.path.join(node_dir, "hda_disk.qcow2"), "rb") as f:
+        assert f.read() == b"disk"
+    assert not os.path.exists(os.path.join(node_dir, "new_file"))
+
+
+def test_restore_outside_of_project(project, controller, async_run):
+
+    snapshot = async_run(project.snapshot(name="test"))
+    store = project.snapshot_store
+    manifest = store.read_manifest(snapshot.path)
+    manifest["files"]["../outside.txt"] = {"size": 3, "mtime": 0, "mode": 0o644, "chunks": [store.write_object(b"bad")]}
+    with open(snapshot.path, "w") as f:
+        json.dump(manifest, f)
+
+    with patch("gns3server.config.Config.get_section_config", return_value={"local": True}):
+        with pytest.raises(aiohttp.web.HTTPConflict):
+            async_run(snapshot.restore())
+    assert not os.path.exists(os.path.join(os.path.dirname(project.path), "outside.txt"))
+    # the project is not closed
+    assert project.status == "opened"
+
+
+def test_delete_releases_objects(project, async_run):
+
+    disk = os.path.join(project.path, "project-files", "qemu", "node1", "hda_disk.qcow2")
+    os.makedirs(os.path.dirname(disk))
+    with open(disk, "wb") as f:
+        f.write(b"disk1")
+    snapshot1 = async_run(project.snapshot(name="test1"))
+    with open(disk, "wb") as f:
+        f.write(b"disk2")
+    snapshot2 = async_run(project.snapshot(name="test2"))
+
+    objects = os.path.join(project.path, "snapshots", "objects")
+    count = sum(len(files) for _, _, files in os.walk(objects))
+    async_run(project.delete_snapshot(snapshot2.id))
+    assert sum(len(files) for _, _, files in os.walk(objects)) == count - 1
+    assert not os.path.exists(snapshot2.path)
+    assert os.path.exists(snapshot1.path)
+
+
+def test_restore_zip_snapshot(project, controller, async_run):
+    """
+    Snapshots created by previous versions are zip files
+    """
+
+    topology = {
+        "project_id": project.id,
+        "name": "Test",
+        "revision": 9,
+        "topology": {"nodes": [], "links": [], "computes": [], "drawings": []},
+        "type": "topology",
+        "version": "2.2.0"
+    }
+    os.makedirs(os.path.join(project.path, "snapshots"))
+    path = os.path.join(project.path, "snapshots", "old_260716_100439.gns3project")
+    with zipfile.ZipFile(path, "w") as myzip:
+        myzip.writestr("project.gns3", json.dumps(topology))
+        myzip.writestr("project-files/vpcs/test/startup.vpc", "ip 192.168.1.1")
+    project.reset()
+    snapshot = list(project.snapshots.values())[0]
+
+    with patch("gns3server.config.Config.get_section_config", return_value={"local": True}):
+        async_run(snapshot.restore())
+    assert os.path.exists(os.path.join(project.path, "project-files", "vpcs", "test", "startup.vpc"))
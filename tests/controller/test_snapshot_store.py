@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pytest
+from unittest.mock import patch
+
+from gns3server.controller.snapshot_store import SnapshotStore, check_manifest, project_file_path
+
+
+@pytest.fixture
+def store(tmpdir):
+
+    with patch("gns3server.controller.snapshot_store.CHUNK_SIZE", 4):
+        yield SnapshotStore(str(tmpdir / "snapshots"))
+
+
+def write_file(path, content):
+
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def read_file(path):
+
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_write_object(store):
+
+    digest = store.write_object(b"hello")
+    assert store.write_object(b"hello") == digest
+    assert store.bytes_written == 5
+    assert store.read_object(digest) == b"hello"
+
+
+def test_add_file(store, tmpdir):
+
+    path = str(tmpdir / "disk.qcow2")
+    write_file(path, b"aaaabbbbaaaacc")
+    entry = store.add_file(path)
+    assert entry["size"] == 14
+    assert len(entry["chunks"]) == 4
+    assert entry["chunks"][0] == entry["chunks"][2]
+    # the identical chunks are stored once
+    assert store.bytes_written == 10
+
+
+def test_add_file_unchanged(store, tmpdir):
+
+    path = str(tmpdir / "disk.qcow2")
+    write_file(path, b"aaaabbbb")
+    entry = store.add_file(path)
+    with patch("gns3server.controller.snapshot_store.SnapshotStore.write_object") as mock:
+        assert store.add_file(path, entry) == entry
+        assert not mock.called
+
+
+def test_restore_file(store, tmpdir):
+
+    path = str(tmpdir / "disk.qcow2")
+    write_file(path, b"aaaabbbbcccc")
+    entry = store.add_file(path, None)
+
+    write_file(path, b"aaaaXbbbccccdd")
+    with patch("gns3server.controller.snapshot_store.SnapshotStore.read_object", side_effect=store.read_object) as mock:
+        assert store.restore_file(path, entry, 4)
+    # only the modified chunk is read from the store
+    assert mock.call_count == 1
+    assert read_file(path) == b"aaaabbbbcccc"
+    assert os.stat(path).st_mtime_ns == entry["mtime"]
+
+    # the file is identical to the snapshot
+    assert not store.restore_file(path, entry, 4)
+
+    os.remove(path)
+    assert store.restore_file(path, entry, 4)
+    assert read_file(path) == b"aaaabbbbcccc"
+
+
+def test_restore_file_hard_link(store, tmpdir):
+
+    path = str(tmpdir / "disk.qcow2")
+    write_file(path, b"aaaabbbb")
+    entry = store.add_file(path, None)
+    write_file(path, b"aaaacccc")
+
+    # the file is shared with a duplicated project
+    link = str(tmpdir / "duplicate.qcow2")
+    os.link(path, link)
+    assert store.restore_file(path, entry, 4)
+    assert read_file(path) == b"aaaabbbb"
+    assert read_file(link) == b"aaaacccc"
+    assert os.stat(path).st_nlink == 1
+
+
+def test_restore_file_read_only(store, tmpdir):
+
+    path = str(tmpdir / "disk.qcow2")
+    write_file(path, b"aaaabbbb")
+    entry = store.add_file(path, None)
+    write_file(path, b"aaaaccccdd")
+    os.chmod(path, 0o444)
+
+    with patch("gns3server.controller.snapshot_store.SnapshotStore._rewrite_file") as mock:
+        assert store.restore_file(path, entry, 4)
+        assert not mock.called
+    assert read_file(path) == b"aaaabbbb"
+    assert os.stat(path).st_mode & 0o777 == entry["mode"]
+    assert not [f for f in os.listdir(str(tmpdir)) if f.startswith(".tmp")]
+
+
+@pytest.mark.parametrize("relpath", ["../outside.txt", "/etc/passwd", "project-files/../../outside.txt", "C:/outside.txt", "project-files\\..\\..\\outside.txt", "project-files//test"])
+def test_check_manifest_invalid_path(relpath):
+
+    with pytest.raises(ValueError):
+        check_manifest({"files": {relpath: {"chunks": []}}})
+
+
+def test_check_manifest_invalid_chunk():
+
+    check_manifest({"files": {"project-files/test": {"chunks": ["a" * 64]}}})
+    with pytest.raises(ValueError):
+        check_manifest({"files": {"project-files/test": {"chunks": ["../../outside"]}}})
+
+
+def test_project_file_path(tmpdir):
+
+    project_path = str(tmpdir / "project")
+    os.makedirs(os.path.join(project_path, "project-files"))
+    assert project_file_path(project_path, "project-files/test") == os.path.join(project_path, "project-files", "test")
+
+    # a symbolic link cannot be used to write outside of the project
+    os.symlink(str(tmpdir), os.path.join(project_path, "project-files", "link"))
+    with pytest.raises(ValueError):
+        project_file_path(project_path, "project-files/link/outside.txt")
+
+
+def test_collect_garbage(store, tmpdir):
+
+    path = str(tmpdir / "disk.qcow2")
+    write_file(path, b"aaaabbbb")
+    store.write_manifest(os.path.join(store.path, "snap1_260716_100439.gns3snapshot"), {"topology": {}, "files": {"disk.qcow2": store.add_file(path)}})
+    write_file(path, b"aaaacccc")
+    manifest2 = os.path.join(store.path, "snap2_260716_100439.gns3snapshot")
+    store.write_manifest(manifest2, {"topology": {}, "files": {"disk.qcow2": store.add_file(path)}})
+    assert store.latest_files()["disk.qcow2"]["size"] == 8
+
+    os.remove(manifest2)
+    # only the chunk "cccc" is not used anymore
+    assert store.collect_garbage() == 1
+    entry = store.latest_files()["disk.qcow2"]
+    for digest in entry["chunks"]:
+        store.read_object(digest)
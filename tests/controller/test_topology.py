@@ -24,7 +24,7 @@ from tests.utils import asyncio_patch
 
 from gns3server.controller.project import Project
 from gns3server.controller.compute import Compute
-from gns3server.controller.topology import project_to_topology, load_topology, GNS3_FILE_FORMAT_REVISION
+from gns3server.controller.topology import project_to_topology, load_topology, load_topology_header, GNS3_FILE_FORMAT_REVISION
 from gns3server.version import __version__
 
 
@@ -125,6 +125,50 @@ def test_load_topology(tmpdir):
     assert topo == data
 
 
+def test_load_topology_header(tmpdir):
+    data = {
+        "project_id": "69f26504-7aa3-48aa-9f29-798d44841211",
+        "name": "Test",
+        "auto_open": True,
+        "revision": GNS3_FILE_FORMAT_REVISION,
+        "topology": {
+            # the nodes are not checked
+            "nodes": [{"node_type": "unknown"}],
+            "links": [],
+            "computes": [],
+            "drawings": []
+        },
+        "variables": [{"name": ""}, {"name": "TEST1"}],
+        "type": "topology",
+        "version": __version__}
+
+    path = str(tmpdir / "test.gns3")
+    with open(path, "w+") as f:
+        json.dump(data, f)
+    header = load_topology_header(path)
+    assert header == {
+        "project_id": "69f26504-7aa3-48aa-9f29-798d44841211",
+        "name": "Test",
+        "auto_open": True,
+        "revision": GNS3_FILE_FORMAT_REVISION,
+        "variables": [{"name": "TEST1"}],
+        "type": "topology",
+        "version": __version__}
+
+
+def test_load_topology_header_schema_error(tmpdir):
+    path = str(tmpdir / "test.gns3")
+    with open(path, "w+") as f:
+        json.dump({
+            "revision": GNS3_FILE_FORMAT_REVISION,
+            "name": "Test",
+            "type": "topology",
+            "version": __version__
+        }, f)
+    with pytest.raises(aiohttp.web.HTTPConflict):
+        load_topology_header(path)
+
+
 def test_load_topology_file_error(tmpdir):
     path = str(tmpdir / "test.gns3")
     with pytest.raises(aiohttp.web.HTTPConflict):
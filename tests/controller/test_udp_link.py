@@ -162,6 +162,56 @@ def test_create_one_side_failure(async_run, project):
     compute1.delete.assert_any_call("/projects/{}/vpcs/nodes/{}/adapters/0/ports/4/nio".format(project.id, node1.id), timeout=120)
 
 
+def test_create_first_side_failure(async_run, project):
+    compute1 = MagicMock()
+    compute2 = MagicMock()
+
+    node1 = Node(project, compute1, "node1", node_type="vpcs")
+    node1._ports = [EthernetPort("E0", 0, 0, 4)]
+    node2 = Node(project, compute2, "node2", node_type="vpcs")
+    node2._ports = [EthernetPort("E0", 0, 3, 1)]
+
+    async def subnet_callback(compute2):
+        """
+        Fake subnet callback
+        """
+        return ("192.168.1.1", "192.168.1.2")
+
+    compute1.get_ip_on_same_subnet.side_effect = subnet_callback
+
+    link = UDPLink(project)
+    async_run(link.add_node(node1, 0, 4))
+
+    async def compute1_callback(path, data={}, **kwargs):
+        """
+        Fake server
+        """
+        if "/ports/udp" in path:
+            response = MagicMock()
+            response.json = {"udp_port": 1024}
+            return response
+        elif "/adapters" in path:
+            raise aiohttp.web.HTTPConflict(text="Error when creating the NIO")
+
+    async def compute2_callback(path, data={}, **kwargs):
+        """
+        Fake server
+        """
+        if "/ports/udp" in path:
+            response = MagicMock()
+            response.json = {"udp_port": 2048}
+            return response
+
+    compute1.post.side_effect = compute1_callback
+    compute2.post.side_effect = compute2_callback
+    with pytest.raises(aiohttp.web.HTTPConflict):
+        async_run(link.add_node(node2, 3, 1))
+
+    # The NIOs are created at the same time, the one of node2 is removed
+    compute2.delete.assert_any_call("/projects/{}/vpcs/nodes/{}/adapters/3/ports/1/nio".format(project.id, node2.id), timeout=120)
+    assert not compute1.delete.called
+
+
 def test_delete(async_run, project):
     compute1 = MagicMock()
     compute2 = MagicMock()
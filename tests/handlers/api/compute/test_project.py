@@ -21,6 +21,8 @@ This test suite check /project endpoint
 
 import uuid
 import os
+import json
+import asyncio
 
 from unittest.mock import patch
 from tests.utils import asyncio_patch
@@ -196,3 +198,72 @@ def test_stream_file(http_compute, tmpdir):
 
     response = http_compute.get("/projects/{project_id}/files/../hello".format(project_id=project.id), raw=True)
     assert response.status == 404
+
+
+def test_nodes_action(http_compute, project):
+    response = http_compute.post("/projects/{project_id}/vpcs/nodes".format(project_id=project.id), {"name": "PC TEST 1"})
+    node_id = response.json["node_id"]
+    missing_node_id = str(uuid.uuid4())
+
+    with asyncio_patch("gns3server.compute.vpcs.vpcs_vm.VPCSVM.start", return_value=True) as mock:
+        response = http_compute.post("/projects/{project_id}/nodes/start".format(project_id=project.id),
+                                     {"nodes": [{"node_id": node_id}, {"node_id": missing_node_id}]})
+        assert mock.called
+    assert response.status == 200
+    results = {}
+    for line in response.body.decode().splitlines():
+        result = json.loads(line)
+        results[result["node_id"]] = result
+    assert results[node_id]["status"] == 200
+    assert results[node_id]["node"]["name"] == "PC TEST 1"
+    assert results[missing_node_id]["status"] == 404
+
+
+def test_nodes_action_timeout(http_compute, project):
+    response = http_compute.post("/projects/{project_id}/vpcs/nodes".format(project_id=project.id), {"name": "PC TEST 1"})
+    node_id = response.json["node_id"]
+
+    async def start(*args, **kwargs):
+        await asyncio.sleep(1)
+
+    with patch("gns3server.handlers.api.compute.project_handler.NODE_ACTION_TIMEOUT", 0.1):
+        with patch("gns3server.compute.vpcs.vpcs_vm.VPCSVM.start", side_effect=start):
+            response = http_compute.post("/projects/{project_id}/nodes/start".format(project_id=project.id),
+                                         {"nodes": [{"node_id": node_id}]})
+    assert response.status == 200
+    result = json.loads(response.body.decode().splitlines()[0])
+    assert result["node_id"] == node_id
+    assert result["status"] == 504
+
+
+def test_nodes_action_invalid(http_compute, project):
+    response = http_compute.post("/projects/{project_id}/nodes/delete".format(project_id=project.id), {"nodes": []})
+    assert response.status == 400
+
+
+def test_console_history(http_compute, project):
+    response = http_compute.post("/projects/{project_id}/vpcs/nodes".format(project_id=project.id), {"name": "PC TEST 1"})
+    node_id = response.json["node_id"]
+    response = http_compute.post("/projects/{project_id}/vpcs/nodes".format(project_id=project.id), {"name": "PC TEST 2"})
+    stopped_node_id = response.json["node_id"]
+    missing_node_id = str(uuid.uuid4())
+
+    node = project.get_node(node_id)
+    node._get_console_history().append(b"Welcome to Virtual PC Simulator\r\nPC1> ping 10.0.0.1\r\n")
+
+    response = http_compute.post("/projects/{project_id}/console_history".format(project_id=project.id),
+                                 {"node_ids": [node_id, stopped_node_id, missing_node_id], "size": 20}, example=True)
+    assert response.status == 200
+    results = response.json["nodes"]
+    assert results[0] == {"node_id": node_id, "status": 200, "output": "PC1> ping 10.0.0.1\r\n", "size": 53, "total": 53}
+    assert results[1]["status"] == 409
+    assert results[2]["status"] == 404
+
+    response = http_compute.post("/projects/{project_id}/console_history".format(project_id=project.id), {"search": "ping"})
+    assert response.status == 200
+    results = {result["node_id"]: result for result in response.json["nodes"]}
+    assert results[node_id]["matches"] == ["PC1> ping 10.0.0.1"]
+    assert "matches" not in results[stopped_node_id]
+
+    response = http_compute.post("/projects/{project_id}/console_history".format(project_id=project.id), {"search": "("})
+    assert response.status == 400
@@ -40,7 +40,9 @@ def compute(http_controller, async_run):
     compute.id = "example.com"
     compute.host = "example.org"
     Controller.instance()._computes = {"example.com": compute}
-    return compute
+    yield compute
+    # the nodes are stopped with the controller, the response is released
+    compute.post = AsyncioMagicMock(return_value=MagicMock())
 
 
 @pytest.fixture
@@ -135,6 +137,19 @@ def test_start_all_nodes(http_controller, tmpdir, project, compute):
     assert response.status == 204
 
 
+def test_console_history(http_controller, tmpdir, project, compute):
+    response = MagicMock()
+    response.json = {"nodes": []}
+    compute.post = AsyncioMagicMock(return_value=response)
+
+    response = http_controller.post("/projects/{}/console_history".format(project.id), {"size": 1024}, example=True)
+    assert response.status == 200
+    assert response.json == {"nodes": []}
+
+    response = http_controller.post("/projects/{}/console_history".format(project.id), {"search": "("})
+    assert response.status == 400
+
+
 def test_stop_all_nodes(http_controller, tmpdir, project, compute):
     response = MagicMock()
     compute.post = AsyncioMagicMock()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from unittest.mock import MagicMock
+
+from gns3server.notification_queue import NotificationQueue, NotificationMessage
+
+
+def test_get(async_run):
+    queue = NotificationQueue()
+    assert async_run(queue.get(0.1))[0] == "ping"
+    queue.put_nowait(("test", {"a": 1}, {}))
+    assert async_run(queue.get(5)) == ("test", {"a": 1}, {})
+
+
+def test_get_nowait():
+    queue = NotificationQueue()
+    queue.put_nowait(("test", {"a": 1}, {"project_id": "42"}))
+    assert queue.get_nowait() == ("test", {"a": 1}, {"project_id": "42"})
+    assert queue.empty()
+
+
+def test_get_wait(async_run):
+    queue = NotificationQueue()
+    async_run(queue.get(0.1))
+
+    async def put():
+        await asyncio.sleep(0.1)
+        queue.put_nowait(("test", {"a": 1}, {}))
+
+    asyncio.ensure_future(put())
+    assert async_run(queue.get(5)) == ("test", {"a": 1}, {})
+
+
+def test_message_serialized_once():
+    event = MagicMock()
+    event.__json__ = MagicMock(return_value={"a": 1})
+    message = NotificationMessage("test", event, {"project_id": "42"})
+    assert message.json() == '{"action": "test", "event": {"a": 1}, "project_id": "42"}'
+    assert message.json() == '{"action": "test", "event": {"a": 1}, "project_id": "42"}'
+    assert event.__json__.call_count == 1
+
+
+def test_coalesce(async_run):
+    queue = NotificationQueue()
+    async_run(queue.get(0.1))  # ping
+    queue.put_nowait(NotificationMessage("node.updated", {"node_id": "1", "name": "a"}))
+    queue.put_nowait(NotificationMessage("node.updated", {"node_id": "2", "name": "b"}))
+    queue.put_nowait(NotificationMessage("node.created", {"node_id": "3"}))
+    queue.put_nowait(NotificationMessage("node.updated", {"node_id": "1", "name": "c"}))
+    assert queue.qsize() == 3
+    assert queue.coalesced == 1
+    assert async_run(queue.get(5)) == ("node.updated", {"node_id": "1", "name": "c"}, {})
+    assert async_run(queue.get(5)) == ("node.updated", {"node_id": "2", "name": "b"}, {})
+    assert async_run(queue.get(5)) == ("node.created", {"node_id": "3"}, {})
+
+    # the node.updated has been sent, a new one is queued
+    queue.put_nowait(NotificationMessage("node.updated", {"node_id": "1", "name": "d"}))
+    assert queue.qsize() == 1
+
+
+def test_drop_oldest(async_run):
+    queue = NotificationQueue(maxsize=2)
+    async_run(queue.get(0.1))  # ping
+    for i in range(4):
+        queue.put_nowait(NotificationMessage("test", {"i": i}))
+    assert queue.dropped == 2
+    assert queue.stats() == {"size": 2, "maxsize": 2, "dropped": 2, "coalesced": 0}
+    assert async_run(queue.get(5)) == ("test", {"i": 2}, {})
+
+
+def test_get_json_batch(async_run):
+    queue = NotificationQueue()
+    async_run(queue.get(0.1))  # ping
+    for i in range(3):
+        queue.put_nowait(NotificationMessage("test", {"i": i}))
+    assert async_run(queue.get_json_batch(5, max_messages=2)) == ['{"action": "test", "event": {"i": 0}}',
+                                                                  '{"action": "test", "event": {"i": 1}}']
+    assert async_run(queue.get_json_batch(5)) == ['{"action": "test", "event": {"i": 2}}']
+
+
+def test_put_partial_merged(async_run):
+    queue = NotificationQueue()
+    queue.put_nowait(NotificationMessage("node.updated", {"node_id": "a", "name": "PC1", "status": "stopped"}))
+    queue.put_nowait(NotificationMessage("node.updated", {"node_id": "a", "status": "started"}, partial=True))
+    assert queue.qsize() == 1
+    message = queue._next_message()
+    assert message.event == {"node_id": "a", "name": "PC1", "status": "started"}
+    assert not message.partial
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pytest
+from unittest.mock import patch
+
+from gns3server.ubridge.hypervisor_pool import UbridgeHypervisorPool
+
+
+class FakeHypervisor:
+
+    instances = []
+
+    def __init__(self, project, path, working_dir, host):
+        self.host = host
+        self.port = 4242 + len(FakeHypervisor.instances)
+        self.version = "0.9.18"
+        self.process = None
+        self.commands = []
+        self.running = False
+        FakeHypervisor.instances.append(self)
+
+    async def start(self):
+        self.running = True
+
+    async def connect(self):
+        pass
+
+    async def stop(self):
+        self.running = False
+
+    def is_running(self):
+        return self.running
+
+    def read_stdout(self):
+        return ""
+
+    async def send(self, command):
+        self.commands.append(command)
+        return []
+
+    async def send_batch(self, commands, ignore_errors=False):
+        self.commands.extend(commands)
+        return [[] for command in commands]
+
+
+@pytest.fixture
+def pool(async_run):
+
+    FakeHypervisor.instances = []
+    with patch("gns3server.ubridge.hypervisor_pool.Hypervisor", FakeHypervisor):
+        pool = UbridgeHypervisorPool(2, "127.0.0.1")
+        yield pool
+        # removes the working directory of the hypervisors
+        async_run(pool.close())
+
+
+def test_acquire_spread(async_run, pool):
+
+    clients = [async_run(pool.acquire("ubridge", "PC{}".format(i))) for i in range(4)]
+    assert len(FakeHypervisor.instances) == 2
+    assert len(pool.hypervisors()) == 2
+    assert clients[0].port != clients[1].port
+    assert clients[0].port == clients[2].port
+
+
+def test_release(async_run, pool):
+
+    client1 = async_run(pool.acquire("ubridge", "PC1"))
+    client2 = async_run(pool.acquire("ubridge", "PC2"))
+    client3 = async_run(pool.acquire("ubridge", "PC3"))
+    hypervisor = FakeHypervisor.instances[0]
+    async_run(client1.send("bridge create QEMU-1-0"))
+    async_run(client1.send("bridge start QEMU-1-0"))
+
+    # the bridges of the node are deleted, the hypervisor is still used by PC3
+    async_run(client1.stop())
+    assert hypervisor.commands[-1] == "bridge delete QEMU-1-0"
+    assert hypervisor.is_running()
+    assert not client1.is_running()
+
+    async_run(client3.stop())
+    assert not hypervisor.is_running()
+    assert len(pool.hypervisors()) == 1
+    assert client2.is_running()
+
+
+def test_restart_after_crash(async_run, pool):
+
+    client = async_run(pool.acquire("ubridge", "PC1"))
+    async_run(client.send("bridge create VPCS-1"))
+    async_run(client.send('bridge add_nio_udp VPCS-1 20000 127.0.0.1 20001'))
+    async_run(client.send('bridge start_capture VPCS-1 "/tmp/test.pcap"'))
+    async_run(client.send("bridge stop_capture VPCS-1"))
+    async_run(client.send("bridge start VPCS-1"))
+    async_run(client.send("bridge create VPCS-2"))
+    async_run(client.send("bridge delete VPCS-2"))
+
+    FakeHypervisor.instances[0].running = False
+    async_run(client.send("bridge reset_packet_filters VPCS-1"))
+
+    restarted = FakeHypervisor.instances[-1]
+    assert restarted is not FakeHypervisor.instances[0]
+    assert restarted.commands == ["bridge create VPCS-1",
+                                  "bridge add_nio_udp VPCS-1 20000 127.0.0.1 20001",
+                                  "bridge start VPCS-1",
+                                  "bridge reset_packet_filters VPCS-1"]
+
+
+def test_record_iol_bridge(async_run, pool):
+
+    client = async_run(pool.acquire("ubridge", "IOU1"))
+    async_run(client.send("iol_bridge create IOL-BRIDGE-513 513"))
+    async_run(client.send("iol_bridge add_nio_udp IOL-BRIDGE-513 1 0 0 20000 127.0.0.1 20001"))
+    async_run(client.send("iol_bridge add_nio_udp IOL-BRIDGE-513 1 0 1 20002 127.0.0.1 20003"))
+    async_run(client.send("iol_bridge delete_nio_udp IOL-BRIDGE-513 0 0"))
+    assert client.replay_commands() == ["iol_bridge create IOL-BRIDGE-513 513",
+                                        "iol_bridge add_nio_udp IOL-BRIDGE-513 1 0 1 20002 127.0.0.1 20003"]
+    assert client.delete_commands() == ["iol_bridge delete IOL-BRIDGE-513"]
+
+
+def test_close(async_run, pool):
+
+    async_run(pool.acquire("ubridge", "PC1"))
+    working_dir = pool._working_dir
+    assert os.path.isdir(working_dir)
+    async_run(pool.close())
+    assert not FakeHypervisor.instances[0].is_running()
+    assert pool.hypervisors() == []
+    assert not os.path.exists(working_dir)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import asyncio
+
+from gns3server.ubridge.ubridge_hypervisor import UBridgeHypervisor
+from gns3server.ubridge.ubridge_error import UbridgeError
+
+
+class FakeUbridge:
+    """
+    Answers the commands one byte at a time to check the responses
+    split over several reads.
+    """
+
+    def __init__(self):
+
+        self.commands = []
+        self.server = None
+
+    async def start(self):
+
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip()
+            self.commands.append(command)
+            if command == "hypervisor version":
+                response = "100-0.9.18\r\n"
+            elif command == "bridge show":
+                response = "101 bridge0\r\n101 bridge1\r\n100-OK\r\n"
+            elif command.startswith("bridge start"):
+                response = "209-Bridge doesn't exist\r\n"
+            else:
+                response = "100-OK\r\n"
+            for byte in response:
+                writer.write(byte.encode())
+                await writer.drain()
+            if command == "hypervisor close":
+                break
+        writer.close()
+
+
+@pytest.fixture
+def hypervisor(async_run):
+
+    fake = FakeUbridge()
+    port = async_run(fake.start())
+    hypervisor = UBridgeHypervisor("127.0.0.1", port)
+    async_run(hypervisor.connect())
+    hypervisor.fake = fake
+    yield hypervisor
+    async_run(hypervisor.close())
+    fake.server.close()
+
+
+def test_send(async_run, hypervisor):
+
+    assert async_run(hypervisor.send("bridge show")) == ["bridge0", "bridge1"]
+    with pytest.raises(UbridgeError):
+        async_run(hypervisor.send("bridge start bridge0"))
+
+
+def test_send_batch(async_run, hypervisor):
+
+    commands = ["bridge create bridge0", "bridge show", "bridge add_nio_udp bridge0 20000 127.0.0.1 20001"]
+    assert async_run(hypervisor.send_batch(commands)) == [[], ["bridge0", "bridge1"], []]
+    assert hypervisor.fake.commands[-3:] == commands
+    assert async_run(hypervisor.send_batch([])) == []
+
+
+def test_send_batch_errors(async_run, hypervisor):
+
+    commands = ["bridge create bridge0", "bridge start bridge0", "bridge show"]
+    with pytest.raises(UbridgeError):
+        async_run(hypervisor.send_batch(commands))
+
+    # the responses of the other commands are read even after an error
+    results = async_run(hypervisor.send_batch(commands, ignore_errors=True))
+    assert results[0] == []
+    assert isinstance(results[1], UbridgeError)
+    assert results[2] == ["bridge0", "bridge1"]
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import asyncio
+import zipfile
+import pytest
+from concurrent import futures
+from unittest.mock import patch
+
+from gns3server.utils.asyncio import aiozipstream
+
+
+@pytest.fixture
+def data():
+
+    # compressible and random parts
+    return (b"hello world " * 10000 + os.urandom(50000)) * 3
+
+
+async def write_archive(zstream, path):
+
+    with open(path, "wb") as f:
+        async for chunk in zstream:
+            f.write(chunk)
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA])
+def test_write_file(async_run, tmpdir, data, compression):
+
+    path = str(tmpdir / "disk.qcow2")
+    with open(path, "wb") as f:
+        f.write(data)
+
+    with aiozipstream.ZipFile(compression=compression, chunksize=4096) as zstream:
+        zstream.write(path, "project-files/disk.qcow2")
+        zstream.writestr("project.gns3", b"{}")
+        async_run(write_archive(zstream, str(tmpdir / "test.zip")))
+
+    with zipfile.ZipFile(str(tmpdir / "test.zip")) as myzip:
+        assert myzip.testzip() is None
+        assert myzip.read("project-files/disk.qcow2") == data
+        assert myzip.read("project.gns3") == b"{}"
+
+
+def test_write_file_parallel_deflate(async_run, tmpdir, data):
+
+    path = str(tmpdir / "disk.qcow2")
+    with open(path, "wb") as f:
+        f.write(data)
+    empty_path = str(tmpdir / "empty.qcow2")
+    open(empty_path, "wb").close()
+
+    with patch("gns3server.utils.asyncio.aiozipstream.PARALLEL_DEFLATE_MIN_SIZE", 0):
+        with patch("gns3server.utils.asyncio.aiozipstream._deflate_block", side_effect=aiozipstream._deflate_block) as mock:
+            with aiozipstream.ZipFile(compression=zipfile.ZIP_DEFLATED, chunksize=4096, parallel_deflate=True) as zstream:
+                zstream.write(path, "disk.qcow2")
+                zstream.write(empty_path, "empty.qcow2")
+                async_run(write_archive(zstream, str(tmpdir / "test.zip")))
+    # one block per buffer
+    assert mock.call_count == (len(data) + 4095) // 4096
+
+    with zipfile.ZipFile(str(tmpdir / "test.zip")) as myzip:
+        assert myzip.testzip() is None
+        assert myzip.read("disk.qcow2") == data
+        assert myzip.read("empty.qcow2") == b""
+        # the blocks use the previous block as dictionary
+        assert myzip.getinfo("disk.qcow2").compress_size < len(data) // 2
+
+
+def test_write_iter(async_run, tmpdir, data):
+
+    class AsyncIterable:
+
+        def __init__(self):
+            self.closed = False
+
+        def __aiter__(self):
+            self._chunks = iter([data[:1000], data[1000:]])
+            return self
+
+        async def __anext__(self):
+            try:
+                return next(self._chunks)
+            except StopIteration:
+                raise StopAsyncIteration
+
+        def close(self):
+            self.closed = True
+
+    iterable = AsyncIterable()
+    with aiozipstream.ZipFile(compression=zipfile.ZIP_DEFLATED, chunksize=4096) as zstream:
+        zstream.write_iter("async", iterable)
+        zstream.write_iter("sync", iter([data[:10], data[10:]]))
+        async_run(write_archive(zstream, str(tmpdir / "test.zip")))
+    assert iterable.closed
+
+    with zipfile.ZipFile(str(tmpdir / "test.zip")) as myzip:
+        assert myzip.testzip() is None
+        assert myzip.read("async") == data
+        assert myzip.read("sync") == data
+
+
+def test_write_iter_zip64(async_run, tmpdir, data):
+    """
+    The iterables of unknown size can be larger than the zip64 limit
+    """
+
+    with patch("zipfile.ZIP64_LIMIT", 1000):
+        with aiozipstream.ZipFile(compression=zipfile.ZIP_DEFLATED, chunksize=4096) as zstream:
+            zstream.write_iter("remote.qcow2", iter([data[:10], data[10:]]))
+            zstream.writestr("project.gns3", b"{}")
+            async_run(write_archive(zstream, str(tmpdir / "test.zip")))
+
+    with zipfile.ZipFile(str(tmpdir / "test.zip")) as myzip:
+        assert myzip.testzip() is None
+        assert myzip.read("remote.qcow2") == data
+        assert myzip.read("project.gns3") == b"{}"
+
+
+def test_close_during_stream(async_run, tmpdir, data):
+
+    path = str(tmpdir / "disk.qcow2")
+    with open(path, "wb") as f:
+        f.write(data)
+
+    async def read_one_chunk(zstream):
+        iterator = zstream.__aiter__()
+        await iterator.__anext__()  # header
+        await iterator.__anext__()
+        return iterator
+
+    with patch("gns3server.utils.asyncio.aiozipstream.READ_AHEAD", 1):
+        zstream = aiozipstream.ZipFile(chunksize=1024)
+        zstream.write(path, "disk.qcow2")
+        async_run(read_one_chunk(zstream))
+        prefetcher = zstream._prefetcher
+        zstream.close()
+    assert prefetcher._closed
+
+    async def wait_reader_closed():
+        while prefetcher._reader._file is not None or not prefetcher._task.done():
+            await asyncio.sleep(0.01)
+
+    # the file is no longer read
+    async_run(asyncio.wait_for(wait_reader_closed(), 5))
+
+
+def test_stalled_stream(async_run, tmpdir, data):
+    """
+    An archive which is not read doesn't prevent the other archives from being read
+    """
+
+    path = str(tmpdir / "disk.qcow2")
+    with open(path, "wb") as f:
+        f.write(data)
+
+    async def run():
+        stalled = aiozipstream.ZipFile(chunksize=1024)
+        stalled.write(path, "disk.qcow2")
+        try:
+            iterator = stalled.__aiter__()
+            await iterator.__anext__()  # header
+            await iterator.__anext__()
+            # the buffers ahead of the stalled stream are ready
+            await asyncio.sleep(0.1)
+            with aiozipstream.ZipFile(chunksize=1024) as zstream:
+                zstream.write(path, "disk.qcow2")
+                await asyncio.wait_for(write_archive(zstream, str(tmpdir / "test.zip")), 5)
+        finally:
+            stalled.close()
+
+    with patch("gns3server.utils.asyncio.aiozipstream._entry_pool", futures.ThreadPoolExecutor(max_workers=1)):
+        async_run(run())
+
+    with zipfile.ZipFile(str(tmpdir / "test.zip")) as myzip:
+        assert myzip.read("disk.qcow2") == data
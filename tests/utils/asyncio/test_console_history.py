@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import re
+
+from gns3server.utils.asyncio.console_history import ConsoleHistory
+
+
+def test_read(async_run):
+
+    history = ConsoleHistory(page_size=16)
+    assert async_run(history.read()) == b""
+    history.append(b"Router>enable\r\n")
+    history.append(b"Router#show version\r\nCisco IOS Software\r\n")
+    assert async_run(history.read()) == b"Router>enable\r\nRouter#show version\r\nCisco IOS Software\r\n"
+    assert async_run(history.read(22)) == b"\r\nCisco IOS Software\r\n"
+    assert async_run(history.read(0)) == b""
+    assert history.size == history.total == 56
+
+
+def test_max_size(async_run):
+
+    history = ConsoleHistory(max_size=1024 * 64, page_size=1024 * 4)
+    data = os.urandom(1024 * 1024)
+    history.append(data)
+    # the random data can't be compressed, only the last pages are kept
+    assert history.total == len(data)
+    assert history.memory_size <= 1024 * 64 + 1024 * 4
+    assert history.size < 1024 * 64
+    assert async_run(history.read()) == data[-history.size:]
+
+
+def test_search(async_run):
+
+    history = ConsoleHistory(page_size=8)
+    for i in range(100):
+        history.append("interface Ethernet{}\r\n no shutdown\r\n".format(i).encode())
+    assert async_run(history.search(re.compile("Ethernet9"))) == ["interface Ethernet9"] + ["interface Ethernet9{}".format(i) for i in range(10)]
+    assert async_run(history.search(re.compile("Ethernet9"), limit=2)) == ["interface Ethernet98", "interface Ethernet99"]
+    assert async_run(history.search(re.compile("Serial"))) == []
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+import asyncio
+import pytest
+from unittest.mock import patch
+
+import aiofiles
+
+from gns3server.utils.asyncio.file_tail import FileTail, FileTailClosedError, file_notifier, _FilePoller
+
+
+class Writer:
+
+    def __init__(self, path):
+
+        self.path = path
+        self.active = True
+        with open(path, "wb"):
+            pass
+
+    def write(self, data):
+
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+
+async def read_all(reader):
+
+    data = b""
+    while True:
+        chunk = await asyncio.wait_for(reader.read(), 5)
+        if not chunk:
+            break
+        data += chunk
+    await reader.close()
+    return data
+
+
+def test_fan_out(async_run, tmpdir):
+
+    writer = Writer(str(tmpdir / "test.pcap"))
+    writer.write(b"header")
+    tail = FileTail(writer.path, lambda: writer.active, chunk_size=4, check_interval=0.1)
+
+    async def run():
+        reader1 = await tail.open_reader()
+        reader2 = await tail.open_reader()
+        readers = asyncio.gather(read_all(reader1), read_all(reader2))
+        await asyncio.sleep(0.1)
+        writer.write(b"packet1")
+        await asyncio.sleep(0.1)
+        # a reader arriving late receives the beginning of the file
+        reader3 = await tail.open_reader()
+        writer.write(b"packet2")
+        writer.active = False
+        return await readers, await read_all(reader3)
+
+    (data1, data2), data3 = async_run(run())
+    assert data1 == data2 == data3 == b"headerpacket1packet2"
+    assert tail.closed
+
+
+def test_slow_reader(async_run, tmpdir):
+
+    writer = Writer(str(tmpdir / "test.pcap"))
+    tail = FileTail(writer.path, lambda: writer.active, chunk_size=2, max_chunks=2, check_interval=0.1)
+
+    async def run():
+        reader = await tail.open_reader()
+        for i in range(10):
+            writer.write("{}{}".format(i, i).encode())
+            await asyncio.sleep(0.05)
+        writer.active = False
+        # the chunks which didn't fit in the queue are read from the file
+        return await read_all(reader)
+
+    assert async_run(run()) == b"00112233445566778899"
+
+
+def test_close_last_reader(async_run, tmpdir):
+
+    writer = Writer(str(tmpdir / "test.pcap"))
+    tail = FileTail(writer.path, lambda: writer.active, check_interval=0.1)
+
+    async def run():
+        reader = await tail.open_reader()
+        await asyncio.sleep(0.05)
+        await reader.close()
+
+    async_run(run())
+    assert tail.closed
+    assert tail.readers == 0
+
+
+def test_close_last_reader_while_opening(async_run, tmpdir):
+    """
+    A reader added while the last reader is closed is refused,
+    the caller must follow the file with a new FileTail
+    """
+
+    writer = Writer(str(tmpdir / "test.pcap"))
+    tail = FileTail(writer.path, lambda: writer.active, check_interval=0.1)
+
+    async def run():
+        reader = await tail.open_reader()
+        opened = asyncio.Event()
+        release = asyncio.Event()
+        aiofiles_open = aiofiles.open
+
+        async def slow_open(*args, **kwargs):
+            f = await aiofiles_open(*args, **kwargs)
+            opened.set()
+            await release.wait()
+            return f
+
+        with patch("aiofiles.open", side_effect=slow_open):
+            second_reader = asyncio.ensure_future(tail.open_reader())
+            await opened.wait()
+            await reader.close()
+            release.set()
+            with pytest.raises(FileTailClosedError):
+                await second_reader
+
+    async_run(run())
+    assert tail.closed
+    assert tail.readers == 0
+
+
+def test_file_not_found(async_run, tmpdir):
+
+    tail = FileTail(str(tmpdir / "test.pcap"), lambda: True)
+    with pytest.raises(FileNotFoundError):
+        async_run(tail.open_reader())
+
+
+def test_polling(async_run, tmpdir):
+
+    writer = Writer(str(tmpdir / "test.pcap"))
+    tail = FileTail(writer.path, lambda: writer.active, check_interval=0.1)
+
+    async def run():
+        reader = await tail.open_reader()
+        writer.write(b"packet1")
+        await asyncio.sleep(0.2)
+        writer.active = False
+        return await read_all(reader)
+
+    with patch("gns3server.utils.asyncio.file_tail.file_notifier", side_effect=_FilePoller):
+        assert async_run(run()) == b"packet1"
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+def test_file_notifier(async_run, tmpdir):
+
+    writer = Writer(str(tmpdir / "test.pcap"))
+    modified = asyncio.Event()
+    notifier = file_notifier(writer.path, modified.set)
+    assert not isinstance(notifier, _FilePoller)
+
+    async def run():
+        notifier.pause()
+        writer.write(b"packet1")
+        await asyncio.sleep(0.1)
+        assert not modified.is_set()
+        # the writes received while paused are notified when resumed
+        notifier.resume()
+        await asyncio.wait_for(modified.wait(), 1)
+        modified.clear()
+        asyncio.get_event_loop().call_later(0.1, writer.write, b"packet2")
+        await asyncio.wait_for(modified.wait(), 1)
+
+    try:
+        async_run(run())
+    finally:
+        notifier.close()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2017 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import asyncio
+import pytest
+
+from gns3server.utils.asyncio.pool import Pool, PoolError
+
+
+def test_pool_concurrency(async_run):
+
+    running = []
+    max_running = []
+
+    async def task(id):
+        running.append(id)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(id)
+
+    pool = Pool(concurrency=3)
+    for i in range(10):
+        pool.append(task, i)
+    async_run(pool.join())
+    assert max(max_running) == 3
+
+
+def test_pool_load():
+
+    pool = Pool(concurrency=10, load=lambda: 10)
+    assert pool.concurrency() == 10
+    pool = Pool(concurrency=10, load=lambda: 70)
+    assert pool.concurrency() == 5
+    pool = Pool(concurrency=10, load=lambda: 95)
+    assert pool.concurrency() == 1
+    pool = Pool(concurrency=10, load=lambda: None)
+    assert pool.concurrency() == 10
+
+
+def test_pool_priority(async_run):
+
+    order = []
+
+    async def task(id, delay):
+        await asyncio.sleep(delay)
+        order.append(id)
+
+    pool = Pool(concurrency=10)
+    pool.add_task(task, args=("vm", 0))
+    pool.add_task(task, args=("switch", 0.05), priority=1)
+    async_run(pool.join())
+    assert order == ["switch", "vm"]
+
+
+def test_pool_timeout(async_run):
+
+    async def task():
+        await asyncio.sleep(1)
+
+    pool = Pool(timeout=0.01)
+    pool.append(task)
+    with pytest.raises(asyncio.TimeoutError):
+        async_run(pool.join())
+
+
+def test_pool_errors(async_run):
+
+    async def task(id):
+        if id % 2:
+            raise ValueError("Error {}".format(id))
+
+    pool = Pool(concurrency=2)
+    for i in range(5):
+        pool.append(task, i)
+    with pytest.raises(PoolError) as e:
+        async_run(pool.join())
+    assert len(e.value.exceptions) == 2
+    assert "Error 1" in str(e.value)
+    assert "Error 3" in str(e.value)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+from gns3server.utils.asyncio.telnet_server import AsyncioTelnetServer, ConsoleBuffer, IAC
+from gns3server.utils.asyncio.console_history import ConsoleHistory
+
+
+def test_console_buffer():
+
+    buffer = ConsoleBuffer(8)
+    buffer.append(b"hello")
+    assert b"".join(buffer.read(0)) == b"hello"
+    assert b"".join(buffer.read(2)) == b"llo"
+    buffer.append(b" world")
+    assert buffer.start == 3
+    assert buffer.end == 11
+    assert len(buffer.read(3)) == 2
+    assert b"".join(buffer.read(3)) == b"lo world"
+    assert buffer.read(11) == []
+    buffer.append(b"0123456789")
+    assert buffer.start == 13
+    assert b"".join(buffer.read(13)) == b"23456789"
+
+
+async def start_server(scrollback_size=1024):
+
+    emulator = asyncio.StreamReader()
+    telnet = AsyncioTelnetServer(reader=emulator, writer=None, binary=True, echo=True, scrollback_size=scrollback_size)
+    server = await asyncio.start_server(telnet.run, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return emulator, telnet, server, port
+
+
+async def connect(port):
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    # skip the telnet negotiation
+    await reader.readexactly(4 * 3)
+    return reader, writer
+
+
+async def read_until(reader, data):
+
+    return await asyncio.wait_for(reader.readuntil(data), 5)
+
+
+def test_fan_out(async_run):
+
+    async def run():
+        emulator, telnet, server, port = await start_server()
+        client1 = await connect(port)
+        client2 = await connect(port)
+        await asyncio.sleep(0.1)
+        emulator.feed_data(b"Router>")
+        assert await read_until(client1[0], b">") == b"Router>"
+        assert await read_until(client2[0], b">") == b"Router>"
+        emulator.feed_eof()
+        assert await asyncio.wait_for(client1[0].read(), 5) == b""
+        assert await asyncio.wait_for(client2[0].read(), 5) == b""
+        server.close()
+        await server.wait_closed()
+
+    async_run(run())
+
+
+def test_connect_after_console_closed(async_run):
+
+    async def run():
+        emulator, telnet, server, port = await start_server()
+        client1 = await connect(port)
+        await asyncio.sleep(0.1)
+        emulator.feed_data(b"Router>")
+        emulator.feed_eof()
+        assert await asyncio.wait_for(client1[0].read(), 5) == b"Router>"
+        # a client connecting after the end of the console is disconnected
+        client2 = await connect(port)
+        assert await asyncio.wait_for(client2[0].read(), 5) == b"Router>"
+        server.close()
+        await server.wait_closed()
+
+    async_run(run())
+
+
+def test_scrollback_replay(async_run):
+
+    async def run():
+        emulator, telnet, server, port = await start_server(scrollback_size=8)
+        client1 = await connect(port)
+        await asyncio.sleep(0.1)
+        emulator.feed_data(b"boot\n")
+        assert await read_until(client1[0], b"\n") == b"boot\n"
+        emulator.feed_data(b"Router>")
+        assert await read_until(client1[0], b">") == b"Router>"
+        # a new client gets the last output of the console
+        client2 = await connect(port)
+        assert await read_until(client2[0], b">") == b"\nRouter>"
+        await telnet.close()
+        server.close()
+        await server.wait_closed()
+
+    async_run(run())
+
+
+def test_slow_client(async_run):
+
+    async def run():
+        emulator, telnet, server, port = await start_server(scrollback_size=1024)
+        stalled_reader, stalled_writer = await connect(port)
+        client = await connect(port)
+        await asyncio.sleep(0.1)
+        # the stalled client never reads, the other client must get all the output
+        line = b"x" * 1023 + b"\n"
+        read = asyncio.ensure_future(client[0].readexactly(10 * 1024 * 1024 + 7))
+        for _ in range(10 * 1024):
+            emulator.feed_data(line)
+            await asyncio.sleep(0)
+        emulator.feed_data(b"Router>")
+        data = await asyncio.wait_for(read, 10)
+        assert data.endswith(line + b"Router>")
+        # the stalled client has lost part of the output
+        # the stalled client catches up from the end of the scrollback
+        stalled = b""
+        while not stalled.endswith(b"Router>"):
+            stalled += await asyncio.wait_for(stalled_reader.read(65536), 5)
+        assert len(stalled) < len(data)
+        assert len([c for c in telnet._clients.values() if c.lost]) == 1
+        emulator.feed_eof()
+        server.close()
+        await server.wait_closed()
+
+    async_run(run())
+
+
+def test_history(async_run):
+
+    async def run():
+        emulator = asyncio.StreamReader()
+        history = ConsoleHistory()
+        AsyncioTelnetServer(reader=emulator, writer=None, binary=True, echo=True, history=history)
+        # the output is recorded without client connected
+        emulator.feed_data(b"Router>")
+        emulator.feed_eof()
+        await asyncio.sleep(0.1)
+        assert await history.read() == b"Router>"
+
+    async_run(run())
+
+
+def test_input(async_run):
+
+    async def run():
+        emulator = asyncio.StreamReader()
+
+        class Writer:
+            data = b""
+
+            def write(self, data):
+                self.data += data
+
+            async def drain(self):
+                pass
+
+        writer = Writer()
+        telnet = AsyncioTelnetServer(reader=emulator, writer=writer, binary=True, echo=True)
+        server = await asyncio.start_server(telnet.run, "127.0.0.1", 0)
+        reader, network_writer = await connect(server.sockets[0].getsockname()[1])
+        network_writer.write(b"show version\n" + bytes([IAC, IAC]))
+        await network_writer.drain()
+        for _ in range(50):
+            if len(writer.data) >= 14:
+                break
+            await asyncio.sleep(0.1)
+        assert writer.data == b"show version\n" + bytes([IAC])
+        network_writer.close()
+        emulator.feed_eof()
+        server.close()
+        await server.wait_closed()
+
+    async_run(run())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+from gns3server.utils.file_clone import clone_file
+
+
+@pytest.fixture
+def src(tmpdir):
+
+    path = str(tmpdir / "disk.qcow2")
+    with open(path, "wb") as f:
+        f.write(os.urandom(1024 * 1024 * 3 + 42))
+    os.utime(path, (1000000000, 1000000000))
+    return path
+
+
+def read(path):
+
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_clone_file(src, tmpdir):
+
+    dst = str(tmpdir / "copy.qcow2")
+    assert clone_file(src, dst) in ("reflink", "copy")
+    assert read(dst) == read(src)
+    assert os.stat(dst).st_mtime == 1000000000
+    assert os.stat(dst).st_ino != os.stat(src).st_ino
+
+
+def test_clone_file_no_reflink(src, tmpdir):
+
+    dst = str(tmpdir / "copy.qcow2")
+    with patch("gns3server.utils.file_clone._reflink", return_value=False):
+        assert clone_file(src, dst) == "copy"
+    assert read(dst) == read(src)
+
+
+def test_clone_file_reflink(src, tmpdir):
+
+    def reflink(src, dst):
+        open(dst, "wb").close()
+        return True
+
+    dst = str(tmpdir / "copy.qcow2")
+    with patch("gns3server.utils.file_clone._reflink", side_effect=reflink) as mock:
+        assert clone_file(src, dst) == "reflink"
+    mock.assert_called_with(src, dst)
+    assert os.stat(dst).st_mtime == 1000000000
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Not supported on Windows")
+def test_clone_file_read_only(src, tmpdir):
+
+    os.chmod(src, 0o444)
+    dst = str(tmpdir / "copy.qcow2")
+    assert clone_file(src, dst) == "hardlink"
+    assert os.stat(dst).st_ino == os.stat(src).st_ino
+
+    dst = str(tmpdir / "copy2.qcow2")
+    assert clone_file(src, dst, allow_hardlink=False) != "hardlink"
+    assert os.stat(dst).st_ino != os.stat(src).st_ino
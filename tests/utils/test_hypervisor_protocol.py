@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from gns3server.utils.hypervisor_protocol import HypervisorResponseParser
+
+
+def test_parse_ok():
+
+    parser = HypervisorResponseParser()
+    assert parser.feed("100-OK\r\n") == [(False, [])]
+
+
+def test_parse_result_lines():
+
+    parser = HypervisorResponseParser()
+    assert parser.feed("101 bridge0\r\n101 bridge1\r\n100-OK\r\n") == [(False, ["bridge0", "bridge1"])]
+    assert parser.feed("100-0.9.18\r\n") == [(False, ["0.9.18"])]
+
+
+def test_parse_error():
+
+    parser = HypervisorResponseParser()
+    assert parser.feed("209-Bridge 'bridge0' doesn't exist\r\n") == [(True, "Bridge 'bridge0' doesn't exist")]
+
+
+def test_parse_multiple_responses():
+
+    parser = HypervisorResponseParser()
+    responses = parser.feed("100-OK\r\n209-Unknown command\r\n101 c2600\r\n100-OK\r\n")
+    assert responses == [(False, []), (True, "Unknown command"), (False, ["c2600"])]
+
+
+def test_parse_split_responses():
+
+    parser = HypervisorResponseParser()
+    assert parser.feed("101 ca") == []
+    assert parser.feed("fe\r\n100-") == []
+    assert parser.feed("OK\r") == []
+    assert parser.feed("\n100-OK\r\n") == [(False, ["cafe"]), (False, [])]
@@ -17,12 +17,13 @@
 
 import os
 import sys
+import hashlib
 import threading
 from unittest.mock import patch
 
 
 from gns3server.utils import force_unix_path
-from gns3server.utils.images import md5sum, remove_checksum, images_directories, list_images
+from gns3server.utils.images import md5sum, remove_checksum, images_directories, list_images, ChecksumIndex, DirectoryIndex, _directory_indexes
 
 
 def test_images_directories(tmpdir):
@@ -95,6 +96,51 @@ def test_md5sum_none(tmpdir):
     assert md5sum(None) is None
 
 
+def test_md5sum_large_file(tmpdir):
+    fake_img = str(tmpdir / 'large')
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    with open(fake_img, 'wb+') as f:
+        f.write(data)
+
+    assert md5sum(fake_img) == hashlib.md5(data).hexdigest()
+
+
+def test_md5sum_index(tmpdir):
+    fake_img = str(tmpdir / 'hello')
+    with open(fake_img, 'w+') as f:
+        f.write('hello')
+
+    assert md5sum(fake_img) == '5d41402abc4b2a76b9719d911017c592'
+    # the digest comes from the index, the image is not read again
+    with patch("gns3server.utils.images.compute_md5sum") as mock:
+        assert md5sum(fake_img) == '5d41402abc4b2a76b9719d911017c592'
+        assert not mock.called
+
+    # the image has changed, the .md5sum file is outdated
+    with open(fake_img, 'w+') as f:
+        f.write('hello world')
+    assert md5sum(fake_img) == '5eb63bbbe01eeed093cb22bb8f5acdc3'
+    with open(str(tmpdir / 'hello.md5sum')) as f:
+        assert f.read() == '5eb63bbbe01eeed093cb22bb8f5acdc3'
+
+
+def test_checksum_index_persistence(tmpdir):
+    fake_img = str(tmpdir / 'hello')
+    with open(fake_img, 'w+') as f:
+        f.write('hello')
+    stat = os.stat(fake_img)
+
+    index = ChecksumIndex(str(tmpdir / 'index.json'))
+    assert index.lookup(fake_img, stat) == (False, None)
+    index.update(fake_img, stat, '5d41402abc4b2a76b9719d911017c592')
+    index.save()
+
+    index = ChecksumIndex(str(tmpdir / 'index.json'))
+    assert index.lookup(fake_img, stat) == (True, '5d41402abc4b2a76b9719d911017c592')
+    index.remove(fake_img)
+    assert index.lookup(fake_img, stat) == (False, None)
+
+
 def test_remove_checksum(tmpdir):
 
     with open(str(tmpdir / 'hello.md5sum'), 'w+') as f:
@@ -170,3 +216,77 @@ def test_list_images(tmpdir):
                 'path': 'test4.qcow2'
             }
         ]
+
+
+def test_directory_index(tmpdir):
+    path = tmpdir / "images" / "QEMU" / "a.qcow2"
+    path.write("1", ensure=True)
+    directory = str(tmpdir / "images")
+    for d in (directory, str(tmpdir / "images" / "QEMU")):
+        os.utime(d, (0, 0))
+
+    index = DirectoryIndex(directory)
+    assert index.find("a.qcow2") == str(path)
+    assert index.find("QEMU/a.qcow2") == str(path)
+    assert index.find("IOU/a.qcow2") is None
+    generation = index.generation
+
+    # nothing has changed the directory is not scanned again
+    with patch("gns3server.utils.images._os_walk") as mock_walk:
+        assert index.find("a.qcow2") == str(path)
+        assert not mock_walk.called
+    assert index.generation == generation
+
+    (tmpdir / "images" / "QEMU" / "b.qcow2").write("1")
+    assert index.find("b.qcow2") == str(tmpdir / "images" / "QEMU" / "b.qcow2")
+    assert index.generation == generation + 1
+
+
+def test_list_images_modified_in_place(tmpdir):
+    path = tmpdir / "images" / "QEMU" / "a.qcow2"
+    path.write(b"1" * 100, ensure=True)
+    for d in (str(tmpdir / "images"), str(tmpdir / "images" / "QEMU")):
+        os.utime(d, (0, 0))
+
+    with patch("gns3server.config.Config.get_section_config", return_value={"images_path": str(tmpdir / "images")}):
+        assert list_images("qemu")[0]["filesize"] == 100
+        # the checksum index is not stored in an images directory
+        assert os.path.exists(str(tmpdir / ".image_checksums.json"))
+        assert os.stat(str(tmpdir / "images")).st_mtime == 0
+        # the .md5sum file has changed the directory
+        os.utime(str(tmpdir / "images" / "QEMU"), (0, 0))
+        list_images("qemu")
+
+        # nothing has changed, the cached listing is returned
+        with patch("gns3server.utils.images._scan_images") as mock:
+            list_images("qemu")
+            assert not mock.called
+
+        with open(str(path), "r+b") as f:
+            f.write(b"2" * 5000)
+        if not sys.platform.startswith("linux"):
+            for index in _directory_indexes.values():
+                index._files_checked = 0
+        images = list_images("qemu")
+        assert images[0]["filesize"] == 5000
+        assert images[0]["md5sum"] == hashlib.md5(b"2" * 5000).hexdigest()
+
+
+def test_directory_index_without_inotify(tmpdir):
+    path = tmpdir / "images" / "a.qcow2"
+    path.write(b"1", ensure=True)
+    os.utime(str(tmpdir / "images"), (0, 0))
+
+    with patch("gns3server.utils.images._directory_watcher", return_value=None):
+        index = DirectoryIndex(str(tmpdir / "images"))
+        index.refresh()
+    generation = index.generation
+
+    with open(str(path), "r+b") as f:
+        f.write(b"22")
+    # the files are only checked at an interval
+    index.refresh()
+    assert index.generation == generation
+    index._files_checked = 0
+    index.refresh()
+    assert index.generation == generation + 1
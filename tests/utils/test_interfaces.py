@@ -16,8 +16,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import sys
+import socket
+from unittest.mock import patch
 
-from gns3server.utils.interfaces import interfaces, is_interface_up, has_netmask
+from gns3server.utils.interfaces import interfaces, is_interface_up, has_netmask, _InterfacesSnapshot
 
 
 def test_interfaces():
@@ -57,3 +59,42 @@ def test_is_interface_up():
     else:
         assert is_interface_up("lo") is True
         assert is_interface_up("fake0") is False
+
+
+def test_interfaces_snapshot():
+    snapshot = _InterfacesSnapshot()
+    notifications, netlink = socket.socketpair()
+    netlink.setblocking(False)
+    snapshot._netlink = netlink
+    with patch("gns3server.utils.interfaces._host_interfaces", return_value=[{"name": "eth0"}]) as mock:
+        assert snapshot.get(None) == [{"name": "eth0"}]
+        assert snapshot.get(None) == [{"name": "eth0"}]
+        assert mock.call_count == 1
+        # an interface has changed
+        notifications.send(b"link")
+        snapshot.get(None)
+        assert mock.call_count == 2
+        snapshot.get("eth0")
+        assert mock.call_count == 3
+    notifications.close()
+    netlink.close()
+
+
+def test_interfaces_snapshot_ttl():
+    snapshot = _InterfacesSnapshot()
+    snapshot._netlink = False
+    with patch("gns3server.utils.interfaces._host_interfaces", return_value=[{"name": "eth0"}]) as mock:
+        with patch("time.monotonic", return_value=100):
+            snapshot.get(None)
+        with patch("time.monotonic", return_value=102):
+            snapshot.get(None)
+        assert mock.call_count == 1
+        with patch("time.monotonic", return_value=110):
+            snapshot.get(None)
+        assert mock.call_count == 2
+
+
+def test_interfaces_copy():
+    interface_list = interfaces()
+    interface_list[0]["name"] = "modified"
+    assert interfaces()[0]["name"] != "modified"
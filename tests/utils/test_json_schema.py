@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2020 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import jsonschema
+from unittest.mock import patch
+
+from gns3server.utils import json_schema
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"}
+    },
+    "required": ["name"]
+}
+
+
+def test_get_validator_cached():
+
+    validator = json_schema.get_validator(SCHEMA)
+    assert json_schema.get_validator(SCHEMA) is validator
+    # an equal schema is another schema
+    assert json_schema.get_validator(dict(SCHEMA)) is not validator
+
+
+def test_get_validator_invalid_schema():
+
+    with pytest.raises(jsonschema.SchemaError):
+        json_schema.get_validator({"type": 42})
+
+
+def test_validate():
+
+    json_schema.validate({"name": "test"}, SCHEMA)
+    with pytest.raises(jsonschema.ValidationError) as e:
+        json_schema.validate({"name": 42}, SCHEMA)
+    assert e.value.message == "42 is not of type 'string'"
+
+
+def test_should_validate_output():
+
+    with patch("gns3server.config.Config.get_section_config", return_value={"output_validation": "always"}):
+        assert json_schema.should_validate_output()
+    with patch("gns3server.config.Config.get_section_config", return_value={"output_validation": "never"}):
+        assert not json_schema.should_validate_output()
+    with patch("gns3server.config.Config.get_section_config", return_value={"output_validation": "sample", "output_validation_sample_rate": "10"}):
+        assert sum(json_schema.should_validate_output() for _ in range(100)) == 10
@@ -17,8 +17,8 @@
 
 import pytest
 
-from unittest.mock import MagicMock
-from aiohttp.web import HTTPNotFound
+from unittest.mock import MagicMock, patch
+from aiohttp.web import HTTPNotFound, HTTPBadRequest
 
 from gns3server.web.response import Response
 
@@ -42,3 +42,23 @@ def test_response_file_not_found(async_run, tmpdir, response):
     filename = str(tmpdir / 'hello-not-found')
 
     pytest.raises(HTTPNotFound, lambda: async_run(response.stream_file(filename)))
+
+
+def test_response_keep_alive():
+    request = MagicMock()
+    response = Response(request=request, route="/v2/projects/{project_id}")
+    assert response.headers["Connection"] == "close"
+    response = Response(request=request, route="/v2/compute/projects/{project_id}")
+    assert "Connection" not in response.headers
+
+
+def test_response_json_output_validation(response):
+
+    schema = {"type": "object", "properties": {"name": {"type": "string"}}}
+    response._output_schema = schema
+    with patch("gns3server.config.Config.get_section_config", return_value={"output_validation": "always"}):
+        with pytest.raises(HTTPBadRequest):
+            response.json({"name": 42})
+    with patch("gns3server.config.Config.get_section_config", return_value={"output_validation": "never"}):
+        response.json({"name": 42})
+        assert response.body